@@ -1,20 +1,24 @@
-from languru.models.data_model import DataModel
-from languru.prompts.prompt_template import PromptTemplate
-from languru.types.audio import (
-    AudioSpeechRequest,
-    AudioTranscriptionRequest,
-    AudioTranslationRequest,
-)
-from languru.types.chat.anthropic import AnthropicChatCompletionRequest
-from languru.types.chat.completions import ChatCompletionRequest
-from languru.types.completions import Completion, CompletionRequest
-from languru.types.embeddings import EmbeddingRequest
-from languru.types.images import (
-    ImagesEditRequest,
-    ImagesGenerationsRequest,
-    ImagesVariationsRequest,
-)
-from languru.types.moderations import ModerationRequest
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from languru.models.data_model import DataModel
+    from languru.prompts.prompt_template import PromptTemplate
+    from languru.types.audio import (
+        AudioSpeechRequest,
+        AudioTranscriptionRequest,
+        AudioTranslationRequest,
+    )
+    from languru.types.chat.anthropic import AnthropicChatCompletionRequest
+    from languru.types.chat.completions import ChatCompletionRequest
+    from languru.types.completions import Completion, CompletionRequest
+    from languru.types.embeddings import EmbeddingRequest
+    from languru.types.images import (
+        ImagesEditRequest,
+        ImagesGenerationsRequest,
+        ImagesVariationsRequest,
+    )
+    from languru.types.moderations import ModerationRequest
 
 __all__ = [
     "AnthropicChatCompletionRequest",
@@ -32,3 +36,28 @@ __all__ = [
     "ModerationRequest",
     "PromptTemplate",
 ]
+
+# The exports are imported on the first access, so importing a submodule, e.g.
+# the CLI, does not import the `openai` types
+_export_modules = {
+    "AnthropicChatCompletionRequest": "languru.types.chat.anthropic",
+    "AudioSpeechRequest": "languru.types.audio",
+    "AudioTranscriptionRequest": "languru.types.audio",
+    "AudioTranslationRequest": "languru.types.audio",
+    "ChatCompletionRequest": "languru.types.chat.completions",
+    "Completion": "languru.types.completions",
+    "CompletionRequest": "languru.types.completions",
+    "DataModel": "languru.models.data_model",
+    "EmbeddingRequest": "languru.types.embeddings",
+    "ImagesEditRequest": "languru.types.images",
+    "ImagesGenerationsRequest": "languru.types.images",
+    "ImagesVariationsRequest": "languru.types.images",
+    "ModerationRequest": "languru.types.moderations",
+    "PromptTemplate": "languru.prompts.prompt_template",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _export_modules:
+        return getattr(importlib.import_module(_export_modules[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,35 @@
-from languru.openai_plugins.clients.anthropic import AnthropicOpenAI
-from languru.openai_plugins.clients.google import GoogleOpenAI
-from languru.openai_plugins.clients.groq import GroqOpenAI
-from languru.openai_plugins.clients.pplx import PerplexityOpenAI
-from languru.openai_plugins.clients.voyage import VoyageOpenAI
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from languru.openai_plugins.clients.anthropic import AnthropicOpenAI
+    from languru.openai_plugins.clients.google import GoogleOpenAI
+    from languru.openai_plugins.clients.groq import GroqOpenAI
+    from languru.openai_plugins.clients.local import LocalOpenAI
+    from languru.openai_plugins.clients.pplx import PerplexityOpenAI
+    from languru.openai_plugins.clients.voyage import VoyageOpenAI
 
 __all__ = [
     "AnthropicOpenAI",
     "GoogleOpenAI",
     "GroqOpenAI",
+    "LocalOpenAI",
     "PerplexityOpenAI",
     "VoyageOpenAI",
 ]
+
+# The clients are imported on the first access, each imports its provider SDK
+_client_modules = {
+    "AnthropicOpenAI": "languru.openai_plugins.clients.anthropic",
+    "GoogleOpenAI": "languru.openai_plugins.clients.google",
+    "GroqOpenAI": "languru.openai_plugins.clients.groq",
+    "LocalOpenAI": "languru.openai_plugins.clients.local",
+    "PerplexityOpenAI": "languru.openai_plugins.clients.pplx",
+    "VoyageOpenAI": "languru.openai_plugins.clients.voyage",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _client_modules:
+        return getattr(importlib.import_module(_client_modules[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,18 +1,26 @@
 import os
 import time
-from typing import Dict, Generator, Iterable, List, Literal, Optional, Text, Union
+from types import SimpleNamespace
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Union,
+)
 
 import anthropic
+import anyio
 import httpx
 import openai
-from anthropic.types.raw_content_block_delta_event import RawContentBlockDeltaEvent
-from anthropic.types.raw_content_block_start_event import RawContentBlockStartEvent
-from anthropic.types.raw_content_block_stop_event import RawContentBlockStopEvent
-from anthropic.types.raw_message_delta_event import RawMessageDeltaEvent
-from anthropic.types.raw_message_start_event import RawMessageStartEvent
-from anthropic.types.raw_message_stop_event import RawMessageStopEvent
 from anthropic.types.raw_message_stream_event import RawMessageStreamEvent
-from anthropic.types.text_delta import TextDelta
 from httpx._transports.default import ResponseStream
 from openai import OpenAI
 from openai import resources as OpenAIResources
@@ -24,7 +32,11 @@ from openai.pagination import SyncPage
 from openai.resources.chat.completions import Completions
 from openai.types.chat import completion_create_params
 from openai.types.chat.chat_completion import ChatCompletion
-from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+from openai.types.chat.chat_completion_chunk import (
+    ChatCompletionChunk,
+    Choice,
+    ChoiceDelta,
+)
 from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
 from openai.types.chat.chat_completion_stream_options_param import (
     ChatCompletionStreamOptionsParam,
@@ -34,16 +46,162 @@ from openai.types.chat.chat_completion_tool_choice_option_param import (
 )
 from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
 from openai.types.chat_model import ChatModel
+from openai.types.completion_usage import CompletionUsage
 from openai.types.model import Model
 
 from languru.config import logger
 from languru.exceptions import CredentialsNotProvided
 from languru.openai_plugins.clients.utils import openai_init_parameter_keys
-from languru.types.chat.anthropic import AnthropicChatCompletionRequest
+from languru.types.chat.anthropic import AnthropicChatCompletionRequest, CacheBreakpoint
 from languru.types.chat.completions import ChatCompletionRequest
 from languru.types.models import MODELS_ANTHROPIC
 from languru.utils.openai_utils import rand_chat_completion_id
-from languru.utils.sse import simple_encode_sse
+from languru.utils.sse import ChatCompletionChunkEncoder, simple_encode_sse
+
+
+def to_completion_usage(usage: Any) -> CompletionUsage:
+    """Convert the Anthropic usage to the OpenAI completion usage.
+
+    The cache reads and writes of prompt caching are billed input tokens, so
+    they are counted in `prompt_tokens`, the cache reads are also reported in
+    `prompt_tokens_details.cached_tokens` as OpenAI does.
+    """
+
+    cache_creation_input_tokens = getattr(usage, "cache_creation_input_tokens", 0)
+    cache_read_input_tokens = getattr(usage, "cache_read_input_tokens", 0)
+    prompt_tokens = (
+        usage.input_tokens
+        + (cache_creation_input_tokens or 0)
+        + (cache_read_input_tokens or 0)
+    )
+    return CompletionUsage.model_validate(
+        {
+            "completion_tokens": usage.output_tokens,
+            "prompt_tokens": prompt_tokens,
+            "total_tokens": prompt_tokens + usage.output_tokens,
+            "prompt_tokens_details": {"cached_tokens": cache_read_input_tokens or 0},
+            "cache_creation_input_tokens": cache_creation_input_tokens or 0,
+            "cache_read_input_tokens": cache_read_input_tokens or 0,
+        }
+    )
+
+
+class MessageStreamState:
+    """The state of an Anthropic message stream converted to the chat
+    completion chunks, shared by the sync and async streaming.
+
+    Parameters
+    ----------
+    model : Text
+        The model name of the chunks.
+    created : Optional[int], optional
+        The timestamp of the chunks, by default now.
+    chat_completion_id : Optional[Text], optional
+        The chat completion ID until the message start event, by default a
+        random one.
+    input_output_tokens : Optional[Dict[Text, int]], optional
+        The usage updated by the events, by default a new one.
+    """
+
+    def __init__(
+        self,
+        *,
+        model: Text,
+        created: Optional[int] = None,
+        chat_completion_id: Optional[Text] = None,
+        input_output_tokens: Optional[Dict[Text, int]] = None,
+    ):
+        self.model = model
+        self.created = created or int(time.time())
+        self.id = chat_completion_id or rand_chat_completion_id()
+        self.input_output_tokens = input_output_tokens or {
+            "input_tokens": 0,
+            "output_tokens": 0,
+        }
+        self.finish_reason: Text = "stop"
+
+    def update(self, event: Any) -> Optional[Text]:
+        """Update the state with the event, returns the text of a text delta."""
+
+        # Dispatch on the event type, the prompt caching beta events are
+        # not the instances of the `RawMessageStreamEvent` classes.
+        if event.type == "message_start":
+            self.id = event.message.id
+            usage = event.message.usage
+            self.input_output_tokens["input_tokens"] = usage.input_tokens
+            for key in ("cache_creation_input_tokens", "cache_read_input_tokens"):
+                self.input_output_tokens[key] = getattr(usage, key, None) or 0
+        elif event.type == "content_block_start":
+            pass
+        elif event.type == "content_block_delta":
+            if event.delta.type == "text_delta":
+                return event.delta.text
+            logger.warning(f"Unhandled delta type: {event.delta} yet.")
+        elif event.type == "content_block_stop":
+            pass
+        elif event.type == "message_delta":
+            self.input_output_tokens["output_tokens"] = event.usage.output_tokens
+            if event.delta.stop_reason == "end_turn":
+                self.finish_reason = "stop"
+            elif event.delta.stop_reason == "max_tokens":
+                self.finish_reason = "length"
+            elif event.delta.stop_reason == "stop_sequence":
+                self.finish_reason = "stop"
+            else:
+                logger.warning(f"Unknown stop reason: {event.delta.stop_reason}")
+        elif event.type == "message_stop":
+            pass
+        else:
+            logger.warning(f"Unhandled event type: {event} yet.")
+        return None
+
+    def content_chunk(self, text: Text) -> ChatCompletionChunk:
+        return ChatCompletionChunk.model_construct(
+            id=self.id,
+            choices=[
+                Choice.model_construct(
+                    delta=ChoiceDelta.model_construct(content=text, role="assistant"),
+                    finish_reason=None,
+                    index=0,
+                )
+            ],
+            created=self.created,
+            model=self.model,
+            object="chat.completion.chunk",
+        )
+
+    def final_chunk(self) -> ChatCompletionChunk:
+        """Return the last chunk of the choice with the finish reason."""
+
+        return ChatCompletionChunk.model_validate(
+            {
+                "id": self.id,
+                "choices": [
+                    {"delta": {}, "finish_reason": self.finish_reason, "index": 0}
+                ],
+                "created": self.created,
+                "model": self.model,
+                "object": "chat.completion.chunk",
+            }
+        )
+
+    def usage_chunk(self) -> ChatCompletionChunk:
+        """Return the trailing chunk without choices carrying the usage, sent
+        with `stream_options.include_usage` as OpenAI does.
+        """
+
+        return ChatCompletionChunk.model_validate(
+            {
+                "id": self.id,
+                "choices": [],
+                "created": self.created,
+                "model": self.model,
+                "object": "chat.completion.chunk",
+                "usage": to_completion_usage(
+                    SimpleNamespace(**self.input_output_tokens)
+                ).model_dump(),
+            }
+        )
 
 
 class AnthropicChatCompletions(Completions):
@@ -183,19 +341,15 @@ class AnthropicChatCompletions(Completions):
         if len(list(messages)) == 0:
             raise ValueError("The `messages` must not be empty")
 
-        anthropic_req = (
-            AnthropicChatCompletionRequest.from_openai_chat_completion_request(
-                ChatCompletionRequest.from_kwargs(
-                    messages=messages, model=model, **kwargs
-                )
-            )
+        anthropic_req = self.to_anthropic_request(
+            messages=messages, model=model, extra_body=extra_body, **kwargs
         )
 
         # Send request
-        res_message = self._client.anthropic_client.messages.create(
+        anthropic_messages, anthropic_req = self.anthropic_messages(anthropic_req)
+        res_message = anthropic_messages.create(
             **anthropic_req.model_dump(exclude_none=True)
         )
-        total_tokens = res_message.usage.input_tokens + res_message.usage.output_tokens
         finish_reason = "stop"
         if res_message.stop_reason == "end_turn":
             finish_reason = "stop"
@@ -223,11 +377,7 @@ class AnthropicChatCompletions(Completions):
                 "created": int(time.time()),
                 "model": res_message.model,
                 "object": "chat.completion",
-                "usage": {
-                    "completion_tokens": res_message.usage.output_tokens,
-                    "prompt_tokens": res_message.usage.input_tokens,
-                    "total_tokens": total_tokens,
-                },
+                "usage": to_completion_usage(res_message.usage).model_dump(),
             }
         )
 
@@ -274,29 +424,27 @@ class AnthropicChatCompletions(Completions):
         if len(list(messages)) == 0:
             raise ValueError("The `messages` must not be empty")
 
-        anthropic_req = (
-            AnthropicChatCompletionRequest.from_openai_chat_completion_request(
-                ChatCompletionRequest.from_kwargs(
-                    messages=messages, model=model, **kwargs
-                )
-            )
+        anthropic_req = self.to_anthropic_request(
+            messages=messages, model=model, extra_body=extra_body, **kwargs
         )
 
         # Send request
         input_output_tokens = {"input_tokens": 0, "output_tokens": 0}
-        message_stream_manager = self._client.anthropic_client.messages.stream(
-            **anthropic_req.model_dump(exclude_none=True, exclude={"stream"})
-        )
-
-        # Get the message stream, witch is considered name mangled.
+        anthropic_messages, anthropic_req = self.anthropic_messages(anthropic_req)
         message_stream_event: "anthropic.Stream[RawMessageStreamEvent]" = (
-            message_stream_manager.__dict__["_MessageStreamManager__api_request"]()
+            anthropic_messages.create(
+                **anthropic_req.model_dump(exclude_none=True, exclude={"stream"}),
+                stream=True,
+            )
         )
         httpx_response_stream = ResponseStream(
             self.generator_generate_content_chunks(
                 message_stream_event,
                 model=model,
                 input_output_tokens=input_output_tokens,
+                include_usage=bool(
+                    stream_options and stream_options.get("include_usage")
+                ),
             )
         )
         httpx_response = httpx.Response(
@@ -310,6 +458,129 @@ class AnthropicChatCompletions(Completions):
             client=self._client,
         )
 
+    async def async_create_stream(
+        self,
+        *,
+        messages: Iterable[ChatCompletionMessageParam],
+        model: Union[str, ChatModel],
+        stream: Literal[True] = True,
+        stream_options: (
+            Optional[ChatCompletionStreamOptionsParam] | NotGiven
+        ) = NOT_GIVEN,
+        extra_body: Body | None = None,
+        **kwargs,
+    ) -> AsyncGenerator[ChatCompletionChunk, None]:
+        """Create a chat completion stream with the async Anthropic client.
+
+        The request is sent before returning, so its errors are raised here,
+        and the returned generator maps the events to the chunks directly,
+        without encoding and parsing them as the `Stream` of `create` does.
+        Closing the generator, e.g. when the server request is cancelled,
+        closes the upstream response.
+        """
+
+        messages = list(messages)
+        if len(messages) == 0:
+            raise ValueError("The `messages` must not be empty")
+
+        anthropic_req = self.to_anthropic_request(
+            messages=messages, model=model, extra_body=extra_body, **kwargs
+        )
+        async_messages, anthropic_req = self.anthropic_messages(
+            anthropic_req, anthropic_client=self._client.async_anthropic_client
+        )
+        message_stream_event: "anthropic.AsyncStream[RawMessageStreamEvent]" = (
+            await async_messages.create(
+                **anthropic_req.model_dump(exclude_none=True, exclude={"stream"}),
+                stream=True,
+            )
+        )
+        return self.async_generator_generate_chunks(
+            message_stream_event,
+            model=model,
+            include_usage=bool(stream_options and stream_options.get("include_usage")),
+        )
+
+    async def async_generator_generate_chunks(
+        self,
+        message_stream_event: "anthropic.AsyncStream[RawMessageStreamEvent]",
+        *,
+        model: Text,
+        include_usage: bool = False,
+    ) -> AsyncGenerator[ChatCompletionChunk, None]:
+        """Generate the chat completion chunks from the async message stream,
+        the last one with the finish reason, followed by a usage chunk without
+        choices if `include_usage`.
+        """
+
+        state = MessageStreamState(model=model)
+        try:
+            async for event in message_stream_event:
+                text = state.update(event)
+                if text is not None:
+                    yield state.content_chunk(text)
+            yield state.final_chunk()
+            if include_usage:
+                yield state.usage_chunk()
+        finally:
+            # Shielded, the enclosing scope may be cancelled already
+            with anyio.CancelScope(shield=True):
+                await message_stream_event.close()
+
+    def to_anthropic_request(
+        self,
+        *,
+        messages: Iterable[ChatCompletionMessageParam],
+        model: Union[str, ChatModel],
+        extra_body: Body | None = None,
+        prompt_caching: Optional[bool] = None,
+        cache_breakpoints: Optional[Sequence[CacheBreakpoint]] = None,
+        **kwargs,
+    ) -> AnthropicChatCompletionRequest:
+        """Convert the OpenAI parameters to the Anthropic messages request.
+
+        The `prompt_caching` and `cache_breakpoints` options of
+        `AnthropicChatCompletionRequest.from_openai_chat_completion_request`
+        are taken from the keyword arguments or the `extra_body`, the prompt
+        caching is opt-in as a cache write costs more than its input tokens.
+        """
+
+        extra_body = extra_body if isinstance(extra_body, Dict) else {}
+        if prompt_caching is None:
+            prompt_caching = extra_body.get("prompt_caching", False)
+        if cache_breakpoints is None:
+            cache_breakpoints = extra_body.get("cache_breakpoints")
+        return AnthropicChatCompletionRequest.from_openai_chat_completion_request(
+            ChatCompletionRequest.from_kwargs(messages=messages, model=model, **kwargs),
+            prompt_caching=bool(prompt_caching),
+            cache_breakpoints=cache_breakpoints,
+        )
+
+    def anthropic_messages(
+        self,
+        anthropic_req: AnthropicChatCompletionRequest,
+        *,
+        anthropic_client: Optional[
+            Union["anthropic.Anthropic", "anthropic.AsyncAnthropic"]
+        ] = None,
+    ) -> Tuple[Any, AnthropicChatCompletionRequest]:
+        """Return the messages resource of the request and the request to send.
+
+        The request with `cache_control` breakpoints is sent to the prompt
+        caching beta resource. The `anthropic` SDK versions without it get the
+        request without the breakpoints on the messages resource.
+        """
+
+        if anthropic_client is None:
+            anthropic_client = self._client.anthropic_client
+        if not anthropic_req.uses_prompt_caching:
+            return (anthropic_client.messages, anthropic_req)
+        prompt_caching = getattr(anthropic_client.beta, "prompt_caching", None)
+        if prompt_caching is None:
+            logger.debug("No prompt caching of the anthropic SDK, not caching.")
+            return (anthropic_client.messages, anthropic_req.without_cache_control())
+        return (prompt_caching.messages, anthropic_req)
+
     def generator_generate_content_chunks(
         self,
         message_stream_event: "anthropic.Stream[RawMessageStreamEvent]",
@@ -319,6 +590,7 @@ class AnthropicChatCompletions(Completions):
         created: Optional[int] = None,
         chat_completion_id: Optional[Text] = None,
         input_output_tokens: Optional[Dict[Text, int]] = None,
+        include_usage: bool = False,
         **kwargs,
     ) -> Generator[bytes, None, None]:
         """Generate the chat completion chunks from the message stream.
@@ -337,6 +609,9 @@ class AnthropicChatCompletions(Completions):
             The chat completion ID, by default None.
         input_output_tokens : Optional[Dict[Text, int]], optional
             The input and output tokens, by default None.
+        include_usage : bool, optional
+            Whether to send the usage in a trailing chunk without choices, like
+            OpenAI with `stream_options.include_usage`, by default False.
 
         Yields
         ------
@@ -344,71 +619,31 @@ class AnthropicChatCompletions(Completions):
             The generator yielding the chat completion chunks.
         """
 
-        chat_completion_id = chat_completion_id or rand_chat_completion_id()
-        created = created or int(time.time())
-        input_output_tokens = input_output_tokens or {
-            "input_tokens": 0,
-            "output_tokens": 0,
-        }
-        finish_reason: Text = "stop"
+        state = MessageStreamState(
+            model=model,
+            created=created,
+            chat_completion_id=chat_completion_id,
+            input_output_tokens=input_output_tokens,
+        )
+        chunk_encoder: Optional[ChatCompletionChunkEncoder] = None
 
         # Generate the chat response
         for event in message_stream_event:
-            if isinstance(event, RawMessageStartEvent):
-                chat_completion_id = event.message.id
-                input_output_tokens["input_tokens"] = event.message.usage.input_tokens
-            elif isinstance(event, RawContentBlockStartEvent):
-                pass
-            elif isinstance(event, RawContentBlockDeltaEvent):
-                if isinstance(event.delta, TextDelta):
-                    chunk = ChatCompletionChunk.model_validate(
-                        {
-                            "id": chat_completion_id,
-                            "choices": [
-                                {
-                                    "index": 0,
-                                    "delta": {
-                                        "content": event.delta.text,
-                                        "role": "assistant",
-                                    },
-                                }
-                            ],
-                            "created": created,
-                            "model": model,
-                            "object": "chat.completion.chunk",
-                        }
-                    )
-                    yield simple_encode_sse(chunk, encoding=encoding)
-                else:
-                    logger.warning(f"Unhandled delta type: {event.delta} yet.")
-            elif isinstance(event, RawContentBlockStopEvent):
-                pass
-            elif isinstance(event, RawMessageDeltaEvent):
-                input_output_tokens["output_tokens"] = event.usage.output_tokens
-                if event.delta.stop_reason == "end_turn":
-                    finish_reason = "stop"
-                elif event.delta.stop_reason == "max_tokens":
-                    finish_reason = "length"
-                elif event.delta.stop_reason == "stop_sequence":
-                    finish_reason = "stop"
-                else:
-                    logger.warning(f"Unknown stop reason: {event.delta.stop_reason}")
-            elif isinstance(event, RawMessageStopEvent):
-                pass
-            else:
-                logger.warning(f"Unhandled event type: {event} yet.")
+            text = state.update(event)
+            if text is None:
+                continue
+            if chunk_encoder is None or chunk_encoder.id != state.id:
+                chunk_encoder = ChatCompletionChunkEncoder(
+                    id=state.id, model=model, created=state.created, encoding=encoding
+                )
+            yield chunk_encoder.encode_content(text)
 
         # Send the final chunk with finish_reason
-        chunk = ChatCompletionChunk.model_validate(
-            {
-                "id": chat_completion_id,
-                "choices": [{"delta": {}, "finish_reason": finish_reason, "index": 0}],
-                "created": created,
-                "model": model,
-                "object": "chat.completion.chunk",
-            }
-        )
-        yield simple_encode_sse(chunk, encoding=encoding)
+        yield simple_encode_sse(state.final_chunk(), encoding=encoding)
+
+        # Send the usage in a trailing chunk without choices
+        if include_usage:
+            yield simple_encode_sse(state.usage_chunk(), encoding=encoding)
 
         # End the stream
         yield simple_encode_sse("[DONE]", encoding=encoding)
@@ -482,6 +717,7 @@ class AnthropicOpenAI(OpenAI):
     models: AnthropicModels
 
     anthropic_client: anthropic.Anthropic
+    async_anthropic_client: anthropic.AsyncAnthropic
 
     def __init__(self, *, api_key: Optional[Text] = None, **kwargs):
         api_key = (
@@ -501,3 +737,4 @@ class AnthropicOpenAI(OpenAI):
         self.models = AnthropicModels(self)
 
         self.anthropic_client = anthropic.Anthropic(api_key=api_key)
+        self.async_anthropic_client = anthropic.AsyncAnthropic(api_key=api_key)
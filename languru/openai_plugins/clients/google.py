@@ -1,7 +1,20 @@
+import functools
+import math
 import os
 import time
 import uuid
-from typing import Dict, Generator, Iterable, List, Literal, Optional, Text, Union
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Text,
+    Tuple,
+    Union,
+)
 
 import google.generativeai as genai
 import httpx
@@ -30,6 +43,7 @@ from openai.types.chat.chat_completion_tool_choice_option_param import (
 )
 from openai.types.chat.chat_completion_tool_param import ChatCompletionToolParam
 from openai.types.chat_model import ChatModel
+from openai.types.completion_usage import CompletionUsage
 from openai.types.create_embedding_response import CreateEmbeddingResponse
 from openai.types.model import Model
 
@@ -37,7 +51,7 @@ from languru.exceptions import CredentialsNotProvided
 from languru.openai_plugins.clients.utils import openai_init_parameter_keys
 from languru.types.models import MODELS_GOOGLE
 from languru.utils.openai_utils import rand_chat_completion_id
-from languru.utils.sse import simple_encode_sse
+from languru.utils.sse import ChatCompletionChunkEncoder, simple_encode_sse
 
 
 class GoogleChatCompletions(Completions):
@@ -173,7 +187,12 @@ class GoogleChatCompletions(Completions):
             raise ValueError("The `messages` must not be empty")
 
         # pop out the last message
-        genai_model = genai.GenerativeModel(model)
+        genai_model = get_generative_model(
+            model,
+            to_generation_config(
+                temperature=temperature, max_tokens=max_tokens, top_p=top_p, stop=stop
+            ),
+        )
         contents: List[ContentDict] = [
             ContentDict(
                 role=(
@@ -184,18 +203,16 @@ class GoogleChatCompletions(Completions):
             for m in messages
             if "content" in m and m["content"]
         ]
-        input_tokens = genai_model.count_tokens(contents).total_tokens
 
-        # Generate the chat response
+        # Generate the chat response, the usage comes with it
         latest_content = contents.pop()
         chat_session = genai_model.start_chat(history=contents or None)
-        send_message_kwargs = dict()
-        if temperature is not None and not isinstance(temperature, NotGiven):
-            send_message_kwargs["generation_config"] = (
-                generation_types.GenerationConfigDict(temperature=temperature)
-            )
-        response = chat_session.send_message(latest_content, **send_message_kwargs)
-        out_tokens = genai_model.count_tokens(response.parts).total_tokens
+        response = chat_session.send_message(latest_content)
+        usage = to_completion_usage(
+            getattr(response, "usage_metadata", None),
+            contents=contents + [latest_content],
+            output_text="".join(part.text for part in response.parts),
+        )
 
         # Parse the response
         chat_completion = ChatCompletion.model_validate(
@@ -213,11 +230,7 @@ class GoogleChatCompletions(Completions):
                 created=int(time.time()),
                 model=model,
                 object="chat.completion",
-                usage=dict(
-                    completion_tokens=out_tokens,
-                    prompt_tokens=input_tokens,
-                    total_tokens=input_tokens + out_tokens,
-                ),
+                usage=usage.model_dump(),
             )
         )
         return chat_completion
@@ -266,7 +279,12 @@ class GoogleChatCompletions(Completions):
             raise ValueError("The `messages` must not be empty")
 
         # pop out the last message
-        genai_model = genai.GenerativeModel(model)
+        genai_model = get_generative_model(
+            model,
+            to_generation_config(
+                temperature=temperature, max_tokens=max_tokens, top_p=top_p, stop=stop
+            ),
+        )
         contents: List[ContentDict] = [
             ContentDict(
                 role=(
@@ -281,17 +299,16 @@ class GoogleChatCompletions(Completions):
         # Generate the chat response
         latest_content = contents.pop()
         chat_session = genai_model.start_chat(history=contents or None)
-        send_message_kwargs = dict()
-        if temperature is not None and not isinstance(temperature, NotGiven):
-            send_message_kwargs["generation_config"] = (
-                generation_types.GenerationConfigDict(temperature=temperature)
-            )
-        send_message_kwargs["stream"] = True
-        genai_response = chat_session.send_message(
-            latest_content, **send_message_kwargs
-        )
+        genai_response = chat_session.send_message(latest_content, stream=True)
         httpx_response_stream = ResponseStream(
-            self.generator_generate_content_chunks(genai_response, model=model)
+            self.generator_generate_content_chunks(
+                genai_response,
+                model=model,
+                contents=contents + [latest_content],
+                include_usage=bool(
+                    stream_options and stream_options.get("include_usage")
+                ),
+            )
         )
         httpx_response = httpx.Response(
             status_code=200,
@@ -310,6 +327,8 @@ class GoogleChatCompletions(Completions):
         encoding: Text = "utf-8",
         created: Optional[int] = None,
         chat_completion_id: Optional[Text] = None,
+        contents: Optional[List[ContentDict]] = None,
+        include_usage: bool = False,
     ) -> Generator[bytes, None, None]:
         """Generate the chat completion response in chunks.
 
@@ -325,6 +344,13 @@ class GoogleChatCompletions(Completions):
             The timestamp when the chat completion was created, by default None.
         chat_completion_id : Optional[Text], optional
             The chat completion ID, by default None.
+        contents : Optional[List[ContentDict]], optional
+            The prompt contents, to estimate the prompt tokens when the response
+            has no usage metadata, by default None.
+        include_usage : bool, optional
+            Whether to send the usage in a trailing chunk without choices after
+            the final chunk, like OpenAI with `stream_options.include_usage`,
+            by default False.
 
         Yields
         ------
@@ -335,26 +361,24 @@ class GoogleChatCompletions(Completions):
         chat_completion_id = chat_completion_id or rand_chat_completion_id()
         created = created or int(time.time())
 
+        chunk_encoder = ChatCompletionChunkEncoder(
+            id=chat_completion_id, model=model, created=created, encoding=encoding
+        )
+
         # Generate the chat response
+        usage_metadata = None
+        output_texts: List[Text] = []
         for generate_content_chunk in generate_content_response:
             parts_content = "\n".join(
                 p.text for p in generate_content_chunk.candidates[0].content.parts
             )
-            chunk = ChatCompletionChunk.model_validate(
-                {
-                    "id": chat_completion_id,
-                    "choices": [
-                        {
-                            "index": 0,
-                            "delta": {"content": parts_content, "role": "assistant"},
-                        }
-                    ],
-                    "created": created,
-                    "model": model,
-                    "object": "chat.completion.chunk",
-                }
+            output_texts.append(parts_content)
+            # The usage metadata of the last chunk covers the whole response
+            usage_metadata = (
+                getattr(generate_content_chunk, "usage_metadata", None)
+                or usage_metadata
             )
-            yield simple_encode_sse(chunk, encoding=encoding)
+            yield chunk_encoder.encode_content(parts_content)
 
         # Send the final chunk with finish_reason
         chunk = ChatCompletionChunk.model_validate(
@@ -368,10 +392,94 @@ class GoogleChatCompletions(Completions):
         )
         yield simple_encode_sse(chunk, encoding=encoding)
 
+        # Send the usage in a trailing chunk without choices
+        if include_usage:
+            usage = to_completion_usage(
+                usage_metadata,
+                contents=contents or [],
+                output_text="".join(output_texts),
+            )
+            chunk = chunk.model_copy(update={"choices": [], "usage": usage})
+            yield simple_encode_sse(chunk, encoding=encoding)
+
         # End the stream
         yield simple_encode_sse("[DONE]", encoding=encoding)
 
 
+@functools.lru_cache(maxsize=128)
+def get_generative_model(
+    model: Text, generation_config: Optional[Tuple[Tuple[Text, Any], ...]] = None
+) -> "genai.GenerativeModel":
+    """Return the cached GenAI model of the model name and generation config,
+    the config is given as sorted items to be hashable.
+    """
+
+    config = dict(generation_config or ())
+    return genai.GenerativeModel(
+        model,
+        generation_config=(
+            generation_types.GenerationConfigDict(**config) if config else None
+        ),
+    )
+
+
+def to_generation_config(
+    *,
+    temperature: Optional[float] | NotGiven = NOT_GIVEN,
+    max_tokens: Optional[int] | NotGiven = NOT_GIVEN,
+    top_p: Optional[float] | NotGiven = NOT_GIVEN,
+    stop: Union[Optional[str], List[str]] | NotGiven = NOT_GIVEN,
+) -> Optional[Tuple[Tuple[Text, Any], ...]]:
+    """Convert the chat completion parameters to the hashable generation
+    config of `get_generative_model`.
+    """
+
+    config: Dict[Text, Any] = {}
+    if temperature is not None and not isinstance(temperature, NotGiven):
+        config["temperature"] = temperature
+    if max_tokens is not None and not isinstance(max_tokens, NotGiven):
+        config["max_output_tokens"] = max_tokens
+    if top_p is not None and not isinstance(top_p, NotGiven):
+        config["top_p"] = top_p
+    if stop is not None and not isinstance(stop, NotGiven):
+        config["stop_sequences"] = (stop,) if isinstance(stop, Text) else tuple(stop)
+    return tuple(sorted(config.items())) or None
+
+
+def estimate_tokens(text: Text) -> int:
+    """Estimate the tokens of the text, a Gemini token is about 4 characters."""
+
+    return math.ceil(len(text) / 4)
+
+
+def to_completion_usage(
+    usage_metadata: Optional[Any],
+    *,
+    contents: List[ContentDict],
+    output_text: Text,
+) -> CompletionUsage:
+    """Return the usage of the response usage metadata, estimated from the
+    texts when the metadata is absent.
+    """
+
+    prompt_tokens = getattr(usage_metadata, "prompt_token_count", 0) or 0
+    completion_tokens = getattr(usage_metadata, "candidates_token_count", 0) or 0
+    if not prompt_tokens:
+        prompt_tokens = sum(
+            estimate_tokens(part)
+            for content in contents
+            for part in content["parts"]
+            if isinstance(part, Text)
+        )
+    if not completion_tokens:
+        completion_tokens = estimate_tokens(output_text)
+    return CompletionUsage(
+        completion_tokens=completion_tokens,
+        prompt_tokens=prompt_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+    )
+
+
 class GoogleChat(OpenAIResources.Chat):
     @cached_property
     def completions(self) -> GoogleChatCompletions:
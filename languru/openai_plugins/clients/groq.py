@@ -37,7 +37,7 @@ from openai.types.model import Model
 from languru.exceptions import CredentialsNotProvided
 from languru.openai_plugins.clients.utils import openai_init_parameter_keys
 from languru.types.models import MODELS_GROQ
-from languru.utils.sse import simple_encode_sse
+from languru.utils.sse import ChatCompletionChunkEncoder, simple_encode_sse
 
 
 class GroqChatCompletions(Completions):
@@ -332,8 +332,26 @@ class GroqChatCompletions(Completions):
             The generator yielding the chat completion chunks.
         """
 
-        # Generate the chat response
+        # Generate the chat response, the content deltas through the encoder
+        chunk_encoder: Optional[ChatCompletionChunkEncoder] = None
         for chunk in stream_chat_completion_chunks:
+            content = content_only_delta(chunk)
+            if content is not None:
+                if chunk_encoder is None or not chunk_encoder.matches(
+                    id=chunk.id,
+                    model=chunk.model,
+                    created=chunk.created,
+                    system_fingerprint=chunk.system_fingerprint,
+                ):
+                    chunk_encoder = ChatCompletionChunkEncoder(
+                        id=chunk.id,
+                        model=chunk.model,
+                        created=chunk.created,
+                        system_fingerprint=chunk.system_fingerprint,
+                        encoding=encoding,
+                    )
+                yield chunk_encoder.encode_content(content)
+                continue
             openai_chunk = ChatCompletionChunk.model_validate(
                 chunk.model_dump(exclude_none=True)
             )
@@ -343,6 +361,35 @@ class GroqChatCompletions(Completions):
         yield simple_encode_sse("[DONE]", encoding=encoding)
 
 
+def content_only_delta(chunk: "GroqChatCompletionChunk") -> Optional[Text]:
+    """Returns the content of a chunk with only an assistant content delta,
+    which `ChatCompletionChunkEncoder` encodes as is, otherwise None.
+    """
+
+    if (
+        len(chunk.choices) != 1
+        or chunk.usage is not None
+        or chunk.x_groq is not None
+        or chunk.model_extra
+    ):
+        return None
+    choice = chunk.choices[0]
+    delta = choice.delta
+    if (
+        choice.index != 0
+        or choice.finish_reason is not None
+        or choice.logprobs is not None
+        or choice.model_extra
+        or delta.role != "assistant"
+        or delta.function_call is not None
+        or delta.tool_calls is not None
+        or delta.model_extra
+        or not isinstance(delta.content, Text)
+    ):
+        return None
+    return delta.content
+
+
 class GroqChat(OpenAIResources.Chat):
     @cached_property
     def completions(self) -> GroqChatCompletions:
@@ -0,0 +1,477 @@
+import os
+import time
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Union,
+)
+
+import httpx
+import openai
+from openai import OpenAI
+from openai import resources as OpenAIResources
+from openai._compat import cached_property
+from openai._types import NOT_GIVEN, Body, Headers, NotGiven, Query
+from openai._utils import required_args
+from openai.pagination import SyncPage
+from openai.resources.chat.completions import Completions
+from openai.types.chat.chat_completion import ChatCompletion
+from openai.types.chat.chat_completion_chunk import (
+    ChatCompletionChunk,
+    Choice,
+    ChoiceDelta,
+)
+from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
+from openai.types.chat.chat_completion_stream_options_param import (
+    ChatCompletionStreamOptionsParam,
+)
+from openai.types.create_embedding_response import CreateEmbeddingResponse, Usage
+from openai.types.embedding import Embedding
+from openai.types.model import Model
+
+from languru.exceptions import CredentialsNotProvided
+from languru.openai_plugins.clients.utils import openai_init_parameter_keys
+from languru.resources.local.embeddings import EmbeddingEngine
+from languru.resources.local.generation import GenerationEngine, GenerationOutput
+from languru.utils.calculation import encode_embeddings, truncate_embeddings
+from languru.utils.openai_utils import rand_chat_completion_id
+
+
+class LocalModels(OpenAIResources.Models):
+
+    _client: "LocalOpenAI"
+
+    def retrieve(
+        self,
+        model: str,
+        *,
+        extra_headers: Headers | None = None,
+        extra_query: Query | None = None,
+        extra_body: Body | None = None,
+        timeout: float | httpx.Timeout | None | NotGiven = NOT_GIVEN,
+        **kwargs,
+    ) -> "Model":
+        if model in self._client.supported_models:
+            return Model.model_validate(
+                {
+                    "id": model,
+                    "created": self._client.created,
+                    "object": "model",
+                    "owned_by": "local",
+                }
+            )
+        else:
+            error_message = (
+                f"Model {model} not found. "
+                + f"Supported models are {self._client.supported_models}"
+            )
+            raise openai.NotFoundError(
+                error_message,
+                response=httpx.Response(status_code=404, text=error_message),
+                body=None,
+            )
+
+    def list(
+        self,
+        *,
+        extra_headers: Headers | None = None,
+        extra_query: Query | None = None,
+        extra_body: Body | None = None,
+        timeout: float | httpx.Timeout | None | NotGiven = NOT_GIVEN,
+        **kwargs,
+    ) -> "SyncPage[Model]":
+        models = [
+            Model.model_validate(
+                {
+                    "id": model,
+                    "created": self._client.created,
+                    "object": "model",
+                    "owned_by": "local",
+                }
+            )
+            for model in self._client.supported_models
+        ]
+        return SyncPage(data=models, object="list")
+
+
+class LocalEmbeddings(OpenAIResources.Embeddings):
+
+    _client: "LocalOpenAI"
+
+    def create(
+        self,
+        *,
+        input: Union[str, List[str], Iterable[int], Iterable[Iterable[int]]],
+        model: Text,
+        dimensions: int | NotGiven = NOT_GIVEN,
+        encoding_format: (
+            Literal["float", "base64", "base64_float16"] | NotGiven
+        ) = NOT_GIVEN,
+        user: str | NotGiven = NOT_GIVEN,
+        extra_headers: Headers | None = None,
+        extra_query: Query | None = None,
+        extra_body: Body | None = None,
+        timeout: float | httpx.Timeout | None | NotGiven = NOT_GIVEN,
+    ) -> CreateEmbeddingResponse:
+        """Create an embedding for the input text or texts, batched with the
+        concurrent requests. The `dimensions` truncate the embeddings, which
+        are normalized again.
+        """
+
+        if (
+            self._client.embedding_engine is None
+            or model != self._client.embeddings_model
+        ):
+            self._client.models.retrieve(model)
+            raise ValueError(f"The model '{model}' is not an embeddings model.")
+        texts = [input] if isinstance(input, Text) else list(input)
+        if not all(isinstance(t, Text) for t in texts):
+            raise ValueError("The local embeddings only support text inputs.")
+
+        result = self._client.embedding_engine.embed(
+            texts, timeout=timeout if isinstance(timeout, (int, float)) else None
+        )
+
+        embeddings = truncate_embeddings(result.embeddings, _given(dimensions))
+
+        return CreateEmbeddingResponse.model_construct(
+            data=[
+                Embedding.model_construct(embedding=emb, index=idx, object="embedding")
+                for idx, emb in enumerate(
+                    encode_embeddings(embeddings, _given(encoding_format))
+                )
+            ],
+            model=model,
+            object="list",
+            usage=Usage(
+                prompt_tokens=result.prompt_tokens,
+                total_tokens=result.prompt_tokens,
+            ),
+        )
+
+
+class LocalChatCompletions(Completions):
+
+    _client: "LocalOpenAI"
+
+    @required_args(["messages", "model"], ["messages", "model", "stream"])
+    def create(
+        self,
+        *,
+        messages: Iterable[ChatCompletionMessageParam],
+        model: Text,
+        max_tokens: Optional[int] | NotGiven = NOT_GIVEN,
+        seed: Optional[int] | NotGiven = NOT_GIVEN,
+        stop: Union[Optional[str], List[str]] | NotGiven = NOT_GIVEN,
+        stream: Optional[Literal[False]] | Literal[True] | NotGiven = NOT_GIVEN,
+        stream_options: (
+            Optional[ChatCompletionStreamOptionsParam] | NotGiven
+        ) = NOT_GIVEN,
+        temperature: Optional[float] | NotGiven = NOT_GIVEN,
+        top_p: Optional[float] | NotGiven = NOT_GIVEN,
+        extra_headers: Headers | None = None,
+        extra_query: Query | None = None,
+        extra_body: Body | None = None,
+        timeout: float | httpx.Timeout | None | NotGiven = NOT_GIVEN,
+        **kwargs,
+    ) -> ChatCompletion | Generator[ChatCompletionChunk, None, None]:
+        """Create a chat completion, generated in the batches of the concurrent
+        requests. The stream is a generator of the chunks, closing it cancels
+        the generation.
+        """
+
+        engine, prompt_ids, params = self.to_generation_request(
+            messages=messages,
+            model=model,
+            max_tokens=max_tokens,
+            seed=seed,
+            stop=stop,
+            temperature=temperature,
+            top_p=top_p,
+        )
+        if stream is True:
+            return self.generator_generate_chunks(
+                engine.stream(prompt_ids, **params), model=model
+            )
+
+        output = engine.generate(prompt_ids, **params)
+        return ChatCompletion.model_validate(
+            {
+                "id": rand_chat_completion_id(),
+                "choices": [
+                    {
+                        "finish_reason": output.finish_reason,
+                        "index": 0,
+                        "message": {"content": output.text, "role": "assistant"},
+                    }
+                ],
+                "created": int(time.time()),
+                "model": model,
+                "object": "chat.completion",
+                "usage": _usage(output),
+            }
+        )
+
+    async def async_create_stream(
+        self,
+        *,
+        messages: Iterable[ChatCompletionMessageParam],
+        model: Text,
+        stream: Literal[True] = True,
+        max_tokens: Optional[int] | NotGiven = NOT_GIVEN,
+        seed: Optional[int] | NotGiven = NOT_GIVEN,
+        stop: Union[Optional[str], List[str]] | NotGiven = NOT_GIVEN,
+        temperature: Optional[float] | NotGiven = NOT_GIVEN,
+        top_p: Optional[float] | NotGiven = NOT_GIVEN,
+        **kwargs,
+    ) -> AsyncGenerator[ChatCompletionChunk, None]:
+        """Create a chat completion stream on the event loop, closing the
+        returned generator, e.g. when the server request is cancelled, takes
+        the sequence out of the batch.
+        """
+
+        engine, prompt_ids, params = self.to_generation_request(
+            messages=messages,
+            model=model,
+            max_tokens=max_tokens,
+            seed=seed,
+            stop=stop,
+            temperature=temperature,
+            top_p=top_p,
+        )
+        return self.async_generator_generate_chunks(
+            engine.astream(prompt_ids, **params), model=model
+        )
+
+    def to_generation_request(
+        self,
+        *,
+        messages: Iterable[ChatCompletionMessageParam],
+        model: Text,
+        max_tokens: Optional[int] | NotGiven = NOT_GIVEN,
+        seed: Optional[int] | NotGiven = NOT_GIVEN,
+        stop: Union[Optional[str], List[str]] | NotGiven = NOT_GIVEN,
+        temperature: Optional[float] | NotGiven = NOT_GIVEN,
+        top_p: Optional[float] | NotGiven = NOT_GIVEN,
+    ) -> Tuple[GenerationEngine, List[int], Dict[Text, Any]]:
+        """Returns the engine, the prompt token ids and the generation
+        parameters of the chat completion request.
+        """
+
+        engine = self._client.generation_engine
+        if engine is None or model != self._client.generation_model:
+            self._client.models.retrieve(model)
+            raise ValueError(f"The model '{model}' is not a generation model.")
+        messages = list(messages)
+        if len(messages) == 0:
+            raise ValueError("The `messages` must not be empty")
+
+        params: Dict[Text, Any] = {
+            "max_tokens": _given(max_tokens),
+            "seed": _given(seed),
+            "stop": _given(stop),
+        }
+        for key, value in (("temperature", temperature), ("top_p", top_p)):
+            if _given(value) is not None:
+                params[key] = value
+        return (engine, engine.model.apply_chat_template(messages), params)
+
+    def generator_generate_chunks(
+        self, outputs: Generator[GenerationOutput, None, None], *, model: Text
+    ) -> Generator[ChatCompletionChunk, None, None]:
+        chunks = _ChunkBuilder(model=model)
+        try:
+            for output in outputs:
+                yield from chunks.build(output)
+        finally:
+            outputs.close()
+
+    async def async_generator_generate_chunks(
+        self, outputs: AsyncGenerator[GenerationOutput, None], *, model: Text
+    ) -> AsyncGenerator[ChatCompletionChunk, None]:
+        chunks = _ChunkBuilder(model=model)
+        try:
+            async for output in outputs:
+                for chunk in chunks.build(output):
+                    yield chunk
+        finally:
+            await outputs.aclose()
+
+
+class LocalChat(OpenAIResources.Chat):
+    @cached_property
+    def completions(self) -> LocalChatCompletions:
+        return LocalChatCompletions(self._client)
+
+
+class _ChunkBuilder:
+    """Build the chat completion chunks of the generation outputs, the last
+    one with the finish reason and usage.
+    """
+
+    def __init__(self, *, model: Text):
+        self.id = rand_chat_completion_id()
+        self.created = int(time.time())
+        self.model = model
+
+    def build(self, output: GenerationOutput) -> Sequence[ChatCompletionChunk]:
+        chunks: List[ChatCompletionChunk] = []
+        if output.text:
+            chunks.append(
+                ChatCompletionChunk.model_construct(
+                    id=self.id,
+                    choices=[
+                        Choice.model_construct(
+                            delta=ChoiceDelta.model_construct(
+                                content=output.text, role="assistant"
+                            ),
+                            finish_reason=None,
+                            index=0,
+                        )
+                    ],
+                    created=self.created,
+                    model=self.model,
+                    object="chat.completion.chunk",
+                )
+            )
+        if output.finish_reason is not None:
+            chunks.append(
+                ChatCompletionChunk.model_validate(
+                    {
+                        "id": self.id,
+                        "choices": [
+                            {
+                                "delta": {},
+                                "finish_reason": output.finish_reason,
+                                "index": 0,
+                            }
+                        ],
+                        "created": self.created,
+                        "model": self.model,
+                        "object": "chat.completion.chunk",
+                        "usage": _usage(output),
+                    }
+                )
+            )
+        return chunks
+
+
+def _usage(output: GenerationOutput) -> Dict[Text, int]:
+    return {
+        "prompt_tokens": output.prompt_tokens,
+        "completion_tokens": output.completion_tokens,
+        "total_tokens": output.prompt_tokens + output.completion_tokens,
+    }
+
+
+def _given(value: Any) -> Any:
+    return None if isinstance(value, NotGiven) else value
+
+
+class LocalOpenAI(OpenAI):
+    """The OpenAI client of the models served on the local CPU.
+
+    The embeddings model is a `transformers` model name or path, or an ONNX
+    model directory, loaded by the worker processes of the embedding engine.
+    The generation model is a `transformers` causal language model, decoded
+    in the continuous batches of the generation engine.
+    """
+
+    chat: LocalChat
+    models: LocalModels
+    embeddings: LocalEmbeddings
+
+    embedding_engine: Optional[EmbeddingEngine]
+    generation_engine: Optional[GenerationEngine]
+
+    def __init__(
+        self,
+        *,
+        embeddings_model: Optional[Text] = None,
+        embeddings_backend: Optional[Text] = None,
+        embeddings_workers: Optional[int] = None,
+        embeddings_max_batch_size: Optional[int] = None,
+        embeddings_max_wait: Optional[float] = None,
+        generation_model: Optional[Text] = None,
+        generation_backend: Optional[Text] = None,
+        generation_max_batch_size: Optional[int] = None,
+        generation_max_tokens: Optional[int] = None,
+        **kwargs,
+    ):
+        embeddings_model = embeddings_model or os.getenv("LOCAL_EMBEDDINGS_MODEL")
+        generation_model = generation_model or os.getenv("LOCAL_GENERATION_MODEL")
+        if not embeddings_model and not generation_model:
+            raise CredentialsNotProvided("Local models are not provided.")
+        kwargs["api_key"] = kwargs.get("api_key") or "local"
+        kwargs = {k: v for k, v in kwargs.items() if k in openai_init_parameter_keys}
+
+        super().__init__(**kwargs)
+
+        self.chat = LocalChat(self)
+        self.models = LocalModels(self)
+        self.embeddings = LocalEmbeddings(self)
+
+        self.created = int(time.time())
+        self.embeddings_model = embeddings_model
+        self.generation_model = generation_model
+        self.supported_models = tuple(
+            m for m in (embeddings_model, generation_model) if m
+        )
+        self.embedding_engine = None
+        self.generation_engine = None
+        if embeddings_model:
+            self.embedding_engine = EmbeddingEngine(
+                embeddings_model,
+                backend=(
+                    embeddings_backend
+                    or os.getenv("LOCAL_EMBEDDINGS_BACKEND")
+                    or "transformers"
+                ),
+                workers=int(
+                    embeddings_workers or os.getenv("LOCAL_EMBEDDINGS_WORKERS") or 1
+                ),
+                max_batch_size=int(
+                    embeddings_max_batch_size
+                    or os.getenv("LOCAL_EMBEDDINGS_MAX_BATCH_SIZE")
+                    or 32
+                ),
+                max_wait=float(
+                    embeddings_max_wait
+                    or os.getenv("LOCAL_EMBEDDINGS_MAX_WAIT")
+                    or 0.005
+                ),
+            )
+        if generation_model:
+            self.generation_engine = GenerationEngine(
+                generation_model,
+                backend=(
+                    generation_backend
+                    or os.getenv("LOCAL_GENERATION_BACKEND")
+                    or "transformers"
+                ),
+                max_batch_size=int(
+                    generation_max_batch_size
+                    or os.getenv("LOCAL_GENERATION_MAX_BATCH_SIZE")
+                    or 8
+                ),
+                max_tokens=int(
+                    generation_max_tokens
+                    or os.getenv("LOCAL_GENERATION_MAX_TOKENS")
+                    or 512
+                ),
+            )
+
+    def close(self) -> None:
+        for engine in (self.embedding_engine, self.generation_engine):
+            if engine is not None:
+                engine.close()
+        super().close()
@@ -1,3 +1,12 @@
+import weakref
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+from languru.config import logger
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI, OpenAI
+
 openai_init_parameter_keys = (
     "api_key",
     "organization",
@@ -10,3 +19,94 @@ openai_init_parameter_keys = (
     "http_client",
     "_strict_response_validation",
 )
+
+_async_openai_clients: "weakref.WeakKeyDictionary[OpenAI, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+_async_http_clients: "weakref.WeakKeyDictionary[httpx.Client, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def to_async_openai_client(
+    openai_client: "OpenAI",
+    *,
+    async_http_client: Optional["httpx.AsyncClient"] = None,
+) -> Optional["AsyncOpenAI"]:
+    """Return the async client on the endpoint and credentials of the client.
+
+    The async client of each client is created once. The plugin clients are
+    adapters of other SDKs and have no async counterpart, so None is returned
+    for them. A client given its own `http_client`, e.g. with a proxy, needs
+    the async HTTP client with the same settings, the `async_http_client`
+    argument or the one registered with `register_async_http_client`, e.g. by
+    `create_http_clients`; otherwise None is returned.
+    """
+
+    from openai import AsyncAzureOpenAI, AsyncOpenAI, AzureOpenAI, OpenAI
+
+    async_client = _async_openai_clients.get(openai_client)
+    if async_client is not None:
+        return async_client
+
+    from openai._base_client import SyncHttpxClientWrapper
+
+    if type(openai_client) not in (OpenAI, AzureOpenAI):
+        return None
+    kwargs = dict(
+        api_key=openai_client.api_key,
+        organization=openai_client.organization,
+        project=openai_client.project,
+        base_url=openai_client.base_url,
+        timeout=openai_client.timeout,
+        max_retries=openai_client.max_retries,
+        default_headers=openai_client._custom_headers,
+        default_query=openai_client._custom_query,
+    )
+    if type(openai_client._client) is not SyncHttpxClientWrapper:
+        async_http_client = async_http_client or _async_http_clients.get(
+            openai_client._client
+        )
+        if async_http_client is None:
+            logger.warning(
+                "The OpenAI client has its own HTTP client without an async "
+                + "one registered, the requests are sent in a worker thread"
+            )
+            return None
+    if async_http_client is not None:
+        kwargs["http_client"] = async_http_client
+    if type(openai_client) is AzureOpenAI:
+        async_client = AsyncAzureOpenAI(
+            api_version=openai_client._api_version,
+            azure_ad_token=openai_client._azure_ad_token,
+            azure_ad_token_provider=openai_client._azure_ad_token_provider,
+            **kwargs,
+        )
+    else:
+        async_client = AsyncOpenAI(**kwargs)
+    _async_openai_clients[openai_client] = async_client
+    return async_client
+
+
+def register_async_http_client(
+    http_client: "httpx.Client", async_http_client: "httpx.AsyncClient"
+) -> None:
+    """Register the async HTTP client used by the async OpenAI clients of
+    the clients sending their requests with `http_client`.
+    """
+
+    _async_http_clients[http_client] = async_http_client
+
+
+def create_http_clients(**kwargs: Any) -> Tuple["httpx.Client", "httpx.AsyncClient"]:
+    """Create the sync and async HTTP clients of the OpenAI clients from the
+    same keyword arguments, e.g. `proxy`, `verify` or `limits`, and register
+    the async one for `to_async_openai_client`.
+    """
+
+    from openai import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+    http_client = DefaultHttpxClient(**kwargs)
+    async_http_client = DefaultAsyncHttpxClient(**kwargs)
+    register_async_http_client(http_client, async_http_client)
+    return (http_client, async_http_client)
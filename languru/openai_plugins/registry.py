@@ -0,0 +1,258 @@
+import importlib
+import importlib.metadata
+import os
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Literal,
+    Optional,
+    Text,
+    Tuple,
+    Type,
+    Union,
+)
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from languru.config import logger
+from languru.types.models import (
+    MODELS_ANTHROPIC,
+    MODELS_AZURE_OPENAI,
+    MODELS_GOOGLE,
+    MODELS_GROQ,
+    MODELS_OPENAI,
+    MODELS_PERPLEXITY,
+    MODELS_VOYAGE,
+)
+from languru.types.organizations import OrganizationType
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+
+# The organization of a provider, a name for the providers without a type
+ProviderOrganization = Union[OrganizationType, Text]
+
+# The entry point group of the third-party providers, each entry point loads
+# a `ProviderSpec` or a callable returning one
+PROVIDERS_ENTRY_POINT_GROUP = "languru.providers"
+
+Capability = Literal[
+    "chat", "stream", "completions", "embeddings", "audio", "images", "moderations"
+]
+
+
+class ProviderCapabilities(BaseModel):
+    """The APIs a provider serves and the limits the routing, batching and
+    concurrency policies follow.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    chat: bool = True
+    stream: bool = True
+    completions: bool = False
+    embeddings: bool = False
+    audio: bool = False
+    images: bool = False
+    moderations: bool = False
+    max_batch_size: Optional[int] = Field(
+        default=None, description="The most inputs of an embeddings request."
+    )
+    max_concurrency: Optional[int] = Field(
+        default=None, description="The most concurrent requests of a batch."
+    )
+    rate_limit_headers: Tuple[Text, ...] = Field(
+        default=(), description="The prefixes of the rate-limit response headers."
+    )
+
+    def supports(self, capability: Capability) -> bool:
+        return bool(getattr(self, capability))
+
+
+# The capabilities of the OpenAI API compatible providers
+OPENAI_CAPABILITIES = ProviderCapabilities(
+    completions=True,
+    embeddings=True,
+    audio=True,
+    images=True,
+    moderations=True,
+    max_batch_size=2048,
+    rate_limit_headers=("x-ratelimit-",),
+)
+
+
+class ProviderSpec(BaseModel):
+    """A provider of an OpenAI compatible client.
+
+    The client module is only imported, and the client constructed, when the
+    provider is first used, so the SDKs of the unused providers are never
+    loaded.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    organization: ProviderOrganization = Field(
+        ...,
+        description=(
+            "The organization type, or the name of a provider without one, "
+            + "the model names are prefixed with it."
+        ),
+    )
+    aliases: Tuple[Text, ...] = Field(
+        default=(), description="The other names of a provider without type."
+    )
+    client: Text = Field(
+        ..., description="The import path of the client class, `module:Class`."
+    )
+    async_client: Optional[Text] = Field(
+        default=None,
+        description=(
+            "The import path of the async client factory, called with the "
+            + "client, `module:function`. None if there is no async client."
+        ),
+    )
+    capabilities: ProviderCapabilities = Field(default_factory=ProviderCapabilities)
+    models: Tuple[Text, ...] = Field(
+        default=(), description="The models served by the provider."
+    )
+    models_env_keys: Tuple[Text, ...] = Field(
+        default=(),
+        description="The environment variables naming more served models.",
+    )
+    env_keys: Tuple[Text, ...] = Field(
+        default=(),
+        description="The environment variables of the credentials, any of them.",
+    )
+    client_kwargs: Dict[Text, Any] = Field(
+        default_factory=dict, description="The keyword arguments of the client."
+    )
+
+    @property
+    def name(self) -> Text:
+        if isinstance(self.organization, OrganizationType):
+            return self.organization.value
+        return self.organization.casefold()
+
+    def credentials_available(self) -> bool:
+        """Whether any credentials environment variable is set."""
+
+        return any(os.getenv(key) for key in self.env_keys)
+
+    def served_models(self) -> Tuple[Text, ...]:
+        """The `models` and the models named by the `models_env_keys`."""
+
+        env_models = (os.getenv(key) for key in self.models_env_keys)
+        return tuple(dict.fromkeys(self.models + tuple(m for m in env_models if m)))
+
+    def load_client_class(self) -> Type["OpenAI"]:
+        return _import_object(self.client)
+
+    def create_client(self) -> "OpenAI":
+        return self.load_client_class()(**self.client_kwargs)
+
+    def create_async_client(self, client: "OpenAI") -> Optional["AsyncOpenAI"]:
+        if self.async_client is None:
+            return None
+        return _import_object(self.async_client)(client)
+
+
+def load_providers(
+    group: Text = PROVIDERS_ENTRY_POINT_GROUP,
+) -> Tuple[ProviderSpec, ...]:
+    """Returns the built-in providers and the providers of the entry points.
+
+    A provider of an entry point replaces the built-in one of the same name,
+    and an entry point failing to load is skipped.
+    """
+
+    providers: Dict[Text, ProviderSpec] = {spec.name: spec for spec in PROVIDERS}
+    for entry_point in importlib.metadata.entry_points(group=group):
+        try:
+            spec: Union[ProviderSpec, Callable[[], ProviderSpec]] = entry_point.load()
+            if not isinstance(spec, ProviderSpec):
+                spec = spec()
+            spec = ProviderSpec.model_validate(spec)
+        except Exception as e:
+            logger.warning(f"Failed to load provider '{entry_point.name}': {e}")
+            continue
+        if spec.name in providers:
+            logger.info(f"Provider '{spec.name}' replaced by '{entry_point.value}'.")
+        providers[spec.name] = spec
+    return tuple(providers.values())
+
+
+def _import_object(path: Text) -> Any:
+    module_name, _, name = path.partition(":")
+    return getattr(importlib.import_module(module_name), name)
+
+
+_TO_ASYNC_OPENAI_CLIENT = "languru.openai_plugins.clients.utils:to_async_openai_client"
+
+PROVIDERS: Tuple[ProviderSpec, ...] = (
+    ProviderSpec(
+        organization=OrganizationType.OPENAI,
+        client="openai:OpenAI",
+        models=MODELS_OPENAI,
+        env_keys=("OPENAI_API_KEY",),
+        async_client=_TO_ASYNC_OPENAI_CLIENT,
+        capabilities=OPENAI_CAPABILITIES,
+    ),
+    ProviderSpec(
+        organization=OrganizationType.AZURE,
+        client="openai:AzureOpenAI",
+        models=MODELS_AZURE_OPENAI,
+        env_keys=("AZURE_OPENAI_API_KEY", "AZURE_OPENAI_AD_TOKEN"),
+        client_kwargs={"api_version": "2024-02-01"},
+        async_client=_TO_ASYNC_OPENAI_CLIENT,
+        capabilities=OPENAI_CAPABILITIES,
+    ),
+    ProviderSpec(
+        organization=OrganizationType.ANTHROPIC,
+        client="languru.openai_plugins.clients.anthropic:AnthropicOpenAI",
+        models=MODELS_ANTHROPIC,
+        env_keys=("ANTHROPIC_API_KEY", "CLAUDE_API_KEY"),
+        capabilities=ProviderCapabilities(
+            rate_limit_headers=("anthropic-ratelimit-", "retry-after")
+        ),
+    ),
+    ProviderSpec(
+        organization=OrganizationType.GOOGLE,
+        client="languru.openai_plugins.clients.google:GoogleOpenAI",
+        models=MODELS_GOOGLE,
+        env_keys=("GOOGLE_GENAI_API_KEY", "GOOGLE_AI_API_KEY", "GOOGLE_API_KEY"),
+        capabilities=ProviderCapabilities(embeddings=True, max_batch_size=100),
+    ),
+    ProviderSpec(
+        organization=OrganizationType.GROQ,
+        client="languru.openai_plugins.clients.groq:GroqOpenAI",
+        models=MODELS_GROQ,
+        env_keys=("GROQ_API_KEY",),
+        capabilities=ProviderCapabilities(rate_limit_headers=("x-ratelimit-",)),
+    ),
+    ProviderSpec(
+        organization=OrganizationType.PERPLEXITY,
+        client="languru.openai_plugins.clients.pplx:PerplexityOpenAI",
+        models=MODELS_PERPLEXITY,
+        env_keys=("PPLX_API_KEY", "PERPLEXITY_API_KEY"),
+        capabilities=ProviderCapabilities(rate_limit_headers=("x-ratelimit-",)),
+    ),
+    ProviderSpec(
+        organization=OrganizationType.VOYAGE,
+        client="languru.openai_plugins.clients.voyage:VoyageOpenAI",
+        models=MODELS_VOYAGE,
+        env_keys=("VOYAGE_API_KEY",),
+        capabilities=ProviderCapabilities(
+            chat=False, stream=False, embeddings=True, max_batch_size=128
+        ),
+    ),
+    # The models on the local CPU, served by the workers of the client
+    ProviderSpec(
+        organization="local",
+        client="languru.openai_plugins.clients.local:LocalOpenAI",
+        env_keys=("LOCAL_EMBEDDINGS_MODEL", "LOCAL_GENERATION_MODEL"),
+        models_env_keys=("LOCAL_EMBEDDINGS_MODEL", "LOCAL_GENERATION_MODEL"),
+        capabilities=ProviderCapabilities(embeddings=True),
+    ),
+)
@@ -0,0 +1,366 @@
+import importlib
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Literal,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+from numpy.typing import NDArray
+
+from languru.config import logger
+from languru.utils.calculation import l2_normalize, mean_pooling
+
+EmbeddingBackend = Literal["transformers", "onnx"]
+EmbeddingPooling = Literal["mean", "cls"]
+
+EMBEDDING_BACKENDS: Dict[Text, Text] = {
+    "transformers": "languru.resources.local.embeddings:TransformersEmbeddingModel",
+    "onnx": "languru.resources.local.embeddings:OnnxEmbeddingModel",
+}
+
+
+class EmbeddingResult(NamedTuple):
+    embeddings: NDArray[np.float32]
+    prompt_tokens: int
+
+
+class EmbeddingModel:
+    """An embedding model on CPU, the pooled and normalized last hidden states
+    of the texts.
+
+    Parameters
+    ----------
+    model : Text
+        The model name or path.
+    max_length : int, optional
+        The most tokens of a text, the rest is truncated, by default 512.
+    pooling : EmbeddingPooling, optional
+        The pooling of the hidden states, by default "mean".
+    normalize : bool, optional
+        Whether to L2 normalize the embeddings, by default True.
+    num_threads : Optional[int], optional
+        The intra-op threads of the inference, by default the runtime default.
+    """
+
+    def __init__(
+        self,
+        model: Text,
+        *,
+        max_length: int = 512,
+        pooling: EmbeddingPooling = "mean",
+        normalize: bool = True,
+        num_threads: Optional[int] = None,
+        **kwargs,
+    ):
+        self.model_name = model
+        self.max_length = max_length
+        self.pooling = pooling
+        self.normalize = normalize
+        self.num_threads = num_threads
+
+    def forward(
+        self, texts: Sequence[Text]
+    ) -> Tuple[NDArray[np.float32], NDArray[np.int64]]:
+        """Returns the last hidden states and the attention mask of the texts."""
+
+        raise NotImplementedError
+
+    def embed(self, texts: Sequence[Text]) -> Tuple[NDArray[np.float32], List[int]]:
+        """Returns the embeddings and the token counts of the texts."""
+
+        last_hidden_states, attention_mask = self.forward(texts)
+        if self.pooling == "cls":
+            embeddings = last_hidden_states[:, 0]
+        else:
+            embeddings = mean_pooling(last_hidden_states, attention_mask)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self.normalize:
+            l2_normalize(embeddings, out=embeddings)
+        return (embeddings, attention_mask.sum(axis=1).tolist())
+
+
+class TransformersEmbeddingModel(EmbeddingModel):
+    """The embedding model of `transformers` `AutoModel` on torch."""
+
+    def __init__(self, model: Text, **kwargs):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        super().__init__(model, **kwargs)
+        if self.num_threads is not None:
+            torch.set_num_threads(self.num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModel.from_pretrained(model).eval()
+
+    def forward(
+        self, texts: Sequence[Text]
+    ) -> Tuple[NDArray[np.float32], NDArray[np.int64]]:
+        import torch
+
+        from languru.utils.calculation import tensor_to_np
+
+        inputs = self.tokenizer(
+            list(texts),
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="pt",
+        )
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+        return (
+            tensor_to_np(outputs.last_hidden_state),
+            inputs["attention_mask"].numpy(),
+        )
+
+
+class OnnxEmbeddingModel(EmbeddingModel):
+    """The embedding model of an ONNX export on `onnxruntime`, the `model`
+    directory has the `model.onnx` and its `tokenizer.json`.
+    """
+
+    def __init__(self, model: Text, **kwargs):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        super().__init__(model, **kwargs)
+        model_dir = Path(model)
+        self.tokenizer = Tokenizer.from_file(str(model_dir.joinpath("tokenizer.json")))
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+        self.tokenizer.enable_padding()
+        session_options = onnxruntime.SessionOptions()
+        if self.num_threads is not None:
+            session_options.intra_op_num_threads = self.num_threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_dir.joinpath("model.onnx")),
+            session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def forward(
+        self, texts: Sequence[Text]
+    ) -> Tuple[NDArray[np.float32], NDArray[np.int64]]:
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        last_hidden_states = self.session.run(None, feeds)[0]
+        return (last_hidden_states, attention_mask)
+
+
+# The model of the worker process, loaded once by its initializer
+_worker_model: Optional[EmbeddingModel] = None
+
+
+def _init_worker(model_class: Text, model: Text, model_kwargs: Dict) -> None:
+    global _worker_model
+    module_name, _, class_name = model_class.partition(":")
+    _worker_model = getattr(importlib.import_module(module_name), class_name)(
+        model, **model_kwargs
+    )
+
+
+def _embed_batch(texts: List[Text]) -> Tuple[NDArray[np.float32], List[int]]:
+    if _worker_model is None:
+        raise RuntimeError("The embedding model of the worker is not loaded.")
+    return _worker_model.embed(texts)
+
+
+class _Request:
+    def __init__(self, texts: Sequence[Text]):
+        self.texts = texts
+        self.future: "Future[EmbeddingResult]" = Future()
+        self.embeddings: Optional[NDArray[np.float32]] = None
+        self.prompt_tokens = 0
+        self.remaining = len(texts)
+
+
+class _Item(NamedTuple):
+    request: _Request
+    index: int
+    text: Text
+
+
+class EmbeddingEngine:
+    """Embed the texts of the concurrent requests in dynamic batches on a
+    process pool.
+
+    The texts waiting when a worker frees up, up to `max_batch_size` per
+    worker, are sorted by length and split into batches of similar lengths,
+    so little padding is computed. A request waits at most `max_wait` seconds
+    for other requests to share its batches.
+
+    Parameters
+    ----------
+    model : Text
+        The model name or path.
+    backend : Union[EmbeddingBackend, Text], optional
+        The backend, or the import path of an `EmbeddingModel` class,
+        `module:Class`, by default "transformers".
+    workers : int, optional
+        The worker processes, each loads the model, by default 1.
+    max_batch_size : int, optional
+        The most texts of a batch, by default 32.
+    max_wait : float, optional
+        The seconds a batch waits to be filled, by default 0.005.
+    **model_kwargs
+        The keyword arguments of the model, e.g. `max_length`.
+    """
+
+    def __init__(
+        self,
+        model: Text,
+        *,
+        backend: Union[EmbeddingBackend, Text] = "transformers",
+        workers: int = 1,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        **model_kwargs: Any,
+    ):
+        if workers < 1:
+            raise ValueError("The `workers` must be at least 1")
+        self.model = model
+        self.workers = workers
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        model_class = EMBEDDING_BACKENDS.get(backend, backend)
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_class, model, model_kwargs),
+        )
+        self._queue: "queue.SimpleQueue[Optional[_Request]]" = queue.SimpleQueue()
+        self._slots = threading.Semaphore(workers)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._batch_loop, name="languru.embedding_engine", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "EmbeddingEngine":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def submit(self, texts: Sequence[Text]) -> "Future[EmbeddingResult]":
+        """Queue the texts, returns the future of their embeddings."""
+
+        if self._closed:
+            raise RuntimeError("The embedding engine is closed")
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result(
+                EmbeddingResult(np.empty((0, 0), dtype=np.float32), 0)
+            )
+            return request.future
+        self._queue.put(request)
+        return request.future
+
+    def embed(
+        self, texts: Sequence[Text], *, timeout: Optional[float] = None
+    ) -> EmbeddingResult:
+        return self.submit(texts).result(timeout=timeout)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _batch_loop(self) -> None:
+        while (request := self._queue.get()) is not None:
+            window = self._collect(request)
+            if window is None:
+                return
+            # Sorted by length, the texts of a batch need little padding
+            window.sort(key=lambda item: len(item.text))
+            for start in range(0, len(window), self.max_batch_size):
+                self._slots.acquire()
+                batch = window[start : start + self.max_batch_size]
+                try:
+                    future = self._pool.submit(
+                        _embed_batch, [item.text for item in batch]
+                    )
+                except Exception as e:  # The pool is broken or shut down
+                    self._slots.release()
+                    self._fail(batch, e)
+                    continue
+                future.add_done_callback(lambda f, batch=batch: self._done(batch, f))
+
+    def _collect(self, request: _Request) -> Optional[List[_Item]]:
+        """Collect the texts of the waiting requests into a window, returns
+        None if the engine is closing.
+        """
+
+        window = [_Item(request, i, t) for i, t in enumerate(request.texts)]
+        limit = self.max_batch_size * self.workers
+        deadline = time.monotonic() + self.max_wait
+        while len(window) < limit:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    request = self._queue.get(timeout=timeout)
+                else:
+                    request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._fail(window, RuntimeError("The embedding engine is closed"))
+                return None
+            window.extend(_Item(request, i, t) for i, t in enumerate(request.texts))
+        return window
+
+    def _done(
+        self, batch: List[_Item], future: "Future[Tuple[NDArray, List[int]]]"
+    ) -> None:
+        self._slots.release()
+        try:
+            embeddings, token_counts = future.result()
+        except BaseException as e:
+            logger.warning(f"Embedding batch of {len(batch)} texts failed: {e!r}")
+            self._fail(batch, e)
+            return
+        with self._lock:
+            for item, embedding, num_tokens in zip(batch, embeddings, token_counts):
+                request = item.request
+                if request.future.done():
+                    continue
+                if request.embeddings is None:
+                    request.embeddings = np.empty(
+                        (len(request.texts), embeddings.shape[-1]), dtype=np.float32
+                    )
+                request.embeddings[item.index] = embedding
+                request.prompt_tokens += num_tokens
+                request.remaining -= 1
+                if request.remaining == 0:
+                    request.future.set_result(
+                        EmbeddingResult(request.embeddings, request.prompt_tokens)
+                    )
+
+    def _fail(self, items: List[_Item], error: BaseException) -> None:
+        with self._lock:
+            for item in items:
+                if not item.request.future.done():
+                    item.request.future.set_exception(error)
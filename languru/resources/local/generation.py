@@ -0,0 +1,576 @@
+import asyncio
+import importlib
+import queue
+import threading
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    FrozenSet,
+    Generator,
+    List,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+from numpy.typing import NDArray
+
+from languru.config import logger
+from languru.utils.stop_sequences import StopSequences
+
+FinishReason = Literal["stop", "length"]
+
+GENERATION_BACKENDS: Dict[Text, Text] = {
+    "transformers": "languru.resources.local.generation:TransformersGenerationModel",
+}
+
+
+class GenerationOutput(NamedTuple):
+    text: Text
+    finish_reason: Optional[FinishReason]
+    prompt_tokens: int
+    completion_tokens: int
+
+
+class GenerationModel:
+    """A causal language model on CPU, decoding one token per step for a batch
+    of sequences, each with its own cache.
+
+    Parameters
+    ----------
+    model : Text
+        The model name or path.
+    num_threads : Optional[int], optional
+        The intra-op threads of the inference, by default the runtime default.
+    """
+
+    eos_token_ids: FrozenSet[int] = frozenset()
+
+    def __init__(self, model: Text, *, num_threads: Optional[int] = None, **kwargs):
+        self.model_name = model
+        self.num_threads = num_threads
+
+    def encode(self, text: Text) -> List[int]:
+        raise NotImplementedError
+
+    def decode(self, token_ids: Sequence[int]) -> Text:
+        raise NotImplementedError
+
+    def apply_chat_template(self, messages: Sequence[Mapping[Text, Any]]) -> List[int]:
+        """Returns the prompt token ids of the chat messages."""
+
+        prompt = "".join(f"{m['role']}: {m['content']}\n" for m in messages)
+        return self.encode(prompt + "assistant: ")
+
+    def prefill(self, input_ids: Sequence[int]) -> Tuple[Any, NDArray[np.float32]]:
+        """Returns the cache of the prompt and the logits of its next token."""
+
+        raise NotImplementedError
+
+    def decode_step(
+        self, token_ids: Sequence[int], caches: Sequence[Any]
+    ) -> Tuple[List[Any], NDArray[np.float32]]:
+        """Decode the last tokens of a batch of sequences, returns the updated
+        caches and the logits of the next tokens, `(batch_size, vocab_size)`.
+        """
+
+        raise NotImplementedError
+
+
+class TransformersGenerationModel(GenerationModel):
+    """The generation model of `transformers` `AutoModelForCausalLM` on torch.
+
+    The cache of a sequence is its legacy key-value cache, the caches of a
+    batch are left padded to the longest one for each decode step.
+    """
+
+    def __init__(self, model: Text, **kwargs):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        super().__init__(model, **kwargs)
+        if self.num_threads is not None:
+            torch.set_num_threads(self.num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(model)
+        self.model = AutoModelForCausalLM.from_pretrained(model).eval()
+        eos_token_id = self.model.generation_config.eos_token_id
+        if eos_token_id is None:
+            eos_token_id = self.tokenizer.eos_token_id
+        self.eos_token_ids = frozenset(
+            eos_token_id if isinstance(eos_token_id, list) else [eos_token_id]
+        ) - {None}
+
+    def encode(self, text: Text) -> List[int]:
+        return self.tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, token_ids: Sequence[int]) -> Text:
+        return self.tokenizer.decode(token_ids, skip_special_tokens=True)
+
+    def apply_chat_template(self, messages: Sequence[Mapping[Text, Any]]) -> List[int]:
+        if getattr(self.tokenizer, "chat_template", None):
+            return list(
+                self.tokenizer.apply_chat_template(
+                    [dict(m) for m in messages], add_generation_prompt=True
+                )
+            )
+        return super().apply_chat_template(messages)
+
+    def prefill(self, input_ids: Sequence[int]) -> Tuple[Any, NDArray[np.float32]]:
+        import torch
+
+        from languru.utils.calculation import tensor_to_np
+
+        with torch.inference_mode():
+            outputs = self.model(input_ids=torch.tensor([input_ids]), use_cache=True)
+        return (
+            _to_legacy_cache(outputs.past_key_values),
+            tensor_to_np(outputs.logits[0, -1]),
+        )
+
+    def decode_step(
+        self, token_ids: Sequence[int], caches: Sequence[Any]
+    ) -> Tuple[List[Any], NDArray[np.float32]]:
+        import torch
+        import torch.nn.functional as F
+
+        from languru.utils.calculation import tensor_to_np
+
+        lengths = [cache[0][0].shape[-2] for cache in caches]
+        max_length = max(lengths)
+        past = tuple(
+            tuple(
+                torch.cat(
+                    [
+                        F.pad(cache[layer][i], (0, 0, max_length - length, 0))
+                        for cache, length in zip(caches, lengths)
+                    ]
+                )
+                for i in (0, 1)
+            )
+            for layer in range(len(caches[0]))
+        )
+        attention_mask = torch.zeros((len(caches), max_length + 1), dtype=torch.long)
+        for row, length in enumerate(lengths):
+            attention_mask[row, max_length - length :] = 1
+        with torch.inference_mode():
+            outputs = self.model(
+                input_ids=torch.tensor(token_ids)[:, None],
+                attention_mask=attention_mask,
+                position_ids=torch.tensor(lengths)[:, None],
+                past_key_values=_to_cache(past),
+                use_cache=True,
+            )
+        new_past = _to_legacy_cache(outputs.past_key_values)
+        # The caches of the sequences are views without their left padding
+        new_caches = [
+            tuple(
+                (
+                    k[row : row + 1, :, max_length - length :],
+                    v[row : row + 1, :, max_length - length :],
+                )
+                for k, v in new_past
+            )
+            for row, length in enumerate(lengths)
+        ]
+        return (new_caches, tensor_to_np(outputs.logits[:, -1]))
+
+
+def _to_cache(past: Any) -> Any:
+    try:
+        from transformers import DynamicCache
+    except ImportError:
+        return past
+    return DynamicCache.from_legacy_cache(past)
+
+
+def _to_legacy_cache(past: Any) -> Any:
+    return past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else past
+
+
+class IncrementalDetokenizer:
+    """Decode the generated tokens into text deltas, decoding only the tokens
+    since the last complete delta, so a step costs the same however long the
+    text is.
+    """
+
+    def __init__(self, decode: Callable[[Sequence[int]], Text]):
+        self.decode = decode
+        self.token_ids: List[int] = []
+        self.prefix_offset = 0
+        self.read_offset = 0
+
+    def add(self, token_id: int) -> Text:
+        """Add a token, returns the new text, empty if the token ends inside a
+        character, e.g. a byte of a multi-byte character.
+        """
+
+        self.token_ids.append(token_id)
+        prefix_text = self.decode(self.token_ids[self.prefix_offset : self.read_offset])
+        new_text = self.decode(self.token_ids[self.prefix_offset :])
+        if len(new_text) > len(prefix_text) and not new_text.endswith("\ufffd"):
+            self.prefix_offset = self.read_offset
+            self.read_offset = len(self.token_ids)
+            return new_text[len(prefix_text) :]
+        return ""
+
+
+def sample_tokens(
+    logits: NDArray[np.float32],
+    temperatures: NDArray[np.float32],
+    top_ps: NDArray[np.float32],
+    rngs: Sequence[np.random.Generator],
+) -> NDArray[np.int64]:
+    """Sample the next tokens of a batch, greedy for the rows of temperature 0,
+    else from the smallest set of tokens whose probability reaches `top_p`.
+    """
+
+    tokens = logits.argmax(axis=-1)
+    rows = np.flatnonzero(temperatures > 0)
+    if rows.size == 0:
+        return tokens
+    probs = logits[rows] / temperatures[rows, None]
+    probs -= probs.max(axis=-1, keepdims=True)
+    np.exp(probs, out=probs)
+    order = np.argsort(-probs, axis=-1)
+    cumsum = np.cumsum(np.take_along_axis(probs, order, axis=-1), axis=-1)
+    cumsum /= cumsum[:, -1:]
+    # The last kept token is the first one reaching `top_p`
+    cutoff = np.minimum(
+        (cumsum < top_ps[rows, None]).sum(axis=-1), logits.shape[-1] - 1
+    )
+    arange = np.arange(rows.size)
+    uniform = np.array([rngs[row].random() for row in rows]) * cumsum[arange, cutoff]
+    choice = np.minimum((cumsum < uniform[:, None]).sum(axis=-1), cutoff)
+    tokens[rows] = order[arange, choice]
+    return tokens
+
+
+class GenerationRequest:
+    """A sequence generated by the engine, its outputs are passed to the
+    `callback` on the engine thread, the last one with the finish reason, or
+    the exception if it failed.
+    """
+
+    def __init__(
+        self,
+        prompt_ids: Sequence[int],
+        *,
+        callback: Callable[[Union[GenerationOutput, BaseException]], Any],
+        decode: Callable[[Sequence[int]], Text],
+        max_tokens: int,
+        stop: StopSequences[Text],
+        temperature: float,
+        top_p: float,
+        seed: Optional[int],
+    ):
+        self.prompt_ids = list(prompt_ids)
+        self.callback = callback
+        self.max_tokens = max_tokens
+        self.stop = stop
+        self.temperature = temperature
+        self.top_p = top_p
+        self.rng = np.random.default_rng(seed)
+        self.detokenizer = IncrementalDetokenizer(decode)
+        self.cache: Any = None
+        self.last_token_id: Optional[int] = None
+        self.completion_tokens = 0
+        self.cancelled = False
+        # The stop matching state and the text held back as a stop prefix
+        self._stop_state = 0
+        self._pending = ""
+
+    def cancel(self) -> None:
+        """Stop generating, the sequence leaves the batch at the next step."""
+
+        self.cancelled = True
+
+    def append(self, token_id: int, eos_token_ids: FrozenSet[int]) -> bool:
+        """Append a generated token, returns whether the sequence finished."""
+
+        self.completion_tokens += 1
+        self.last_token_id = token_id
+        if token_id in eos_token_ids:
+            return self._emit(self._pending, "stop")
+        delta = self.detokenizer.add(token_id)
+        if delta and self.stop:
+            # Only the new characters are matched, from the kept state
+            pending = self._pending + delta
+            self._stop_state, match = self.stop.feed(self._stop_state, delta)
+            if match is not None:
+                end, length = match
+                stop_start = len(self._pending) + end + 1 - length
+                return self._emit(pending[:stop_start], "stop")
+            split = len(pending) - self.stop.pending(self._stop_state)
+            delta, self._pending = pending[:split], pending[split:]
+        if self.completion_tokens >= self.max_tokens:
+            return self._emit(delta + self._pending, "length")
+        if delta:
+            self._emit(delta, None)
+        return False
+
+    def _emit(self, text: Text, finish_reason: Optional[FinishReason]) -> bool:
+        output = GenerationOutput(
+            text, finish_reason, len(self.prompt_ids), self.completion_tokens
+        )
+        try:
+            self.callback(output)
+        except Exception as e:  # The consumer is gone, e.g. its loop closed
+            logger.debug(f"Generation output dropped: {e!r}")
+            self.cancelled = True
+        return finish_reason is not None or self.cancelled
+
+
+class GenerationEngine:
+    """Generate the sequences of the concurrent requests with continuous
+    batching.
+
+    Every step decodes one token of all the running sequences in one batch.
+    A new request joins the batch at the next step, after its prompt is
+    prefilled, and a finished one leaves it at once, so the batch is refilled
+    without waiting for its longest sequence. The stop sequences are matched
+    incrementally on the new text of each step.
+
+    Parameters
+    ----------
+    model : Union[Text, GenerationModel]
+        The model name or path, or a loaded model.
+    backend : Text, optional
+        The backend, or the import path of a `GenerationModel` class,
+        `module:Class`, by default "transformers".
+    max_batch_size : int, optional
+        The most sequences decoded in a step, by default 8.
+    max_tokens : int, optional
+        The default most tokens of a completion, by default 512.
+    **model_kwargs
+        The keyword arguments of the model, e.g. `num_threads`.
+    """
+
+    def __init__(
+        self,
+        model: Union[Text, GenerationModel],
+        *,
+        backend: Text = "transformers",
+        max_batch_size: int = 8,
+        max_tokens: int = 512,
+        **model_kwargs: Any,
+    ):
+        if isinstance(model, GenerationModel):
+            self.model = model
+        else:
+            module_name, _, class_name = GENERATION_BACKENDS.get(
+                backend, backend
+            ).partition(":")
+            self.model = getattr(importlib.import_module(module_name), class_name)(
+                model, **model_kwargs
+            )
+        self.max_batch_size = max_batch_size
+        self.max_tokens = max_tokens
+        self._queue: "queue.SimpleQueue[Optional[GenerationRequest]]" = (
+            queue.SimpleQueue()
+        )
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._loop, name="languru.generation_engine", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "GenerationEngine":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def submit(
+        self,
+        prompt_ids: Sequence[int],
+        *,
+        callback: Callable[[Union[GenerationOutput, BaseException]], Any],
+        max_tokens: Optional[int] = None,
+        stop: Optional[Union[Text, Sequence[Text]]] = None,
+        temperature: float = 1.0,
+        top_p: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> GenerationRequest:
+        """Queue the prompt, its outputs are passed to the `callback`."""
+
+        if self._closed:
+            raise RuntimeError("The generation engine is closed")
+        if not prompt_ids:
+            raise ValueError("The prompt must not be empty")
+        request = GenerationRequest(
+            prompt_ids,
+            callback=callback,
+            decode=self.model.decode,
+            max_tokens=max_tokens or self.max_tokens,
+            stop=StopSequences([stop] if isinstance(stop, Text) else stop or []),
+            temperature=temperature,
+            top_p=top_p,
+            seed=seed,
+        )
+        self._queue.put(request)
+        return request
+
+    def stream(
+        self,
+        prompt_ids: Sequence[int],
+        *,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Generator[GenerationOutput, None, None]:
+        """Generate the text deltas, closing the generator cancels the request."""
+
+        outputs: "queue.SimpleQueue[Union[GenerationOutput, BaseException]]" = (
+            queue.SimpleQueue()
+        )
+        request = self.submit(prompt_ids, callback=outputs.put, **kwargs)
+        try:
+            while True:
+                output = outputs.get(timeout=timeout)
+                if isinstance(output, BaseException):
+                    raise output
+                yield output
+                if output.finish_reason is not None:
+                    return
+        finally:
+            request.cancel()
+
+    async def astream(
+        self, prompt_ids: Sequence[int], **kwargs: Any
+    ) -> AsyncGenerator[GenerationOutput, None]:
+        """The async `stream`."""
+
+        loop = asyncio.get_running_loop()
+        outputs: "asyncio.Queue[Union[GenerationOutput, BaseException]]" = (
+            asyncio.Queue()
+        )
+        request = self.submit(
+            prompt_ids,
+            callback=lambda o: loop.call_soon_threadsafe(outputs.put_nowait, o),
+            **kwargs,
+        )
+        try:
+            while True:
+                output = await outputs.get()
+                if isinstance(output, BaseException):
+                    raise output
+                yield output
+                if output.finish_reason is not None:
+                    return
+        finally:
+            request.cancel()
+
+    def generate(self, prompt_ids: Sequence[int], **kwargs: Any) -> GenerationOutput:
+        """Generate the whole text."""
+
+        texts: List[Text] = []
+        for output in self.stream(prompt_ids, **kwargs):
+            texts.append(output.text)
+        return output._replace(text="".join(texts))
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self) -> None:
+        running: List[GenerationRequest] = []
+        closing = False
+        while not closing:
+            # Block for a request when idle, else take the waiting ones
+            admitted: List[GenerationRequest] = []
+            if not running:
+                request = self._queue.get()
+                if request is None:
+                    break
+                admitted.append(request)
+            while len(running) + len(admitted) < self.max_batch_size:
+                try:
+                    request = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    closing = True
+                    break
+                admitted.append(request)
+            running = [r for r in running if not r.cancelled]
+            admitted = [r for r in admitted if not r.cancelled]
+            if closing:
+                running.extend(admitted)
+                break
+            running = self._step(running, admitted)
+
+        error = RuntimeError("The generation engine is closed")
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                running.append(request)
+        for request in running:
+            _fail(request, error)
+
+    def _step(
+        self, running: List[GenerationRequest], admitted: List[GenerationRequest]
+    ) -> List[GenerationRequest]:
+        """Decode a token of the running sequences and prefill the admitted
+        ones, returns the unfinished sequences.
+        """
+
+        batch: List[GenerationRequest] = []
+        logits: List[NDArray[np.float32]] = []
+        if running:
+            try:
+                caches, running_logits = self.model.decode_step(
+                    [r.last_token_id for r in running], [r.cache for r in running]
+                )
+            except Exception as e:
+                logger.exception(f"Decoding a batch of {len(running)} failed: {e}")
+                for request in running:
+                    _fail(request, e)
+            else:
+                for request, cache in zip(running, caches):
+                    request.cache = cache
+                batch.extend(running)
+                logits.append(running_logits)
+        for request in admitted:
+            try:
+                request.cache, prompt_logits = self.model.prefill(request.prompt_ids)
+            except Exception as e:
+                logger.exception(f"Prefilling a prompt failed: {e}")
+                _fail(request, e)
+                continue
+            batch.append(request)
+            logits.append(prompt_logits[None])
+        if not batch:
+            return []
+
+        token_ids = sample_tokens(
+            np.concatenate(logits),
+            np.array([r.temperature for r in batch], dtype=np.float32),
+            np.array([r.top_p for r in batch], dtype=np.float32),
+            [r.rng for r in batch],
+        )
+        eos_token_ids = self.model.eos_token_ids
+        return [
+            request
+            for request, token_id in zip(batch, token_ids.tolist())
+            if not request.append(token_id, eos_token_ids)
+        ]
+
+
+def _fail(request: GenerationRequest, error: BaseException) -> None:
+    try:
+        request.callback(error)
+    except Exception:
+        pass
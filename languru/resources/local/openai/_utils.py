@@ -0,0 +1,17 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Text
+
+
+def dump_json_atomic(path: Path, data: Dict[Text, Any]) -> None:
+    """Write the JSON file through a temporary file, so a crash leaves either
+    the old or the new content.
+    """
+
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,6 @@
+from languru.resources.local.openai.backend._client import (
+    LogOpenaiBackend,
+    MemoryOpenaiBackend,
+)
+
+__all__ = ["LogOpenaiBackend", "MemoryOpenaiBackend"]
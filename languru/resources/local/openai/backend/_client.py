@@ -0,0 +1,68 @@
+from typing import Text
+
+from yarl import URL
+
+from languru.resources.local.openai.backend._store import LogStore, MemoryStore
+from languru.resources.local.openai.backend.assistants import (
+    Assistants as AssistantsBackend,
+)
+from languru.resources.local.openai.backend.threads import Threads as ThreadsBackend
+from languru.resources.openai_backend import BaseOpenaiBackend
+
+
+class MemoryOpenaiBackend(BaseOpenaiBackend):
+    """The OpenAI backend kept in process memory, for tests and ephemeral
+    deployments, e.g. `OPENAI_BACKEND_URL=memory://`.
+
+    The resources have the methods of the SQL engine, without a database, and
+    the options of the SQL engine, e.g. `pool_size`, are ignored. The objects
+    are only seen by the process, so the server runs with one worker.
+    """
+
+    assistants: AssistantsBackend  # type: ignore[assignment]
+    threads: ThreadsBackend  # type: ignore[assignment]
+    store: MemoryStore
+    multiprocess = False
+
+    def __init__(self, url: Text | URL = "memory://", **kwargs):
+        self.url: Text = str(url)
+        self.store = self._create_store()
+
+        self.assistants = AssistantsBackend(client=self)
+        self.threads = ThreadsBackend(client=self)
+
+    def touch(self):
+        pass
+
+    def compact(self, *, full: bool = False) -> None:
+        with self.store.lock:
+            self.store.compact(full=full)
+
+    def close(self) -> None:
+        with self.store.lock:
+            self.store.close()
+
+    def _create_store(self) -> MemoryStore:
+        return MemoryStore()
+
+
+class LogOpenaiBackend(MemoryOpenaiBackend):
+    """The OpenAI backend on the append-only logs of a local directory, e.g.
+    `OPENAI_BACKEND_URL=logstore:///data/openai?segment_size=4194304&fsync=false`.
+
+    Messages are written to per-thread segment files and read through memory
+    maps, see `LogStore`. The directory is owned by a single process, the
+    segments and the index are not locked against other writers, so the
+    server runs with one worker.
+    """
+
+    store: LogStore
+
+    def _create_store(self) -> LogStore:
+        url = URL(self.url)
+        query = url.query
+        return LogStore(
+            f"{url.host or ''}{url.path}",
+            segment_size=int(query.get("segment_size", 4 * 1024 * 1024)),
+            fsync=query.get("fsync", "false").lower() in ("1", "true", "yes"),
+        )
@@ -0,0 +1,52 @@
+from typing import Iterable, List, Literal, Optional, Text
+
+from languru.resources.local.openai.backend._store import Entry
+
+
+def keyset_paginate(
+    entries: Iterable[Entry],
+    *,
+    after: Optional[Text] = None,
+    before: Optional[Text] = None,
+    limit: Optional[int] = None,
+    order: Literal["asc", "desc"] = "desc",
+) -> List[Entry]:
+    """Apply keyset pagination on `(created_at, seq)` to the entries, with
+    the semantics of the SQL engine: a cursor which is not among the entries
+    yields an empty page.
+
+    Parameters
+    ----------
+    entries : Iterable[Entry]
+        The entries to paginate, in any order.
+    after : Optional[Text], optional
+        The ID of the cursor to list objects after, by default None.
+    before : Optional[Text], optional
+        The ID of the cursor to list objects before, by default None.
+    limit : Optional[int], optional
+        The maximum number of entries to return, by default None.
+    order : Literal["asc", "desc"], optional
+        The sort order of `created_at`, by default "desc".
+
+    Returns
+    -------
+    List[Entry]
+        The entries of the page, sorted.
+    """
+
+    page = sorted(entries, reverse=order == "desc")
+    for cursor_id, is_after in ((after, True), (before, False)):
+        if cursor_id is None:
+            continue
+        cursor = next((entry for entry in page if entry.id == cursor_id), None)
+        if cursor is None:
+            return []
+        # `after` walks forward in the sort order, `before` walks backward
+        if is_after == (order == "asc"):
+            page = [entry for entry in page if entry[:2] > cursor[:2]]
+        else:
+            page = [entry for entry in page if entry[:2] < cursor[:2]]
+
+    if limit is not None:
+        page = page[:limit]
+    return page
@@ -0,0 +1,621 @@
+import itertools
+import json
+import mmap
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import (
+    Dict,
+    Final,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from openai.types.beta.assistant import Assistant
+from openai.types.beta.thread import Thread
+from openai.types.beta.threads.message import Message
+from openai.types.beta.threads.run import Run
+from pydantic import BaseModel
+
+from languru.types.openai_threads import RunState
+
+OBJECT_KINDS: Final[Dict[Text, Type[BaseModel]]] = {
+    "assistants": Assistant,
+    "threads": Thread,
+    "runs": Run,
+    "run_states": RunState,
+}
+
+M = TypeVar("M", bound=BaseModel)
+
+_SAFE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class Entry(NamedTuple):
+    """The sort key of a stored object, `seq` is the insertion order that
+    breaks ties between objects created in the same second.
+    """
+
+    created_at: int
+    seq: int
+    id: Text
+
+
+class MemoryStore:
+    """The storage of the local engines, kept in process memory.
+
+    Assistants, threads and runs are unique by ID, messages by ID within
+    their thread. Callers hold `lock` around read-modify-write sequences.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._seq = itertools.count(1)
+        self._objects: Dict[Text, Dict[Text, Tuple[Entry, BaseModel]]] = {
+            kind: {} for kind in OBJECT_KINDS
+        }
+        self._run_ids_by_thread: Dict[Text, Dict[Text, None]] = {}
+        self._messages: Dict[Text, Dict[Text, Tuple[Entry, Message]]] = {}
+
+    # Assistants, threads and runs
+    def get(self, kind: Text, object_id: Text) -> Optional[BaseModel]:
+        item = self._objects[kind].get(object_id)
+        # Callers may reassign fields of the returned object
+        return None if item is None else item[1].model_copy()
+
+    def has(self, kind: Text, object_id: Text) -> bool:
+        return object_id in self._objects[kind]
+
+    def entries(self, kind: Text, *, thread_id: Optional[Text] = None) -> List[Entry]:
+        objects = self._objects[kind]
+        if kind == "runs" and thread_id is not None:
+            run_ids = self._run_ids_by_thread.get(thread_id, {})
+            return [objects[run_id][0] for run_id in run_ids]
+        return [entry for entry, _ in objects.values()]
+
+    def scan(self, kind: Text) -> List[BaseModel]:
+        """Return the stored objects, which callers must not modify."""
+
+        return [obj for _, obj in self._objects[kind].values()]
+
+    def insert(self, kind: Text, objs: Sequence[BaseModel]) -> None:
+        self.check_new(kind, objs)
+        objs = [declared_fields(obj) for obj in objs]
+        self._write_objects(kind, objs)
+        for obj in objs:
+            self._put(kind, obj)
+
+    def check_new(self, kind: Text, objs: Sequence[BaseModel]) -> None:
+        """Raise `ValueError` if any of the IDs is already taken."""
+
+        seen = set()
+        for obj in objs:
+            object_id: Text = obj.id  # type: ignore[attr-defined]
+            if object_id in self._objects[kind] or object_id in seen:
+                raise ValueError(f"The {kind} ID {object_id} already exists")
+            seen.add(object_id)
+
+    def replace(self, kind: Text, obj: BaseModel) -> None:
+        self._write_objects(kind, [obj])
+        self._put(kind, obj)
+
+    def remove(self, kind: Text, object_ids: Iterable[Text]) -> int:
+        object_ids = [i for i in object_ids if i in self._objects[kind]]
+        if object_ids:
+            self._write_removals(kind, object_ids)
+        for object_id in object_ids:
+            self._pop(kind, object_id)
+        return len(object_ids)
+
+    # Messages
+    def message_entries(self, thread_id: Text) -> List[Entry]:
+        return [entry for entry, _ in self._messages.get(thread_id, {}).values()]
+
+    def get_messages(
+        self, thread_id: Text, message_ids: Iterable[Text]
+    ) -> List[Message]:
+        messages = self._messages.get(thread_id, {})
+        return [
+            messages[message_id][1].model_copy()
+            for message_id in message_ids
+            if message_id in messages
+        ]
+
+    def insert_messages(self, messages: Sequence[Message]) -> None:
+        messages = [declared_fields(message) for message in messages]
+        seen = set()
+        for message in messages:
+            key = (message.thread_id, message.id)
+            if message.id in self._messages.get(message.thread_id, {}) or key in seen:
+                raise ValueError(f"The message ID {message.id} already exists")
+            seen.add(key)
+        for message in messages:
+            self.replace_message(message)
+
+    def replace_message(self, message: Message) -> None:
+        messages = self._messages.setdefault(message.thread_id, {})
+        item = messages.get(message.id)
+        entry = (
+            Entry(message.created_at, next(self._seq), message.id)
+            if item is None
+            else item[0]
+        )
+        messages[message.id] = (entry, message.model_copy())
+
+    def remove_message(self, thread_id: Text, message_id: Text) -> bool:
+        return self._messages.get(thread_id, {}).pop(message_id, None) is not None
+
+    def drop_messages(self, thread_ids: Iterable[Text]) -> int:
+        return sum(len(self._messages.pop(thread_id, {})) for thread_id in thread_ids)
+
+    def message_thread_ids(self) -> List[Text]:
+        return [thread_id for thread_id, items in self._messages.items() if items]
+
+    # Maintenance
+    def compact(self, *, full: bool = False) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _put(self, kind: Text, obj: BaseModel) -> None:
+        objects = self._objects[kind]
+        object_id: Text = obj.id  # type: ignore[attr-defined]
+        item = objects.get(object_id)
+        entry = (
+            Entry(obj.created_at, next(self._seq), object_id)  # type: ignore
+            if item is None
+            else item[0]
+        )
+        objects[object_id] = (entry, obj.model_copy())
+        if kind == "runs":
+            thread_id: Text = obj.thread_id  # type: ignore[attr-defined]
+            self._run_ids_by_thread.setdefault(thread_id, {})[object_id] = None
+
+    def _pop(self, kind: Text, object_id: Text) -> None:
+        _, obj = self._objects[kind].pop(object_id)
+        if kind == "runs":
+            thread_id: Text = obj.thread_id  # type: ignore[attr-defined]
+            run_ids = self._run_ids_by_thread.get(thread_id, {})
+            run_ids.pop(object_id, None)
+            if not run_ids:
+                self._run_ids_by_thread.pop(thread_id, None)
+
+    def _write_objects(self, kind: Text, objs: Sequence[BaseModel]) -> None:
+        pass
+
+    def _write_removals(self, kind: Text, object_ids: Sequence[Text]) -> None:
+        pass
+
+
+class _Location(NamedTuple):
+    entry: Entry
+    segment: int
+    offset: int
+    length: int
+
+
+class _ThreadLog:
+    """The index of the message segments of a thread."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+        self.locations: Dict[Text, _Location] = {}
+        self.segments: List[int] = []
+        self.active_size = 0
+        self.total_bytes = 0
+
+    @property
+    def live_bytes(self) -> int:
+        return sum(location.length for location in self.locations.values())
+
+    def segment_path(self, segment: int) -> Path:
+        return self.path / f"{segment:06d}.log"
+
+
+class LogStore(MemoryStore):
+    """The storage of the local engines, persisted as append-only logs in a
+    directory.
+
+    Assistants, threads and runs are few and hot, they are replayed from
+    `objects.log` into memory on open and every change is appended to it.
+    Messages stay on disk: each thread has its own directory of segment files,
+    only their offsets are indexed in memory, on the first access of the
+    thread, and messages are read through memory maps of the segments.
+    Updates and deletes append new records, `compact` rewrites the logs
+    without the records they superseded.
+
+    A directory is owned by a single process.
+
+    Parameters
+    ----------
+    path : Text | Path
+        The directory of the logs, created if missing.
+    segment_size : int, optional
+        The size in bytes after which a thread starts a new segment file,
+        by default 4 MiB.
+    fsync : bool, optional
+        Whether to `fsync` every write, by default False which leaves
+        flushing to the operating system.
+    max_open_segments : int, optional
+        The number of segment memory maps kept open, by default 256.
+    """
+
+    def __init__(
+        self,
+        path: Text | Path,
+        *,
+        segment_size: int = 4 * 1024 * 1024,
+        fsync: bool = False,
+        max_open_segments: int = 256,
+    ):
+        super().__init__()
+        self.path = Path(path)
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.max_open_segments = max_open_segments
+        self.threads_path = self.path / "threads"
+        self.threads_path.mkdir(parents=True, exist_ok=True)
+        self.objects_path = self.path / "objects.log"
+
+        self._thread_logs: Dict[Text, _ThreadLog] = {}
+        self._maps: "OrderedDict[Tuple[Text, int], mmap.mmap]" = OrderedDict()
+        self._object_records = self._replay_objects()
+        self._objects_file = open(self.objects_path, "ab")
+
+    # Messages
+    def message_entries(self, thread_id: Text) -> List[Entry]:
+        thread_log = self._thread_log(thread_id)
+        if thread_log is None:
+            return []
+        return [location.entry for location in thread_log.locations.values()]
+
+    def get_messages(
+        self, thread_id: Text, message_ids: Iterable[Text]
+    ) -> List[Message]:
+        thread_log = self._thread_log(thread_id)
+        if thread_log is None:
+            return []
+        messages: List[Message] = []
+        for message_id in message_ids:
+            location = thread_log.locations.get(message_id)
+            if location is None:
+                continue
+            buffer = self._map(thread_log, location)
+            messages.append(
+                Message.model_validate_json(
+                    buffer[location.offset : location.offset + location.length]
+                )
+            )
+        return messages
+
+    def insert_messages(self, messages: Sequence[Message]) -> None:
+        messages_by_thread: Dict[Text, List[Message]] = {}
+        for message in map(declared_fields, messages):
+            messages_by_thread.setdefault(message.thread_id, []).append(message)
+        for thread_id, thread_messages in messages_by_thread.items():
+            thread_log = self._thread_log(thread_id, create=True)
+            assert thread_log is not None
+            seen = set()
+            for message in thread_messages:
+                if message.id in thread_log.locations or message.id in seen:
+                    raise ValueError(f"The message ID {message.id} already exists")
+                seen.add(message.id)
+        for thread_id, thread_messages in messages_by_thread.items():
+            self._append_messages(thread_id, thread_messages)
+
+    def replace_message(self, message: Message) -> None:
+        self._append_messages(message.thread_id, [message])
+
+    def remove_message(self, thread_id: Text, message_id: Text) -> bool:
+        thread_log = self._thread_log(thread_id)
+        if thread_log is None or message_id not in thread_log.locations:
+            return False
+        record = json.dumps({"deleted": message_id}).encode() + b"\n"
+        self._append(thread_log, [record])
+        thread_log.locations.pop(message_id)
+        return True
+
+    def drop_messages(self, thread_ids: Iterable[Text]) -> int:
+        dropped = 0
+        for thread_id in thread_ids:
+            thread_log = self._thread_log(thread_id)
+            if thread_log is None:
+                continue
+            dropped += len(thread_log.locations)
+            self._unmap(thread_log)
+            shutil.rmtree(thread_log.path, ignore_errors=True)
+            self._thread_logs.pop(thread_id, None)
+        return dropped
+
+    def message_thread_ids(self) -> List[Text]:
+        return [
+            _decode_name(path.name)
+            for path in self.threads_path.iterdir()
+            if path.is_dir() and any(path.iterdir())
+        ]
+
+    # Maintenance
+    def compact(self, *, full: bool = False) -> None:
+        """Rewrite the logs whose superseded records outweigh the live ones.
+
+        Only the threads indexed by this process are considered, unless `full`
+        which rewrites the logs of every thread.
+        """
+
+        if full or self._object_records > 2 * sum(map(len, self._objects.values())):
+            self._rewrite_objects()
+        thread_ids = self.message_thread_ids() if full else list(self._thread_logs)
+        for thread_id in thread_ids:
+            thread_log = self._thread_log(thread_id)
+            if thread_log is None:
+                continue
+            if full or thread_log.total_bytes > 2 * thread_log.live_bytes:
+                self._rewrite_thread(thread_log)
+
+    def close(self) -> None:
+        for buffer in self._maps.values():
+            buffer.close()
+        self._maps.clear()
+        self._objects_file.close()
+
+    # Objects log
+    def _write_objects(self, kind: Text, objs: Sequence[BaseModel]) -> None:
+        self._write_object_records(
+            [
+                b'{"kind":"'
+                + kind.encode()
+                + b'","data":'
+                + obj.model_dump_json().encode()
+                + b"}\n"
+                for obj in objs
+            ]
+        )
+
+    def _write_removals(self, kind: Text, object_ids: Sequence[Text]) -> None:
+        self._write_object_records(
+            [
+                json.dumps({"kind": kind, "deleted": object_id}).encode() + b"\n"
+                for object_id in object_ids
+            ]
+        )
+
+    def _write_object_records(self, records: List[bytes]) -> None:
+        self._objects_file.write(b"".join(records))
+        self._objects_file.flush()
+        if self.fsync:
+            os.fsync(self._objects_file.fileno())
+        self._object_records += len(records)
+
+    def _replay_objects(self) -> int:
+        if not self.objects_path.exists():
+            return 0
+        records = 0
+        offset = 0
+        with open(self.objects_path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A torn write of the last record
+                offset += len(line)
+                record = json.loads(line)
+                kind = record["kind"]
+                if "deleted" in record:
+                    if record["deleted"] in self._objects[kind]:
+                        self._pop(kind, record["deleted"])
+                else:
+                    self._put(kind, OBJECT_KINDS[kind].model_validate(record["data"]))
+                records += 1
+        os.truncate(self.objects_path, offset)
+        return records
+
+    def _rewrite_objects(self) -> None:
+        items = sorted(
+            (entry.seq, kind, obj)
+            for kind, objects in self._objects.items()
+            for entry, obj in objects.values()
+        )
+        tmp_path = self.objects_path.with_suffix(".log.tmp")
+        with open(tmp_path, "wb") as f:
+            for _, kind, obj in items:
+                f.write(
+                    b'{"kind":"'
+                    + kind.encode()
+                    + b'","data":'
+                    + obj.model_dump_json().encode()
+                    + b"}\n"
+                )
+            f.flush()
+            os.fsync(f.fileno())
+        self._objects_file.close()
+        os.replace(tmp_path, self.objects_path)
+        self._objects_file = open(self.objects_path, "ab")
+        self._object_records = len(items)
+
+    # Message segments
+    def _thread_log(
+        self, thread_id: Text, *, create: bool = False
+    ) -> Optional[_ThreadLog]:
+        thread_log = self._thread_logs.get(thread_id)
+        if thread_log is not None:
+            return thread_log
+        path = self.threads_path / _encode_name(thread_id)
+        if not path.is_dir():
+            if not create:
+                return None
+            path.mkdir(parents=True, exist_ok=True)
+        thread_log = _ThreadLog(path)
+        segments = sorted(int(p.stem) for p in path.glob("*.log") if p.stem.isdigit())
+        for segment in segments:
+            self._replay_segment(thread_log, segment)
+        thread_log.segments = segments or [1]
+        self._thread_logs[thread_id] = thread_log
+        return thread_log
+
+    def _replay_segment(self, thread_log: _ThreadLog, segment: int) -> None:
+        offset = 0
+        with open(thread_log.segment_path(segment), "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A torn write of the last record
+                record = json.loads(line)
+                if "deleted" in record:
+                    thread_log.locations.pop(record["deleted"], None)
+                else:
+                    self._locate(
+                        thread_log,
+                        record["id"],
+                        record["created_at"],
+                        segment,
+                        offset,
+                        len(line) - 1,
+                    )
+                offset += len(line)
+        os.truncate(thread_log.segment_path(segment), offset)
+        thread_log.total_bytes += offset
+        thread_log.active_size = offset
+
+    def _locate(
+        self,
+        thread_log: _ThreadLog,
+        message_id: Text,
+        created_at: int,
+        segment: int,
+        offset: int,
+        length: int,
+    ) -> None:
+        location = thread_log.locations.get(message_id)
+        entry = (
+            Entry(created_at, next(self._seq), message_id)
+            if location is None
+            else location.entry
+        )
+        thread_log.locations[message_id] = _Location(entry, segment, offset, length)
+
+    def _append_messages(self, thread_id: Text, messages: Sequence[Message]) -> None:
+        thread_log = self._thread_log(thread_id, create=True)
+        assert thread_log is not None
+        records = [message.model_dump_json().encode() + b"\n" for message in messages]
+        positions = self._append(thread_log, records)
+        for message, record, (segment, offset) in zip(messages, records, positions):
+            self._locate(
+                thread_log,
+                message.id,
+                message.created_at,
+                segment,
+                offset,
+                len(record) - 1,
+            )
+
+    def _append(
+        self, thread_log: _ThreadLog, records: List[bytes]
+    ) -> List[Tuple[int, int]]:
+        """Append the records to the active segment of the thread, rolling
+        over to a new segment when it is full, and return their positions.
+        """
+
+        positions: List[Tuple[int, int]] = []
+        chunks: Dict[int, List[bytes]] = {}
+        for record in records:
+            if thread_log.active_size and (
+                thread_log.active_size + len(record) > self.segment_size
+            ):
+                thread_log.segments.append(thread_log.segments[-1] + 1)
+                thread_log.active_size = 0
+            segment = thread_log.segments[-1]
+            positions.append((segment, thread_log.active_size))
+            chunks.setdefault(segment, []).append(record)
+            thread_log.active_size += len(record)
+            thread_log.total_bytes += len(record)
+        for segment, segment_records in chunks.items():
+            with open(thread_log.segment_path(segment), "ab") as f:
+                f.write(b"".join(segment_records))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        return positions
+
+    def _rewrite_thread(self, thread_log: _ThreadLog) -> None:
+        old_segments = list(thread_log.segments)
+        locations = sorted(thread_log.locations.values())
+        records: List[bytes] = []
+        for location in locations:
+            buffer = self._map(thread_log, location)
+            records.append(
+                buffer[location.offset : location.offset + location.length] + b"\n"
+            )
+        self._unmap(thread_log)
+
+        # The live records move to new segments, the old ones are removed once
+        # the new ones are written
+        thread_log.segments = [old_segments[-1] + 1]
+        thread_log.active_size = 0
+        thread_log.total_bytes = 0
+        for location, (segment, offset) in zip(
+            locations, self._append(thread_log, records)
+        ):
+            thread_log.locations[location.entry.id] = _Location(
+                location.entry, segment, offset, location.length
+            )
+        for segment in old_segments:
+            thread_log.segment_path(segment).unlink(missing_ok=True)
+
+    def _map(self, thread_log: _ThreadLog, location: _Location) -> mmap.mmap:
+        key = (thread_log.name, location.segment)
+        buffer = self._maps.get(key)
+        if buffer is not None and len(buffer) >= location.offset + location.length:
+            self._maps.move_to_end(key)
+            return buffer
+
+        # The segment grew since it was mapped
+        if buffer is not None:
+            buffer.close()
+        with open(thread_log.segment_path(location.segment), "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[key] = buffer
+        while len(self._maps) > self.max_open_segments:
+            _, evicted = self._maps.popitem(last=False)
+            evicted.close()
+        return buffer
+
+    def _unmap(self, thread_log: _ThreadLog) -> None:
+        for segment in thread_log.segments:
+            buffer = self._maps.pop((thread_log.name, segment), None)
+            if buffer is not None:
+                buffer.close()
+
+
+def declared_fields(obj: M) -> M:
+    """Return the object without the fields its model does not declare, which
+    the SQL engine has no columns for.
+    """
+
+    if not obj.model_extra:
+        return obj
+    return obj.__class__.model_validate(obj.model_dump(exclude=set(obj.model_extra)))
+
+
+def _encode_name(thread_id: Text) -> Text:
+    """Return the directory name of the thread, IDs which are not safe file
+    names are hex encoded behind a `=` prefix.
+    """
+
+    if _SAFE_NAME_PATTERN.match(thread_id):
+        return thread_id
+    return "=" + thread_id.encode().hex()
+
+
+def _decode_name(name: Text) -> Text:
+    if name.startswith("="):
+        return bytes.fromhex(name[1:]).decode()
+    return name
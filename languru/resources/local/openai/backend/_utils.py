@@ -0,0 +1,29 @@
+from typing import Any, Dict, Iterable, Optional, Text, Type, TypeVar
+
+from pydantic import BaseModel
+
+from languru.types.sql._openai import Base
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def updated_model(obj: M, values: Dict[Text, Any]) -> M:
+    """Return a validated copy of the object with the values of its fields
+    replaced, the values may be models or their dumps.
+    """
+
+    return obj.__class__.model_validate({**obj.model_dump(), **values})
+
+
+def excluded_values(
+    orm_model: Type[Base], exclude: Optional[Iterable[Text]] = None
+) -> Dict[Text, Any]:
+    """Return the values the SQL engine lists for the excluded fields."""
+
+    orm_model.defer_options(exclude)  # Rejects the fields which are not JSON
+    exclude = set(exclude or ())
+    return {
+        field: default() if callable(default) else default
+        for field, (_, default) in orm_model.deferrable_fields.items()
+        if field in exclude
+    }
@@ -0,0 +1,109 @@
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Literal, Optional, Text
+
+from openai.types.beta.assistant import Assistant, ToolResources
+from openai.types.beta.assistant_deleted import AssistantDeleted
+from openai.types.beta.assistant_response_format_option import (
+    AssistantResponseFormatOption,
+)
+from openai.types.beta.assistant_tool import AssistantTool
+
+from languru.exceptions import NotFound
+from languru.resources.local.openai.backend._pagination import keyset_paginate
+from languru.resources.local.openai.backend._utils import updated_model
+from languru.utils.common import model_dump
+
+if TYPE_CHECKING:
+    from languru.resources.local.openai.backend._client import MemoryOpenaiBackend
+
+
+class Assistants:
+    kind = "assistants"
+
+    def __init__(self, client: "MemoryOpenaiBackend", **kwargs):
+        self._client = client
+
+    def list(
+        self,
+        *,
+        after: Optional[Text] = None,
+        before: Optional[Text] = None,
+        limit: Optional[int] = None,
+        order: Optional[Literal["asc", "desc"]] = None,
+    ) -> List["Assistant"]:
+        store = self._client.store
+        with store.lock:
+            entries = keyset_paginate(
+                store.entries(self.kind),
+                after=after,
+                before=before,
+                limit=limit,
+                order=order or "asc",
+            )
+            if not entries:
+                for cursor_id in (after, before):
+                    if cursor_id is not None and not store.has(self.kind, cursor_id):
+                        raise NotFound(f"Assistant with ID {cursor_id} not found.")
+            return [store.get(self.kind, entry.id) for entry in entries]  # type: ignore
+
+    def create(self, assistant: "Assistant") -> "Assistant":
+        with self._client.store.lock:
+            self._client.store.insert(self.kind, [assistant])
+        return assistant
+
+    def update(
+        self,
+        assistant_id: Text,
+        *,
+        model: Optional[Text] = None,
+        description: Optional[Text] = None,
+        instructions: Optional[Text] = None,
+        metadata: Optional[Dict] = None,
+        name: Optional[Text] = None,
+        response_format: Optional[AssistantResponseFormatOption] = None,
+        temperature: Optional[float] = None,
+        tool_resources: Optional[ToolResources] = None,
+        tools: Optional[Iterable[AssistantTool]] = None,
+        top_p: Optional[float] = None,
+    ) -> "Assistant":
+        values: Dict[Text, Any] = {}
+        for key, value in (
+            ("model", model),
+            ("description", description),
+            ("instructions", instructions),
+            ("metadata", metadata),
+            ("name", name),
+            ("response_format", model_dump(response_format)),
+            ("temperature", temperature),
+            ("tool_resources", model_dump(tool_resources)),
+            ("tools", None if tools is None else [model_dump(t) for t in tools]),
+            ("top_p", top_p),
+        ):
+            if value is not None:
+                values[key] = value
+
+        store = self._client.store
+        with store.lock:
+            assistant = store.get(self.kind, assistant_id)
+            if assistant is None:
+                raise NotFound(f"Assistant with ID {assistant_id} not found.")
+            assistant = updated_model(assistant, values)
+            store.replace(self.kind, assistant)
+            return assistant  # type: ignore[return-value]
+
+    def delete(
+        self, assistant_id: Text, *, not_exist_ok: bool = False
+    ) -> "AssistantDeleted":
+        with self._client.store.lock:
+            deleted = self._client.store.remove(self.kind, [assistant_id]) > 0
+        if not deleted and not not_exist_ok:
+            raise NotFound(f"Assistant with ID {assistant_id} not found.")
+        return AssistantDeleted.model_validate(
+            {"id": assistant_id, "deleted": deleted, "object": "assistant.deleted"}
+        )
+
+    def retrieve(self, assistant_id: Text) -> "Assistant":
+        with self._client.store.lock:
+            assistant = self._client.store.get(self.kind, assistant_id)
+        if assistant is None:
+            raise NotFound(f"Assistant with ID {assistant_id} not found.")
+        return assistant  # type: ignore[return-value]
@@ -0,0 +1,108 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List, Literal, Optional, Text
+
+from openai.types.beta.threads.message import Message
+from openai.types.beta.threads.message_deleted import MessageDeleted
+
+from languru.exceptions import NotFound
+from languru.resources.local.openai.backend._pagination import keyset_paginate
+from languru.resources.local.openai.backend._utils import excluded_values, updated_model
+from languru.types.sql._openai import Message as OrmMessage
+
+if TYPE_CHECKING:
+    from languru.resources.local.openai.backend._client import MemoryOpenaiBackend
+
+
+class Messages:
+    def __init__(self, client: "MemoryOpenaiBackend", **kwargs):
+        self._client = client
+
+    def create(self, message: "Message") -> "Message":
+        with self._client.store.lock:
+            self._client.store.insert_messages([message])
+        return message
+
+    def create_many(
+        self, messages: Iterable["Message"], *, batch_size: int = 1000
+    ) -> List["Message"]:
+        """Insert the messages in bulk, `batch_size` is accepted for parity
+        with the SQL engine.
+        """
+
+        messages = list(messages)
+        with self._client.store.lock:
+            self._client.store.insert_messages(messages)
+        return messages
+
+    def list(
+        self,
+        thread_id: str,
+        *,
+        after: Optional[Text] = None,
+        before: Optional[Text] = None,
+        limit: Optional[int] = None,
+        order: Optional[Literal["asc", "desc"]] = None,
+        run_id: Optional[Text] = None,
+        exclude: Optional[Iterable[Text]] = None,
+    ) -> List["Message"]:
+        """List the messages of the thread.
+
+        `exclude` names JSON fields, e.g. `metadata`, which are returned empty.
+        """
+
+        excluded = excluded_values(OrmMessage, exclude)
+        store = self._client.store
+        with store.lock:
+            entries = store.message_entries(thread_id)
+            if run_id is None:
+                entries = keyset_paginate(
+                    entries,
+                    after=after,
+                    before=before,
+                    limit=limit,
+                    order=order or "desc",
+                )
+                messages = store.get_messages(thread_id, (e.id for e in entries))
+            else:
+                # The run of a message is only known once it is read
+                entries = keyset_paginate(
+                    entries, after=after, before=before, order=order or "desc"
+                )
+                messages = [
+                    m
+                    for m in store.get_messages(thread_id, (e.id for e in entries))
+                    if m.run_id == run_id
+                ][:limit]
+
+        if excluded:
+            messages = [m.model_copy(update=excluded) for m in messages]
+        return messages
+
+    def retrieve(self, message_id: Text, *, thread_id: Text) -> "Message":
+        with self._client.store.lock:
+            messages = self._client.store.get_messages(thread_id, [message_id])
+        if not messages:
+            raise NotFound(f"Message {message_id} not found")
+        return messages[0]
+
+    def update(
+        self, message_id: Text, *, thread_id: Text, metadata: Optional[Dict] = None
+    ) -> "Message":
+        store = self._client.store
+        with store.lock:
+            messages = store.get_messages(thread_id, [message_id])
+            if not messages:
+                raise NotFound(f"Message {message_id} not found")
+            message = updated_model(messages[0], {"metadata": metadata or {}})
+            store.replace_message(message)
+            return message
+
+    def delete(
+        self, message_id: Text, *, thread_id: Text, not_exist_ok: bool = False
+    ) -> "MessageDeleted":
+        with self._client.store.lock:
+            deleted = self._client.store.remove_message(thread_id, message_id)
+        if not deleted and not not_exist_ok:
+            raise NotFound(f"Message {message_id} not found")
+        return MessageDeleted.model_validate(
+            dict(id=message_id, deleted=deleted, object="thread.message.deleted")
+        )
@@ -0,0 +1,368 @@
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Text,
+)
+
+from openai.types.beta.assistant_response_format_option import (
+    AssistantResponseFormatOption,
+)
+from openai.types.beta.assistant_tool import AssistantTool
+from openai.types.beta.assistant_tool_choice_option import AssistantToolChoiceOption
+from openai.types.beta.threads.message import Message
+from openai.types.beta.threads.run import (
+    IncompleteDetails,
+    LastError,
+    RequiredAction,
+    Run,
+    TruncationStrategy,
+    Usage,
+)
+from openai.types.beta.threads.run_status import RunStatus
+
+from languru.exceptions import NotFound
+from languru.resources.local.openai.backend._pagination import keyset_paginate
+from languru.resources.local.openai.backend._utils import excluded_values, updated_model
+from languru.resources.sql.openai.backend.runs import (
+    EXPIRABLE_RUN_STATUSES,
+    TERMINAL_RUN_STATUSES,
+)
+from languru.types.openai_threads import RunState
+from languru.types.sql._openai import Run as OrmRun
+from languru.utils.common import model_dump
+
+if TYPE_CHECKING:
+    from languru.resources.local.openai.backend._client import MemoryOpenaiBackend
+
+
+class Runs:
+    kind = "runs"
+    state_kind = "run_states"
+
+    def __init__(self, client: "MemoryOpenaiBackend", **kwargs):
+        self._client = client
+
+    def create(self, run: "Run") -> "Run":
+        with self._client.store.lock:
+            self._client.store.insert(self.kind, [run])
+        return run
+
+    def list(
+        self,
+        thread_id: Text,
+        *,
+        after: Optional[Text] = None,
+        before: Optional[Text] = None,
+        limit: Optional[int] = None,
+        order: Optional[Literal["asc", "desc"]] = None,
+        assistant_id: Optional[Text] = None,
+        exclude: Optional[Iterable[Text]] = None,
+    ) -> List["Run"]:
+        """List the runs of the thread.
+
+        `exclude` names JSON fields, e.g. `metadata`, which are returned empty.
+        """
+
+        excluded = excluded_values(OrmRun, exclude)
+        store = self._client.store
+        with store.lock:
+            entries = keyset_paginate(
+                store.entries(self.kind, thread_id=thread_id),
+                after=after,
+                before=before,
+                order=order or "desc",
+            )
+            runs: List[Run] = [
+                store.get(self.kind, entry.id) for entry in entries  # type: ignore
+            ]
+        if assistant_id is not None:
+            runs = [run for run in runs if run.assistant_id == assistant_id]
+        if limit is not None:
+            runs = runs[:limit]
+        if excluded:
+            runs = [run.model_copy(update=excluded) for run in runs]
+        return runs
+
+    def retrieve(self, run_id: Text, *, thread_id: Text) -> "Run":
+        with self._client.store.lock:
+            run = self._get(run_id, thread_id=thread_id)
+        if run is None:
+            raise NotFound(f"Run {run_id} not found")
+        return run
+
+    def update(
+        self,
+        run_id: Text,
+        *,
+        thread_id: Text,
+        cancelled_at: Optional[int] = None,
+        completed_at: Optional[int] = None,
+        expires_at: Optional[int] = None,
+        failed_at: Optional[int] = None,
+        incomplete_details: Optional[IncompleteDetails] = None,
+        instructions: Optional[Text] = None,
+        last_error: Optional[LastError] = None,
+        max_completion_tokens: Optional[int] = None,
+        max_prompt_tokens: Optional[int] = None,
+        metadata: Optional[Dict] = None,
+        model: Optional[Text] = None,
+        parallel_tool_calls: Optional[bool] = None,
+        required_action: Optional[RequiredAction] = None,
+        response_format: Optional[AssistantResponseFormatOption] = None,
+        started_at: Optional[int] = None,
+        status: Optional[RunStatus] = None,
+        tool_choice: Optional[AssistantToolChoiceOption] = None,
+        tools: Optional[List[AssistantTool]] = None,
+        truncation_strategy: Optional[TruncationStrategy] = None,
+        usage: Optional[Usage] = None,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+    ) -> "Run":
+        values: Dict[Text, Any] = {"metadata": metadata or {}}
+        for key, value in (
+            ("cancelled_at", cancelled_at),
+            ("completed_at", completed_at),
+            ("expires_at", expires_at),
+            ("failed_at", failed_at),
+            ("incomplete_details", model_dump(incomplete_details)),
+            ("instructions", instructions),
+            ("last_error", model_dump(last_error)),
+            ("max_completion_tokens", max_completion_tokens),
+            ("max_prompt_tokens", max_prompt_tokens),
+            ("model", model),
+            ("parallel_tool_calls", parallel_tool_calls),
+            ("required_action", model_dump(required_action)),
+            ("response_format", model_dump(response_format)),
+            ("started_at", started_at),
+            ("status", status),
+            ("tool_choice", model_dump(tool_choice)),
+            ("tools", model_dump(tools)),
+            ("truncation_strategy", model_dump(truncation_strategy)),
+            ("usage", model_dump(usage)),
+            ("temperature", temperature),
+            ("top_p", top_p),
+        ):
+            if value is not None:
+                values[key] = value
+
+        store = self._client.store
+        with store.lock:
+            run = self._get(run_id, thread_id=thread_id)
+            if run is None:
+                raise NotFound(f"Run {run_id} not found")
+            run = updated_model(run, values)
+            store.replace(self.kind, run)
+            return run
+
+    def transition(
+        self,
+        run_id: Text,
+        *,
+        thread_id: Text,
+        from_statuses: Iterable[RunStatus],
+        status: RunStatus,
+        cancelled_at: Optional[int] = None,
+        completed_at: Optional[int] = None,
+        failed_at: Optional[int] = None,
+        started_at: Optional[int] = None,
+        last_error: Optional[LastError] = None,
+        usage: Optional[Usage] = None,
+        required_action: Optional[RequiredAction] = None,
+    ) -> Optional["Run"]:
+        """Move the run to `status` only if it is currently in `from_statuses`,
+        the check and the write hold the store lock.
+
+        Returns
+        -------
+        Optional[Run]
+            The updated run, or None if the run does not exist or its status
+            is not one of `from_statuses`.
+        """
+
+        # The required action only applies to the `requires_action` status
+        values: Dict[Text, Any] = {
+            "status": status,
+            "required_action": model_dump(required_action),
+        }
+        for key, value in (
+            ("cancelled_at", cancelled_at),
+            ("completed_at", completed_at),
+            ("failed_at", failed_at),
+            ("started_at", started_at),
+            ("last_error", model_dump(last_error)),
+            ("usage", model_dump(usage)),
+        ):
+            if value is not None:
+                values[key] = value
+
+        store = self._client.store
+        with store.lock:
+            run = self._get(run_id, thread_id=thread_id)
+            if run is None or run.status not in list(from_statuses):
+                return None
+            run = updated_model(run, values)
+            store.replace(self.kind, run)
+            return run
+
+    def complete(
+        self,
+        run_id: Text,
+        *,
+        thread_id: Text,
+        completed_at: Optional[int] = None,
+        usage: Optional[Usage] = None,
+        messages: Sequence["Message"] = (),
+    ) -> Optional["Run"]:
+        """Move the in-progress run to `completed` and add its answer messages
+        to the thread, both under the store lock. The messages are added
+        first, the run is left `in_progress` if they fail.
+
+        Returns
+        -------
+        Optional[Run]
+            The completed run, or None if the run does not exist or is not
+            `in_progress`.
+        """
+
+        values: Dict[Text, Any] = {
+            "status": "completed",
+            "required_action": None,
+            "completed_at": completed_at or int(time.time()),
+        }
+        if usage is not None:
+            values["usage"] = model_dump(usage)
+
+        store = self._client.store
+        with store.lock:
+            run = self._get(run_id, thread_id=thread_id)
+            if run is None or run.status != "in_progress":
+                return None
+            if messages:
+                store.insert_messages(list(messages))
+            run = updated_model(run, values)
+            try:
+                store.replace(self.kind, run)
+            except Exception:
+                for message in messages:
+                    store.remove_message(message.thread_id, message.id)
+                raise
+            return run
+
+    def expire(self, *, expires_after: int = 600, batch_size: int = 500) -> int:
+        """Mark the unfinished runs past their `expires_at` as `expired`.
+
+        Runs without `expires_at` expire `expires_after` seconds after creation,
+        and get `expires_at` filled in.
+
+        Returns
+        -------
+        int
+            The number of expired runs.
+        """
+
+        now = int(time.time())
+        store = self._client.store
+        expired = 0
+        with store.lock:
+            runs: List[Run] = store.scan(self.kind)  # type: ignore[assignment]
+            for run in runs:
+                if run.status not in EXPIRABLE_RUN_STATUSES:
+                    continue
+                expires_at = run.expires_at or (run.created_at + expires_after)
+                if expires_at <= now:
+                    store.replace(
+                        self.kind,
+                        updated_model(
+                            run, {"status": "expired", "expires_at": expires_at}
+                        ),
+                    )
+                    expired += 1
+        return expired
+
+    def delete_finished(self, older_than: int, *, batch_size: int = 500) -> int:
+        """Delete the runs in a terminal status created more than `older_than`
+        seconds ago, to trim the run history.
+
+        Returns
+        -------
+        int
+            The number of deleted runs.
+        """
+
+        cutoff = int(time.time()) - older_than
+        store = self._client.store
+        with store.lock:
+            runs: List[Run] = store.scan(self.kind)  # type: ignore[assignment]
+            run_ids = [
+                run.id
+                for run in runs
+                if run.created_at < cutoff and run.status in TERMINAL_RUN_STATUSES
+            ]
+            store.remove(self.state_kind, run_ids)
+            return store.remove(self.kind, run_ids)
+
+    def delete(
+        self, run_id: Text, *, thread_id: Text, not_exist_ok: bool = False
+    ) -> Dict:
+        store = self._client.store
+        with store.lock:
+            deleted = (
+                self._get(run_id, thread_id=thread_id) is not None
+                and store.remove(self.kind, [run_id]) > 0
+            )
+            if deleted:
+                store.remove(self.state_kind, [run_id])
+        if not deleted and not not_exist_ok:
+            raise NotFound(f"Run {run_id} not found")
+        return {"id": run_id, "deleted": deleted, "object": "thread.run.deleted"}
+
+    def save_state(self, state: "RunState") -> "RunState":
+        """Save the state of the run, replacing its previous state."""
+
+        with self._client.store.lock:
+            self._client.store.replace(self.state_kind, state)
+        return state
+
+    def retrieve_state(self, run_id: Text, *, thread_id: Text) -> Optional["RunState"]:
+        """Return the state of the run, None if it has no saved state."""
+
+        state: Optional[RunState] = self._client.store.get(
+            self.state_kind, run_id
+        )  # type: ignore[assignment]
+        if state is None or state.thread_id != thread_id:
+            return None
+        return state
+
+    def list_scheduled_states(self) -> List["RunState"]:
+        """Return the states of the delayed runs, by their start time."""
+
+        with self._client.store.lock:
+            states: List[RunState] = self._client.store.scan(
+                self.state_kind
+            )  # type: ignore[assignment]
+            return sorted(
+                (s.model_copy() for s in states if s.scheduled_at is not None),
+                key=lambda s: s.scheduled_at or 0,
+            )
+
+    def delete_state(self, run_id: Text, *, thread_id: Text) -> bool:
+        """Delete the state of the run, returns False if it has none."""
+
+        store = self._client.store
+        with store.lock:
+            if self.retrieve_state(run_id, thread_id=thread_id) is None:
+                return False
+            return store.remove(self.state_kind, [run_id]) > 0
+
+    def _get(self, run_id: Text, *, thread_id: Text) -> Optional["Run"]:
+        run: Optional[Run] = self._client.store.get(self.kind, run_id)  # type: ignore
+        if run is None or run.thread_id != thread_id:
+            return None
+        return run
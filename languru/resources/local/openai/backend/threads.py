@@ -0,0 +1,223 @@
+import time
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+)
+
+from openai.types.beta.assistant import ToolResources
+from openai.types.beta.thread import Thread
+from openai.types.beta.thread_deleted import ThreadDeleted
+from openai.types.beta.threads.message import Message as OpenaiMessage
+from openai.types.beta.threads.run import Run
+
+from languru.exceptions import NotFound
+from languru.resources.local.openai.backend._pagination import keyset_paginate
+from languru.resources.local.openai.backend._utils import updated_model
+from languru.resources.local.openai.backend.messages import Messages as MessagesBackend
+from languru.resources.local.openai.backend.runs import Runs as RunsBackend
+from languru.types.openai_threads import RunState
+from languru.utils.common import model_dump
+
+if TYPE_CHECKING:
+    from languru.resources.local.openai.backend._client import MemoryOpenaiBackend
+
+
+class Threads:
+    kind = "threads"
+    messages: MessagesBackend
+    runs: RunsBackend
+
+    def __init__(self, client: "MemoryOpenaiBackend", **kwargs):
+        self._client = client
+
+        self.messages = MessagesBackend(client=self._client)
+        self.runs = RunsBackend(client=self._client)
+
+    def list(
+        self,
+        *,
+        after: Optional[Text] = None,
+        before: Optional[Text] = None,
+        limit: Optional[int] = None,
+        order: Optional[Literal["asc", "desc"]] = None,
+    ) -> List["Thread"]:
+        store = self._client.store
+        with store.lock:
+            entries = keyset_paginate(
+                store.entries(self.kind),
+                after=after,
+                before=before,
+                limit=limit,
+                order=order or "asc",
+            )
+            if not entries:
+                for cursor_id in (after, before):
+                    if cursor_id is not None and not store.has(self.kind, cursor_id):
+                        raise NotFound(f"Thread {cursor_id} not found")
+            return [store.get(self.kind, entry.id) for entry in entries]  # type: ignore
+
+    def create(
+        self,
+        thread: "Thread",
+        messages: Optional[Iterable[OpenaiMessage]] = None,
+    ) -> "Thread":
+        self.create_many([thread], messages)
+        return thread
+
+    def create_and_run(
+        self,
+        thread: "Thread",
+        run: "Run",
+        messages: Optional[Iterable[OpenaiMessage]] = None,
+    ) -> Tuple["Thread", List[OpenaiMessage], "Run"]:
+        """Create the thread, its messages and the queued run at once, nothing
+        is written if any of their IDs is taken.
+        """
+
+        messages = list(messages or [])
+        store = self._client.store
+        with store.lock:
+            store.check_new(self.kind, [thread])
+            store.check_new(self.runs.kind, [run])
+            # Messages are checked before any of them is written
+            store.insert_messages(messages)
+            store.insert(self.kind, [thread])
+            store.insert(self.runs.kind, [run])
+        return (thread, messages, run)
+
+    def create_many(
+        self,
+        threads: Sequence["Thread"],
+        messages: Optional[Iterable[OpenaiMessage]] = None,
+        *,
+        batch_size: int = 1000,
+    ) -> List["Thread"]:
+        """Import threads and their messages, `batch_size` is accepted for
+        parity with the SQL engine.
+        """
+
+        threads = list(threads)
+        store = self._client.store
+        with store.lock:
+            store.check_new(self.kind, threads)
+            # Messages are checked before any of them is written
+            store.insert_messages(list(messages or []))
+            store.insert(self.kind, threads)
+        return threads
+
+    def retrieve(self, thread_id: Text) -> "Thread":
+        with self._client.store.lock:
+            thread = self._client.store.get(self.kind, thread_id)
+        if thread is None:
+            raise NotFound(f"Thread {thread_id} not found")
+        return thread  # type: ignore[return-value]
+
+    def update(
+        self,
+        thread_id: Text,
+        *,
+        metadata: Optional[Dict] = None,
+        tool_resources: Optional[ToolResources] = None,
+    ) -> "Thread":
+        values: Dict = {}
+        if metadata is not None:
+            values["metadata"] = metadata
+        if tool_resources is not None:
+            values["tool_resources"] = model_dump(tool_resources)
+
+        store = self._client.store
+        with store.lock:
+            thread = store.get(self.kind, thread_id)
+            if thread is None:
+                raise NotFound(f"Thread {thread_id} not found")
+            thread = updated_model(thread, values)
+            store.replace(self.kind, thread)
+            return thread  # type: ignore[return-value]
+
+    def delete(self, thread_id: Text, *, not_exist_ok: bool = False) -> "ThreadDeleted":
+        with self._client.store.lock:
+            deleted = self._client.store.has(self.kind, thread_id)
+            if deleted:
+                self._delete_cascade([thread_id])
+        if not deleted and not not_exist_ok:
+            raise NotFound(f"Thread {thread_id} not found")
+        return ThreadDeleted.model_validate(
+            {"id": thread_id, "deleted": deleted, "object": "thread.deleted"}
+        )
+
+    def delete_idle(self, idle_seconds: int, *, batch_size: int = 500) -> int:
+        """Delete the threads without any new message or run for `idle_seconds`,
+        together with their messages and runs.
+
+        Returns
+        -------
+        int
+            The number of deleted threads.
+        """
+
+        cutoff = int(time.time()) - idle_seconds
+        store = self._client.store
+        with store.lock:
+            thread_ids = [
+                entry.id
+                for entry in store.entries(self.kind)
+                if entry.created_at < cutoff
+                and all(
+                    e.created_at < cutoff
+                    for e in store.message_entries(entry.id)
+                    + store.entries(self.runs.kind, thread_id=entry.id)
+                )
+            ]
+            self._delete_cascade(thread_ids)
+        return len(thread_ids)
+
+    def delete_orphans(self) -> int:
+        """Delete the messages and runs whose thread no longer exists.
+
+        Returns
+        -------
+        int
+            The number of deleted messages and runs.
+        """
+
+        store = self._client.store
+        with store.lock:
+            deleted = store.drop_messages(
+                thread_id
+                for thread_id in store.message_thread_ids()
+                if not store.has(self.kind, thread_id)
+            )
+            runs: List[Run] = store.scan(self.runs.kind)  # type: ignore[assignment]
+            deleted += store.remove(
+                self.runs.kind,
+                [run.id for run in runs if not store.has(self.kind, run.thread_id)],
+            )
+            states: List[RunState] = store.scan(
+                self.runs.state_kind
+            )  # type: ignore[assignment]
+            deleted += store.remove(
+                self.runs.state_kind,
+                [s.id for s in states if not store.has(self.kind, s.thread_id)],
+            )
+        return deleted
+
+    def _delete_cascade(self, thread_ids: List[Text]) -> None:
+        # The thread goes first, what an interruption leaves behind are
+        # orphans for `delete_orphans`
+        store = self._client.store
+        store.remove(self.kind, thread_ids)
+        run_ids = [
+            entry.id
+            for thread_id in thread_ids
+            for entry in store.entries(self.runs.kind, thread_id=thread_id)
+        ]
+        store.remove(self.runs.state_kind, run_ids)
+        store.remove(self.runs.kind, run_ids)
+        store.drop_messages(thread_ids)
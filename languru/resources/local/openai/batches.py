@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Literal, Optional, Sequence, Text, Union
+
+from openai.types.batch import Batch
+
+from languru.exceptions import NotFound
+from languru.resources.local.openai._utils import dump_json_atomic
+from languru.utils.openai_utils import rand_openai_id
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+TERMINAL_BATCH_STATUSES = ("failed", "completed", "expired", "cancelled")
+COMPLETION_WINDOWS = {"24h": 86400}
+
+
+class BatchClaim:
+    """The lock of a batch held by the process executing it.
+
+    The lock is an exclusive `flock` of `.<batch_id>.lock`, the OS releases it
+    when the process exits, so the batch of a crashed process can be claimed
+    again right away.
+    """
+
+    def __init__(self, path: Path, fd: int):
+        self.path = path
+        self._fd: Optional[int] = fd
+
+    def release(self, *, unlink: bool = False) -> None:
+        """Release the lock, `unlink` removes the lock file of a finished
+        batch.
+        """
+
+        if self._fd is None:
+            return
+        if unlink:
+            self.path.unlink(missing_ok=True)
+        os.close(self._fd)  # Releases the lock
+        self._fd = None
+
+
+class LocalBatches:
+    """The batches of the `/v1/batches` API stored in a directory, one
+    `<batch_id>.json` per batch, rewritten atomically on every update.
+
+    The updates of the server workers are serialized by a `flock` of the
+    directory, and a batch is executed by the worker holding its `claim`.
+    Without `fcntl`, e.g. on Windows, the locks only apply within a process.
+
+    Parameters
+    ----------
+    root : Union[Path, Text]
+        The directory of the batches, created on the first write.
+    """
+
+    def __init__(self, root: Union[Path, Text]):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def create(
+        self,
+        *,
+        input_file_id: Text,
+        endpoint: Text,
+        completion_window: Text = "24h",
+        metadata: Optional[Dict[Text, Text]] = None,
+    ) -> Batch:
+        self.root.mkdir(parents=True, exist_ok=True)
+        created_at = int(time.time())
+        batch = Batch.model_validate(
+            {
+                "id": rand_openai_id("batch"),
+                "object": "batch",
+                "endpoint": endpoint,
+                "input_file_id": input_file_id,
+                "completion_window": completion_window,
+                "status": "validating",
+                "created_at": created_at,
+                "expires_at": created_at + COMPLETION_WINDOWS[completion_window],
+                "metadata": metadata,
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+        )
+        self._dump(batch)
+        return batch
+
+    def retrieve(self, batch_id: Text) -> Batch:
+        try:
+            return Batch.model_validate_json(self._path(batch_id).read_bytes())
+        except FileNotFoundError:
+            raise NotFound(f"Batch {batch_id!r} not found.")
+
+    def update(self, batch_id: Text, **kwargs: Any) -> Batch:
+        with self._locked():
+            batch = self.retrieve(batch_id)
+            batch = Batch.model_validate(
+                {**batch.model_dump(mode="json"), **_jsonable(kwargs)}
+            )
+            self._dump(batch)
+        return batch
+
+    def transition(
+        self,
+        batch_id: Text,
+        *,
+        from_statuses: Sequence[Text],
+        status: Text,
+        **kwargs: Any,
+    ) -> Optional[Batch]:
+        """Compare-and-set the batch status, returns None if the batch is not
+        in any of `from_statuses` anymore.
+        """
+
+        with self._locked():
+            batch = self.retrieve(batch_id)
+            if batch.status not in from_statuses:
+                return None
+            batch = Batch.model_validate(
+                {
+                    **batch.model_dump(mode="json"),
+                    **_jsonable(kwargs),
+                    "status": status,
+                }
+            )
+            self._dump(batch)
+        return batch
+
+    def list(
+        self,
+        *,
+        after: Optional[Text] = None,
+        limit: int = 20,
+        order: Literal["asc", "desc"] = "desc",
+        statuses: Optional[Sequence[Text]] = None,
+    ) -> List[Batch]:
+        if not self.root.exists():
+            return []
+        batches = [
+            Batch.model_validate_json(p.read_bytes())
+            for p in self.root.glob("*.json")
+            if not p.name.startswith(".")
+        ]
+        if statuses is not None:
+            batches = [b for b in batches if b.status in statuses]
+        batches.sort(key=lambda b: (b.created_at, b.id), reverse=order == "desc")
+        if after is not None:
+            ids = [b.id for b in batches]
+            batches = batches[ids.index(after) + 1 :] if after in ids else []
+        return batches[:limit]
+
+    def claim(self, batch_id: Text) -> Optional[BatchClaim]:
+        """Lock the batch for the calling process, returns None if another
+        process or claim holds it.
+        """
+
+        path = self._path(batch_id).with_name(f".{batch_id}.lock")
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+        return BatchClaim(path, fd)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.root.joinpath(".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def _path(self, batch_id: Text) -> Path:
+        if not batch_id or "/" in batch_id or batch_id.startswith("."):
+            raise NotFound(f"Batch {batch_id!r} not found.")
+        return self.root.joinpath(f"{batch_id}.json")
+
+    def _dump(self, batch: Batch) -> None:
+        dump_json_atomic(self._path(batch.id), batch.model_dump(mode="json"))
+
+
+def _jsonable(kwargs: Dict[Text, Any]) -> Dict[Text, Any]:
+    return {
+        k: v.model_dump(mode="json") if hasattr(v, "model_dump") else v
+        for k, v in kwargs.items()
+    }
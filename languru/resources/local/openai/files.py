@@ -0,0 +1,139 @@
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO, List, Literal, Optional, Text, Union
+
+from openai.types.file_deleted import FileDeleted
+from openai.types.file_object import FileObject
+
+from languru.exceptions import NotFound
+from languru.resources.local.openai._utils import dump_json_atomic
+from languru.utils.openai_utils import rand_openai_id
+
+FilePurpose = Literal[
+    "assistants",
+    "assistants_output",
+    "batch",
+    "batch_output",
+    "fine-tune",
+    "fine-tune-results",
+    "vision",
+]
+
+
+class LocalFiles:
+    """The files of the `/v1/files` API stored in a directory.
+
+    The content of a file is kept in `<file_id>` and its `FileObject` in
+    `<file_id>.json` next to it.
+
+    Parameters
+    ----------
+    root : Union[Path, Text]
+        The directory of the files, created on the first write.
+    """
+
+    def __init__(self, root: Union[Path, Text]):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def path(self, file_id: Text) -> Path:
+        """Return the path of the content of the file."""
+
+        if not file_id or "/" in file_id or file_id.startswith("."):
+            raise NotFound(f"File {file_id!r} not found.")
+        return self.root.joinpath(file_id)
+
+    def create(
+        self,
+        file: Union[BinaryIO, bytes],
+        *,
+        filename: Text,
+        purpose: FilePurpose,
+        status: Literal["uploaded", "processed", "error"] = "uploaded",
+    ) -> FileObject:
+        """Store the content, read from the file object in chunks."""
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        file_id = rand_openai_id("file")
+        path = self.path(file_id)
+        with path.open("wb") as f:
+            if isinstance(file, bytes):
+                f.write(file)
+            else:
+                shutil.copyfileobj(file, f, length=1024 * 1024)
+        file_obj = FileObject.model_validate(
+            {
+                "id": file_id,
+                "bytes": path.stat().st_size,
+                "created_at": int(time.time()),
+                "filename": filename,
+                "object": "file",
+                "purpose": purpose,
+                "status": status,
+            }
+        )
+        self._dump(file_obj)
+        return file_obj
+
+    def retrieve(self, file_id: Text) -> FileObject:
+        meta_path = self.path(file_id).with_suffix(".json")
+        try:
+            return FileObject.model_validate_json(meta_path.read_bytes())
+        except FileNotFoundError:
+            raise NotFound(f"File {file_id!r} not found.")
+
+    def refresh(
+        self,
+        file_id: Text,
+        *,
+        status: Optional[Literal["uploaded", "processed", "error"]] = None,
+    ) -> FileObject:
+        """Update the size of the file after its content was appended."""
+
+        with self._lock:
+            file_obj = self.retrieve(file_id)
+            file_obj.bytes = self.path(file_id).stat().st_size
+            if status is not None:
+                file_obj.status = status
+            self._dump(file_obj)
+        return file_obj
+
+    def list(
+        self,
+        *,
+        purpose: Optional[Text] = None,
+        after: Optional[Text] = None,
+        limit: int = 10000,
+        order: Literal["asc", "desc"] = "desc",
+    ) -> List[FileObject]:
+        if not self.root.exists():
+            return []
+        files = [
+            FileObject.model_validate_json(p.read_bytes())
+            for p in self.root.glob("*.json")
+            if not p.name.startswith(".")
+        ]
+        if purpose is not None:
+            files = [f for f in files if f.purpose == purpose]
+        files.sort(key=lambda f: (f.created_at, f.id), reverse=order == "desc")
+        if after is not None:
+            ids = [f.id for f in files]
+            files = files[ids.index(after) + 1 :] if after in ids else []
+        return files[:limit]
+
+    def delete(self, file_id: Text) -> FileDeleted:
+        self.retrieve(file_id)
+        with self._lock:
+            self.path(file_id).with_suffix(".json").unlink(missing_ok=True)
+            self.path(file_id).unlink(missing_ok=True)
+        return FileDeleted.model_validate(
+            {"id": file_id, "object": "file", "deleted": True}
+        )
+
+    def _dump(self, file_obj: FileObject) -> None:
+        dump_json_atomic(
+            self.path(file_obj.id).with_suffix(".json"),
+            file_obj.model_dump(mode="json"),
+        )
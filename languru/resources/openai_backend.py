@@ -0,0 +1,72 @@
+from typing import TYPE_CHECKING, Text
+
+from yarl import URL
+
+if TYPE_CHECKING:
+    from languru.resources.sql.openai.backend.assistants import (
+        Assistants as AssistantsBackend,
+    )
+    from languru.resources.sql.openai.backend.threads import Threads as ThreadsBackend
+
+
+class BaseOpenaiBackend:
+    """The storage of the assistants, threads, messages and runs of the OpenAI
+    Assistants API.
+
+    The engines are `OpenaiBackend` on a SQL database, `AsyncOpenaiBackend` on
+    an asyncio SQL driver, `MemoryOpenaiBackend` in process memory and
+    `LogOpenaiBackend` on the append-only logs of a local directory. Their
+    `assistants` and `threads` resources have the same methods.
+    """
+
+    url: Text
+    assistants: "AssistantsBackend"
+    threads: "ThreadsBackend"
+
+    # Whether the storage is shared by processes, e.g. `uvicorn --workers`
+    multiprocess: bool = True
+
+    @classmethod
+    def from_url(cls, url: Text | URL, **kwargs) -> "BaseOpenaiBackend":
+        """Create the backend matching the scheme and driver of the URL.
+
+        Asyncio drivers, e.g. `sqlite+aiosqlite://` or `postgresql+asyncpg://`,
+        create an `AsyncOpenaiBackend` whose resource methods are awaitable.
+        The non-SQL engines are `memory://`, kept in process memory, and
+        `logstore:///path/to/dir`, append-only logs in a local directory.
+        """
+
+        url_str: Text = str(url)
+        if url_str.startswith("memory:"):
+            from languru.resources.local.openai.backend import MemoryOpenaiBackend
+
+            return MemoryOpenaiBackend(url, **kwargs)
+        if url_str.startswith("logstore:"):
+            from languru.resources.local.openai.backend import LogOpenaiBackend
+
+            return LogOpenaiBackend(url, **kwargs)
+
+        from languru.resources.sql.openai.backend import (
+            AsyncOpenaiBackend,
+            OpenaiBackend,
+        )
+        from languru.resources.sql.openai.backend._utils import is_async_sql_url
+
+        if is_async_sql_url(url_str):
+            return AsyncOpenaiBackend(url, **kwargs)
+        return OpenaiBackend(url, **kwargs)
+
+    def touch(self):
+        """Create the tables or the storage of the backend."""
+
+        raise NotImplementedError  # pragma: no cover
+
+    def compact(self, *, full: bool = False) -> None:
+        """Reclaim the space of the deleted objects."""
+
+        raise NotImplementedError  # pragma: no cover
+
+    def close(self) -> None:
+        """Release the connections or files of the backend."""
+
+        pass
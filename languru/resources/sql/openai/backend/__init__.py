@@ -1,3 +1,6 @@
-from languru.resources.sql.openai.backend._client import OpenaiBackend
+from languru.resources.sql.openai.backend._client import (
+    AsyncOpenaiBackend,
+    OpenaiBackend,
+)
 
-__all__ = ["OpenaiBackend"]
+__all__ = ["AsyncOpenaiBackend", "OpenaiBackend"]
@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, Text, Tuple, TypeVar
+
+from diskcache import Cache
+from pydantic import BaseModel
+from yarl import URL
+
+V = TypeVar("V", bound=BaseModel)
+
+
+class CacheInvalidation:
+    """The channel sharing invalidations between the caches of several
+    workers, e.g. the processes of `uvicorn --workers`.
+
+    Every key has a version that is bumped on invalidation, and cached values
+    are only served while the version they were read at is current.
+    """
+
+    @classmethod
+    def from_url(cls, url: Text | URL) -> "CacheInvalidation":
+        url_str: Text = str(URL(url))
+        if url_str.startswith("diskcache") or url_str.startswith("file"):
+            return DiskCacheInvalidation(url)
+        raise ValueError(f"Unsupported cache invalidation url: {url_str}")
+
+    def version(self, key: Text) -> int:
+        raise NotImplementedError  # pragma: no cover
+
+    def invalidate(self, key: Text) -> None:
+        raise NotImplementedError  # pragma: no cover
+
+
+class DiskCacheInvalidation(CacheInvalidation):
+    def __init__(self, url: Text | URL):
+        self.url = URL(url)
+        self.file_root = f"{self.url.host or ''}{self.url.path}"
+        self.cache = Cache(self.file_root, size_limit=10 * 1024 * 1024)
+
+    def version(self, key: Text) -> int:
+        return self.cache.get(key, default=0)  # type: ignore[return-value]
+
+    def invalidate(self, key: Text) -> None:
+        self.cache.incr(key, default=0)
+
+
+class TTLCache(Generic[V]):
+    """A thread-safe LRU cache of pydantic objects whose entries expire
+    after `ttl` seconds.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        The maximum number of entries, by default 1024.
+    ttl : float, optional
+        The seconds an entry is served for, by default 60.0.
+    namespace : Text, optional
+        The prefix of the keys in the invalidation channel, by default "".
+    invalidation : Optional[CacheInvalidation], optional
+        The channel shared with the caches of other workers, by default None.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        *,
+        namespace: Text = "",
+        invalidation: Optional[CacheInvalidation] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.namespace = namespace
+        self.invalidation = invalidation
+        self._data: "OrderedDict[Hashable, Tuple[float, int, V]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Text) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, version, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+
+        if self.invalidation is not None and version != self.invalidation.version(
+            self._channel_key(key)
+        ):
+            with self._lock:
+                self._data.pop(key, None)
+            return None
+
+        # Callers may reassign fields of the returned object
+        return value.model_copy()
+
+    def token(self, key: Text) -> Tuple[int, int]:
+        """Return the token to pass to `set` for a value loaded afterwards."""
+
+        version = 0
+        if self.invalidation is not None:
+            version = self.invalidation.version(self._channel_key(key))
+        return (self._generation, version)
+
+    def set(self, key: Text, value: V, token: Tuple[int, int]) -> None:
+        """Cache the value loaded after `token` was taken, unless an
+        invalidation happened meanwhile and the value may be stale.
+        """
+
+        generation, version = token
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Text) -> None:
+        """Invalidate the key here and in the caches of other workers, call it
+        after the change is committed.
+        """
+
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+        if self.invalidation is not None:
+            self.invalidation.invalidate(self._channel_key(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _channel_key(self, key: Text) -> Text:
+        return f"{self.namespace}:{key}"
@@ -1,20 +1,85 @@
 from contextlib import contextmanager
-from typing import Text, Type
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Type,
+    TypeVar,
+)
 
 import sqlalchemy as sa
+from openai.types.beta.assistant import Assistant
+from openai.types.beta.thread import Thread
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.util import greenlet_spawn
 from yarl import URL
 
+from languru.config import logger
+from languru.exceptions import NotFound
+from languru.resources.openai_backend import BaseOpenaiBackend
+from languru.resources.sql.openai.backend._cache import CacheInvalidation, TTLCache
+from languru.resources.sql.openai.backend._replicas import Replica, ReplicaRouter
+from languru.resources.sql.openai.backend._utils import (
+    DEFAULT_SQLITE_PRAGMAS,
+    is_sqlite_memory_url,
+    is_sqlite_url,
+    set_sqlite_pragmas,
+)
 from languru.resources.sql.openai.backend.assistants import (
     Assistants as AssistantsBackend,
 )
+from languru.resources.sql.openai.backend.assistants import (
+    AsyncAssistants as AsyncAssistantsBackend,
+)
+from languru.resources.sql.openai.backend.threads import (
+    AsyncThreads as AsyncThreadsBackend,
+)
 from languru.resources.sql.openai.backend.threads import Threads as ThreadsBackend
 from languru.types.sql._openai import Assistant as OrmAssistant
 from languru.types.sql._openai import Base as SQL_Base
 from languru.types.sql._openai import Thread as OrmThread
 
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+R = TypeVar("R")
+
+LEGACY_ID_INDEX_TABLES = ("assistants", "threads", "messages", "runs")
+
+
+def _delete_duplicates(conn: "sa.Connection", index: "sa.Index") -> None:
+    """Delete the rows duplicating the columns of the unique index, keeping
+    the first inserted one, the lowest `db_id`.
 
-class OpenaiBackend:
+    Older versions could insert an object twice, e.g. the threads and messages
+    of `create_thread_and_run`, which would fail the creation of the index.
+    """
+
+    table = index.table
+    if table is None or "db_id" not in table.c:
+        return
+    kept = (
+        sa.select(sa.func.min(table.c.db_id).label("db_id"))
+        .group_by(*index.columns)
+        .subquery()
+    )
+    result = conn.execute(
+        sa.delete(table).where(table.c.db_id.not_in(sa.select(kept.c.db_id)))
+    )
+    if result.rowcount:
+        logger.warning(
+            f"Deleted {result.rowcount} duplicate rows of '{table.name}' "
+            + f"before creating the unique index '{index.name}'"
+        )
+
+
+class OpenaiBackend(BaseOpenaiBackend):
     assistants: AssistantsBackend
     threads: ThreadsBackend
 
@@ -25,29 +90,118 @@ class OpenaiBackend:
         sql_base: Type[DeclarativeBase] = SQL_Base,
         orm_assistant: Type[OrmAssistant] = OrmAssistant,
         orm_thread: Type[OrmThread] = OrmThread,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_timeout: Optional[float] = None,
+        pool_recycle: int = 3600,
+        pool_pre_ping: bool = True,
+        sqlite_pragmas: Optional[Dict[Text, Any]] = None,
+        cache_ttl: Optional[float] = None,
+        cache_maxsize: int = 1024,
+        cache_invalidation_url: Optional[Text | URL] = None,
+        replica_urls: Optional[Sequence[Text | URL]] = None,
+        replica_max_lag: float = 5.0,
         **kwargs,
     ):
-        self.url: Text = str(url)
-        connect_kwargs = {}
-        if self.url.startswith("sqlite"):
-            connect_kwargs["check_same_thread"] = False
+        """Initialize the OpenAI backend on a SQL database.
 
-        self._engine = sa.create_engine(self.url, connect_args=connect_kwargs)
+        Parameters
+        ----------
+        url : Text | URL
+            The SQLAlchemy database URL.
+        pool_size : Optional[int], optional
+            The number of connections kept in the pool, by default None
+            which keeps the SQLAlchemy default. Size it to the API workers
+            plus the run executor workers.
+        max_overflow : Optional[int], optional
+            The connections allowed beyond `pool_size`, by default None.
+        pool_timeout : Optional[float], optional
+            The seconds to wait for a free connection, by default None.
+        pool_recycle : int, optional
+            The seconds after which connections are replaced, by default 3600.
+            Set -1 to disable.
+        pool_pre_ping : bool, optional
+            Test connections on checkout, by default True.
+        sqlite_pragmas : Optional[Dict[Text, Any]], optional
+            The PRAGMA statements applied on every SQLite connection, by
+            default None which applies `DEFAULT_SQLITE_PRAGMAS`. Pass an empty
+            dict to keep the SQLite defaults.
+        cache_ttl : Optional[float], optional
+            The seconds assistants and threads are served from the in-process
+            read-through cache, by default None which disables the cache.
+        cache_maxsize : int, optional
+            The maximum number of cached objects per resource, by default 1024.
+        cache_invalidation_url : Optional[Text | URL], optional
+            The channel sharing invalidations with the other workers, e.g.
+            `diskcache:///tmp/languru-cache`, by default None. Without it other
+            workers serve their cached objects until `cache_ttl` passes.
+        replica_urls : Optional[Sequence[Text | URL]], optional
+            The URLs of read replicas of the database, by default None. The
+            `list` and `retrieve` methods read from them, the other methods
+            and the read-through cache use the primary `url`.
+        replica_max_lag : float, optional
+            The replication lag in seconds tolerated on reads, by default 5.0.
+            Threads and assistants written through this backend in the last
+            `replica_max_lag` seconds are read from the primary, and so is
+            everything while the replicas lag more. Objects missing on a
+            replica are looked up on the primary.
+        """
+
+        self.url: Text = str(url)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+        self.sqlite_pragmas: Dict[Text, Any] = (
+            dict(DEFAULT_SQLITE_PRAGMAS) if sqlite_pragmas is None else sqlite_pragmas
+        )
+        self._engine = self._create_engine(self.url)
+        self._listen_sqlite_pragmas(self._engine, self.url)
         self._session_factory = sessionmaker(bind=self._engine)
+        self.replica_router: Optional[ReplicaRouter] = None
+        if replica_urls:
+            # The engine options and the pragmas follow the URL of each replica,
+            # e.g. a SQLite file replica of a PostgreSQL primary
+            replica_engines = []
+            for replica_url in map(str, replica_urls):
+                engine = self._create_engine(replica_url)
+                self._listen_sqlite_pragmas(engine, replica_url)
+                replica_engines.append(engine)
+            self.replica_router = ReplicaRouter(
+                [Replica(engine) for engine in replica_engines],
+                max_lag=replica_max_lag,
+            )
         self._sql_base = sql_base
+        self._assistants_cache, self._threads_cache = self._create_caches(
+            cache_ttl, cache_maxsize, cache_invalidation_url
+        )
 
         self.assistants = AssistantsBackend(
-            client=self, orm_model=orm_assistant, **kwargs
+            client=self,
+            orm_model=orm_assistant,
+            cache=self._assistants_cache,
+            **kwargs,
+        )
+        self.threads = ThreadsBackend(
+            client=self, orm_model=orm_thread, cache=self._threads_cache, **kwargs
         )
-        self.threads = ThreadsBackend(client=self, orm_model=orm_thread, **kwargs)
+
+    @property
+    def connect_args(self):
+        return self._connect_args(self.url)
+
+    @property
+    def engine_kwargs(self) -> Dict[Text, Any]:
+        return self._engine_kwargs(self.url)
 
     @property
     def sql_engine(self) -> sa.Engine:
         return self._engine
 
     @contextmanager
-    def sql_session(self):
-        session = self._session_factory()
+    def sql_session(self, session_factory: Optional[sessionmaker] = None):
+        session = (session_factory or self._session_factory)()
         try:
             yield session
             session.commit()
@@ -57,5 +211,231 @@ class OpenaiBackend:
         finally:
             session.close()
 
+    def sql_read(
+        self,
+        func: Callable[["Session"], R],
+        *,
+        key: Optional[Text] = None,
+        primary: bool = False,
+    ) -> R:
+        """Run the read-only query function in a session on a replica.
+
+        The primary is used instead when there are no replicas, with
+        `primary=True`, when `key` was written recently or when the replicas
+        lag. The function runs again on the primary if it raises `NotFound`
+        or returns None on the replica, the object may not be replicated yet.
+        """
+
+        router = self.replica_router
+        replica = None if router is None or primary else router.choose(key)
+        if replica is not None:
+            try:
+                with self.sql_session(replica.session_factory) as session:
+                    result = func(session)
+                if result is not None:
+                    return result
+            except NotFound:
+                pass
+            except sa.exc.DBAPIError as e:
+                logger.warning(f"Read on replica {replica.engine.url!r} failed: {e}")
+                replica.healthy = False
+        with self.sql_session() as session:
+            return func(session)
+
+    def mark_written(self, *keys: Text) -> None:
+        """Read the keys, e.g. thread IDs, from the primary until the replicas
+        have caught up with the writes.
+        """
+
+        if self.replica_router is not None:
+            self.replica_router.mark_written(*keys)
+
     def touch(self):
         self._sql_base.metadata.create_all(self.sql_engine)
+        with self.sql_engine.begin() as conn:
+            inspector = sa.inspect(conn)
+            # Tables created by older versions miss the composite and unique
+            # indexes
+            for table in self._sql_base.metadata.sorted_tables:
+                index_names = {i["name"] for i in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name in index_names:
+                        continue
+                    if index.unique:
+                        _delete_duplicates(conn, index)
+                    index.create(conn)
+            # The unique `ux_<table>_id` replaces the `ix_<table>_id` of the column
+            for table_name in LEGACY_ID_INDEX_TABLES:
+                if not inspector.has_table(table_name):
+                    continue
+                index_name = f"ix_{table_name}_id"
+                if any(
+                    i["name"] == index_name for i in inspector.get_indexes(table_name)
+                ):
+                    logger.info(f"Dropping the legacy index '{index_name}'")
+                    legacy_table = sa.Table(
+                        table_name, sa.MetaData(), sa.Column("id", sa.String)
+                    )
+                    sa.Index(index_name, legacy_table.c.id).drop(conn)
+
+    def compact(self, *, full: bool = False) -> None:
+        """Reclaim the free pages of a SQLite database.
+
+        The WAL file is checkpointed and truncated, and the query planner
+        statistics refreshed. With `auto_vacuum=INCREMENTAL` the free pages are
+        released online; `full=True` runs `VACUUM`, which rewrites the whole
+        file and blocks writers meanwhile. Other databases are left to their
+        own vacuum processes.
+        """
+
+        if not is_sqlite_url(self.url):
+            return
+        with self.sql_engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            if full:
+                conn.exec_driver_sql("VACUUM")
+            elif conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2:
+                # Each step of `incremental_vacuum` frees one page, `sqlite3`
+                # only steps scripts to completion
+                dbapi_connection = conn.connection.dbapi_connection
+                if hasattr(dbapi_connection, "executescript"):
+                    dbapi_connection.executescript("PRAGMA incremental_vacuum;")
+                else:
+                    free_pages = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+                    for _ in range(free_pages or 0):
+                        conn.exec_driver_sql("PRAGMA incremental_vacuum(1)")
+            conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            conn.exec_driver_sql("PRAGMA optimize")
+
+    def _connect_args(self, url: Text) -> Dict[Text, Any]:
+        connect_kwargs = {}
+        if is_sqlite_url(url):
+            connect_kwargs["check_same_thread"] = False
+        return connect_kwargs
+
+    def _engine_kwargs(self, url: Text) -> Dict[Text, Any]:
+        engine_kwargs: Dict[Text, Any] = {
+            "connect_args": self._connect_args(url),
+            "pool_pre_ping": self.pool_pre_ping,
+            "pool_recycle": self.pool_recycle,
+        }
+        # In-memory SQLite uses a single connection pool without overflow
+        if not is_sqlite_memory_url(url):
+            for key in ("pool_size", "max_overflow", "pool_timeout"):
+                value = getattr(self, key)
+                if value is not None:
+                    engine_kwargs[key] = value
+        return engine_kwargs
+
+    def _create_engine(self, url: Text) -> sa.Engine:
+        return sa.create_engine(url, **self._engine_kwargs(url))
+
+    def _create_caches(
+        self,
+        ttl: Optional[float],
+        maxsize: int,
+        invalidation_url: Optional[Text | URL] = None,
+    ) -> Tuple[Optional[TTLCache[Assistant]], Optional[TTLCache[Thread]]]:
+        if not ttl:
+            return (None, None)
+        invalidation = (
+            CacheInvalidation.from_url(invalidation_url) if invalidation_url else None
+        )
+        return (
+            TTLCache(maxsize, ttl, namespace="assistants", invalidation=invalidation),
+            TTLCache(maxsize, ttl, namespace="threads", invalidation=invalidation),
+        )
+
+    def _listen_sqlite_pragmas(self, engine: sa.Engine, url: Text) -> None:
+        if not is_sqlite_url(url) or not self.sqlite_pragmas:
+            return
+        pragmas = dict(self.sqlite_pragmas)
+        if is_sqlite_memory_url(url):
+            pragmas.pop("journal_mode", None)  # WAL needs a database file
+
+        @sa.event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            set_sqlite_pragmas(dbapi_connection, pragmas)
+
+
+class AsyncOpenaiBackend(OpenaiBackend):
+    """The OpenAI backend on an asyncio SQL driver.
+
+    The resources share the query code of `OpenaiBackend`, but their methods
+    are coroutines, so database round trips do not occupy threads.
+    """
+
+    assistants: AsyncAssistantsBackend  # type: ignore[assignment]
+    threads: AsyncThreadsBackend  # type: ignore[assignment]
+
+    def __init__(
+        self,
+        url: Text | URL,
+        *,
+        sql_base: Type[DeclarativeBase] = SQL_Base,
+        orm_assistant: Type[OrmAssistant] = OrmAssistant,
+        orm_thread: Type[OrmThread] = OrmThread,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_timeout: Optional[float] = None,
+        pool_recycle: int = 3600,
+        pool_pre_ping: bool = True,
+        sqlite_pragmas: Optional[Dict[Text, Any]] = None,
+        cache_ttl: Optional[float] = None,
+        cache_maxsize: int = 1024,
+        cache_invalidation_url: Optional[Text | URL] = None,
+        replica_urls: Optional[Sequence[Text | URL]] = None,
+        replica_max_lag: float = 5.0,
+        **kwargs,
+    ):
+        super().__init__(
+            url,
+            sql_base=sql_base,
+            orm_assistant=orm_assistant,
+            orm_thread=orm_thread,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            sqlite_pragmas=sqlite_pragmas,
+            cache_ttl=cache_ttl,
+            cache_maxsize=cache_maxsize,
+            cache_invalidation_url=cache_invalidation_url,
+            replica_urls=replica_urls,
+            replica_max_lag=replica_max_lag,
+            **kwargs,
+        )
+
+        self.assistants = AsyncAssistantsBackend(
+            client=self,
+            orm_model=orm_assistant,
+            cache=self._assistants_cache,
+            **kwargs,
+        )
+        self.threads = AsyncThreadsBackend(
+            client=self, orm_model=orm_thread, cache=self._threads_cache, **kwargs
+        )
+
+    @property
+    def async_sql_engine(self) -> AsyncEngine:
+        return self._async_engine
+
+    async def touch(self):  # type: ignore[override]
+        await greenlet_spawn(super().touch)
+
+    async def compact(self, *, full: bool = False) -> None:  # type: ignore[override]
+        await greenlet_spawn(super().compact, full=full)
+
+    async def dispose(self):
+        for async_engine in self._async_engines:
+            await async_engine.dispose()
+
+    def _create_engine(self, url: Text) -> sa.Engine:
+        async_engine = create_async_engine(url, **self._engine_kwargs(url))
+        if not hasattr(self, "_async_engine"):
+            self._async_engine = async_engine
+            self._async_engines = []
+        self._async_engines.append(async_engine)
+        # Sessions on the sync facade only run inside `greenlet_spawn`
+        return async_engine.sync_engine
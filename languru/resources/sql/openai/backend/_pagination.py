@@ -0,0 +1,105 @@
+from typing import TYPE_CHECKING, Literal, Optional, Text, Type, TypeVar
+
+import sqlalchemy as sa
+from sqlalchemy.orm import aliased
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Query, Session
+
+    from languru.types.sql._openai import Base
+
+OrmModelType = TypeVar("OrmModelType", bound="Base")
+
+
+def keyset_paginate(
+    query: "Query[OrmModelType]",
+    orm_model: Type[OrmModelType],
+    *,
+    after: Optional[Text] = None,
+    before: Optional[Text] = None,
+    limit: Optional[int] = None,
+    order: Literal["asc", "desc"] = "desc",
+) -> "Query[OrmModelType]":
+    """Apply keyset pagination on `(created_at, db_id)` to the query.
+
+    The cursor rows are resolved by correlated scalar subqueries, so the page
+    is fetched in a single statement and rows sharing the same `created_at`
+    second are neither skipped nor repeated across pages.
+
+    Parameters
+    ----------
+    query : Query
+        The query to paginate.
+    orm_model : Type[Base]
+        The ORM model with `id`, `created_at` and `db_id` columns.
+    after : Optional[Text], optional
+        The public ID of the cursor to list objects after, by default None.
+    before : Optional[Text], optional
+        The public ID of the cursor to list objects before, by default None.
+    limit : Optional[int], optional
+        The maximum number of objects to return, by default None.
+    order : Literal["asc", "desc"], optional
+        The sort order of `created_at`, by default "desc".
+
+    Returns
+    -------
+    Query
+        The paginated query.
+    """
+
+    created_at_col = orm_model.created_at
+    db_id_col = orm_model.db_id
+
+    if order == "asc":
+        query = query.order_by(created_at_col.asc(), db_id_col.asc())
+    else:
+        query = query.order_by(created_at_col.desc(), db_id_col.desc())
+
+    for cursor_id, is_after in ((after, True), (before, False)):
+        if cursor_id is None:
+            continue
+        cursor_table = aliased(orm_model)
+        cursor_created_at = (
+            sa.select(cursor_table.created_at)
+            .where(cursor_table.id == cursor_id)
+            .scalar_subquery()
+        )
+        cursor_db_id = (
+            sa.select(cursor_table.db_id)
+            .where(cursor_table.id == cursor_id)
+            .scalar_subquery()
+        )
+        # `after` walks forward in the sort order, `before` walks backward
+        if is_after == (order == "asc"):
+            query = query.filter(
+                sa.or_(
+                    created_at_col > cursor_created_at,
+                    sa.and_(
+                        created_at_col == cursor_created_at, db_id_col > cursor_db_id
+                    ),
+                )
+            )
+        else:
+            query = query.filter(
+                sa.or_(
+                    created_at_col < cursor_created_at,
+                    sa.and_(
+                        created_at_col == cursor_created_at, db_id_col < cursor_db_id
+                    ),
+                )
+            )
+
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def cursor_exists(
+    session: "Session", orm_model: Type[OrmModelType], cursor_id: Text
+) -> bool:
+    """Check whether the pagination cursor exists."""
+
+    return (
+        session.query(orm_model.db_id).filter(orm_model.id == cursor_id).first()
+        is not None
+    )
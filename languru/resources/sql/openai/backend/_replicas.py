@@ -0,0 +1,115 @@
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Text
+
+import sqlalchemy as sa
+from sqlalchemy.orm import sessionmaker
+
+from languru.config import logger
+
+# Postgres reports the age of the last replayed transaction, which also grows
+# while the primary is idle, so a replica that replayed everything it received
+# has no lag
+POSTGRES_REPLICA_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(
+        EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+    )
+END
+"""
+
+
+def measure_replica_lag(engine: sa.Engine) -> float:
+    """Return the replication lag of the replica in seconds.
+
+    The lag is measured on PostgreSQL, other databases are assumed in sync.
+    """
+
+    if engine.dialect.name != "postgresql":
+        return 0.0
+    with engine.connect() as conn:
+        return float(conn.exec_driver_sql(POSTGRES_REPLICA_LAG_SQL).scalar() or 0.0)
+
+
+class Replica:
+    def __init__(self, engine: sa.Engine):
+        self.engine = engine
+        self.session_factory = sessionmaker(bind=engine)
+        self.lag: float = 0.0
+        self.healthy = True
+        self.checked_at = float("-inf")
+
+
+class ReplicaRouter:
+    """Route read-only sessions to replicas with read-your-writes.
+
+    The keys, e.g. thread IDs, written through this process during the last
+    `max_lag` seconds are read from the primary, and so are all keys while
+    every replica lags more than `max_lag` or fails its lag check.
+
+    Parameters
+    ----------
+    replicas : Sequence[Replica]
+        The replicas of the primary database.
+    max_lag : float, optional
+        The replication lag in seconds tolerated on reads, by default 5.0.
+    lag_check_interval : float, optional
+        The seconds between lag checks of a replica, by default 10.0.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[Replica],
+        *,
+        max_lag: float = 5.0,
+        lag_check_interval: float = 10.0,
+    ):
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self._written: Dict[Text, float] = {}
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+
+    def mark_written(self, *keys: Text) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._written[key] = now
+            # Drop the marks older than the lag window now and then
+            if len(self._written) > 10_000:
+                cutoff = now - self.max_lag
+                self._written = {k: t for k, t in self._written.items() if t > cutoff}
+
+    def recently_written(self, key: Text) -> bool:
+        written_at = self._written.get(key)
+        return written_at is not None and time.monotonic() - written_at < self.max_lag
+
+    def choose(self, key: Optional[Text] = None) -> Optional[Replica]:
+        """Return the replica to read the key from, or None for the primary."""
+
+        if key is not None and self.recently_written(key):
+            return None
+        candidates: List[Replica] = []
+        for replica in self.replicas:
+            self._check_lag(replica)
+            if replica.healthy and replica.lag <= self.max_lag:
+                candidates.append(replica)
+        if not candidates:
+            return None
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    def _check_lag(self, replica: Replica) -> None:
+        now = time.monotonic()
+        if now - replica.checked_at < self.lag_check_interval:
+            return
+        replica.checked_at = now
+        try:
+            replica.lag = measure_replica_lag(replica.engine)
+            replica.healthy = True
+        except Exception as e:
+            logger.warning(f"Replica {replica.engine.url!r} is unavailable: {e}")
+            replica.healthy = False
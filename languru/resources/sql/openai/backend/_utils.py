@@ -0,0 +1,88 @@
+import functools
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Concatenate,
+    Dict,
+    Final,
+    ParamSpec,
+    Text,
+    TypeVar,
+)
+
+from sqlalchemy.util import greenlet_spawn
+
+S = TypeVar("S")
+P = ParamSpec("P")
+R = TypeVar("R")
+
+ASYNC_SQL_DRIVERS = ("aiosqlite", "asyncpg", "aiomysql", "asyncmy", "psycopg_async")
+
+# WAL lets the run worker write while API handlers read, `synchronous=NORMAL`
+# is durable in WAL mode except on power loss, and `busy_timeout` makes
+# concurrent writers wait for the lock instead of failing immediately.
+# `auto_vacuum` only applies to databases created after it is set.
+DEFAULT_SQLITE_PRAGMAS: Final[Dict[Text, Any]] = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 268435456,
+}
+
+
+def is_async_sql_url(url: Text) -> bool:
+    """Check whether the SQLAlchemy URL uses an asyncio driver,
+    e.g. `sqlite+aiosqlite:///data/openai.db`.
+    """
+
+    scheme = url.split(":", 1)[0]
+    if "+" not in scheme:
+        return False
+    return scheme.split("+", 1)[1].lower() in ASYNC_SQL_DRIVERS
+
+
+def is_sqlite_url(url: Text) -> bool:
+    """Check whether the SQLAlchemy URL is a SQLite database."""
+
+    return url.split(":", 1)[0].split("+", 1)[0].lower() == "sqlite"
+
+
+def is_sqlite_memory_url(url: Text) -> bool:
+    """Check whether the SQLAlchemy URL is an in-memory SQLite database,
+    e.g. `sqlite://` or `sqlite:///:memory:`.
+    """
+
+    if not is_sqlite_url(url):
+        return False
+    database = url.split("://", 1)[-1].lstrip("/").split("?", 1)[0]
+    return database in ("", ":memory:") or "mode=memory" in url
+
+
+def set_sqlite_pragmas(dbapi_connection: Any, pragmas: Dict[Text, Any]) -> None:
+    """Apply the PRAGMA statements on a new SQLite DBAPI connection."""
+
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def awaitable(
+    func: Callable[Concatenate[S, P], R]
+) -> Callable[Concatenate[S, P], Awaitable[R]]:
+    """Turn a sync backend method into a coroutine method.
+
+    The method body runs in a greenlet, so the sessions it opens on the
+    `sync_engine` of an `AsyncEngine` perform their I/O through the asyncio
+    driver instead of blocking a thread.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(self: S, *args: P.args, **kwargs: P.kwargs) -> R:
+        return await greenlet_spawn(func, self, *args, **kwargs)
+
+    return wrapper
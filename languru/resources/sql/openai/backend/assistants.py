@@ -9,10 +9,21 @@ from openai.types.beta.assistant_response_format_option import (
 from openai.types.beta.assistant_tool import AssistantTool
 
 from languru.exceptions import NotFound
+from languru.resources.sql.openai.backend._cache import TTLCache
+from languru.resources.sql.openai.backend._pagination import (
+    cursor_exists,
+    keyset_paginate,
+)
+from languru.resources.sql.openai.backend._utils import awaitable
 from languru.types.sql._openai import Assistant as OrmAssistant
 
 if TYPE_CHECKING:
-    from languru.resources.sql.openai.backend._client import OpenaiBackend
+    from sqlalchemy.orm import Session
+
+    from languru.resources.sql.openai.backend._client import (
+        AsyncOpenaiBackend,
+        OpenaiBackend,
+    )
 
 
 class Assistants:
@@ -21,10 +32,12 @@ class Assistants:
         client: "OpenaiBackend",
         *,
         orm_model: Type["OrmAssistant"] = OrmAssistant,
+        cache: Optional[TTLCache[Assistant]] = None,
         **kwargs,
     ):
         self._client = client
         self.orm_model = orm_model
+        self.cache = cache
 
     def list(
         self,
@@ -34,67 +47,36 @@ class Assistants:
         limit: Optional[int] = None,
         order: Optional[Literal["asc", "desc"]] = None,
     ) -> List["Assistant"]:
-        with self._client.sql_session() as session:
-            query = session.query(self.orm_model)
-
-            # Apply sorting
-            if order == "desc":
-                query = query.order_by(self.orm_model.created_at.desc())
-            else:
-                query = query.order_by(self.orm_model.created_at.asc())
-
-            # Apply pagination using after
-            if after is not None:
-                try:
-                    after_instance = (
-                        session.query(self.orm_model)
-                        .filter(self.orm_model.id == after)
-                        .one()
-                    )
-                    if order == "asc":
-                        query = query.filter(
-                            self.orm_model.created_at > after_instance.created_at
-                        )
-                    else:
-                        query = query.filter(
-                            self.orm_model.created_at < after_instance.created_at
-                        )
-                except sqlalchemy.exc.NoResultFound:
-                    raise NotFound(f"Assistant with ID {after} not found.")
-
-            # Apply pagination using before
-            if before is not None:
-                try:
-                    before_instance = (
-                        session.query(self.orm_model)
-                        .filter(self.orm_model.id == before)
-                        .one()
-                    )
-                    if order == "asc":
-                        query = query.filter(
-                            self.orm_model.created_at < before_instance.created_at
-                        )
-                    else:
-                        query = query.filter(
-                            self.orm_model.created_at > before_instance.created_at
-                        )
-                except sqlalchemy.exc.NoResultFound:
-                    raise NotFound(f"Assistant with ID {before} not found.")
-
-            # Apply limit
-            if limit is not None:
-                query = query.limit(limit)
-
-            # Execute query and return results
+        def _list(session: "Session") -> List["Assistant"]:
+            query = keyset_paginate(
+                session.query(self.orm_model),
+                self.orm_model,
+                after=after,
+                before=before,
+                limit=limit,
+                order=order or "asc",
+            )
             assistants = query.all()
+
+            # Only look the cursor up when the page is empty
+            if not assistants:
+                for cursor_id in (after, before):
+                    if cursor_id is not None and not cursor_exists(
+                        session, self.orm_model, cursor_id
+                    ):
+                        raise NotFound(f"Assistant with ID {cursor_id} not found.")
+
             return [asst.to_openai() for asst in assistants]
 
+        return self._client.sql_read(_list, key="assistants")
+
     def create(self, assistant: "Assistant") -> "Assistant":
         with self._client.sql_session() as session:
             orm_assistant = self.orm_model.from_openai(assistant)
             session.add(orm_assistant)
             session.commit()
             session.refresh(orm_assistant)
+            self._client.mark_written(assistant.id, "assistants")
             return orm_assistant.to_openai()
 
     def update(
@@ -131,6 +113,9 @@ class Assistants:
                     top_p=top_p,
                 )
                 session.commit()
+                self._client.mark_written(assistant_id, "assistants")
+                if self.cache is not None:
+                    self.cache.delete(assistant_id)
                 session.refresh(assistant)
                 return assistant.to_openai()
         except sqlalchemy.exc.NoResultFound:
@@ -157,17 +142,44 @@ class Assistants:
 
             session.delete(assistant)
             session.commit()
+            self._client.mark_written(assistant_id, "assistants")
+            if self.cache is not None:
+                self.cache.delete(assistant_id)
             return AssistantDeleted.model_validate(
                 {"id": assistant_id, "deleted": True, "object": "assistant.deleted"}
             )
 
     def retrieve(self, assistant_id: Text) -> "Assistant":
-        try:
-            with self._client.sql_session() as session:
-                query = session.query(self.orm_model).filter(
-                    self.orm_model.id == assistant_id
-                )
-                assistant = query.one()
-                return assistant.to_openai()
-        except sqlalchemy.exc.NoResultFound:
-            raise NotFound(f"Assistant with ID {assistant_id} not found.")
+        if self.cache is not None:
+            assistant_cached = self.cache.get(assistant_id)
+            if assistant_cached is not None:
+                return assistant_cached
+            cache_token = self.cache.token(assistant_id)
+
+        def _retrieve(session: "Session") -> "Assistant":
+            query = session.query(self.orm_model).filter(
+                self.orm_model.id == assistant_id
+            )
+            try:
+                return query.one().to_openai()
+            except sqlalchemy.exc.NoResultFound:
+                raise NotFound(f"Assistant with ID {assistant_id} not found.")
+
+        # The cache is only filled from the primary
+        assistant = self._client.sql_read(
+            _retrieve, key=assistant_id, primary=self.cache is not None
+        )
+
+        if self.cache is not None:
+            self.cache.set(assistant_id, assistant.model_copy(), cache_token)
+        return assistant
+
+
+class AsyncAssistants(Assistants):
+    _client: "AsyncOpenaiBackend"
+
+    list = awaitable(Assistants.list)
+    create = awaitable(Assistants.create)
+    update = awaitable(Assistants.update)
+    delete = awaitable(Assistants.delete)
+    retrieve = awaitable(Assistants.retrieve)
@@ -1,14 +1,32 @@
-from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Text, Type
-
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Text,
+    Type,
+)
+
+import sqlalchemy as sa
 import sqlalchemy.exc
 from openai.types.beta.threads.message import Message
 from openai.types.beta.threads.message_deleted import MessageDeleted
 
 from languru.exceptions import NotFound
+from languru.resources.sql.openai.backend._pagination import keyset_paginate
+from languru.resources.sql.openai.backend._utils import awaitable
 from languru.types.sql._openai import Message as OrmMessage
 
 if TYPE_CHECKING:
-    from languru.resources.sql.openai.backend._client import OpenaiBackend
+    from sqlalchemy.orm import Session
+
+    from languru.resources.sql.openai.backend._client import (
+        AsyncOpenaiBackend,
+        OpenaiBackend,
+    )
 
 
 class Messages:
@@ -28,8 +46,52 @@ class Messages:
             session.add(orm_message)
             session.commit()
             session.refresh(orm_message)
+            self._client.mark_written(message.thread_id)
             return orm_message.to_openai()
 
+    def create_many(
+        self, messages: Iterable["Message"], *, batch_size: int = 1000
+    ) -> List["Message"]:
+        """Insert the messages in bulk.
+
+        The rows are inserted with executemany batches and are not refreshed,
+        so the given messages are returned as they are.
+
+        Parameters
+        ----------
+        messages : Iterable[Message]
+            The messages to insert, in the order they were created.
+        batch_size : int, optional
+            The number of rows per INSERT statement, by default 1000.
+
+        Returns
+        -------
+        List[Message]
+            The inserted messages.
+        """
+
+        messages = list(messages)
+        with self._client.sql_session() as session:
+            self._insert_many(session, messages, batch_size=batch_size)
+        self._client.mark_written(*{message.thread_id for message in messages})
+        return messages
+
+    def _insert_many(
+        self,
+        session: "Session",
+        messages: Sequence["Message"],
+        *,
+        batch_size: int = 1000,
+    ) -> None:
+        for i in range(0, len(messages), batch_size):
+            session.execute(
+                sa.insert(self.orm_model),
+                [
+                    self.orm_model.values_from_openai(message)
+                    for message in messages[i : i + batch_size]
+                ],
+            )
+
     def list(
         self,
         thread_id: str,
@@ -39,67 +101,42 @@ class Messages:
         limit: Optional[int] = None,
         order: Optional[Literal["asc", "desc"]] = None,
         run_id: Optional[Text] = None,
+        exclude: Optional[Iterable[Text]] = None,
     ) -> List["Message"]:
-        with self._client.sql_session() as session:
-            query = session.query(OrmMessage).filter(OrmMessage.thread_id == thread_id)
+        """List the messages of the thread.
+
+        `exclude` names JSON fields, e.g. `metadata`, which are not loaded
+        from the database and are returned empty.
+        """
 
-            # Apply sorting
-            if order == "asc":
-                query = query.order_by(OrmMessage.created_at.asc())
-            else:
-                query = query.order_by(OrmMessage.created_at.desc())
+        def _list(session: "Session") -> List["Message"]:
+            query = (
+                session.query(self.orm_model)
+                .options(*self.orm_model.defer_options(exclude))
+                .filter(self.orm_model.thread_id == thread_id)
+            )
 
             # Apply filters
             if run_id is not None:
-                query = query.filter(OrmMessage.run_id == run_id)
-
-            # Apply pagination
-            if after is not None:
-                try:
-                    after_message = (
-                        session.query(OrmMessage)
-                        .filter(OrmMessage.id == after)
-                        .one_or_none()
-                    )
-                    if after_message:
-                        if order == "asc":
-                            query = query.filter(
-                                OrmMessage.created_at > after_message.created_at
-                            )
-                        else:
-                            query = query.filter(
-                                OrmMessage.created_at < after_message.created_at
-                            )
-                except sqlalchemy.exc.NoResultFound:
-                    raise NotFound(f"Message with ID {after} not found.")
-
-            if before is not None:
-                try:
-                    before_message = (
-                        session.query(OrmMessage)
-                        .filter(OrmMessage.id == before)
-                        .one_or_none()
-                    )
-                    if before_message:
-                        if order == "asc":
-                            query = query.filter(
-                                OrmMessage.created_at < before_message.created_at
-                            )
-                        else:
-                            query = query.filter(
-                                OrmMessage.created_at > before_message.created_at
-                            )
-                except sqlalchemy.exc.NoResultFound:
-                    raise NotFound(f"Message with ID {before} not found.")
-
-            # Apply limit
-            query = query.limit(limit)
+                query = query.filter(self.orm_model.run_id == run_id)
+
+            # Apply sorting and pagination
+            query = keyset_paginate(
+                query,
+                self.orm_model,
+                after=after,
+                before=before,
+                limit=limit,
+                order=order or "desc",
+            )
 
             # Execute query and return results
-            return [m.to_openai() for m in query.all()]
+            return [m.to_openai(exclude=exclude) for m in query.all()]
+
+        return self._client.sql_read(_list, key=thread_id)
 
     def retrieve(self, message_id: Text, *, thread_id: Text) -> "Message":
-        with self._client.sql_session() as session:
+        def _retrieve(session: "Session") -> "Message":
             message = (
                 session.query(OrmMessage)
                 .filter(OrmMessage.id == message_id, OrmMessage.thread_id == thread_id)
@@ -109,6 +146,8 @@ class Messages:
                 raise NotFound(f"Message {message_id} not found")
             return message.to_openai()
 
+        return self._client.sql_read(_retrieve, key=thread_id)
+
     def update(
         self, message_id: Text, *, thread_id: Text, metadata: Optional[Dict] = None
     ) -> "Message":
@@ -122,6 +161,7 @@ class Messages:
                 raise NotFound(f"Message {message_id} not found")
             message.message_metadata = metadata or {}
             session.commit()
+            self._client.mark_written(thread_id)
             session.refresh(message)
             return message.to_openai()
 
@@ -139,6 +179,7 @@ class Messages:
                 )
                 session.delete(message)
                 session.commit()
+                self._client.mark_written(thread_id)
                 return MessageDeleted.model_validate(
                     dict(id=message_id, deleted=True, object="thread.message.deleted")
                 )
@@ -152,3 +193,14 @@ class Messages:
                         )
                     )
                 raise NotFound(f"Message {message_id} not found")
+
+
+class AsyncMessages(Messages):
+    _client: "AsyncOpenaiBackend"
+
+    create = awaitable(Messages.create)
+    create_many = awaitable(Messages.create_many)
+    list = awaitable(Messages.list)
+    retrieve = awaitable(Messages.retrieve)
+    update = awaitable(Messages.update)
+    delete = awaitable(Messages.delete)
@@ -1,11 +1,24 @@
-from typing import TYPE_CHECKING, Dict, List, Literal, Optional, Text, Type
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Text,
+    Type,
+)
 
-import sqlalchemy.exc
+import sqlalchemy as sa
 from openai.types.beta.assistant_response_format_option import (
     AssistantResponseFormatOption,
 )
 from openai.types.beta.assistant_tool import AssistantTool
 from openai.types.beta.assistant_tool_choice_option import AssistantToolChoiceOption
+from openai.types.beta.threads.message import Message
 from openai.types.beta.threads.run import (
     IncompleteDetails,
     LastError,
@@ -17,11 +30,24 @@ from openai.types.beta.threads.run import (
 from openai.types.beta.threads.run_status import RunStatus
 
 from languru.exceptions import NotFound
+from languru.resources.sql.openai.backend._pagination import keyset_paginate
+from languru.resources.sql.openai.backend._utils import awaitable
+from languru.types.openai_threads import RunState
+from languru.types.sql._openai import Message as OrmMessage
 from languru.types.sql._openai import Run as OrmRun
+from languru.types.sql._openai import RunState as OrmRunState
 from languru.utils.common import model_dump
 
 if TYPE_CHECKING:
-    from languru.resources.sql.openai.backend._client import OpenaiBackend
+    from sqlalchemy.orm import Session
+
+    from languru.resources.sql.openai.backend._client import (
+        AsyncOpenaiBackend,
+        OpenaiBackend,
+    )
+
+TERMINAL_RUN_STATUSES = ("cancelled", "failed", "completed", "incomplete", "expired")
+EXPIRABLE_RUN_STATUSES = ("queued", "in_progress", "requires_action", "cancelling")
 
 
 class Runs:
@@ -30,10 +56,14 @@ class Runs:
         client: "OpenaiBackend",
         *,
         orm_model: Type["OrmRun"] = OrmRun,
+        state_orm_model: Type["OrmRunState"] = OrmRunState,
+        message_orm_model: Type["OrmMessage"] = OrmMessage,
         **kwargs,
     ):
         self._client = client
         self.orm_model = orm_model
+        self.state_orm_model = state_orm_model
+        self.message_orm_model = message_orm_model
 
     def create(self, run: "Run") -> "Run":
         with self._client.sql_session() as session:
@@ -41,6 +71,7 @@ class Runs:
             session.add(orm_run)
             session.commit()
             session.refresh(orm_run)
+            self._client.mark_written(run.thread_id)
             return orm_run.to_openai()
 
     def list(
@@ -52,68 +83,41 @@ class Runs:
         limit: Optional[int] = None,
         order: Optional[Literal["asc", "desc"]] = None,
         assistant_id: Optional[Text] = None,
+        exclude: Optional[Iterable[Text]] = None,
     ) -> List["Run"]:
-        with self._client.sql_session() as session:
-            query = session.query(self.orm_model).filter(
-                self.orm_model.thread_id == thread_id
-            )
+        """List the runs of the thread.
 
-            # Apply sorting
-            if order == "asc":
-                query = query.order_by(self.orm_model.created_at.asc())
-            else:
-                query = query.order_by(self.orm_model.created_at.desc())
+        `exclude` names JSON fields, e.g. `metadata`, which are not loaded
+        from the database and are returned empty.
+        """
+
+        def _list(session: "Session") -> List["Run"]:
+            query = (
+                session.query(self.orm_model)
+                .options(*self.orm_model.defer_options(exclude))
+                .filter(self.orm_model.thread_id == thread_id)
+            )
 
             # Apply filters
             if assistant_id is not None:
                 query = query.filter(self.orm_model.assistant_id == assistant_id)
 
-            # Apply pagination
-            if after is not None:
-                try:
-                    after_run = (
-                        session.query(self.orm_model)
-                        .filter(self.orm_model.id == after)
-                        .one_or_none()
-                    )
-                    if after_run:
-                        if order == "asc":
-                            query = query.filter(
-                                self.orm_model.created_at > after_run.created_at
-                            )
-                        else:
-                            query = query.filter(
-                                self.orm_model.created_at < after_run.created_at
-                            )
-                except sqlalchemy.exc.NoResultFound:
-                    raise NotFound(f"Run with ID {after} not found.")
-
-            if before is not None:
-                try:
-                    before_run = (
-                        session.query(self.orm_model)
-                        .filter(self.orm_model.id == before)
-                        .one_or_none()
-                    )
-                    if before_run:
-                        if order == "asc":
-                            query = query.filter(
-                                self.orm_model.created_at < before_run.created_at
-                            )
-                        else:
-                            query = query.filter(
-                                self.orm_model.created_at > before_run.created_at
-                            )
-                except sqlalchemy.exc.NoResultFound:
-                    raise NotFound(f"Run with ID {before} not found.")
-
-            if limit is not None:
-                query = query.limit(limit)
-
-            return [run.to_openai() for run in query.all()]
+            # Apply sorting and pagination
+            query = keyset_paginate(
+                query,
+                self.orm_model,
+                after=after,
+                before=before,
+                limit=limit,
+                order=order or "desc",
+            )
+
+            return [run.to_openai(exclude=exclude) for run in query.all()]
+
+        return self._client.sql_read(_list, key=thread_id)
 
     def retrieve(self, run_id: Text, *, thread_id: Text) -> "Run":
-        with self._client.sql_session() as session:
+        def _retrieve(session: "Session") -> "Run":
             run = (
                 session.query(self.orm_model)
                 .filter(
@@ -125,6 +129,8 @@ class Runs:
                 raise NotFound(f"Run {run_id} not found")
             return run.to_openai()
 
+        return self._client.sql_read(_retrieve, key=thread_id)
+
     def update(
         self,
         run_id: Text,
@@ -153,64 +159,281 @@ class Runs:
         temperature: Optional[float] = None,
         top_p: Optional[float] = None,
     ) -> "Run":
+        values: Dict[Text, Any] = {"run_metadata": metadata or {}}
+        for key, value in (
+            ("cancelled_at", cancelled_at),
+            ("completed_at", completed_at),
+            ("expires_at", expires_at),
+            ("failed_at", failed_at),
+            ("incomplete_details", model_dump(incomplete_details)),
+            ("instructions", instructions),
+            ("last_error", model_dump(last_error)),
+            ("max_completion_tokens", max_completion_tokens),
+            ("max_prompt_tokens", max_prompt_tokens),
+            ("model", model),
+            ("parallel_tool_calls", parallel_tool_calls),
+            ("required_action", model_dump(required_action)),
+            ("response_format", model_dump(response_format)),
+            ("started_at", started_at),
+            ("status", status),
+            ("tool_choice", model_dump(tool_choice)),
+            ("tools", model_dump(tools)),
+            ("truncation_strategy", model_dump(truncation_strategy)),
+            ("usage", model_dump(usage)),
+            ("temperature", temperature),
+            ("top_p", top_p),
+        ):
+            if value is not None:
+                values[key] = value
+
         with self._client.sql_session() as session:
-            run = (
-                session.query(self.orm_model)
-                .filter(
-                    self.orm_model.id == run_id, self.orm_model.thread_id == thread_id
-                )
-                .first()
+            run = self._update_returning(
+                session, run_id=run_id, thread_id=thread_id, values=values
             )
+            self._client.mark_written(thread_id)
             if run is None:
                 raise NotFound(f"Run {run_id} not found")
-            run.run_metadata = metadata or {}
-            if cancelled_at is not None:
-                run.cancelled_at = cancelled_at
-            if completed_at is not None:
-                run.completed_at = completed_at
-            if expires_at is not None:
-                run.expires_at = expires_at
-            if failed_at is not None:
-                run.failed_at = failed_at
-            if incomplete_details is not None:
-                run.incomplete_details = model_dump(incomplete_details)
-            if instructions is not None:
-                run.instructions = instructions
-            if last_error is not None:
-                run.last_error = model_dump(last_error)
-            if max_completion_tokens is not None:
-                run.max_completion_tokens = max_completion_tokens
-            if max_prompt_tokens is not None:
-                run.max_prompt_tokens = max_prompt_tokens
-            if model is not None:
-                run.model = model
-            if parallel_tool_calls is not None:
-                run.parallel_tool_calls = parallel_tool_calls
-            if required_action is not None:
-                run.required_action = model_dump(required_action)
-            if response_format is not None:
-                run.response_format = model_dump(response_format)
-            if started_at is not None:
-                run.started_at = started_at
-            if status is not None:
-                run.status = status
-            if tool_choice is not None:
-                run.tool_choice = model_dump(tool_choice)
-            if tools is not None:
-                run.tools = model_dump(tools)
-            if truncation_strategy is not None:
-                run.truncation_strategy = model_dump(truncation_strategy)
-            if usage is not None:
-                run.usage = model_dump(usage)
-            if temperature is not None:
-                run.temperature = temperature
-            if top_p is not None:
-                run.top_p = top_p
-
-            session.commit()
-            session.refresh(run)
             return run.to_openai()
 
+    def transition(
+        self,
+        run_id: Text,
+        *,
+        thread_id: Text,
+        from_statuses: Iterable[RunStatus],
+        status: RunStatus,
+        cancelled_at: Optional[int] = None,
+        completed_at: Optional[int] = None,
+        failed_at: Optional[int] = None,
+        started_at: Optional[int] = None,
+        last_error: Optional[LastError] = None,
+        usage: Optional[Usage] = None,
+        required_action: Optional[RequiredAction] = None,
+    ) -> Optional["Run"]:
+        """Move the run to `status` only if it is currently in `from_statuses`.
+
+        The check and the write are a single `UPDATE ... WHERE status IN (...)
+        RETURNING ...` statement, so a cancellation and a completion racing on
+        the same run cannot both win.
+
+        Parameters
+        ----------
+        run_id : Text
+            The ID of the run.
+        thread_id : Text
+            The ID of the thread containing the run.
+        from_statuses : Iterable[RunStatus]
+            The statuses the run is allowed to transition from.
+        status : RunStatus
+            The new status of the run.
+        required_action : Optional[RequiredAction], optional
+            The action required to continue the run, by default None which
+            clears it.
+
+        Returns
+        -------
+        Optional[Run]
+            The updated run, or None if the run does not exist or its status
+            is not one of `from_statuses`.
+        """
+
+        # The required action only applies to the `requires_action` status
+        values: Dict[Text, Any] = {
+            "status": status,
+            "required_action": model_dump(required_action),
+        }
+        for key, value in (
+            ("cancelled_at", cancelled_at),
+            ("completed_at", completed_at),
+            ("failed_at", failed_at),
+            ("started_at", started_at),
+            ("last_error", model_dump(last_error)),
+            ("usage", model_dump(usage)),
+        ):
+            if value is not None:
+                values[key] = value
+
+        with self._client.sql_session() as session:
+            run = self._update_returning(
+                session,
+                run_id=run_id,
+                thread_id=thread_id,
+                values=values,
+                where=[self.orm_model.status.in_(list(from_statuses))],
+            )
+            self._client.mark_written(thread_id)
+            return None if run is None else run.to_openai()
+
+    def complete(
+        self,
+        run_id: Text,
+        *,
+        thread_id: Text,
+        completed_at: Optional[int] = None,
+        usage: Optional[Usage] = None,
+        messages: Sequence["Message"] = (),
+    ) -> Optional["Run"]:
+        """Move the in-progress run to `completed` and add its answer messages
+        to the thread in one transaction.
+
+        The messages are only inserted if the run wins the transition, and
+        the transition is rolled back if they fail, so a completed run always
+        has its answer.
+
+        Returns
+        -------
+        Optional[Run]
+            The completed run, or None if the run does not exist or is not
+            `in_progress`.
+        """
+
+        values: Dict[Text, Any] = {
+            "status": "completed",
+            "required_action": None,
+            "completed_at": completed_at or int(time.time()),
+        }
+        if usage is not None:
+            values["usage"] = model_dump(usage)
+
+        with self._client.sql_session() as session:
+            run = self._update_returning(
+                session,
+                run_id=run_id,
+                thread_id=thread_id,
+                values=values,
+                where=[self.orm_model.status == "in_progress"],
+            )
+            if run is None:
+                return None
+            run_completed = run.to_openai()
+            if messages:
+                session.execute(
+                    sa.insert(self.message_orm_model),
+                    [self.message_orm_model.values_from_openai(m) for m in messages],
+                )
+        self._client.mark_written(thread_id)
+        return run_completed
+
+    def expire(self, *, expires_after: int = 600, batch_size: int = 500) -> int:
+        """Mark the unfinished runs past their `expires_at` as `expired`.
+
+        Runs without `expires_at` expire `expires_after` seconds after creation,
+        and get `expires_at` filled in.
+
+        Parameters
+        ----------
+        expires_after : int, optional
+            The default lifetime of runs in seconds, by default 600.
+        batch_size : int, optional
+            The number of runs updated per transaction, by default 500.
+
+        Returns
+        -------
+        int
+            The number of expired runs.
+        """
+
+        now = int(time.time())
+        expires_at = sa.func.coalesce(
+            self.orm_model.expires_at, self.orm_model.created_at + expires_after
+        )
+        expired = 0
+        while True:
+            with self._client.sql_session() as session:
+                run_db_ids = [
+                    row[0]
+                    for row in session.query(self.orm_model.db_id)
+                    .filter(
+                        self.orm_model.status.in_(EXPIRABLE_RUN_STATUSES),
+                        expires_at <= now,
+                    )
+                    .limit(batch_size)
+                    .all()
+                ]
+                if run_db_ids:
+                    # The status is checked again, runs finished meanwhile are kept
+                    session.execute(
+                        sa.update(self.orm_model)
+                        .where(
+                            self.orm_model.db_id.in_(run_db_ids),
+                            self.orm_model.status.in_(EXPIRABLE_RUN_STATUSES),
+                        )
+                        .values(status="expired", expires_at=expires_at),
+                        execution_options={"synchronize_session": False},
+                    )
+            expired += len(run_db_ids)
+            if len(run_db_ids) < batch_size:
+                return expired
+
+    def delete_finished(self, older_than: int, *, batch_size: int = 500) -> int:
+        """Delete the runs in a terminal status created more than `older_than`
+        seconds ago, to trim the run history.
+
+        Returns
+        -------
+        int
+            The number of deleted runs.
+        """
+
+        cutoff = int(time.time()) - older_than
+        deleted = 0
+        while True:
+            with self._client.sql_session() as session:
+                rows = (
+                    session.query(self.orm_model.db_id, self.orm_model.id)
+                    .filter(
+                        self.orm_model.status.in_(TERMINAL_RUN_STATUSES),
+                        self.orm_model.created_at < cutoff,
+                    )
+                    .limit(batch_size)
+                    .all()
+                )
+                if rows:
+                    session.query(self.orm_model).filter(
+                        self.orm_model.db_id.in_([row[0] for row in rows])
+                    ).delete(synchronize_session=False)
+                    session.query(self.state_orm_model).filter(
+                        self.state_orm_model.id.in_([row[1] for row in rows])
+                    ).delete(synchronize_session=False)
+            deleted += len(rows)
+            if len(rows) < batch_size:
+                return deleted
+
+    def _update_returning(
+        self,
+        session: "Session",
+        *,
+        run_id: Text,
+        thread_id: Text,
+        values: Dict[Text, Any],
+        where: Optional[List[Any]] = None,
+    ) -> Optional["OrmRun"]:
+        criteria = [
+            self.orm_model.id == run_id,
+            self.orm_model.thread_id == thread_id,
+            *(where or []),
+        ]
+        stmt = sa.update(self.orm_model).where(*criteria).values(**values)
+        if session.get_bind().dialect.update_returning:
+            return (
+                session.execute(
+                    stmt.returning(self.orm_model),
+                    execution_options={"synchronize_session": False},
+                )
+                .scalars()
+                .first()
+            )
+
+        # Dialects without RETURNING, the row is read in the same transaction
+        result = session.execute(stmt, execution_options={"synchronize_session": False})
+        if result.rowcount == 0:  # type: ignore[attr-defined]
+            return None
+        return (
+            session.query(self.orm_model)
+            .filter(self.orm_model.id == run_id, self.orm_model.thread_id == thread_id)
+            .first()
+        )
+
     def delete(
         self, run_id: Text, *, thread_id: Text, not_exist_ok: bool = False
     ) -> Dict:
@@ -233,9 +456,85 @@ class Runs:
                 raise NotFound(f"Run {run_id} not found")
 
             session.delete(run)
+            self._delete_state(session, run_id=run_id, thread_id=thread_id)
             session.commit()
+            self._client.mark_written(thread_id)
             return {
                 "id": run_id,
                 "deleted": True,
                 "object": "thread.run.deleted",
             }
+
+    def save_state(self, state: "RunState") -> "RunState":
+        """Save the state of the run, replacing its previous state."""
+
+        with self._client.sql_session() as session:
+            self._delete_state(session, run_id=state.id, thread_id=state.thread_id)
+            session.execute(
+                sa.insert(self.state_orm_model),
+                [self.state_orm_model.values_from_state(state)],
+            )
+        return state
+
+    def retrieve_state(self, run_id: Text, *, thread_id: Text) -> Optional["RunState"]:
+        """Return the state of the run, None if it has no saved state."""
+
+        with self._client.sql_session() as session:
+            orm_state = (
+                session.query(self.state_orm_model)
+                .filter(
+                    self.state_orm_model.id == run_id,
+                    self.state_orm_model.thread_id == thread_id,
+                )
+                .first()
+            )
+            return None if orm_state is None else orm_state.to_state()
+
+    def list_scheduled_states(self) -> List["RunState"]:
+        """Return the states of the delayed runs, by their start time."""
+
+        with self._client.sql_session() as session:
+            return [
+                orm_state.to_state()
+                for orm_state in session.query(self.state_orm_model)
+                .filter(self.state_orm_model.scheduled_at.is_not(None))
+                .order_by(self.state_orm_model.scheduled_at)
+                .all()
+            ]
+
+    def delete_state(self, run_id: Text, *, thread_id: Text) -> bool:
+        """Delete the state of the run, returns False if it has none."""
+
+        with self._client.sql_session() as session:
+            return self._delete_state(session, run_id=run_id, thread_id=thread_id)
+
+    def _delete_state(
+        self, session: "Session", *, run_id: Text, thread_id: Text
+    ) -> bool:
+        deleted = (
+            session.query(self.state_orm_model)
+            .filter(
+                self.state_orm_model.id == run_id,
+                self.state_orm_model.thread_id == thread_id,
+            )
+            .delete(synchronize_session=False)
+        )
+        return deleted > 0
+
+
+class AsyncRuns(Runs):
+    _client: "AsyncOpenaiBackend"
+
+    create = awaitable(Runs.create)
+    list = awaitable(Runs.list)
+    retrieve = awaitable(Runs.retrieve)
+    update = awaitable(Runs.update)
+    transition = awaitable(Runs.transition)
+    complete = awaitable(Runs.complete)
+    expire = awaitable(Runs.expire)
+    delete_finished = awaitable(Runs.delete_finished)
+    delete = awaitable(Runs.delete)
+    save_state = awaitable(Runs.save_state)
+    retrieve_state = awaitable(Runs.retrieve_state)
+    list_scheduled_states = awaitable(Runs.list_scheduled_states)
+    delete_state = awaitable(Runs.delete_state)
@@ -1,19 +1,46 @@
-from typing import TYPE_CHECKING, Dict, Iterable, List, Literal, Optional, Text, Type
+import time
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Text,
+    Tuple,
+    Type,
+)
 
-import sqlalchemy.exc
+import sqlalchemy as sa
 from openai.types.beta.assistant import ToolResources
 from openai.types.beta.thread import Thread
 from openai.types.beta.thread_deleted import ThreadDeleted
 from openai.types.beta.threads.message import Message as OpenaiMessage
+from openai.types.beta.threads.run import Run
 
 from languru.exceptions import NotFound
+from languru.resources.sql.openai.backend._cache import TTLCache
+from languru.resources.sql.openai.backend._pagination import (
+    cursor_exists,
+    keyset_paginate,
+)
+from languru.resources.sql.openai.backend._utils import awaitable
+from languru.resources.sql.openai.backend.messages import (
+    AsyncMessages as AsyncMessagesBackend,
+)
 from languru.resources.sql.openai.backend.messages import Messages as MessagesBackend
+from languru.resources.sql.openai.backend.runs import AsyncRuns as AsyncRunsBackend
 from languru.resources.sql.openai.backend.runs import Runs as RunsBackend
-from languru.types.sql._openai import Message as OrmMessage
 from languru.types.sql._openai import Thread as OrmThread
 
 if TYPE_CHECKING:
-    from languru.resources.sql.openai.backend._client import OpenaiBackend
+    from sqlalchemy.orm import Session
+
+    from languru.resources.sql.openai.backend._client import (
+        AsyncOpenaiBackend,
+        OpenaiBackend,
+    )
 
 
 class Threads:
@@ -25,10 +52,12 @@ class Threads:
         client: "OpenaiBackend",
         *,
         orm_model: Type["OrmThread"] = OrmThread,
+        cache: Optional[TTLCache[Thread]] = None,
         **kwargs,
     ):
         self._client = client
         self.orm_model = orm_model
+        self.cache = cache
 
         self.messages = MessagesBackend(client=self._client)
         self.runs = RunsBackend(client=self._client)
@@ -41,58 +70,28 @@ class Threads:
         limit: Optional[int] = None,
         order: Optional[Literal["asc", "desc"]] = None,
     ) -> List["Thread"]:
-        with self._client.sql_session() as session:
-            query = session.query(self.orm_model)
-
-            # Apply sorting
-            if order == "desc":
-                query = query.order_by(self.orm_model.created_at.desc())
-            else:
-                query = query.order_by(self.orm_model.created_at.asc())
-
-            # Apply pagination using after
-            if after is not None:
-                try:
-                    after_instance = (
-                        session.query(self.orm_model)
-                        .filter(self.orm_model.id == after)
-                        .one()
-                    )
-                    if order == "asc":
-                        query = query.filter(
-                            self.orm_model.created_at > after_instance.created_at
-                        )
-                    else:
-                        query = query.filter(
-                            self.orm_model.created_at < after_instance.created_at
-                        )
-                except sqlalchemy.exc.NoResultFound:
-                    raise NotFound(f"Thread {after} not found")
-
-            # Apply pagination using before
-            if before is not None:
-                try:
-                    before_instance = (
-                        session.query(self.orm_model)
-                        .filter(self.orm_model.id == before)
-                        .one()
-                    )
-                    if order == "asc":
-                        query = query.filter(
-                            self.orm_model.created_at < before_instance.created_at
-                        )
-                    else:
-                        query = query.filter(
-                            self.orm_model.created_at > before_instance.created_at
-                        )
-                except sqlalchemy.exc.NoResultFound:
-                    raise NotFound(f"Thread {before} not found")
-
-            # Apply limit
-            if limit is not None:
-                query = query.limit(limit)
-
-            return [thread.to_openai() for thread in query.all()]
+        def _list(session: "Session") -> List["Thread"]:
+            query = keyset_paginate(
+                session.query(self.orm_model),
+                self.orm_model,
+                after=after,
+                before=before,
+                limit=limit,
+                order=order or "asc",
+            )
+            threads = query.all()
+
+            # Only look the cursor up when the page is empty
+            if not threads:
+                for cursor_id in (after, before):
+                    if cursor_id is not None and not cursor_exists(
+                        session, self.orm_model, cursor_id
+                    ):
+                        raise NotFound(f"Thread {cursor_id} not found")
+
+            return [thread.to_openai() for thread in threads]
+
+        return self._client.sql_read(_list, key="threads")
 
     def create(
         self,
@@ -100,26 +99,116 @@ class Threads:
         messages: Optional[Iterable[OpenaiMessage]] = None,
     ) -> "Thread":
         with self._client.sql_session() as session:
-            orm_thread = OrmThread.from_openai(thread)
-            session.add(orm_thread)
-            for message in messages or []:
-                orm_message = OrmMessage.from_openai(message)
-                session.add(orm_message)
-            session.commit()
+            session.execute(
+                sa.insert(self.orm_model), [self.orm_model.values_from_openai(thread)]
+            )
+            self.messages._insert_many(session, list(messages or []))
+        self._client.mark_written(thread.id, "threads")
+        return thread
 
-            session.refresh(orm_thread)
-            return orm_thread.to_openai()
+    def create_and_run(
+        self,
+        thread: "Thread",
+        run: "Run",
+        messages: Optional[Iterable[OpenaiMessage]] = None,
+    ) -> Tuple["Thread", List[OpenaiMessage], "Run"]:
+        """Create the thread, its messages and the queued run in a single
+        transaction.
 
-    def retrieve(self, thread_id: Text) -> "Thread":
+        Parameters
+        ----------
+        thread : Thread
+            The thread to create.
+        run : Run
+            The queued run of the thread.
+        messages : Optional[Iterable[Message]], optional
+            The initial messages of the thread, by default None.
+
+        Returns
+        -------
+        Tuple[Thread, List[Message], Run]
+            The created thread, messages and run.
+        """
+
+        messages = list(messages or [])
         with self._client.sql_session() as session:
-            thread = (
+            session.execute(
+                sa.insert(self.orm_model), [self.orm_model.values_from_openai(thread)]
+            )
+            self.messages._insert_many(session, messages)
+            session.execute(
+                sa.insert(self.runs.orm_model),
+                [self.runs.orm_model.values_from_openai(run)],
+            )
+        self._client.mark_written(thread.id, "threads")
+        return (thread, messages, run)
+
+    def create_many(
+        self,
+        threads: Sequence["Thread"],
+        messages: Optional[Iterable[OpenaiMessage]] = None,
+        *,
+        batch_size: int = 1000,
+    ) -> List["Thread"]:
+        """Import threads and their messages in a single transaction.
+
+        Parameters
+        ----------
+        threads : Sequence[Thread]
+            The threads to insert.
+        messages : Optional[Iterable[Message]], optional
+            The messages of the threads, in the order they were created,
+            by default None.
+        batch_size : int, optional
+            The number of rows per INSERT statement, by default 1000.
+
+        Returns
+        -------
+        List[Thread]
+            The inserted threads.
+        """
+
+        threads = list(threads)
+        with self._client.sql_session() as session:
+            for i in range(0, len(threads), batch_size):
+                session.execute(
+                    sa.insert(self.orm_model),
+                    [
+                        self.orm_model.values_from_openai(thread)
+                        for thread in threads[i : i + batch_size]
+                    ],
+                )
+            self.messages._insert_many(
+                session, list(messages or []), batch_size=batch_size
+            )
+        self._client.mark_written(*(thread.id for thread in threads), "threads")
+        return threads
+
+    def retrieve(self, thread_id: Text) -> "Thread":
+        if self.cache is not None:
+            thread_cached = self.cache.get(thread_id)
+            if thread_cached is not None:
+                return thread_cached
+            cache_token = self.cache.token(thread_id)
+
+        def _retrieve(session: "Session") -> "Thread":
+            orm_thread = (
                 session.query(self.orm_model)
                 .filter(self.orm_model.id == thread_id)
                 .first()
             )
-            if thread is None:
+            if orm_thread is None:
                 raise NotFound(f"Thread {thread_id} not found")
-            return thread.to_openai()
+            return orm_thread.to_openai()
+
+        # The cache is only filled from the primary
+        thread = self._client.sql_read(
+            _retrieve, key=thread_id, primary=self.cache is not None
+        )
+
+        if self.cache is not None:
+            self.cache.set(thread_id, thread.model_copy(), cache_token)
+        return thread
 
     def update(
         self,
@@ -141,6 +230,7 @@ class Threads:
                 tool_resources=tool_resources,
             )
             session.commit()
+            self._invalidate([thread_id])
             session.refresh(thread)
             return thread.to_openai()
 
@@ -162,8 +252,130 @@ class Threads:
                     )
                 raise NotFound(f"Thread {thread_id} not found")
 
-            session.delete(thread)
+            self._delete_cascade(session, [thread_id])
             session.commit()
+            self._invalidate([thread_id])
             return ThreadDeleted.model_validate(
                 {"id": thread_id, "deleted": True, "object": "thread.deleted"}
             )
+
+    def delete_idle(self, idle_seconds: int, *, batch_size: int = 500) -> int:
+        """Delete the threads without any new message or run for `idle_seconds`,
+        together with their messages and runs.
+
+        Parameters
+        ----------
+        idle_seconds : int
+            The retention period of idle threads in seconds.
+        batch_size : int, optional
+            The number of threads deleted per transaction, by default 500.
+
+        Returns
+        -------
+        int
+            The number of deleted threads.
+        """
+
+        cutoff = int(time.time()) - idle_seconds
+        orm_message = self.messages.orm_model
+        orm_run = self.runs.orm_model
+        deleted = 0
+        while True:
+            with self._client.sql_session() as session:
+                thread_ids = [
+                    row[0]
+                    for row in session.query(self.orm_model.id)
+                    .filter(
+                        self.orm_model.created_at < cutoff,
+                        ~sa.exists().where(
+                            orm_message.thread_id == self.orm_model.id,
+                            orm_message.created_at >= cutoff,
+                        ),
+                        ~sa.exists().where(
+                            orm_run.thread_id == self.orm_model.id,
+                            orm_run.created_at >= cutoff,
+                        ),
+                    )
+                    .limit(batch_size)
+                    .all()
+                ]
+                if thread_ids:
+                    self._delete_cascade(session, thread_ids)
+            self._invalidate(thread_ids)
+            deleted += len(thread_ids)
+            if len(thread_ids) < batch_size:
+                return deleted
+
+    def delete_orphans(self) -> int:
+        """Delete the messages and runs whose thread no longer exists, e.g.
+        left behind by versions without cascading deletes.
+
+        Returns
+        -------
+        int
+            The number of deleted messages and runs.
+        """
+
+        deleted = 0
+        with self._client.sql_session() as session:
+            for orm_model in (
+                self.messages.orm_model,
+                self.runs.orm_model,
+                self.runs.state_orm_model,
+            ):
+                deleted += (
+                    session.query(orm_model)
+                    .filter(
+                        ~sa.exists().where(self.orm_model.id == orm_model.thread_id)
+                    )
+                    .delete(synchronize_session=False)
+                )
+        return deleted
+
+    def _invalidate(self, thread_ids: Iterable[Text]) -> None:
+        thread_ids = list(thread_ids)
+        self._client.mark_written(*thread_ids, "threads")
+        if self.cache is not None:
+            for thread_id in thread_ids:
+                self.cache.delete(thread_id)
+
+    def _delete_cascade(self, session: "Session", thread_ids: List[Text]) -> None:
+        for orm_model in (
+            self.messages.orm_model,
+            self.runs.orm_model,
+            self.runs.state_orm_model,
+        ):
+            session.query(orm_model).filter(orm_model.thread_id.in_(thread_ids)).delete(
+                synchronize_session=False
+            )
+        session.query(self.orm_model).filter(self.orm_model.id.in_(thread_ids)).delete(
+            synchronize_session=False
+        )
+
+
+class AsyncThreads(Threads):
+    _client: "AsyncOpenaiBackend"
+    messages: AsyncMessagesBackend
+    runs: AsyncRunsBackend
+
+    def __init__(
+        self,
+        client: "AsyncOpenaiBackend",
+        *,
+        orm_model: Type["OrmThread"] = OrmThread,
+        **kwargs,
+    ):
+        super().__init__(client, orm_model=orm_model, **kwargs)
+
+        self.messages = AsyncMessagesBackend(client=self._client)
+        self.runs = AsyncRunsBackend(client=self._client)
+
+    list = awaitable(Threads.list)
+    create = awaitable(Threads.create)
+    create_and_run = awaitable(Threads.create_and_run)
+    create_many = awaitable(Threads.create_many)
+    retrieve = awaitable(Threads.retrieve)
+    update = awaitable(Threads.update)
+    delete = awaitable(Threads.delete)
+    delete_idle = awaitable(Threads.delete_idle)
+    delete_orphans = awaitable(Threads.delete_orphans)
@@ -2,9 +2,11 @@ from fastapi import APIRouter
 
 from languru.server.api.v1.assistants import router as assistants_router
 from languru.server.api.v1.audio import router as audio_router
+from languru.server.api.v1.batches import router as batches_router
 from languru.server.api.v1.chat import router as chat_router
 from languru.server.api.v1.completions import router as completions_router
 from languru.server.api.v1.embeddings import router as embeddings_router
+from languru.server.api.v1.files import router as files_router
 from languru.server.api.v1.images import router as images_router
 from languru.server.api.v1.model import router as model_router
 from languru.server.api.v1.moderations import router as moderations_router
@@ -22,3 +24,5 @@ router.include_router(router=audio_router, tags=["audio"])
 router.include_router(router=images_router, tags=["images"])
 router.include_router(router=assistants_router, tags=["assistants"])
 router.include_router(router=threads_router, tags=["threads"])
+router.include_router(router=files_router, tags=["files"])
+router.include_router(router=batches_router, tags=["batches"])
@@ -8,7 +8,7 @@ from openai.types.beta.assistant_deleted import AssistantDeleted
 from pyassorted.asyncio.executor import run_func
 
 from languru.exceptions import NotFound
-from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.resources.openai_backend import BaseOpenaiBackend
 from languru.server.config import ServerBaseSettings
 from languru.server.deps.common import app_settings
 from languru.server.deps.openai_backend import depends_openai_backend
@@ -44,7 +44,7 @@ async def list_assistants(
         description="Sort order by the `created_at` timestamp of the objects. `asc` for ascending order and `desc` for descending order.",  # noqa: E501
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> OpenaiPage[Assistant]:
     """List all assistants."""
 
@@ -85,7 +85,7 @@ async def create_assistant(
         },
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Assistant:
     """Create an assistant."""
 
@@ -105,7 +105,7 @@ async def get_assistant(
     request: Request,
     assistant_id: Text = QueryPath(..., description="The ID of the assistant."),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Assistant:
     """Retrieve an assistant by ID."""
 
@@ -128,7 +128,7 @@ async def update_assistant(
         description="The request to update an assistant.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Assistant:
     """Update an assistant by ID."""
 
@@ -159,7 +159,7 @@ async def delete_assistant(
     request: Request,
     assistant_id: Text = QueryPath(..., description="The ID of the assistant."),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> AssistantDeleted:
     """Delete an assistant by ID."""
 
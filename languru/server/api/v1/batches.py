@@ -0,0 +1,144 @@
+import time
+from typing import Optional, Text
+
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import Path as QueryPath
+from fastapi import Query, Request
+from openai.types.batch import Batch
+from pyassorted.asyncio.executor import run_func
+
+from languru.exceptions import NotFound
+from languru.resources.local.openai.files import LocalFiles
+from languru.server.config import ServerBaseSettings
+from languru.server.deps.common import app_settings
+from languru.server.deps.openai_batches import depends_batch_worker, depends_files
+from languru.tasks.openai_batches import CANCELLABLE_BATCH_STATUSES, BatchWorker
+from languru.types.openai_batches import BatchCreateRequest
+from languru.types.openai_page import OpenaiPage
+
+router = APIRouter()
+
+
+# https://platform.openai.com/docs/api-reference/batch/create
+@router.post("/batches")
+async def create_batch(
+    request: Request,
+    batch_create_request: BatchCreateRequest = Body(
+        ...,
+        description="The request to create a batch.",
+        openapi_examples={
+            "chat_completions": {
+                "summary": "Chat completions",
+                "value": {
+                    "input_file_id": "file-abc123",
+                    "endpoint": "/v1/chat/completions",
+                    "completion_window": "24h",
+                },
+            }
+        },
+    ),
+    settings: ServerBaseSettings = Depends(app_settings),
+    files: LocalFiles = Depends(depends_files),
+    batch_worker: BatchWorker = Depends(depends_batch_worker),
+) -> Batch:
+    """Create and execute a batch from an uploaded file of requests."""
+
+    try:
+        input_file = await run_func(files.retrieve, batch_create_request.input_file_id)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if input_file.purpose != "batch":
+        raise HTTPException(
+            status_code=400,
+            detail=f"The input file purpose must be 'batch', got '{input_file.purpose}'.",  # noqa: E501
+        )
+    batch = await run_func(
+        batch_worker.batches.create,
+        input_file_id=input_file.id,
+        endpoint=batch_create_request.endpoint,
+        completion_window=batch_create_request.completion_window,
+        metadata=batch_create_request.metadata,
+    )
+    batch_worker.submit(batch.id)
+    return batch
+
+
+# https://platform.openai.com/docs/api-reference/batch/list
+@router.get("/batches")
+async def list_batches(
+    request: Request,
+    after: Optional[Text] = Query(
+        None,
+        description="A cursor for use in pagination. `after` is an object ID that defines your place in the list.",  # noqa: E501
+    ),
+    limit: int = Query(
+        20,
+        ge=1,
+        le=100,
+        description="A limit on the number of objects to be returned.",
+    ),
+    settings: ServerBaseSettings = Depends(app_settings),
+    batch_worker: BatchWorker = Depends(depends_batch_worker),
+) -> OpenaiPage[Batch]:
+    """List the batches."""
+
+    # One more batch tells if there is a next page
+    batches = await run_func(batch_worker.batches.list, after=after, limit=limit + 1)
+    has_more = len(batches) > limit
+    batches = batches[:limit]
+    return OpenaiPage(
+        data=batches,
+        object="list",
+        first_id=batches[0].id if batches else None,
+        last_id=batches[-1].id if batches else None,
+        has_more=has_more,
+    )
+
+
+# https://platform.openai.com/docs/api-reference/batch/retrieve
+@router.get("/batches/{batch_id}")
+async def retrieve_batch(
+    request: Request,
+    batch_id: Text = QueryPath(..., description="The ID of the batch."),
+    settings: ServerBaseSettings = Depends(app_settings),
+    batch_worker: BatchWorker = Depends(depends_batch_worker),
+) -> Batch:
+    """Retrieve a batch with its progress."""
+
+    try:
+        return await run_func(batch_worker.batches.retrieve, batch_id)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+# https://platform.openai.com/docs/api-reference/batch/cancel
+@router.post("/batches/{batch_id}/cancel")
+async def cancel_batch(
+    request: Request,
+    batch_id: Text = QueryPath(..., description="The ID of the batch to cancel."),
+    settings: ServerBaseSettings = Depends(app_settings),
+    batch_worker: BatchWorker = Depends(depends_batch_worker),
+) -> Batch:
+    """Cancel a batch, the results written so far are kept."""
+
+    try:
+        batch = await run_func(
+            batch_worker.batches.transition,
+            batch_id,
+            from_statuses=CANCELLABLE_BATCH_STATUSES,
+            status="cancelling",
+            cancelling_at=int(time.time()),
+        )
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if batch is not None:
+        # A batch of another worker is cancelled at its next checkpoint
+        batch_worker.cancel(batch_id)
+        return batch
+
+    batch = await run_func(batch_worker.batches.retrieve, batch_id)
+    if batch.status in ("cancelling", "cancelled"):
+        return batch
+    raise HTTPException(
+        status_code=400, detail=f"Cannot cancel batch with status '{batch.status}'."
+    )
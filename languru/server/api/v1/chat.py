@@ -12,7 +12,7 @@ from languru.server.deps.openai_chat import (
     depends_openai_client_chat_completion_request,
 )
 from languru.types.chat.completions import ChatCompletionRequest
-from languru.utils.http import simple_sse_encode
+from languru.utils.http import async_simple_sse_encode, simple_sse_encode
 
 router = APIRouter()
 
@@ -72,6 +72,15 @@ class ChatCompletionHandler:
     ) -> StreamingResponse:
         params = chat_completion_request.model_dump(exclude_none=True)
         params["stream"] = True
+        # The plugin clients with native async streaming, e.g. Anthropic
+        async_create_stream = getattr(
+            openai_client.chat.completions, "async_create_stream", None
+        )
+        if async_create_stream is not None:
+            return StreamingResponse(
+                async_simple_sse_encode(await async_create_stream(**params)),
+                media_type="application/stream+json",
+            )
         return StreamingResponse(
             run_generator(
                 simple_sse_encode,
@@ -1,7 +1,9 @@
 from logging import Logger
-from typing import Optional, Tuple
+from typing import Optional, Text, Tuple, Union
 
+import numpy as np
 from fastapi import APIRouter, Body, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
 from openai import OpenAI
 from openai.types import CreateEmbeddingResponse
 from pyassorted.asyncio.executor import run_func
@@ -13,6 +15,7 @@ from languru.server.deps.openai_clients import openai_clients
 from languru.server.utils.common import get_value_from_app
 from languru.types.embeddings import EmbeddingRequest
 from languru.types.organizations import OrganizationType
+from languru.utils.calculation import encode_embeddings, truncate_embeddings
 from languru.utils.common import display_object
 
 router = APIRouter()
@@ -65,10 +68,51 @@ class EmbeddingHandler:
         openai_client: "OpenAI",
         settings: "ServerBaseSettings",
         **kwargs,
+    ) -> Union["CreateEmbeddingResponse", JSONResponse]:
+        # The embeddings are encoded here, so every provider is asked for floats
+        params = embedding_request.model_dump(
+            exclude_none=True, exclude={"encoding_format"}
+        )
+        embedding_response: "CreateEmbeddingResponse" = await run_func(
+            openai_client.embeddings.create, **params
+        )
+        embedding_response = self.format_response(
+            embedding_response,
+            dimensions=embedding_request.dimensions,
+            encoding_format=embedding_request.encoding_format,
+        )
+        if embedding_request.encoding_format in (None, "float"):
+            return embedding_response
+        # The base64 embeddings are not the floats of the response model
+        return JSONResponse(embedding_response.model_dump(warnings=False))
+
+    def format_response(
+        self,
+        embedding_response: "CreateEmbeddingResponse",
+        *,
+        dimensions: Optional[int] = None,
+        encoding_format: Optional[Text] = "float",
     ) -> "CreateEmbeddingResponse":
-        return await run_func(
-            openai_client.embeddings.create,
-            **embedding_request.model_dump(exclude_none=True),
+        """Truncate the embeddings to the `dimensions` if the provider did not,
+        and encode them in the `encoding_format`.
+        """
+
+        data = embedding_response.data
+        truncate = dimensions is not None and any(
+            len(d.embedding) > dimensions for d in data
+        )
+        if not data or (not truncate and encoding_format in (None, "float")):
+            return embedding_response
+        embeddings = np.array([d.embedding for d in data], dtype=np.float32)
+        if truncate:
+            embeddings = truncate_embeddings(embeddings, dimensions)
+        encoded = encode_embeddings(embeddings, encoding_format)
+        return embedding_response.model_copy(
+            update={
+                "data": [
+                    d.model_copy(update={"embedding": e}) for d, e in zip(data, encoded)
+                ]
+            }
         )
 
 
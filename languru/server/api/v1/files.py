@@ -0,0 +1,140 @@
+from typing import Literal, Optional, Text, get_args
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException
+from fastapi import Path as QueryPath
+from fastapi import Query, Request, UploadFile
+from fastapi.responses import FileResponse
+from openai.types.file_deleted import FileDeleted
+from openai.types.file_object import FileObject
+from pyassorted.asyncio.executor import run_func
+
+from languru.exceptions import InvalidRequest, NotFound
+from languru.resources.local.openai.files import FilePurpose, LocalFiles
+from languru.server.config import ServerBaseSettings
+from languru.server.deps.common import app_settings
+from languru.server.deps.openai_batches import depends_batch_worker, depends_files
+from languru.tasks.openai_batches import BatchWorker
+from languru.types.openai_page import OpenaiPage
+
+router = APIRouter()
+
+
+# https://platform.openai.com/docs/api-reference/files/create
+@router.post("/files")
+async def create_file(
+    request: Request,
+    file: UploadFile = File(..., description="The File object to be uploaded."),
+    purpose: Text = Form(
+        ..., description="The intended purpose of the uploaded file, e.g. `batch`."
+    ),
+    settings: ServerBaseSettings = Depends(app_settings),
+    files: LocalFiles = Depends(depends_files),
+) -> FileObject:
+    """Upload a file, e.g. the JSONL input of a batch."""
+
+    if purpose not in get_args(FilePurpose):
+        raise HTTPException(status_code=400, detail=f"Invalid purpose '{purpose}'.")
+    return await run_func(
+        files.create,
+        file.file,
+        filename=file.filename or "file",
+        purpose=purpose,  # type: ignore[arg-type]
+    )
+
+
+# https://platform.openai.com/docs/api-reference/files/list
+@router.get("/files")
+async def list_files(
+    request: Request,
+    purpose: Optional[Text] = Query(
+        None, description="Only return files with the given purpose."
+    ),
+    after: Optional[Text] = Query(
+        None,
+        description="A cursor for use in pagination. `after` is an object ID that defines your place in the list.",  # noqa: E501
+    ),
+    limit: int = Query(
+        10000,
+        ge=1,
+        le=10000,
+        description="A limit on the number of objects to be returned.",
+    ),
+    order: Literal["asc", "desc"] = Query(
+        "desc",
+        description="Sort order by the `created_at` timestamp of the objects.",
+    ),
+    settings: ServerBaseSettings = Depends(app_settings),
+    files: LocalFiles = Depends(depends_files),
+) -> OpenaiPage[FileObject]:
+    """List the files."""
+
+    # One more file tells if there is a next page
+    file_objs = await run_func(
+        files.list, purpose=purpose, after=after, limit=limit + 1, order=order
+    )
+    has_more = len(file_objs) > limit
+    file_objs = file_objs[:limit]
+    return OpenaiPage(
+        data=file_objs,
+        object="list",
+        first_id=file_objs[0].id if file_objs else None,
+        last_id=file_objs[-1].id if file_objs else None,
+        has_more=has_more,
+    )
+
+
+# https://platform.openai.com/docs/api-reference/files/retrieve
+@router.get("/files/{file_id}")
+async def retrieve_file(
+    request: Request,
+    file_id: Text = QueryPath(..., description="The ID of the file."),
+    settings: ServerBaseSettings = Depends(app_settings),
+    files: LocalFiles = Depends(depends_files),
+) -> FileObject:
+    """Retrieve a file."""
+
+    try:
+        return await run_func(files.retrieve, file_id)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+# https://platform.openai.com/docs/api-reference/files/delete
+@router.delete("/files/{file_id}")
+async def delete_file(
+    request: Request,
+    file_id: Text = QueryPath(..., description="The ID of the file."),
+    settings: ServerBaseSettings = Depends(app_settings),
+    batch_worker: BatchWorker = Depends(depends_batch_worker),
+) -> FileDeleted:
+    """Delete a file, unless an unfinished batch reads it."""
+
+    try:
+        return await run_func(batch_worker.delete_file, file_id)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# https://platform.openai.com/docs/api-reference/files/retrieve-contents
+@router.get("/files/{file_id}/content")
+async def retrieve_file_content(
+    request: Request,
+    file_id: Text = QueryPath(..., description="The ID of the file."),
+    settings: ServerBaseSettings = Depends(app_settings),
+    files: LocalFiles = Depends(depends_files),
+) -> FileResponse:
+    """Return the contents of a file, the results of a batch in progress are
+    returned as far as they are written.
+    """
+
+    try:
+        file_obj = await run_func(files.retrieve, file_id)
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FileResponse(
+        files.path(file_obj.id),
+        media_type="application/octet-stream",
+        filename=file_obj.filename,
+    )
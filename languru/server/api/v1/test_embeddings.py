@@ -37,3 +37,33 @@ def test_app_embedding(test_client):
     response = test_client.post("/v1/embeddings", json=embedding_call)
     assert response.status_code == 200
     assert len(response.json()["data"]) == len(embedding_call["input"])
+
+
+def test_app_embedding_dimensions_encoding_format(
+    test_client, mocked_openai_embeddings_create
+):
+    import base64
+
+    import numpy as np
+
+    embedding_call = {
+        "input": ["Hello", "world!"],
+        "model": test_model_name,
+        "dimensions": 256,
+    }
+    response = test_client.post("/v1/embeddings", json=embedding_call)
+    assert response.status_code == 200
+    embeddings = np.array([d["embedding"] for d in response.json()["data"]])
+    # The embeddings are truncated and normalized again
+    assert embeddings.shape == (2, 256)
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+
+    for encoding_format, dtype in (("base64", "<f4"), ("base64_float16", "<f2")):
+        embedding_call["encoding_format"] = encoding_format
+        response = test_client.post("/v1/embeddings", json=embedding_call)
+        assert response.status_code == 200
+        encoded = [d["embedding"] for d in response.json()["data"]]
+        decoded = np.stack(
+            [np.frombuffer(base64.b64decode(e), dtype=dtype) for e in encoded]
+        )
+        np.testing.assert_allclose(decoded, embeddings, atol=1e-3)
@@ -15,6 +15,7 @@ from languru.types.openai_assistants import AssistantCreateRequest
 from languru.types.openai_threads import (
     ThreadCreateAndRunRequest,
     ThreadCreateRequest,
+    ThreadsImportRequest,
     ThreadsMessageUpdate,
     ThreadsRunCreate,
     ThreadsRunUpdate,
@@ -175,6 +176,42 @@ def test_threads_messages_apis(test_client):
     assert len(test_client.get(f"/v1/threads/{thread.id}/messages").json()["data"]) == 2
 
 
+def test_threads_import_apis(test_client):
+    # Import threads with message histories
+    histories = [
+        [
+            {"content": f"Question {i}", "role": "user", "created_at": 1700000000},
+            {"content": f"Answer {i}", "role": "assistant", "created_at": 1700000000},
+        ]
+        for i in range(3)
+    ]
+    res = test_client.post(
+        "/v1/threads/import",
+        json=ThreadsImportRequest.model_validate(
+            {
+                "threads": [
+                    {"messages": messages, "metadata": {"source": "import"}}
+                    for messages in histories
+                ]
+            }
+        ).model_dump(exclude_none=True),
+    )
+    res.raise_for_status()
+    threads = [Thread.model_validate(thread) for thread in res.json()["data"]]
+    assert len(threads) == 3
+
+    # The messages keep the imported order
+    for thread, messages in zip(threads, histories):
+        res = test_client.get(f"/v1/threads/{thread.id}/messages?order=asc")
+        res.raise_for_status()
+        retrieved_messages = [Message.model_validate(m) for m in res.json()["data"]]
+        assert [m.content[0].text.value for m in retrieved_messages] == [  # type: ignore  # noqa: E501
+            m["content"] for m in messages
+        ]
+        res = test_client.delete(f"/v1/threads/{thread.id}")
+        res.raise_for_status()
+
+
 def test_threads_runs_apis(test_client):
     # Create an assistant
     res = test_client.post(
@@ -360,3 +397,104 @@ def test_threads_runs_cancel(test_client):
     else:
         assert False, "Run did not cancelled in time."
     assert retrieved_run.status == "cancelled"
+
+
+def _requires_action_run(test_client):
+    from openai.types.beta.threads.run import RequiredAction
+
+    from languru.resources.openai_backend import BaseOpenaiBackend
+    from languru.server.config import APP_STATE_OPENAI_BACKEND
+    from languru.server.utils.common import get_value_from_app
+    from languru.types.openai_threads import RunState
+
+    openai_backend = get_value_from_app(
+        test_client.app, key=APP_STATE_OPENAI_BACKEND, value_typing=BaseOpenaiBackend
+    )
+    assistant = Assistant.model_validate(
+        test_client.post(
+            "/v1/assistants",
+            json=AssistantCreateRequest.model_validate(
+                json.loads(test_assistant_create_request)
+            ).model_dump(exclude_none=True),
+        ).json()
+    )
+    thread = Thread.model_validate(
+        test_client.post(
+            "/v1/threads",
+            json=ThreadCreateRequest.model_validate(
+                {"messages": [json.loads(test_user_query)]}
+            ).model_dump(exclude_none=True),
+        ).json()
+    )
+    run = Run.model_validate(
+        test_client.post(
+            f"/v1/threads/{thread.id}/runs",
+            params={"delay": 600000},
+            json=ThreadsRunCreate.model_validate(
+                {"assistant_id": assistant.id, "thread_id": thread.id}
+            ).model_dump(exclude_none=True),
+        ).json()
+    )
+    run = openai_backend.threads.runs.transition(
+        run.id,
+        thread_id=thread.id,
+        from_statuses=["queued"],
+        status="requires_action",
+        required_action=RequiredAction.model_validate(
+            {
+                "type": "submit_tool_outputs",
+                "submit_tool_outputs": {
+                    "tool_calls": [
+                        {
+                            "id": "call_1",
+                            "type": "function",
+                            "function": {"name": "get_time", "arguments": "{}"},
+                        }
+                    ]
+                },
+            }
+        ),
+    )
+    assert run is not None
+    openai_backend.threads.runs.save_state(
+        RunState(id=run.id, thread_id=thread.id, rounds=1)
+    )
+    return (run, openai_backend)
+
+
+def test_threads_runs_cancel_requires_action(test_client):
+    run, openai_backend = _requires_action_run(test_client)
+    cancelled = Run.model_validate(
+        test_client.post(f"/v1/threads/{run.thread_id}/runs/{run.id}/cancel").json()
+    )
+    assert cancelled.status == "cancelled"
+    # The saved state of the suspended run is deleted with the cancellation
+    assert (
+        openai_backend.threads.runs.retrieve_state(run.id, thread_id=run.thread_id)
+        is None
+    )
+
+
+def test_threads_runs_submit_tool_outputs_failed(test_client, monkeypatch):
+    from languru.server.config import APP_STATE_RUN_TASKS
+    from languru.server.utils.common import get_value_from_app
+    from languru.tasks.openai_threads import RunTasks
+
+    run, openai_backend = _requires_action_run(test_client)
+    run_tasks = get_value_from_app(
+        test_client.app, key=APP_STATE_RUN_TASKS, value_typing=RunTasks
+    )
+
+    def _submit(*args, **kwargs):
+        raise RuntimeError("submit failed")
+
+    monkeypatch.setattr(run_tasks, "submit", _submit)
+    with pytest.raises(RuntimeError):
+        test_client.post(
+            f"/v1/threads/{run.thread_id}/runs/{run.id}/submit_tool_outputs",
+            json={"tool_outputs": [{"tool_call_id": "call_1", "output": "12:00"}]},
+        )
+    # The run waits for the tool outputs again instead of staying queued
+    retrieved = openai_backend.threads.runs.retrieve(run.id, thread_id=run.thread_id)
+    assert retrieved.status == "requires_action"
+    assert retrieved.required_action == run.required_action
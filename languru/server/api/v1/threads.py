@@ -1,4 +1,4 @@
-from concurrent.futures import ThreadPoolExecutor
+import time
 from typing import List, Literal, Optional, Text, Tuple
 
 from fastapi import APIRouter, Body, Depends, HTTPException
@@ -14,20 +14,29 @@ from openai.types.beta.threads.run import Run
 from pyassorted.asyncio.executor import run_func
 
 from languru.exceptions import NotFound
-from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.resources.openai_backend import BaseOpenaiBackend
 from languru.server.config import ServerBaseSettings
 from languru.server.deps.common import app_settings
-from languru.server.deps.executor import depends_executor
 from languru.server.deps.openai_backend import depends_openai_backend
+from languru.server.deps.openai_clients import openai_clients
 from languru.server.deps.openai_threads import (
+    depends_run_submit_tool_outputs,
     depends_thread_create_and_run,
     depends_thread_id_run_messages_assistant_openai_client_backend,
 )
-from languru.tasks.openai_threads import task_openai_threads_runs_create
+from languru.server.deps.run_tasks import depends_run_tasks, depends_run_tools
+from languru.tasks.openai_threads import (
+    CANCELLABLE_RUN_STATUSES,
+    RunTasks,
+    task_openai_threads_runs_create,
+)
+from languru.tasks.run_tools import RunTools
 from languru.types.openai_page import OpenaiPage
 from languru.types.openai_threads import (
+    RunState,
     RunSubmitToolOutputsRequest,
     ThreadCreateRequest,
+    ThreadsImportRequest,
     ThreadsMessageCreate,
     ThreadsMessageUpdate,
     ThreadsRunUpdate,
@@ -38,6 +47,32 @@ from languru.utils.openai_utils import rand_openai_id
 router = APIRouter()
 
 
+async def _save_scheduled_run_state(
+    run: Run,
+    *,
+    delay: int,
+    openai_client: OpenAI,
+    openai_backend: BaseOpenaiBackend,
+) -> RunState:
+    """Save the start time of the delayed run, so it is scheduled again if
+    the server restarts before it starts.
+    """
+
+    org_type = next(
+        (o for c, o in openai_clients.initialized_clients() if c is openai_client),
+        None,
+    )
+    return await run_func(
+        openai_backend.threads.runs.save_state,
+        RunState(
+            id=run.id,
+            thread_id=run.thread_id,
+            org_type=org_type,
+            scheduled_at=time.time() + delay / 1000,
+        ),
+    )
+
+
 # https://platform.openai.com/docs/api-reference/runs/createThreadAndRun
 @router.post("/threads/runs")
 async def create_thread_and_run(
@@ -49,15 +84,16 @@ async def create_thread_and_run(
         None, description="The sleep in milliseconds after chat completion."
     ),
     thread_run_messages_assistant_openai_client_backend: Tuple[
-        Thread, Run, List[Message], Assistant, OpenAI, OpenaiBackend
+        Thread, Run, List[Message], Assistant, OpenAI, BaseOpenaiBackend
     ] = Depends(depends_thread_create_and_run),
-    executor: ThreadPoolExecutor = Depends(depends_executor),
+    run_tasks: RunTasks = Depends(depends_run_tasks),
+    run_tools: RunTools = Depends(depends_run_tools),
     settings: ServerBaseSettings = Depends(app_settings),
 ) -> Run:
     """Create a thread and run an assistant in it."""
 
     (
-        _,
+        thread,
         run,
         messages,
         _,
@@ -65,17 +101,36 @@ async def create_thread_and_run(
         openai_backend,
     ) = thread_run_messages_assistant_openai_client_backend
 
-    # Save the in-queue run
-    run = await run_func(openai_backend.threads.runs.create, run=run)
-
-    executor.submit(
-        task_openai_threads_runs_create,
+    # Save the thread, its messages and the in-queue run
+    thread, messages, run = await run_func(
+        openai_backend.threads.create_and_run,
+        thread=thread,
         run=run,
         messages=messages,
-        openai_client=openai_client,
-        openai_backend=openai_backend,
-        delay=delay,
-        sleep=sleep,
+    )
+    run_state = (
+        await _save_scheduled_run_state(
+            run,
+            delay=delay,
+            openai_client=openai_client,
+            openai_backend=openai_backend,
+        )
+        if delay
+        else None
+    )
+
+    run_tasks.submit(
+        run.id,
+        task_openai_threads_runs_create(
+            run=run,
+            messages=messages,
+            openai_client=openai_client,
+            openai_backend=openai_backend,
+            sleep=sleep,
+            run_tools=run_tools,
+            run_state=run_state,
+        ),
+        delay=delay / 1000 if delay else None,
     )
     return run
 
@@ -102,7 +157,7 @@ async def list_threads(
         description="Sort order by the `created_at` timestamp of the objects. `asc` for ascending order and `desc` for descending order.",  # noqa: E501
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> OpenaiPage[Thread]:
     """List all threads."""
 
@@ -130,7 +185,7 @@ async def create_thread(
         description="The parameters for creating a thread.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Thread:
     """Create a thread."""
 
@@ -146,6 +201,30 @@ async def create_thread(
     return thread
 
 
+@router.post("/threads/import")
+async def import_threads(
+    request: Request,
+    threads_import_request: ThreadsImportRequest = Body(
+        ...,
+        description="The threads and message histories to import.",
+    ),
+    settings: ServerBaseSettings = Depends(app_settings),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
+) -> OpenaiPage[Thread]:
+    """Import threads with their message histories in bulk."""
+
+    threads, messages = threads_import_request.to_openai_threads_and_messages()
+    threads = await run_func(
+        openai_backend.threads.create_many, threads=threads, messages=messages
+    )
+    return OpenaiPage(
+        data=threads,
+        object="list",
+        first_id=threads[0].id if threads else None,
+        last_id=threads[-1].id if threads else None,
+    )
+
+
 # https://platform.openai.com/docs/api-reference/threads/getThread
 @router.get("/threads/{thread_id}")
 async def get_thread(
@@ -155,7 +234,7 @@ async def get_thread(
         description="The ID of the thread to retrieve.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Thread:
     """Get a thread."""
 
@@ -182,7 +261,7 @@ async def update_thread(
         description="The parameters for updating a thread.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Thread:
     """Update a thread."""
 
@@ -204,7 +283,7 @@ async def delete_thread(
         description="The ID of the thread to delete.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> ThreadDeleted:
     """Delete a thread."""
 
@@ -231,7 +310,7 @@ async def create_message(
         description="The parameters for creating a message.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Message:
     """Create a message in a thread."""
 
@@ -269,7 +348,7 @@ async def list_messages(
         description="Sort order by the `created_at` timestamp of the objects. `asc` for ascending order and `desc` for descending order.",  # noqa: E501
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> OpenaiPage[Message]:
     """List all messages in a thread."""
 
@@ -302,7 +381,7 @@ async def get_message(
         description="The ID of the message to retrieve.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Message:
     """Get a message in a thread."""
 
@@ -334,7 +413,7 @@ async def update_message(
         description="The parameters for updating a message.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Message:
     """Update a message in a thread."""
 
@@ -360,7 +439,7 @@ async def delete_message(
         description="The ID of the message to delete.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> MessageDeleted:
     """Delete a message in a thread."""
 
@@ -387,9 +466,10 @@ async def create_run(
     ),
     settings: ServerBaseSettings = Depends(app_settings),
     thread_id_run_messages_assistant_openai_client_backend: Tuple[
-        Text, Run, List[Message], Assistant, OpenAI, OpenaiBackend
+        Text, Run, List[Message], Assistant, OpenAI, BaseOpenaiBackend
     ] = Depends(depends_thread_id_run_messages_assistant_openai_client_backend),
-    executor: ThreadPoolExecutor = Depends(depends_executor),
+    run_tasks: RunTasks = Depends(depends_run_tasks),
+    run_tools: RunTools = Depends(depends_run_tools),
 ) -> Run:
     """Create a run in a thread."""
 
@@ -404,15 +484,29 @@ async def create_run(
 
     # Save the in-queue run
     run = await run_func(openai_backend.threads.runs.create, run=run)
+    run_state = (
+        await _save_scheduled_run_state(
+            run,
+            delay=delay,
+            openai_client=openai_client,
+            openai_backend=openai_backend,
+        )
+        if delay
+        else None
+    )
 
-    executor.submit(
-        task_openai_threads_runs_create,
-        run=run,
-        messages=messages,
-        openai_client=openai_client,
-        openai_backend=openai_backend,
-        delay=delay,
-        sleep=sleep,
+    run_tasks.submit(
+        run.id,
+        task_openai_threads_runs_create(
+            run=run,
+            messages=messages,
+            openai_client=openai_client,
+            openai_backend=openai_backend,
+            sleep=sleep,
+            run_tools=run_tools,
+            run_state=run_state,
+        ),
+        delay=delay / 1000 if delay else None,
     )
     return run
 
@@ -448,7 +542,7 @@ async def list_runs(
         description="The ID of the assistant to filter runs by.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> OpenaiPage[Run]:
     """List all runs in a thread."""
 
@@ -482,7 +576,7 @@ async def get_run(
         description="The ID of the run to retrieve.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Run:
     """Get a run in a thread."""
 
@@ -512,7 +606,7 @@ async def update_run(
         description="The parameters for updating a run.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
 ) -> Run:
     """Update a run in a thread."""
 
@@ -563,11 +657,68 @@ async def submit_tool_outputs(
         description="The parameters for submitting tool outputs for a run.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    run_messages_openai_client_backend: Tuple[
+        Run, List[Message], OpenAI, BaseOpenaiBackend
+    ] = Depends(depends_run_submit_tool_outputs),
+    run_tasks: RunTasks = Depends(depends_run_tasks),
+    run_tools: RunTools = Depends(depends_run_tools),
 ) -> Run:
     """Submit tool outputs for a run in a thread."""
 
-    raise HTTPException(status_code=501, detail="Not implemented")
+    (
+        run,
+        messages,
+        openai_client,
+        openai_backend,
+    ) = run_messages_openai_client_backend
+
+    # The conversation saved by the worker which suspended the run
+    run_state = await run_func(
+        openai_backend.threads.runs.retrieve_state, run_id=run_id, thread_id=thread_id
+    )
+    tool_messages = run_tools.resume(
+        run,
+        [o.model_dump() for o in run_submit_tool_outputs_request.tool_outputs],
+        run_state=run_state,
+    )
+
+    # Only one submission resumes the run
+    run_queued = await run_func(
+        openai_backend.threads.runs.transition,
+        run_id=run_id,
+        thread_id=thread_id,
+        from_statuses=("requires_action",),
+        status="queued",
+    )
+    if run_queued is None:
+        raise HTTPException(
+            status_code=400, detail=f"Run '{run_id}' is not waiting for tool outputs."
+        )
+
+    run_coro = task_openai_threads_runs_create(
+        run=run_queued,
+        messages=messages,
+        openai_client=openai_client,
+        openai_backend=openai_backend,
+        run_tools=run_tools,
+        tool_messages=tool_messages,
+        run_state=run_state,
+    )
+    try:
+        run_tasks.submit(run_queued.id, run_coro)
+    except Exception:
+        # The run waits for the tool outputs again instead of staying queued
+        run_coro.close()
+        await run_func(
+            openai_backend.threads.runs.transition,
+            run_id=run_id,
+            thread_id=thread_id,
+            from_statuses=("queued",),
+            status="requires_action",
+            required_action=run.required_action,
+        )
+        raise
+    return run_queued
 
 
 # https://platform.openai.com/docs/api-reference/runs/cancelRun
@@ -583,17 +734,45 @@ async def cancel_run(
         description="The ID of the run to cancel.",
     ),
     settings: ServerBaseSettings = Depends(app_settings),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
+    run_tasks: RunTasks = Depends(depends_run_tasks),
 ) -> Run:
     """Cancel a run in a thread."""
 
+    # No task waits for the tool outputs of the run
+    run = await run_func(
+        openai_backend.threads.runs.transition,
+        run_id=run_id,
+        thread_id=thread_id,
+        from_statuses=("requires_action",),
+        status="cancelled",
+        cancelled_at=int(time.time()),
+    )
+    if run is not None:
+        # The saved conversation of the suspended run is not resumed anymore
+        await run_func(
+            openai_backend.threads.runs.delete_state, run_id=run_id, thread_id=thread_id
+        )
+        return run
+
+    run = await run_func(
+        openai_backend.threads.runs.transition,
+        run_id=run_id,
+        thread_id=thread_id,
+        from_statuses=CANCELLABLE_RUN_STATUSES,
+        status="cancelling",
+    )
+    if run is not None:
+        # Abort the upstream request of the run executed by this worker
+        run_tasks.cancel(run_id)
+        return run
+
     try:
         run = await run_func(
-            openai_backend.threads.runs.update,
-            run_id=run_id,
-            thread_id=thread_id,
-            status="cancelling",
+            openai_backend.threads.runs.retrieve, run_id=run_id, thread_id=thread_id
         )
-        return run
     except NotFound as e:
         raise HTTPException(status_code=404, detail=str(e))
+    raise HTTPException(
+        status_code=400, detail=f"Cannot cancel run with status '{run.status}'."
+    )
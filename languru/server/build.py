@@ -1,26 +1,42 @@
+import asyncio
 import logging
 from concurrent.futures import ThreadPoolExecutor
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
+from typing import Optional
 
 from fastapi import FastAPI
+from pyassorted.asyncio.executor import run_func
 
 from languru.config import logger as languru_logger
 from languru.config import settings as languru_settings
-from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.resources.local.openai.batches import LocalBatches
+from languru.resources.local.openai.files import LocalFiles
+from languru.resources.openai_backend import BaseOpenaiBackend
+from languru.resources.sql.openai.backend import AsyncOpenaiBackend
 from languru.server.config import (
+    APP_STATE_BATCH_WORKER,
     APP_STATE_EXECUTOR,
+    APP_STATE_FILES,
     APP_STATE_LANGURU_SETTINGS,
     APP_STATE_LOGGER,
     APP_STATE_OPENAI_BACKEND,
     APP_STATE_OPENAI_CLIENTS,
+    APP_STATE_RUN_TASKS,
+    APP_STATE_RUN_TOOLS,
     APP_STATE_SETTINGS,
     ServerBaseSettings,
     init_logger_config,
     init_paths,
     pretty_print_app_routes,
 )
-from languru.server.deps.openai_clients import OpenaiClients
+from languru.server.deps.openai_clients import OpenaiClients, openai_clients
 from languru.server.utils.common import get_value_from_app
+from languru.tasks.openai_backend import loop_openai_backend_maintenance
+from languru.tasks.openai_batches import BatchWorker
+from languru.tasks.openai_models import loop_openai_clients_models_refresh
+from languru.tasks.openai_threads import RunTasks, resume_scheduled_runs
+from languru.tasks.run_tools import RunTools
 
 
 @asynccontextmanager
@@ -34,14 +50,54 @@ async def app_lifespan(app: FastAPI):
 
     # OpenAI clients initialization
     openai_backend = get_value_from_app(
-        app, key=APP_STATE_OPENAI_BACKEND, value_typing=OpenaiBackend
+        app, key=APP_STATE_OPENAI_BACKEND, value_typing=BaseOpenaiBackend
+    )
+    await run_func(openai_backend.touch)
+    maintenance_task = create_openai_backend_maintenance_task(openai_backend, settings)
+    models_refresh_task = create_openai_clients_models_refresh_task(
+        get_value_from_app(
+            app, key=APP_STATE_OPENAI_CLIENTS, value_typing=OpenaiClients
+        ),
+        settings,
+    )
+    batch_worker = get_value_from_app(
+        app, key=APP_STATE_BATCH_WORKER, value_typing=BatchWorker
+    )
+    await batch_worker.start()  # Resume the unfinished batches
+    await resume_scheduled_runs(  # Schedule again the delayed runs
+        get_value_from_app(app, key=APP_STATE_RUN_TASKS, value_typing=RunTasks),
+        openai_backend=openai_backend,
+        openai_clients=get_value_from_app(
+            app, key=APP_STATE_OPENAI_CLIENTS, value_typing=OpenaiClients
+        ),
+        run_tools=get_value_from_app(
+            app, key=APP_STATE_RUN_TOOLS, value_typing=RunTools
+        ),
     )
-    openai_backend.touch()
 
     # Yield
     with refresh_executor_of_app(app):  # Refresh thread pool executor
         yield
 
+    run_tasks = get_value_from_app(app, key=APP_STATE_RUN_TASKS, value_typing=RunTasks)
+    await run_tasks.shutdown()
+    await batch_worker.shutdown()
+    get_value_from_app(app, key=APP_STATE_RUN_TOOLS, value_typing=RunTools).close()
+    for task in (maintenance_task, models_refresh_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await run_func(
+        get_value_from_app(
+            app, key=APP_STATE_OPENAI_CLIENTS, value_typing=OpenaiClients
+        ).close
+    )
+    if isinstance(openai_backend, AsyncOpenaiBackend):
+        await openai_backend.dispose()
+    else:
+        openai_backend.close()
+
 
 def create_app(settings: "ServerBaseSettings", **kwargs):
     app = FastAPI(
@@ -51,24 +107,75 @@ def create_app(settings: "ServerBaseSettings", **kwargs):
         lifespan=app_lifespan,
     )
     __logger = logging.getLogger(settings.APP_NAME)
-    __openai_clients = OpenaiClients()
-    __openai_backend = OpenaiBackend(url=settings.OPENAI_BACKEND_URL)
+    # The clients the API routes with, so the model catalog refresh reaches them
+    __openai_clients = openai_clients
+    cache_ttl = settings.OPENAI_BACKEND_CACHE_TTL
+    if (
+        cache_ttl
+        and settings.WORKERS > 1
+        and not settings.OPENAI_BACKEND_CACHE_INVALIDATION_URL
+    ):
+        languru_logger.warning(
+            "The OpenAI backend cache is disabled, it needs the "
+            + "`OPENAI_BACKEND_CACHE_INVALIDATION_URL` with multiple workers"
+        )
+        cache_ttl = None
+    __openai_backend = BaseOpenaiBackend.from_url(
+        settings.OPENAI_BACKEND_URL,
+        pool_size=settings.OPENAI_BACKEND_POOL_SIZE,
+        max_overflow=settings.OPENAI_BACKEND_MAX_OVERFLOW,
+        pool_timeout=settings.OPENAI_BACKEND_POOL_TIMEOUT,
+        pool_recycle=settings.OPENAI_BACKEND_POOL_RECYCLE,
+        pool_pre_ping=settings.OPENAI_BACKEND_POOL_PRE_PING,
+        sqlite_pragmas=None if settings.OPENAI_BACKEND_SQLITE_TUNING else {},
+        cache_ttl=cache_ttl,
+        cache_maxsize=settings.OPENAI_BACKEND_CACHE_MAXSIZE,
+        cache_invalidation_url=settings.OPENAI_BACKEND_CACHE_INVALIDATION_URL,
+        replica_urls=settings.OPENAI_BACKEND_REPLICA_URLS,
+        replica_max_lag=settings.OPENAI_BACKEND_REPLICA_MAX_LAG,
+    )
+    if settings.WORKERS > 1 and not __openai_backend.multiprocess:
+        raise ValueError(
+            f"The OpenAI backend '{settings.OPENAI_BACKEND_URL}' is owned by a "
+            + f"single process, it does not support WORKERS={settings.WORKERS}"
+        )
     __executor = ThreadPoolExecutor(
         max_workers=1,
         thread_name_prefix="languru.server.app.state.executor",
     )
+    __run_tasks = RunTasks()
+    __run_tools = RunTools(
+        max_concurrency=settings.RUN_TOOLS_MAX_CONCURRENCY,
+        max_rounds=settings.RUN_TOOLS_MAX_ROUNDS,
+    )
+    __files = LocalFiles(Path(settings.DATA_DIR).joinpath("files"))
+    __batch_worker = BatchWorker(
+        __files,
+        LocalBatches(Path(settings.DATA_DIR).joinpath("batches")),
+        openai_clients=__openai_clients,
+        concurrency=settings.BATCH_CONCURRENCY,
+        checkpoint_interval=settings.BATCH_CHECKPOINT_INTERVAL,
+    )
     app.extra[APP_STATE_LANGURU_SETTINGS] = languru_settings
     app.extra[APP_STATE_SETTINGS] = settings
     app.extra[APP_STATE_LOGGER] = __logger
     app.extra[APP_STATE_OPENAI_CLIENTS] = __openai_clients
     app.state.openai_backend = app.extra[APP_STATE_OPENAI_BACKEND] = __openai_backend
     app.extra[APP_STATE_EXECUTOR] = __executor
+    app.extra[APP_STATE_RUN_TASKS] = __run_tasks
+    app.extra[APP_STATE_RUN_TOOLS] = __run_tools
+    app.extra[APP_STATE_FILES] = __files
+    app.extra[APP_STATE_BATCH_WORKER] = __batch_worker
     setattr(app.state, APP_STATE_LANGURU_SETTINGS, languru_settings)
     setattr(app.state, APP_STATE_SETTINGS, settings)
     setattr(app.state, APP_STATE_LOGGER, __logger)
     setattr(app.state, APP_STATE_OPENAI_CLIENTS, __openai_clients)
     setattr(app.state, APP_STATE_OPENAI_BACKEND, __openai_backend)
     setattr(app.state, APP_STATE_EXECUTOR, __executor)
+    setattr(app.state, APP_STATE_RUN_TASKS, __run_tasks)
+    setattr(app.state, APP_STATE_RUN_TOOLS, __run_tools)
+    setattr(app.state, APP_STATE_FILES, __files)
+    setattr(app.state, APP_STATE_BATCH_WORKER, __batch_worker)
 
     @app.get("/")
     @app.get("/health")
@@ -82,6 +189,9 @@ def create_app(settings: "ServerBaseSettings", **kwargs):
             "pending_tasks": __executor._work_queue.qsize(),
             "total_workers": len(__executor._threads),
             "idle_workers": __executor._idle_semaphore._value,
+            "running_runs": len(__run_tasks),
+            "scheduled_runs": __run_tasks.scheduled,
+            "running_batches": len(__batch_worker),
         }
 
     from languru.server.api.v1 import router as api_v1_router
@@ -119,6 +229,51 @@ def run_app(settings: "ServerBaseSettings", **kwargs):
         )
 
 
+def create_openai_backend_maintenance_task(
+    openai_backend: "BaseOpenaiBackend", settings: "ServerBaseSettings"
+) -> Optional["asyncio.Task"]:
+    """Schedule the run expiry, retention and compaction jobs of the backend,
+    returns None if `OPENAI_BACKEND_MAINTENANCE_INTERVAL` is disabled.
+    """
+
+    if not settings.OPENAI_BACKEND_MAINTENANCE_INTERVAL:
+        return None
+
+    def _days_to_seconds(days: Optional[float]) -> Optional[int]:
+        return None if days is None else int(days * 86400)
+
+    return asyncio.create_task(
+        loop_openai_backend_maintenance(
+            openai_backend,
+            interval=settings.OPENAI_BACKEND_MAINTENANCE_INTERVAL,
+            run_expires_after=settings.OPENAI_BACKEND_RUN_EXPIRES_AFTER,
+            run_retention=_days_to_seconds(settings.OPENAI_BACKEND_RUN_RETENTION_DAYS),
+            thread_retention=_days_to_seconds(
+                settings.OPENAI_BACKEND_THREAD_RETENTION_DAYS
+            ),
+            logger=logging.getLogger(settings.APP_NAME),
+        )
+    )
+
+
+def create_openai_clients_models_refresh_task(
+    openai_clients: "OpenaiClients", settings: "ServerBaseSettings"
+) -> Optional["asyncio.Task"]:
+    """Schedule the model catalog refresh of the clients, returns None if
+    `OPENAI_CLIENTS_MODELS_REFRESH_INTERVAL` is disabled.
+    """
+
+    if not settings.OPENAI_CLIENTS_MODELS_REFRESH_INTERVAL:
+        return None
+    return asyncio.create_task(
+        loop_openai_clients_models_refresh(
+            openai_clients,
+            interval=settings.OPENAI_CLIENTS_MODELS_REFRESH_INTERVAL,
+            logger=logging.getLogger(settings.APP_NAME),
+        )
+    )
+
+
 def refresh_executor_of_app(app: "FastAPI") -> "ThreadPoolExecutor":
     """Refresh the executor of the app."""
 
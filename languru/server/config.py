@@ -3,7 +3,7 @@ import logging.config
 import os
 from datetime import datetime
 from pathlib import Path
-from typing import TYPE_CHECKING, Final, Text
+from typing import TYPE_CHECKING, Final, List, Optional, Text
 
 import pytz
 from colorama import Fore, Style, init
@@ -26,6 +26,10 @@ APP_STATE_LOGGER: Final[Text] = "logger"
 APP_STATE_OPENAI_CLIENTS: Final[Text] = "openai_clients"
 APP_STATE_OPENAI_BACKEND: Final[Text] = "openai_backend"
 APP_STATE_EXECUTOR: Final[Text] = "executor"
+APP_STATE_RUN_TASKS: Final[Text] = "run_tasks"
+APP_STATE_RUN_TOOLS: Final[Text] = "run_tools"
+APP_STATE_FILES: Final[Text] = "files"
+APP_STATE_BATCH_WORKER: Final[Text] = "batch_worker"
 
 
 class ServerBaseSettings(BaseSettings):
@@ -50,8 +54,33 @@ class ServerBaseSettings(BaseSettings):
     RELOAD_DELAY: float = 5.0
     DATA_DIR: Text = str(Path("./data").absolute())
 
-    # Backend configuration
+    # Backend configuration, a SQLAlchemy URL, `memory://` or `logstore:///path`
     OPENAI_BACKEND_URL: Text = "sqlite:///data/openai.db"
+    OPENAI_BACKEND_POOL_SIZE: Optional[int] = 10
+    OPENAI_BACKEND_MAX_OVERFLOW: Optional[int] = 20
+    OPENAI_BACKEND_POOL_TIMEOUT: Optional[float] = 30.0
+    OPENAI_BACKEND_POOL_RECYCLE: int = 3600
+    OPENAI_BACKEND_POOL_PRE_PING: bool = True
+    OPENAI_BACKEND_SQLITE_TUNING: bool = True
+    OPENAI_BACKEND_MAINTENANCE_INTERVAL: Optional[float] = 3600.0
+    OPENAI_BACKEND_RUN_EXPIRES_AFTER: int = 600
+    OPENAI_BACKEND_RUN_RETENTION_DAYS: Optional[float] = None
+    OPENAI_BACKEND_THREAD_RETENTION_DAYS: Optional[float] = None
+    # The assistants and threads cache is off by default, the workers do not
+    # see each other's writes unless `OPENAI_BACKEND_CACHE_INVALIDATION_URL` is
+    # set, so it is only used by a single worker or with the invalidation
+    OPENAI_BACKEND_CACHE_TTL: Optional[float] = None
+    OPENAI_BACKEND_CACHE_MAXSIZE: int = 1024
+    OPENAI_BACKEND_CACHE_INVALIDATION_URL: Optional[Text] = None
+    OPENAI_BACKEND_REPLICA_URLS: List[Text] = []
+    OPENAI_BACKEND_REPLICA_MAX_LAG: float = 5.0
+    RUN_TOOLS_MAX_CONCURRENCY: int = 8
+    RUN_TOOLS_MAX_ROUNDS: int = 10
+    OPENAI_CLIENTS_MODELS_REFRESH_INTERVAL: Optional[float] = 3600.0
+
+    # Batch configuration, the files and batches are stored in `DATA_DIR`
+    BATCH_CONCURRENCY: int = 64
+    BATCH_CHECKPOINT_INTERVAL: float = 5.0
 
     # Resources configuration
     openai_available: bool = True if os.environ.get("OPENAI_API_KEY") else False
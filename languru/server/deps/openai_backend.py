@@ -1,12 +1,12 @@
 from fastapi import Request
 
-from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.resources.openai_backend import BaseOpenaiBackend
 from languru.server.config import APP_STATE_OPENAI_BACKEND
 from languru.server.utils.common import get_value_from_app
 
 
-def depends_openai_backend(request: Request) -> "OpenaiBackend":
+def depends_openai_backend(request: Request) -> "BaseOpenaiBackend":
     openai_backend = get_value_from_app(
-        request.app, key=APP_STATE_OPENAI_BACKEND, value_typing=OpenaiBackend
+        request.app, key=APP_STATE_OPENAI_BACKEND, value_typing=BaseOpenaiBackend
     )
     return openai_backend
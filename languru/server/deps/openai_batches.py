@@ -0,0 +1,21 @@
+from fastapi import Request
+
+from languru.resources.local.openai.batches import LocalBatches
+from languru.resources.local.openai.files import LocalFiles
+from languru.server.config import APP_STATE_BATCH_WORKER, APP_STATE_FILES
+from languru.server.utils.common import get_value_from_app
+from languru.tasks.openai_batches import BatchWorker
+
+
+def depends_files(request: "Request") -> "LocalFiles":
+    return get_value_from_app(request.app, key=APP_STATE_FILES, value_typing=LocalFiles)
+
+
+def depends_batch_worker(request: "Request") -> "BatchWorker":
+    return get_value_from_app(
+        request.app, key=APP_STATE_BATCH_WORKER, value_typing=BatchWorker
+    )
+
+
+def depends_batches(request: "Request") -> "LocalBatches":
+    return depends_batch_worker(request).batches
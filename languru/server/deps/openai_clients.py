@@ -1,40 +1,39 @@
+import threading
 import time
 from logging import Logger
-from typing import Any, Dict, List, Optional, Sequence, Text, Tuple, Union
+from typing import Any, Dict, List, Optional, Sequence, Set, Text, Tuple, Union
 
-from fastapi import Query, Request
-from fastapi.exceptions import HTTPException
-from openai import AzureOpenAI, OpenAI, OpenAIError
+from openai import AsyncOpenAI, OpenAI, OpenAIError
 from openai.types import Model
 from pydantic import BaseModel
 
+# Starlette instead of FastAPI, which takes most of the import time of the
+# module; FastAPI handles these exceptions the same way
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
 from languru.config import logger as languru_logger
 from languru.exceptions import (
     CredentialsNotProvided,
     ModelNotFound,
     OrganizationNotFound,
 )
-from languru.openai_plugins.clients.anthropic import AnthropicOpenAI
-from languru.openai_plugins.clients.google import GoogleOpenAI
-from languru.openai_plugins.clients.groq import GroqOpenAI
-from languru.openai_plugins.clients.pplx import PerplexityOpenAI
-from languru.openai_plugins.clients.voyage import VoyageOpenAI
+from languru.openai_plugins.registry import (
+    Capability,
+    ProviderCapabilities,
+    ProviderOrganization,
+    ProviderSpec,
+    load_providers,
+)
 from languru.server.config import APP_STATE_LOGGER
 from languru.server.utils.common import get_value_from_app
-from languru.types.models import (
-    MODELS_ANTHROPIC,
-    MODELS_AZURE_OPENAI,
-    MODELS_GOOGLE,
-    MODELS_GROQ,
-    MODELS_OPENAI,
-    MODELS_PERPLEXITY,
-    MODELS_VOYAGE,
-)
+from languru.types.models import MODELS_OPENAI
 from languru.types.organizations import OrganizationType, to_org_type
 
 
 class OpenaiModels:
     _models: List[Model]
+    _models_lock: threading.Lock
 
     def models(self, model: Optional[Text] = None) -> List["Model"]:
         """Returns the supported models based on the organization type."""
@@ -64,25 +63,22 @@ class OpenaiModels:
     ) -> None:
         """Adds a new model to the supported models."""
 
-        if isinstance(models, Dict):
-            self._models.append(Model.model_validate(models))
-            return
-        elif isinstance(models, BaseModel):
-            self._models.append(Model.model_validate(models.model_dump()))
-            return
-
-        for m in models:
-            if isinstance(m, BaseModel):
-                self._models.append(Model.model_validate(m.model_dump()))
-            else:
-                self._models.append(Model.model_validate(m))
+        if isinstance(models, (Dict, BaseModel)):
+            models = [models]  # type: ignore[list-item]
+        new_models = [
+            Model.model_validate(m.model_dump() if isinstance(m, BaseModel) else m)
+            for m in models
+        ]
+        with self._models_lock:
+            self._models = self._models + new_models
 
     def model_remove(self, models: Union[Text, List[Text]]) -> None:
         """Removes a model from the supported models."""
 
         if isinstance(models, Text):
             models = [models]
-        self._models[:] = [m for m in self._models if m.id not in models]
+        with self._models_lock:
+            self._models = [m for m in self._models if m.id not in models]
 
     def model_strip_org(
         self, model: Text, org: Optional[Union[Text, OrganizationType]] = None
@@ -105,13 +101,15 @@ class OpenaiDepends:
     def depends_org_type(
         self,
         request: Request,
-        api_type: Optional[Text] = Query(None),
-        org: Optional[Text] = Query(None),
-        org_type: Optional[Text] = Query(None),
-        organization: Optional[Text] = Query(None),
-        organization_type: Optional[Text] = Query(None),
+        api_type: Optional[Text] = None,
+        org: Optional[Text] = None,
+        org_type: Optional[Text] = None,
+        organization: Optional[Text] = None,
+        organization_type: Optional[Text] = None,
     ) -> Optional[OrganizationType]:
-        """Returns the OpenAI client based on the request parameters."""
+        """Returns the OpenAI client based on the request parameters, the
+        scalar parameters are the query parameters of the route.
+        """
 
         logger = get_value_from_app(
             request.app,
@@ -125,168 +123,174 @@ class OpenaiDepends:
 
         out: Optional[OrganizationType] = None
         if organization_type is not None:
-            out = to_org_type(organization_type)
+            out = self.to_org(organization_type)
             logger.debug(f"Organization type: '{out}'.")
         return out
 
+    def to_org(self, org: Text) -> OrganizationType:
+        return to_org_type(org)
+
 
 class OpenaiClients(OpenaiModels, OpenaiDepends):
-    def __init__(self, *args, **kwargs):
-        self._oai_client: Optional["OpenAI"] = None
-        self._aoai_client: Optional["AzureOpenAI"] = None
-        self._ant_client: Optional["AnthropicOpenAI"] = None
-        self._gg_client: Optional["GoogleOpenAI"] = None
-        self._gq_client: Optional["GroqOpenAI"] = None
-        self._pplx_client: Optional["PerplexityOpenAI"] = None
-        self._vg_client: Optional["VoyageOpenAI"] = None
+    """The clients of the providers, routed by the organization type.
+
+    The providers are the built-in ones and the ones of the
+    `languru.providers` entry points. The models of the providers with
+    credentials are served from startup, while a client, and the SDK it
+    wraps, is only created when it is first routed to.
+    """
+
+    def __init__(
+        self,
+        *args,
+        providers: Optional[Sequence["ProviderSpec"]] = None,
+        **kwargs,
+    ):
+        self.providers: Dict[Text, "ProviderSpec"] = {
+            spec.name: spec
+            for spec in (load_providers() if providers is None else providers)
+        }
+        self._clients: Dict[Text, "OpenAI"] = {}
+        self._clients_failed: Set[Text] = set()
+        self._async_clients: Dict[Text, Optional["AsyncOpenAI"]] = {}
+        self._clients_lock = threading.Lock()
+        self._create_locks: Dict[Text, threading.Lock] = {}
+        self._models_lock = threading.Lock()
+        self._available_orgs: Set[Text] = set()
         self._models: List["Model"] = []
+        self._discovered_models: Dict[Text, ProviderOrganization] = {}
+        self.models_refreshed_at: Optional[float] = None
 
         self.init_openai_clients()
 
     def init_openai_clients(self) -> None:
-        self.init_openai_client()
-        self.init_azure_openai_client()
-        self.init_anthropic_openai_client()
-        self.init_google_openai_client()
-        self.init_groq_openai_client()
-        self.init_perplexity_openai_client()
-        self.init_voyage_openai_client()
-
-    def init_openai_client(self) -> None:
-        try:
-            self._oai_client = OpenAI()
-            _models = [
-                Model.model_validate(
-                    {
-                        "id": m,
-                        "created": int(time.time()),
-                        "object": "model",
-                        "owned_by": OrganizationType.OPENAI.value,
-                    }
-                )
-                for m in MODELS_OPENAI
-            ]
-            self.model_add(_models)
-        except OpenAIError:
-            languru_logger.warning("OpenAI client not initialized.")
-
-    def init_azure_openai_client(self) -> None:
-        try:
-            self._aoai_client = AzureOpenAI(api_version="2024-02-01")
-            _models = [
-                Model.model_validate(
-                    {
-                        "id": m,
-                        "created": int(time.time()),
-                        "object": "model",
-                        "owned_by": OrganizationType.AZURE.value,
-                    }
-                )
-                for m in MODELS_AZURE_OPENAI
-            ]
-            self.model_add(_models)
-        except OpenAIError:
-            languru_logger.warning("Azure OpenAI client not initialized.")
-
-    def init_anthropic_openai_client(self) -> None:
-        try:
-            self._ant_client = AnthropicOpenAI()
-            _models = [
-                Model.model_validate(
-                    {
-                        "id": m,
-                        "created": int(time.time()),
-                        "object": "model",
-                        "owned_by": OrganizationType.ANTHROPIC.value,
-                    }
-                )
-                for m in MODELS_ANTHROPIC
-            ]
-            self.model_add(_models)
-        except CredentialsNotProvided:
-            languru_logger.warning("Anthropic OpenAI client not initialized.")
-
-    def init_google_openai_client(self) -> None:
-        try:
-            self._gg_client = GoogleOpenAI()
-            _models = [
-                Model.model_validate(
-                    {
-                        "id": m,
-                        "created": int(time.time()),
-                        "object": "model",
-                        "owned_by": OrganizationType.GOOGLE.value,
-                    }
-                )
-                for m in MODELS_GOOGLE
-            ]
-            self.model_add(_models)
-        except CredentialsNotProvided:
-            languru_logger.warning("Google OpenAI client not initialized.")
-
-    def init_groq_openai_client(self) -> None:
-        try:
-            self._gq_client = GroqOpenAI()
-            _models = [
-                Model.model_validate(
-                    {
-                        "id": m,
-                        "created": int(time.time()),
-                        "object": "model",
-                        "owned_by": OrganizationType.GROQ.value,
-                    }
-                )
-                for m in MODELS_GROQ
-            ]
-            self.model_add(_models)
-        except CredentialsNotProvided:
-            languru_logger.warning("Groq OpenAI client not initialized.")
-
-    def init_perplexity_openai_client(self) -> None:
-        try:
-            self._pplx_client = PerplexityOpenAI()
-            _models = [
-                Model.model_validate(
-                    {
-                        "id": m,
-                        "created": int(time.time()),
-                        "object": "model",
-                        "owned_by": OrganizationType.PERPLEXITY.value,
-                    }
-                )
-                for m in MODELS_PERPLEXITY
-            ]
-            self.model_add(_models)
-        except CredentialsNotProvided:
-            languru_logger.warning("Perplexity OpenAI client not initialized.")
-
-    def init_voyage_openai_client(self) -> None:
-        try:
-            self._vg_client = VoyageOpenAI()
-            _models = [
-                Model.model_validate(
-                    {
-                        "id": m,
-                        "created": int(time.time()),
-                        "object": "model",
-                        "owned_by": OrganizationType.VOYAGE.value,
-                    }
+        """Adds the models of the providers with credentials, without creating
+        their clients.
+        """
+
+        created = int(time.time())
+        for name, spec in self.providers.items():
+            if not spec.credentials_available():
+                languru_logger.debug(f"No credentials of '{name}' provided.")
+                continue
+            self._available_orgs.add(name)
+            self.model_add(
+                [
+                    Model.model_validate(
+                        {
+                            "id": m,
+                            "created": created,
+                            "object": "model",
+                            "owned_by": name,
+                        }
+                    )
+                    for m in spec.served_models()
+                ]
+            )
+
+    def to_org(self, org: Union[Text, ProviderOrganization]) -> ProviderOrganization:
+        """Returns the organization of the provider named or aliased `org`."""
+
+        return self.provider(org).organization
+
+    def provider(self, org: Union[Text, ProviderOrganization]) -> "ProviderSpec":
+        """Returns the provider of the organization type, name or alias."""
+
+        if isinstance(org, OrganizationType):
+            name = org.value
+        else:
+            name = org.casefold().strip()
+            if name not in self.providers:
+                name = (
+                    next(
+                        (
+                            n
+                            for n, spec in self.providers.items()
+                            if name in spec.aliases
+                        ),
+                        None,
+                    )
+                    or to_org_type(org).value
                 )
-                for m in MODELS_VOYAGE
-            ]
-            self.model_add(_models)
-        except CredentialsNotProvided:
-            languru_logger.warning("Voyage OpenAI client not initialized.")
+        spec = self.providers.get(name)
+        if spec is None:
+            raise OrganizationNotFound(f"Unknown organization: '{org}'.")
+        return spec
+
+    def capabilities(
+        self, org: Union[Text, ProviderOrganization]
+    ) -> "ProviderCapabilities":
+        return self.provider(org).capabilities
+
+    def client(self, org: Union[Text, ProviderOrganization]) -> Optional["OpenAI"]:
+        """Returns the client of the organization, created on the first call,
+        or None if it can not be created.
+        """
+
+        spec = self.provider(org)
+        name = spec.name
+        _client = self._clients.get(name)
+        if _client is not None or name in self._clients_failed:
+            return _client
+        # Created outside `_clients_lock` under the lock of the provider, a
+        # slow client, e.g. starting local workers, does not block the others
+        with self._clients_lock:
+            create_lock = self._create_locks.setdefault(name, threading.Lock())
+        with create_lock:
+            if name in self._clients or name in self._clients_failed:
+                return self._clients.get(name)
+            try:
+                _client = spec.create_client()
+            except (OpenAIError, CredentialsNotProvided) as e:
+                languru_logger.warning(f"Client of '{name}' not initialized: {e}")
+                with self._clients_lock:
+                    self._clients_failed.add(name)
+                return None
+            with self._clients_lock:
+                self._clients[name] = _client
+        return _client
 
-    def org_in_model_name(self, model: Text) -> Optional[OrganizationType]:
+    def async_client(
+        self, org: Union[Text, ProviderOrganization]
+    ) -> Optional["AsyncOpenAI"]:
+        """Returns the async client of the organization by the async factory of
+        its provider, or None if the provider has no async client.
+        """
+
+        spec = self.provider(org)
+        if spec.name in self._async_clients:
+            return self._async_clients[spec.name]
+        _client = self.client(org)
+        if _client is None:
+            return None
+        async_client = spec.create_async_client(_client)
+        self._async_clients[spec.name] = async_client
+        return async_client
+
+    def close(self) -> None:
+        """Closes the created clients, they are created again on the next
+        call, e.g. the local clients shut down their worker processes.
+        """
+
+        with self._clients_lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+            self._async_clients.clear()
+        for name, _client in clients:
+            try:
+                _client.close()
+            except Exception as e:
+                languru_logger.warning(f"Failed to close client of '{name}': {e}")
+
+    def org_in_model_name(self, model: Text) -> Optional[ProviderOrganization]:
         _model = (model.strip() if model else None) or None
-        organization_type: Optional[OrganizationType] = None
+        organization_type: Optional[ProviderOrganization] = None
 
         # Try to extract organization type from the model name
         if _model and "/" in _model:
             might_org = _model.split("/")[0]
             try:
-                organization_type = to_org_type(might_org)
+                organization_type = self.to_org(might_org)
                 languru_logger.debug(
                     f"Organization type: '{organization_type}' of '{_model}'."
                 )
@@ -294,50 +298,140 @@ class OpenaiClients(OpenaiModels, OpenaiDepends):
                 pass
         return organization_type
 
-    def org_in_supported_models(self, model: Text) -> Optional[OrganizationType]:
+    def org_in_supported_models(self, model: Text) -> Optional[ProviderOrganization]:
         _model = (model.strip() if model else None) or None
         if _model is None:
             return None
-        # Try search supported models
-        organization_type: Optional[OrganizationType] = None
-        for _c, _org in (
-            (self._oai_client, OrganizationType.OPENAI),
-            (self._aoai_client, OrganizationType.AZURE),
-            (self._ant_client, OrganizationType.ANTHROPIC),
-            (self._gg_client, OrganizationType.GOOGLE),
-            (self._gq_client, OrganizationType.GROQ),
-            (self._pplx_client, OrganizationType.PERPLEXITY),
-            (self._vg_client, OrganizationType.VOYAGE),
-        ):
-            if _c is None:
+        # Try search supported models of the providers with credentials
+        organization_type: Optional[ProviderOrganization] = None
+        for name, spec in self.providers.items():
+            if name not in self._available_orgs and name not in self._clients:
                 continue
-            if isinstance(_c, OpenAI):
-                if model in MODELS_OPENAI:
-                    organization_type = _org
-                    languru_logger.debug(
-                        f"Organization type: '{organization_type}' of '{_model}'."
-                    )
-                    break
-            elif isinstance(_c, AzureOpenAI):
-                if model in MODELS_AZURE_OPENAI:
-                    organization_type = _org
-                    languru_logger.debug(
-                        f"Organization type: '{organization_type}' of '{_model}'."
-                    )
-                    break
-            elif hasattr(_c, "models") and hasattr(_c.models, "supported_models"):
-                if model in _c.models.supported_models:  # type: ignore
-                    organization_type = _org
-                    languru_logger.debug(
-                        f"Organization type: '{organization_type}' of '{_model}'."
-                    )
-                    break
+            if _model in spec.served_models():
+                organization_type = spec.organization
+                languru_logger.debug(
+                    f"Organization type: '{organization_type}' of '{_model}'."
+                )
+                break
+        # The OpenAI models are served by the first client, as every client is
+        # OpenAI compatible
+        if organization_type is None and _model in MODELS_OPENAI:
+            organization_type = next(
+                (
+                    spec.organization
+                    for name, spec in self.providers.items()
+                    if name in self._available_orgs or name in self._clients
+                ),
+                None,
+            )
+        # Try search the models discovered by `refresh_models`
+        if organization_type is None:
+            organization_type = self._discovered_models.get(_model)
         return organization_type
 
-    def org_from_model(self, model: Text) -> Optional[OrganizationType]:
+    def initialized_clients(self) -> List[Tuple["OpenAI", ProviderOrganization]]:
+        """Returns the created clients with their organization types."""
+
+        return [
+            (self._clients[name], spec.organization)
+            for name, spec in self.providers.items()
+            if name in self._clients
+        ]
+
+    def available_clients(self) -> List[Tuple["OpenAI", ProviderOrganization]]:
+        """Returns the clients of the providers with credentials, creating them
+        if needed.
+        """
+
+        out: List[Tuple["OpenAI", ProviderOrganization]] = []
+        for name, spec in self.providers.items():
+            if name not in self._available_orgs and name not in self._clients:
+                continue
+            _client = self.client(spec.organization)
+            if _client is not None:
+                out.append((_client, spec.organization))
+        return out
+
+    def refresh_models(self) -> List["Model"]:
+        """Loads the model lists of the initialized clients into the catalog,
+        returns the models discovered by this refresh.
+
+        The catalog serves `models` from memory, so only the refresh reaches
+        the providers. The refresh creates no client, so the SDK of a provider
+        no request has used yet is not imported. The models of a provider are
+        replaced by the ones it lists, so the models removed upstream are
+        evicted, while a model keeps its `created` once it is in the catalog.
+        The discovered models are routed to the organization which listed
+        them. A provider failing to list its models keeps its known models.
+        """
+
+        # List the models outside the lock, the providers may be slow
+        listed: Dict[Text, Tuple[ProviderOrganization, List[Any]]] = {}
+        for _c, _org in self.initialized_clients():
+            try:
+                listed_models = list(_c.models.list())
+            except Exception as e:
+                languru_logger.warning(f"Failed to list models of '{_org}': {e}")
+                continue
+            listed[self.provider(_org).name] = (_org, listed_models)
+
+        new_models: List["Model"] = []
+        with self._models_lock:
+            known_created = {m.id: m.created for m in self._models}
+            models = [m for m in self._models if m.owned_by not in listed]
+            discovered_models = {
+                k: v
+                for k, v in self._discovered_models.items()
+                if self.provider(v).name not in listed
+            }
+            model_ids = {m.id for m in models}
+            for name, (_org, listed_models) in listed.items():
+                for listed_model in listed_models:
+                    discovered_models.setdefault(listed_model.id, _org)
+                    if listed_model.id in model_ids:
+                        continue
+                    model_ids.add(listed_model.id)
+                    created = known_created.get(listed_model.id)
+                    if created is None:
+                        created = listed_model.created or int(time.time())
+                    model = Model.model_validate(
+                        {
+                            "id": listed_model.id,
+                            "created": created,
+                            "object": "model",
+                            "owned_by": name,
+                        }
+                    )
+                    models.append(model)
+                    if listed_model.id not in known_created:
+                        new_models.append(model)
+            # Swap in new containers, the readers never see a partial update
+            self._discovered_models = discovered_models
+            self._models = models
+        self.models_refreshed_at = time.time()
+        return new_models
+
+    def model_strip_org(
+        self, model: Text, org: Optional[Union[Text, ProviderOrganization]] = None
+    ) -> Text:
+        """Strips the organization type or provider name from the model name."""
+
+        if org is not None:
+            spec = self.provider(org)
+            names = [spec.name] + [a.casefold() for a in spec.aliases]
+        else:
+            names = [o.value for o in OrganizationType] + list(self.providers)
+        model = model.strip()
+        model_lower = model.lower()
+        for name in names:
+            if model_lower.startswith(f"{name.lower()}/"):
+                return model.split("/", 1)[-1]
+        return model
+
+    def org_from_model(self, model: Text) -> Optional[ProviderOrganization]:
         """Returns the organization type based on the model name."""
 
-        organization_type: Optional[OrganizationType] = None
+        organization_type: Optional[ProviderOrganization] = None
         if organization_type is None:
             organization_type = self.org_in_model_name(model)
         if organization_type is None:
@@ -345,29 +439,11 @@ class OpenaiClients(OpenaiModels, OpenaiDepends):
         return organization_type
 
     def org_to_openai_client(
-        self, org: Union[Text, "OrganizationType", Any]
+        self, org: Union[Text, ProviderOrganization, Any]
     ) -> "OpenAI":
         """Returns the OpenAI client based on the organization type."""
 
-        if not isinstance(org, OrganizationType):
-            org = to_org_type(org)
-        _client: Optional["OpenAI"] = None
-        if org == OrganizationType.OPENAI:
-            _client = self._oai_client
-        elif org == OrganizationType.AZURE:
-            _client = self._aoai_client
-        elif org == OrganizationType.ANTHROPIC:
-            _client = self._ant_client
-        elif org == OrganizationType.GOOGLE:
-            _client = self._gg_client
-        elif org == OrganizationType.GROQ:
-            _client = self._gq_client
-        elif org == OrganizationType.PERPLEXITY:
-            _client = self._pplx_client
-        elif org == OrganizationType.VOYAGE:
-            _client = self._vg_client
-        else:
-            raise OrganizationNotFound(f"Unknown organization: '{org}'.")
+        _client = self.client(org)
         if _client is None:
             raise OrganizationNotFound(
                 f"Organization '{org}' client not not initialized."
@@ -378,9 +454,10 @@ class OpenaiClients(OpenaiModels, OpenaiDepends):
         """Returns the default OpenAI client."""
 
         # logger.warning("No organization type specified. Using OpenAI by default.")
-        if self._oai_client is None:
+        _client = self.client(OrganizationType.OPENAI)
+        if _client is None:
             raise OrganizationNotFound("OpenAI client not initialized.")
-        return self._oai_client
+        return _client
 
 
 openai_clients = OpenaiClients()
@@ -389,15 +466,26 @@ openai_clients = OpenaiClients()
 def openai_client_from_model(
     model: Text,
     *,
-    org_type: Optional[OrganizationType] = None,
+    org_type: Optional[ProviderOrganization] = None,
     openai_clients: OpenaiClients = openai_clients,
-) -> Tuple[OpenAI, OrganizationType, Text]:
-    """Returns the OpenAI client and the model name without organization type."""
+    capability: Optional["Capability"] = None,
+) -> Tuple[OpenAI, ProviderOrganization, Text]:
+    """Returns the OpenAI client and the model name without organization type.
+
+    With `capability`, the organization must support it.
+    """
 
     if org_type is None:
         org_type = openai_clients.org_from_model(model)
     if org_type is None:
         raise HTTPException(status_code=400, detail="Organization type not found.")
+    if capability is not None and not (
+        openai_clients.capabilities(org_type).supports(capability)
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Organization '{org_type}' does not support {capability}.",
+        )
 
     model_without_org = openai_clients.model_strip_org(model, org_type)
     openai_client = openai_clients.org_to_openai_client(org_type)
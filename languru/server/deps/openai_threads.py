@@ -15,11 +15,12 @@ from pyassorted.asyncio.executor import run_func
 
 from languru.config import logger as languru_logger
 from languru.exceptions import NotFound
-from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.resources.openai_backend import BaseOpenaiBackend
 from languru.server.deps.openai_backend import depends_openai_backend
 from languru.server.deps.openai_clients import openai_client_from_model, openai_clients
 from languru.server.utils.common import get_value_from_app
 from languru.types.openai_threads import (
+    RunSubmitToolOutputsRequest,
     ThreadCreateAndRunRequest,
     ThreadCreateRequest,
     ThreadsRunCreate,
@@ -29,7 +30,7 @@ from languru.utils.common import display_object
 
 
 async def _retrieve_assistant(
-    assistant: Text, *, openai_backend: OpenaiBackend
+    assistant: Text, *, openai_backend: BaseOpenaiBackend
 ) -> Assistant:
     """Retrieve an assistant from the OpenAI backend."""
 
@@ -43,25 +44,20 @@ async def _retrieve_assistant(
 
 
 async def _list_messages(
-    thread_id: Text, *, openai_backend: OpenaiBackend
+    thread_id: Text, *, openai_backend: BaseOpenaiBackend
 ) -> List[ThreadsMessage]:
     """List messages in a thread from the OpenAI backend."""
 
+    # The chat completion request only needs the roles and contents
     messages = await run_func(
         openai_backend.threads.messages.list,
         thread_id=thread_id,
+        order="asc",
+        exclude=("incomplete_details", "metadata"),
     )
     return messages
 
 
-async def _create_thread(
-    thread: "Thread", messages: List["ThreadsMessage"], *, openai_backend: OpenaiBackend
-) -> "Thread":
-    """Create a thread and messages in the OpenAI backend."""
-
-    return openai_backend.threads.create(thread=thread, messages=messages or None)
-
-
 async def depends_thread_id_run_messages_assistant_openai_client_backend(
     request: "Request",
     org_type: Optional[OrganizationType] = Depends(openai_clients.depends_org_type),
@@ -73,8 +69,10 @@ async def depends_thread_id_run_messages_assistant_openai_client_backend(
         ...,
         description="The parameters for creating a run.",
     ),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
-) -> Tuple[Text, ThreadsRun, List[ThreadsMessage], Assistant, OpenAI, OpenaiBackend]:
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
+) -> Tuple[
+    Text, ThreadsRun, List[ThreadsMessage], Assistant, OpenAI, BaseOpenaiBackend
+]:
     """Returns the thread ID, the OpenAI threads run, the OpenAI client, and the backend.
 
     Note
@@ -82,7 +80,7 @@ async def depends_thread_id_run_messages_assistant_openai_client_backend(
     * The assistant is retrieved from the OpenAI backend.
     * The messages are listed from the OpenAI backend.
     * The additional instructions are append after the assistant instructions in the Run progressing lifecycle.
-    * The additional messages are appended to the thread messages in the Run progressing lifecycle.
+    * The additional messages are saved to the thread and appended to the thread messages.
     * The assistant model is used if not specified, and would be validated for OpenAI client.
     """  # noqa: E501
 
@@ -110,10 +108,14 @@ async def depends_thread_id_run_messages_assistant_openai_client_backend(
 
     # Append additional messages
     if run_create_request.additional_messages:
-        for m in run_create_request.additional_messages:
-            messages.append(
-                m.to_openai_message(thread_id=thread_id, status="completed")
-            )
+        additional_messages = [
+            m.to_openai_message(thread_id=thread_id, status="completed")
+            for m in run_create_request.additional_messages
+        ]
+        await run_func(
+            openai_backend.threads.messages.create_many, messages=additional_messages
+        )
+        messages.extend(additional_messages)
 
     # Create the OpenAI threads run
     run = run_create_request.to_openai_run(
@@ -121,6 +123,7 @@ async def depends_thread_id_run_messages_assistant_openai_client_backend(
         status="queued",
         default_instructions=assistant.instructions or "",
         default_temperature=assistant.temperature or 0.5,
+        default_tools=assistant.tools,
         enable_additional_instructions=True,
     )
 
@@ -152,8 +155,18 @@ async def depends_thread_create_and_run(
             }
         },
     ),
-    openai_backend: OpenaiBackend = Depends(depends_openai_backend),
-) -> Tuple[Thread, ThreadsRun, List[ThreadsMessage], Assistant, OpenAI, OpenaiBackend]:
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
+) -> Tuple[
+    Thread, ThreadsRun, List[ThreadsMessage], Assistant, OpenAI, BaseOpenaiBackend
+]:
+    """Returns the thread, the queued run, the messages, the assistant,
+    the OpenAI client, and the backend.
+
+    Note
+    ----
+    * The thread, messages and run are not saved yet, the endpoint writes them
+      in a single transaction with `threads.create_and_run`.
+    """
 
     logger = get_value_from_app(
         request.app, key="logger", value_typing=Logger, default=languru_logger
@@ -174,14 +187,10 @@ async def depends_thread_create_and_run(
         and thread_create_and_run_request.thread.messages
         else []
     )
-    openai_backend.threads.create(thread=thread, messages=messages or None)
 
-    # Get the assistant and threads messages
-    assistant, thread = await asyncio.gather(
-        _retrieve_assistant(
-            thread_create_and_run_request.assistant_id, openai_backend=openai_backend
-        ),
-        _create_thread(thread, messages, openai_backend=openai_backend),
+    # Get the assistant, the thread is saved together with the run
+    assistant = await _retrieve_assistant(
+        thread_create_and_run_request.assistant_id, openai_backend=openai_backend
     )
 
     # Retrieve the model if not specified
@@ -200,6 +209,7 @@ async def depends_thread_create_and_run(
         status="queued",
         default_instructions=assistant.instructions or "",
         default_temperature=assistant.temperature or 0.5,
+        default_tools=assistant.tools,
     )
 
     logger.debug(
@@ -209,3 +219,58 @@ async def depends_thread_create_and_run(
         + f"model: '{thread_create_and_run_request.model}'"
     )
     return (thread, run, messages, assistant, openai_client, openai_backend)
+
+
+async def depends_run_submit_tool_outputs(
+    request: "Request",
+    org_type: Optional[OrganizationType] = Depends(openai_clients.depends_org_type),
+    thread_id: Text = QueryPath(
+        ...,
+        description="The ID of the thread containing the run.",
+    ),
+    run_id: Text = QueryPath(
+        ...,
+        description="The ID of the run to submit tool outputs for.",
+    ),
+    run_submit_tool_outputs_request: RunSubmitToolOutputsRequest = Body(
+        ...,
+        description="The parameters for submitting tool outputs for a run.",
+    ),
+    openai_backend: BaseOpenaiBackend = Depends(depends_openai_backend),
+) -> Tuple[ThreadsRun, List[ThreadsMessage], OpenAI, BaseOpenaiBackend]:
+    """Returns the run waiting for the submitted tool outputs, the thread
+    messages, the OpenAI client, and the backend.
+
+    Note
+    ----
+    * The outputs must answer exactly the tool calls of the required action.
+    """
+
+    try:
+        run = await run_func(
+            openai_backend.threads.runs.retrieve, run_id=run_id, thread_id=thread_id
+        )
+    except NotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if run.status != "requires_action" or run.required_action is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Run '{run_id}' with status '{run.status}' is not waiting "
+            + "for tool outputs.",
+        )
+
+    tool_call_ids = {c.id for c in run.required_action.submit_tool_outputs.tool_calls}
+    submitted_ids = {
+        o.tool_call_id for o in run_submit_tool_outputs_request.tool_outputs
+    }
+    if submitted_ids != tool_call_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="Tool outputs must be submitted for all the tool calls, "
+            + f"missing: {sorted(tool_call_ids - submitted_ids)}, "
+            + f"unknown: {sorted(submitted_ids - tool_call_ids)}.",
+        )
+
+    messages = await _list_messages(thread_id, openai_backend=openai_backend)
+    openai_client, _, _ = openai_client_from_model(run.model, org_type=org_type)
+    return (run, messages, openai_client, openai_backend)
@@ -0,0 +1,18 @@
+from fastapi import Request
+
+from languru.server.config import APP_STATE_RUN_TASKS, APP_STATE_RUN_TOOLS
+from languru.server.utils.common import get_value_from_app
+from languru.tasks.openai_threads import RunTasks
+from languru.tasks.run_tools import RunTools
+
+
+def depends_run_tasks(request: Request) -> "RunTasks":
+    return get_value_from_app(
+        request.app, key=APP_STATE_RUN_TASKS, value_typing=RunTasks
+    )
+
+
+def depends_run_tools(request: Request) -> "RunTools":
+    return get_value_from_app(
+        request.app, key=APP_STATE_RUN_TOOLS, value_typing=RunTools
+    )
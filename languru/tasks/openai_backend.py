@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Dict, Optional
+
+from pyassorted.asyncio.executor import run_func
+
+from languru.config import logger as languru_logger
+
+if TYPE_CHECKING:
+    from languru.resources.openai_backend import BaseOpenaiBackend
+
+
+async def task_openai_backend_maintenance(
+    openai_backend: "BaseOpenaiBackend",
+    *,
+    run_expires_after: int = 600,
+    run_retention: Optional[int] = None,
+    thread_retention: Optional[int] = None,
+    compact: bool = True,
+    logger: Optional[logging.Logger] = None,
+) -> Dict[str, int]:
+    """Run one pass of the OpenAI backend retention and compaction jobs.
+
+    Parameters
+    ----------
+    openai_backend : BaseOpenaiBackend
+        The OpenAI backend instance
+    run_expires_after : int, optional
+        The lifetime in seconds of runs without `expires_at`, by default 600
+    run_retention : Optional[int], optional
+        The seconds to keep finished runs, by default None which keeps them
+    thread_retention : Optional[int], optional
+        The seconds to keep idle threads, by default None which keeps them
+    compact : bool, optional
+        Whether to compact the database afterwards, by default True
+    logger : Optional[logging.Logger], optional
+        The logger, by default the languru logger
+
+    Returns
+    -------
+    Dict[str, int]
+        The number of affected rows per job
+    """
+
+    logger = logger or languru_logger
+    result = {
+        "expired_runs": await run_func(
+            openai_backend.threads.runs.expire, expires_after=run_expires_after
+        ),
+        "deleted_runs": 0,
+        "deleted_threads": 0,
+        "deleted_orphans": await run_func(openai_backend.threads.delete_orphans),
+    }
+    if run_retention is not None:
+        result["deleted_runs"] = await run_func(
+            openai_backend.threads.runs.delete_finished, older_than=run_retention
+        )
+    if thread_retention is not None:
+        result["deleted_threads"] = await run_func(
+            openai_backend.threads.delete_idle, idle_seconds=thread_retention
+        )
+    if compact:
+        await run_func(openai_backend.compact)
+
+    logger.debug(f"OpenAI backend maintenance: {result}")
+    return result
+
+
+async def loop_openai_backend_maintenance(
+    openai_backend: "BaseOpenaiBackend",
+    *,
+    interval: float,
+    logger: Optional[logging.Logger] = None,
+    **kwargs,
+) -> None:
+    """Run `task_openai_backend_maintenance` every `interval` seconds until
+    cancelled, starting immediately so stale runs left by a restart expire.
+    """
+
+    logger = logger or languru_logger
+    while True:
+        try:
+            await task_openai_backend_maintenance(
+                openai_backend, logger=logger, **kwargs
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"OpenAI backend maintenance failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,816 @@
+import asyncio
+import functools
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext, suppress
+from pathlib import Path
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Text,
+    Tuple,
+)
+
+from openai import APIStatusError
+
+from languru.config import logger
+from languru.exceptions import InvalidRequest
+from languru.resources.local.openai.batches import TERMINAL_BATCH_STATUSES
+from languru.utils.openai_utils import rand_openai_id
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from openai.types.batch import Batch
+    from openai.types.file_deleted import FileDeleted
+
+    from languru.openai_plugins.registry import Capability, ProviderOrganization
+    from languru.resources.local.openai.batches import BatchClaim, LocalBatches
+    from languru.resources.local.openai.files import LocalFiles
+    from languru.server.deps.openai_clients import OpenaiClients
+
+
+BATCH_ENDPOINTS: Dict[Text, Callable[["OpenAI"], Callable[..., Any]]] = {
+    "/v1/chat/completions": lambda client: client.chat.completions.create,
+    "/v1/completions": lambda client: client.completions.create,
+    "/v1/embeddings": lambda client: client.embeddings.create,
+}
+BATCH_ENDPOINT_CAPABILITIES: Dict[Text, "Capability"] = {
+    "/v1/chat/completions": "chat",
+    "/v1/completions": "completions",
+    "/v1/embeddings": "embeddings",
+}
+CANCELLABLE_BATCH_STATUSES = ("validating", "in_progress", "finalizing")
+UNFINISHED_BATCH_STATUSES = CANCELLABLE_BATCH_STATUSES + ("cancelling",)
+
+
+class BatchProgress:
+    """The custom IDs of the requests with a result line and the counts of
+    the output and error lines.
+    """
+
+    def __init__(self):
+        self.done: Set[Text] = set()
+        self.completed = 0
+        self.failed = 0
+
+    def add(self, custom_id: Text, *, failed: bool) -> None:
+        self.done.add(custom_id)
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+
+class BatchWorker:
+    """Execute the batches of the `/v1/batches` API on the server event loop.
+
+    The requests of a batch are sent at most `concurrency` at a time through
+    the client routed from their model, and at most `max_concurrency` of the
+    provider capabilities at a time to a provider. Each result is appended to
+    the output or error file of the batch as soon as it arrives, by a writer
+    thread of the batch off the event loop. The request counts are
+    checkpointed every `checkpoint_interval` seconds, and a batch interrupted
+    by a crash or a shutdown is resumed from its result files, skipping the
+    requests which already have a result.
+
+    A batch is executed by the server worker holding its claim. The unfinished
+    batches without one, e.g. of a crashed worker, are resumed by `start` and
+    then every `resume_interval` seconds.
+
+    Parameters
+    ----------
+    files : LocalFiles
+        The store of the input, output and error files.
+    batches : LocalBatches
+        The store of the batches.
+    openai_clients : OpenaiClients
+        The clients the requests are routed to.
+    concurrency : int, optional
+        The number of requests of a batch in flight, by default 64.
+    checkpoint_interval : float, optional
+        The seconds between checkpoints of the progress, by default 5.0.
+    resume_interval : float, optional
+        The seconds between the scans for unclaimed batches, by default 60.0.
+    """
+
+    def __init__(
+        self,
+        files: "LocalFiles",
+        batches: "LocalBatches",
+        *,
+        openai_clients: "OpenaiClients",
+        concurrency: int = 64,
+        checkpoint_interval: float = 5.0,
+        resume_interval: float = 60.0,
+    ):
+        self.files = files
+        self.batches = batches
+        self.openai_clients = openai_clients
+        self.concurrency = concurrency
+        self.checkpoint_interval = checkpoint_interval
+        self.resume_interval = resume_interval
+        self._tasks: Dict[Text, "asyncio.Task[Batch]"] = {}
+        self._resume_task: Optional["asyncio.Task[None]"] = None
+        self._progress: Dict[Text, BatchProgress] = {}
+        self._provider_semaphores: Dict[Text, asyncio.Semaphore] = {}
+        self._closing = False
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, batch_id: Text) -> bool:
+        return batch_id in self._tasks
+
+    async def start(self) -> None:
+        """Resume the unfinished batches which no process has claimed, now and
+        every `resume_interval` seconds.
+        """
+
+        self._closing = False
+        await self.resume()
+        self._resume_task = asyncio.create_task(self._resume_loop())
+
+    async def resume(self) -> int:
+        """Claim and resume the unfinished batches of no other process,
+        returns the number of resumed batches.
+        """
+
+        batches = await asyncio.to_thread(
+            self.batches.list, limit=sys.maxsize, statuses=UNFINISHED_BATCH_STATUSES
+        )
+        resumed = 0
+        for batch in batches:
+            if batch.id in self._tasks:
+                continue
+            claim = await asyncio.to_thread(self.batches.claim, batch.id)
+            if claim is None:  # Executed by another process
+                continue
+            logger.info(f"Batch resumed: batch_id={batch.id} status={batch.status}")
+            self.submit(batch.id, claim=claim)
+            resumed += 1
+        return resumed
+
+    def submit(
+        self, batch_id: Text, *, claim: Optional["BatchClaim"] = None
+    ) -> "asyncio.Task[Batch]":
+        """Schedule the batch on the running loop, returns its task.
+
+        The task claims the batch unless `claim` is given, and does nothing
+        if another process holds the claim.
+        """
+
+        task = self._tasks.get(batch_id)
+        if task is not None and not task.done():
+            if claim is not None:
+                claim.release()
+            return task
+        task = asyncio.create_task(self.process(batch_id, claim=claim))
+        self._tasks[batch_id] = task
+        task.add_done_callback(functools.partial(self._discard, batch_id))
+        return task
+
+    def cancel(self, batch_id: Text) -> bool:
+        """Cancel the task of the batch, returns False if it is not in flight.
+
+        The batch is finished as `cancelled` with its partial results if it
+        is `cancelling`.
+        """
+
+        task = self._tasks.get(batch_id)
+        if task is None or task.done():
+            return False
+        return task.cancel()
+
+    async def shutdown(self) -> None:
+        """Stop the batch tasks, the batches are resumed on the next start."""
+
+        self._closing = True
+        if self._resume_task is not None:
+            self._resume_task.cancel()
+            await asyncio.gather(self._resume_task, return_exceptions=True)
+            self._resume_task = None
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def delete_file(self, file_id: Text) -> "FileDeleted":
+        """Delete the file, unless it is the input of an unfinished batch.
+
+        Raises
+        ------
+        InvalidRequest
+            If an unfinished batch reads the file.
+        NotFound
+            If the file does not exist.
+        """
+
+        for batch in self.batches.list(
+            limit=sys.maxsize, statuses=UNFINISHED_BATCH_STATUSES
+        ):
+            if batch.input_file_id == file_id:
+                raise InvalidRequest(
+                    f"The file '{file_id}' is the input of the batch '{batch.id}' "
+                    + f"with status '{batch.status}'."
+                )
+        return self.files.delete(file_id)
+
+    async def process(
+        self, batch_id: Text, *, claim: Optional["BatchClaim"] = None
+    ) -> "Batch":
+        """Validate, execute and finalize the batch from its current status,
+        holding its claim.
+        """
+
+        if claim is None:
+            claim = await asyncio.to_thread(self.batches.claim, batch_id)
+            if claim is None:
+                logger.info(f"Batch claimed by another process: batch_id={batch_id}")
+                return await asyncio.to_thread(self.batches.retrieve, batch_id)
+        batch: Optional["Batch"] = None
+        try:
+            batch = await self._process(batch_id)
+            return batch
+        finally:
+            claim.release(
+                unlink=batch is not None and batch.status in TERMINAL_BATCH_STATUSES
+            )
+
+    async def _process(self, batch_id: Text) -> "Batch":
+        try:
+            batch = await asyncio.to_thread(self.batches.retrieve, batch_id)
+            if batch.status == "validating":
+                batch = await self._validate(batch)
+            if batch.status == "in_progress":
+                batch = await self._execute(batch)
+            if batch.status in ("in_progress", "finalizing"):
+                batch = await self._finish(
+                    batch,
+                    from_statuses=("in_progress", "finalizing"),
+                    status="completed",
+                )
+            if batch.status == "cancelling":
+                batch = await self._finish(
+                    batch, from_statuses=("cancelling",), status="cancelled"
+                )
+            return batch
+        except asyncio.CancelledError:
+            if self._closing:
+                raise
+            batch = await asyncio.to_thread(self.batches.retrieve, batch_id)
+            if batch.status != "cancelling":
+                raise
+            logger.info(f"Batch task cancelled: batch_id={batch_id}")
+            return await self._finish(
+                batch, from_statuses=("cancelling",), status="cancelled"
+            )
+        finally:
+            self._progress.pop(batch_id, None)
+
+    async def _validate(self, batch: "Batch") -> "Batch":
+        total, errors = await asyncio.to_thread(
+            validate_batch_input, self.files.path(batch.input_file_id), batch.endpoint
+        )
+        if total == 0 and not errors:
+            errors = [_batch_error("empty_file", "The input file has no requests.")]
+        if errors:
+            logger.info(
+                f"Batch failed validation: batch_id={batch.id} errors={len(errors)}"
+            )
+            batch_next = await asyncio.to_thread(
+                self.batches.transition,
+                batch.id,
+                from_statuses=("validating",),
+                status="failed",
+                failed_at=int(time.time()),
+                errors={"object": "list", "data": errors},
+            )
+        else:
+            batch_next = await asyncio.to_thread(
+                self.batches.transition,
+                batch.id,
+                from_statuses=("validating",),
+                status="in_progress",
+                in_progress_at=int(time.time()),
+                request_counts={"total": total, "completed": 0, "failed": 0},
+            )
+        # None if the batch was cancelled meanwhile
+        return batch_next or await asyncio.to_thread(self.batches.retrieve, batch.id)
+
+    async def _execute(self, batch: "Batch") -> "Batch":
+        if batch.output_file_id is None or batch.error_file_id is None:
+            output_file, error_file = await asyncio.gather(
+                asyncio.to_thread(
+                    self.files.create,
+                    b"",
+                    filename=f"{batch.id}_output.jsonl",
+                    purpose="batch_output",
+                ),
+                asyncio.to_thread(
+                    self.files.create,
+                    b"",
+                    filename=f"{batch.id}_error.jsonl",
+                    purpose="batch_output",
+                ),
+            )
+            batch = await asyncio.to_thread(
+                self.batches.update,
+                batch.id,
+                output_file_id=output_file.id,
+                error_file_id=error_file.id,
+            )
+        assert batch.output_file_id is not None and batch.error_file_id is not None
+
+        output_path = self.files.path(batch.output_file_id)
+        error_path = self.files.path(batch.error_file_id)
+        progress = await asyncio.to_thread(scan_batch_results, output_path, error_path)
+        self._progress[batch.id] = progress
+        total = batch.request_counts.total if batch.request_counts else None
+        logger.info(
+            f"Batch started: batch_id={batch.id} total={total} "
+            + f"done={len(progress.done)}"
+        )
+
+        # A single writer keeps the result lines and the progress in order
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=batch.id)
+        with output_path.open("ab") as output_f, error_path.open("ab") as error_f:
+            checkpoint_task = asyncio.create_task(
+                self._checkpoint_loop(batch, progress, writer, output_f, error_f)
+            )
+            try:
+                expired = await self._send_requests(
+                    batch, progress, writer, output_f, error_f
+                )
+            finally:
+                checkpoint_task.cancel()
+                await asyncio.gather(checkpoint_task, return_exceptions=True)
+                # The pending writes of cancelled requests land before the close
+                await asyncio.to_thread(writer.shutdown)
+                await asyncio.to_thread(_flush, output_f, error_f)
+                await self._checkpoint(batch, progress)
+
+        if expired:
+            return await self._finish(
+                batch, from_statuses=("in_progress",), status="expired"
+            )
+        batch = await asyncio.to_thread(
+            self.batches.transition,
+            batch.id,
+            from_statuses=("in_progress",),
+            status="finalizing",
+            finalizing_at=int(time.time()),
+        ) or await asyncio.to_thread(self.batches.retrieve, batch.id)
+        return batch
+
+    async def _send_requests(
+        self,
+        batch: "Batch",
+        progress: BatchProgress,
+        writer: ThreadPoolExecutor,
+        output_f: IO[bytes],
+        error_f: IO[bytes],
+    ) -> bool:
+        """Send the requests without a result, returns True if the batch
+        expired before all of them were sent.
+        """
+
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Optional[Dict[Text, Any]]]" = asyncio.Queue(
+            maxsize=self.concurrency * 2
+        )
+        expired = False
+
+        async def _write(line: Dict[Text, Any], *, failed: bool) -> None:
+            await loop.run_in_executor(
+                writer,
+                functools.partial(
+                    _write_result,
+                    error_f if failed else output_f,
+                    line,
+                    progress,
+                    failed=failed,
+                ),
+            )
+
+        async def _produce() -> None:
+            nonlocal expired
+            chunks = iter_batch_input(self.files.path(batch.input_file_id))
+            try:
+                while (
+                    chunk := await asyncio.to_thread(next, chunks, None)
+                ) is not None:
+                    for request in chunk:
+                        if request["custom_id"] in progress.done:
+                            continue
+                        if expired or time.time() > batch.expires_at:
+                            expired = True
+                            await _write(
+                                _result_line(
+                                    request["custom_id"],
+                                    error={
+                                        "code": "batch_expired",
+                                        "message": "This request could not be executed before the completion window expired.",  # noqa: E501
+                                    },
+                                ),
+                                failed=True,
+                            )
+                            continue
+                        await queue.put(request)
+            finally:
+                with suppress(ValueError):  # Cancelled while reading a chunk
+                    chunks.close()
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def _consume() -> None:
+            while (request := await queue.get()) is not None:
+                line, failed = await self._request(batch, request)
+                await _write(line, failed=failed)
+
+        tasks = [asyncio.create_task(_produce())] + [
+            asyncio.create_task(_consume()) for _ in range(self.concurrency)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return expired
+
+    async def _request(
+        self, batch: "Batch", request: Dict[Text, Any]
+    ) -> Tuple[Dict[Text, Any], bool]:
+        """Send the request, returns its result line and if it failed."""
+
+        body = dict(request["body"])
+        body.pop("stream", None)
+        org: Optional["ProviderOrganization"] = None
+        try:
+            org, body["model"] = self._route(
+                body["model"], BATCH_ENDPOINT_CAPABILITIES[batch.endpoint]
+            )
+            openai_client = self.openai_clients.org_to_openai_client(org)
+            self._check_batch_size(batch, org, body)
+            async with self._provider_limit(org):
+                async_client = self.openai_clients.async_client(org)
+                if async_client is not None:
+                    response = await BATCH_ENDPOINTS[batch.endpoint](async_client)(
+                        **body
+                    )
+                else:
+                    response = await asyncio.to_thread(
+                        BATCH_ENDPOINTS[batch.endpoint](openai_client), **body
+                    )
+        except APIStatusError as e:
+            if e.status_code == 429 and org is not None:
+                prefixes = self.openai_clients.capabilities(org).rate_limit_headers
+                headers = {
+                    k: v
+                    for k, v in e.response.headers.items()
+                    if k.lower().startswith(prefixes)
+                }
+                logger.warning(
+                    f"Batch request rate limited: batch_id={batch.id} org={org} "
+                    + f"headers={headers}"
+                )
+            return (
+                _result_line(
+                    request["custom_id"],
+                    response={
+                        "status_code": e.status_code,
+                        "request_id": e.request_id,
+                        "body": e.body,
+                    },
+                ),
+                True,
+            )
+        except InvalidRequest as e:
+            return (
+                _result_line(
+                    request["custom_id"],
+                    response={
+                        "status_code": 400,
+                        "request_id": None,
+                        "body": {"error": {"message": str(e)}},
+                    },
+                ),
+                True,
+            )
+        except Exception as e:
+            logger.warning(
+                f"Batch request failed: batch_id={batch.id} "
+                + f"custom_id={request['custom_id']} error={e!r}"
+            )
+            return (
+                _result_line(
+                    request["custom_id"],
+                    error={"code": type(e).__name__, "message": str(e)},
+                ),
+                True,
+            )
+        return (
+            _result_line(
+                request["custom_id"],
+                response={
+                    "status_code": 200,
+                    "request_id": getattr(response, "_request_id", None),
+                    "body": response.model_dump(mode="json", exclude_unset=True),
+                },
+            ),
+            False,
+        )
+
+    def _route(
+        self, model: Text, capability: "Capability"
+    ) -> Tuple["ProviderOrganization", Text]:
+        """Returns the organization of the model supporting the capability
+        and the model name without organization type.
+        """
+
+        org = self.openai_clients.org_from_model(model)
+        if org is None:
+            raise InvalidRequest("Organization type not found.")
+        if not self.openai_clients.capabilities(org).supports(capability):
+            raise InvalidRequest(f"Organization '{org}' does not support {capability}.")
+        return (org, self.openai_clients.model_strip_org(model, org))
+
+    def _check_batch_size(
+        self, batch: "Batch", org: "ProviderOrganization", body: Dict[Text, Any]
+    ) -> None:
+        """Reject the embeddings of more inputs than the provider accepts."""
+
+        if batch.endpoint != "/v1/embeddings":
+            return
+        max_batch_size = self.openai_clients.capabilities(org).max_batch_size
+        inputs = body.get("input")
+        if (
+            max_batch_size is not None
+            and isinstance(inputs, list)
+            and inputs
+            and not isinstance(inputs[0], int)  # A single input of tokens
+            and len(inputs) > max_batch_size
+        ):
+            raise InvalidRequest(
+                f"The {len(inputs)} inputs exceed the batch size limit "
+                + f"{max_batch_size} of '{org}'."
+            )
+
+    def _provider_limit(self, org: "ProviderOrganization"):
+        """The semaphore of the provider with a concurrency limit."""
+
+        spec = self.openai_clients.provider(org)
+        max_concurrency = spec.capabilities.max_concurrency
+        if max_concurrency is None:
+            return nullcontext()
+        semaphore = self._provider_semaphores.get(spec.name)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            self._provider_semaphores[spec.name] = semaphore
+        return semaphore
+
+    async def _checkpoint_loop(
+        self,
+        batch: "Batch",
+        progress: BatchProgress,
+        writer: ThreadPoolExecutor,
+        output_f: IO[bytes],
+        error_f: IO[bytes],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            await loop.run_in_executor(writer, _flush, output_f, error_f)
+            batch_checkpoint = await self._checkpoint(batch, progress)
+            # Cancelled through another worker
+            if batch_checkpoint.status == "cancelling":
+                self.cancel(batch.id)
+                return
+
+    async def _checkpoint(self, batch: "Batch", progress: BatchProgress) -> "Batch":
+        total = batch.request_counts.total if batch.request_counts else 0
+        return await asyncio.to_thread(
+            self.batches.update,
+            batch.id,
+            request_counts={
+                "total": total,
+                "completed": progress.completed,
+                "failed": progress.failed,
+            },
+        )
+
+    async def _finish(
+        self, batch: "Batch", *, from_statuses: Tuple[Text, ...], status: Text
+    ) -> "Batch":
+        """Publish the result files and set the terminal status of the batch."""
+
+        progress = self._progress.get(batch.id)
+        if progress is None and batch.output_file_id and batch.error_file_id:
+            progress = await asyncio.to_thread(
+                scan_batch_results,
+                self.files.path(batch.output_file_id),
+                self.files.path(batch.error_file_id),
+            )
+        file_ids: Dict[Text, Optional[Text]] = {}
+        for key, file_id in (
+            ("output_file_id", batch.output_file_id),
+            ("error_file_id", batch.error_file_id),
+        ):
+            if file_id is None:
+                continue
+            file_obj = await asyncio.to_thread(
+                self.files.refresh, file_id, status="processed"
+            )
+            # Like OpenAI, a batch without any output or error has no such file
+            if file_obj.bytes == 0:
+                await asyncio.to_thread(self.files.delete, file_id)
+                file_ids[key] = None
+
+        now = int(time.time())
+        timestamps = {
+            "completed": {"completed_at": now},
+            "cancelled": {"cancelled_at": now},
+            "expired": {"expired_at": now},
+        }[status]
+        counts = {}
+        if progress is not None:
+            total = batch.request_counts.total if batch.request_counts else 0
+            counts["request_counts"] = {
+                "total": total,
+                "completed": progress.completed,
+                "failed": progress.failed,
+            }
+        batch_finished = await asyncio.to_thread(
+            self.batches.transition,
+            batch.id,
+            from_statuses=from_statuses,
+            status=status,
+            **file_ids,
+            **timestamps,
+            **counts,
+        )
+        if batch_finished is None:
+            # Cancelled while it was finalized
+            batch = await asyncio.to_thread(self.batches.retrieve, batch.id)
+            if batch.status != "cancelling":
+                return batch
+            return await self._finish(
+                batch, from_statuses=("cancelling",), status="cancelled"
+            )
+        logger.info(
+            f"Batch finished: batch_id={batch.id} status={status} "
+            + f"completed={progress.completed if progress else None} "
+            + f"failed={progress.failed if progress else None}"
+        )
+        return batch_finished
+
+    async def _resume_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.resume_interval)
+            try:
+                await self.resume()
+            except Exception as e:
+                logger.warning(f"Batch resume failed: error={e!r}")
+
+    def _discard(self, batch_id: Text, task: "asyncio.Task[Batch]") -> None:
+        if self._tasks.get(batch_id) is task:
+            del self._tasks[batch_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"Batch task failed: batch_id={batch_id}", exc_info=task.exception()
+            )
+
+
+def validate_batch_input(
+    path: Path, endpoint: Text, *, max_errors: int = 100
+) -> Tuple[int, List[Dict[Text, Any]]]:
+    """Validate the lines of the input file, returns the number of requests
+    and the errors of the invalid lines.
+    """
+
+    total = 0
+    errors: List[Dict[Text, Any]] = []
+    custom_ids: Set[Text] = set()
+    with path.open("rb") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            total += 1
+            error = _validate_batch_request(line, endpoint, custom_ids)
+            if error is not None:
+                errors.append(_batch_error(*error, line=line_no))
+                if len(errors) >= max_errors:
+                    break
+    return (total, errors)
+
+
+def _validate_batch_request(
+    line: bytes, endpoint: Text, custom_ids: Set[Text]
+) -> Optional[Tuple[Text, Text, Optional[Text]]]:
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return ("invalid_json_line", "This line is not parseable as valid JSON.", None)
+    if not isinstance(request, Dict):
+        return ("invalid_request", "The request must be a JSON object.", None)
+    custom_id = request.get("custom_id")
+    if not isinstance(custom_id, Text) or not custom_id:
+        return ("missing_required_parameter", "Missing custom_id.", "custom_id")
+    if custom_id in custom_ids:
+        return (
+            "duplicate_custom_id",
+            "The custom_id for this request is a duplicate of another request.",
+            "custom_id",
+        )
+    custom_ids.add(custom_id)
+    if request.get("method") != "POST":
+        return ("invalid_method", "The method must be POST.", "method")
+    if request.get("url") != endpoint:
+        return (
+            "mismatched_endpoint",
+            f"The url must be the endpoint of the batch '{endpoint}'.",
+            "url",
+        )
+    body = request.get("body")
+    if not isinstance(body, Dict) or not body.get("model"):
+        return ("missing_required_parameter", "Missing body.model.", "body.model")
+    return None
+
+
+def iter_batch_input(
+    path: Path, *, chunk_size: int = 1000
+) -> Iterator[List[Dict[Text, Any]]]:
+    """Iterate the requests of the input file in chunks."""
+
+    with path.open("rb") as f:
+        lines = (line for line in f if line.strip())
+        while chunk := list(itertools.islice(lines, chunk_size)):
+            yield [json.loads(line) for line in chunk]
+
+
+def scan_batch_results(output_path: Path, error_path: Path) -> BatchProgress:
+    """Read the results written so far, the partial last line of a result
+    file interrupted by a crash is truncated.
+    """
+
+    progress = BatchProgress()
+    for path, failed in ((output_path, False), (error_path, True)):
+        if not path.exists():
+            continue
+        size = 0
+        with path.open("rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                size += len(line)
+                progress.add(json.loads(line)["custom_id"], failed=failed)
+        if size < path.stat().st_size:
+            with path.open("rb+") as f:
+                f.truncate(size)
+    return progress
+
+
+def _write_result(
+    f: IO[bytes], line: Dict[Text, Any], progress: BatchProgress, *, failed: bool
+) -> None:
+    f.write(json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n")
+    progress.add(line["custom_id"], failed=failed)
+
+
+def _flush(*files: IO[bytes]) -> None:
+    for f in files:
+        f.flush()
+
+
+def _result_line(
+    custom_id: Text,
+    *,
+    response: Optional[Dict[Text, Any]] = None,
+    error: Optional[Dict[Text, Any]] = None,
+) -> Dict[Text, Any]:
+    return {
+        "id": rand_openai_id("batch_req"),
+        "custom_id": custom_id,
+        "response": response,
+        "error": error,
+    }
+
+
+def _batch_error(
+    code: Text,
+    message: Text,
+    param: Optional[Text] = None,
+    *,
+    line: Optional[int] = None,
+) -> Dict[Text, Any]:
+    return {"code": code, "message": message, "param": param, "line": line}
@@ -0,0 +1,32 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from pyassorted.asyncio.executor import run_func
+
+from languru.config import logger as languru_logger
+
+if TYPE_CHECKING:
+    from languru.server.deps.openai_clients import OpenaiClients
+
+
+async def loop_openai_clients_models_refresh(
+    openai_clients: "OpenaiClients",
+    *,
+    interval: float,
+    logger: Optional[logging.Logger] = None,
+) -> None:
+    """Refresh the model catalog of the clients every `interval` seconds
+    until cancelled, starting immediately.
+    """
+
+    logger = logger or languru_logger
+    while True:
+        try:
+            new_models = await run_func(openai_clients.refresh_models)
+            logger.info(f"Model catalog refreshed: {len(new_models)} new models")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"Model catalog refresh failed: {e}")
+        await asyncio.sleep(interval)
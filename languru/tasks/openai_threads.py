@@ -1,42 +1,83 @@
+import asyncio
+import json
+import logging
 import time
-from datetime import datetime
-from typing import TYPE_CHECKING, List, Optional, cast
-
-import pytz
-
-from languru.config import console
-from languru.utils.common import display_messages
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Coroutine,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Text,
+    Tuple,
+    cast,
+)
+
+from pyassorted.asyncio.executor import run_func
+
+from languru.config import logger
+from languru.openai_plugins.clients.utils import to_async_openai_client
+from languru.resources.sql.openai.backend.runs import TERMINAL_RUN_STATUSES
+from languru.tasks.run_tools import (
+    RunTools,
+    assistant_tool_calls_message,
+    response_tool_calls,
+    to_required_action,
+)
 
 if TYPE_CHECKING:
     from openai import OpenAI
     from openai.types.beta.threads.message import Message as ThreadsMessage
-    from openai.types.beta.threads.run import LastError, Run, Usage
+    from openai.types.beta.threads.run import LastError, RequiredAction, Run, Usage
     from openai.types.beta.threads.run_status import RunStatus
     from openai.types.chat.chat_completion import ChatCompletion
+    from openai.types.chat.chat_completion_message_tool_call import (
+        ChatCompletionMessageToolCall,
+    )
+    from openai.types.completion_usage import CompletionUsage
 
-    from languru.resources.sql.openai.backend import OpenaiBackend
+    from languru.resources.openai_backend import BaseOpenaiBackend
+    from languru.server.deps.openai_clients import OpenaiClients
+    from languru.types.openai_threads import RunState
 
 
-TERMINAL_RUN_STATUSES = ("cancelled", "failed", "completed", "incomplete", "expired")
+CANCELLABLE_RUN_STATUSES = ("queued", "in_progress", "requires_action")
 
 
-def _update_run(
+async def _call_backend(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Call a backend method, the blocking methods of `OpenaiBackend` run in
+    a worker thread and the coroutines of `AsyncOpenaiBackend` are awaited.
+    """
+
+    return await run_func(func, *args, **kwargs)
+
+
+async def _transition_run(
     run: "Run",
-    openai_backend: "OpenaiBackend",
+    openai_backend: "BaseOpenaiBackend",
     *,
-    status: Optional["RunStatus"] = None,
+    from_statuses: Iterable["RunStatus"],
+    status: "RunStatus",
     cancelled_at: Optional[int] = None,
     started_at: Optional[int] = None,
     completed_at: Optional[int] = None,
     failed_at: Optional[int] = None,
     usage: Optional["Usage"] = None,
     last_error: Optional["LastError"] = None,
-) -> "Run":
-    """Update the task in-place."""
+    required_action: Optional["RequiredAction"] = None,
+) -> Optional["Run"]:
+    """Compare-and-set the run status, returns None if the run is not in
+    any of `from_statuses` anymore.
+    """
 
-    run = openai_backend.threads.runs.update(
+    return await _call_backend(
+        openai_backend.threads.runs.transition,
         run_id=run.id,
         thread_id=run.thread_id,
+        from_statuses=from_statuses,
         status=status,
         cancelled_at=cancelled_at,
         started_at=started_at,
@@ -44,48 +85,84 @@ def _update_run(
         failed_at=failed_at,
         usage=usage,
         last_error=last_error,
+        required_action=required_action,
     )
-    return run
 
 
-def _update_run_if_cancelled(run: "Run", openai_backend: "OpenaiBackend") -> "Run":
+async def _update_run_if_cancelled(
+    run: "Run",
+    openai_backend: "BaseOpenaiBackend",
+) -> "Run":
     """Update the task if it is cancelled in-place.
 
     Parameters
     ----------
     run : Run
         The run object to update
-    openai_backend : OpenaiBackend
+    openai_backend : BaseOpenaiBackend
         The OpenAI backend instance
 
     Returns
     -------
-    bool
-        True if the run is cancelled, False otherwise
+    Run
+        The run object, cancelled if it was being cancelled
     """
 
     if run.status == "cancelled":
-        console.print(f"Run `{run.id}` is already cancelled. Cancelling the run.")
+        logger.debug(f"Run already cancelled: run_id={run.id}")
     elif run.status == "cancelling":
-        run = _update_run(
-            run, openai_backend, cancelled_at=int(time.time()), status="cancelled"
+        run_cancelled = await _transition_run(
+            run,
+            openai_backend,
+            from_statuses=("cancelling",),
+            status="cancelled",
+            cancelled_at=int(time.time()),
         )
-        console.print(f"Run `{run.id}` is being cancelled.")
+        if run_cancelled is None:  # Another worker has finished the run
+            return await _call_backend(
+                openai_backend.threads.runs.retrieve,
+                run_id=run.id,
+                thread_id=run.thread_id,
+            )
+        run = run_cancelled
+        logger.info(f"Run cancelled: run_id={run.id} thread_id={run.thread_id}")
     return run
 
 
-def _update_run_in_progress(run: "Run", openai_backend: "OpenaiBackend") -> "Run":
-    """Update the task if it is in progress in-place."""
+async def _update_run_lost_race(
+    run: "Run",
+    openai_backend: "BaseOpenaiBackend",
+) -> "Run":
+    """Reload the run whose status transition was rejected, and finish the
+    cancellation if that is what moved it.
+    """
+
+    run = await _call_backend(
+        openai_backend.threads.runs.retrieve,
+        run_id=run.id,
+        thread_id=run.thread_id,
+    )
+    return await _update_run_if_cancelled(run, openai_backend)
+
+
+async def _update_run_in_progress(
+    run: "Run",
+    openai_backend: "BaseOpenaiBackend",
+) -> Optional["Run"]:
+    """Start the queued run, returns None if it is not queued anymore."""
 
-    run = _update_run(
-        run, openai_backend, started_at=int(time.time()), status="in_progress"
+    return await _transition_run(
+        run,
+        openai_backend,
+        from_statuses=("queued",),
+        status="in_progress",
+        started_at=int(time.time()),
     )
-    return run
 
 
-def _update_run_completed(
+async def _update_run_completed(
     run: "Run",
-    openai_backend: "OpenaiBackend",
+    openai_backend: "BaseOpenaiBackend",
     *,
     chat_completion: Optional["ChatCompletion"] = None,
     with_creating_message: bool = True,
@@ -98,24 +175,26 @@ def _update_run_completed(
     from languru.types.openai_threads import to_openai_threads_message
     from languru.utils.openai_utils import ensure_openai_chat_completion_content
 
-    if with_creating_message:
-        if chat_completion is None:
-            raise ValueError("chat_completion is required for creating a message")
+    if with_creating_message and chat_completion is None:
+        raise ValueError("chat_completion is required for creating a message")
+
+    # The answer is added only by the run which won the transition, in the
+    # same transaction, a cancelled run leaves no assistant message behind
+    completed_messages: List["ThreadsMessage"] = []
+    if with_creating_message and chat_completion is not None:
         chat_answer = ensure_openai_chat_completion_content(chat_completion)
-        completed_message = to_openai_threads_message(
-            thread_id=run.thread_id,
-            role="assistant",
-            content=chat_answer,
+        completed_messages.append(
+            to_openai_threads_message(
+                thread_id=run.thread_id,
+                role="assistant",
+                content=chat_answer,
+            )
         )
-        if threads_messages is not None:
-            threads_messages.append(completed_message)
-        openai_backend.threads.messages.create(completed_message)
-
-    run = _update_run(
-        run,
-        openai_backend,
+    run_completed = await _call_backend(
+        openai_backend.threads.runs.complete,
+        run.id,
+        thread_id=run.thread_id,
         completed_at=int(time.time()),
-        status="completed",
         usage=Usage.model_validate(
             (
                 chat_completion.usage.model_dump(exclude_none=True)
@@ -123,38 +202,372 @@ def _update_run_completed(
                 else None
             ),
         ),
+        messages=completed_messages,
     )
-    return run
+    if run_completed is None:  # Cancelled while generating
+        return await _update_run_lost_race(run, openai_backend)
 
+    if threads_messages is not None:
+        threads_messages.extend(completed_messages)
+    return run_completed
 
-def _update_run_failed(
-    run: "Run", openai_backend: "OpenaiBackend", *, last_error: "LastError"
+
+async def _update_run_requires_action(
+    run: "Run",
+    openai_backend: "BaseOpenaiBackend",
+    *,
+    tool_calls: List["ChatCompletionMessageToolCall"],
+    conversation: List[Dict[Text, Any]],
+    rounds: int,
+    usage: Optional["CompletionUsage"] = None,
+) -> "Run":
+    """Hand the tool calls to the client, the run continues once their
+    outputs are submitted.
+
+    The conversation, the rounds and the usage so far are saved in the state
+    of the run, so any worker can resume it.
+    """
+
+    from openai.types.beta.threads.run import Usage
+
+    from languru.types.openai_threads import RunState
+
+    # The state is saved first, the client may submit the outputs right away
+    await _call_backend(
+        openai_backend.threads.runs.save_state,
+        RunState(
+            id=run.id,
+            thread_id=run.thread_id,
+            conversation=conversation,
+            rounds=rounds,
+            usage=(
+                None
+                if usage is None
+                else Usage.model_validate(usage.model_dump(exclude_none=True))
+            ),
+        ),
+    )
+    run_requires_action = await _transition_run(
+        run,
+        openai_backend,
+        from_statuses=("in_progress",),
+        status="requires_action",
+        required_action=to_required_action(tool_calls),
+    )
+    if run_requires_action is None:  # Cancelled while generating
+        await _call_backend(
+            openai_backend.threads.runs.delete_state,
+            run_id=run.id,
+            thread_id=run.thread_id,
+        )
+        return await _update_run_lost_race(run, openai_backend)
+    logger.info(f"Run requires action: run_id={run.id} rounds={rounds}")
+    return run_requires_action
+
+
+async def _update_run_failed(
+    run: "Run",
+    openai_backend: "BaseOpenaiBackend",
+    *,
+    last_error: "LastError",
 ) -> "Run":
     """Update the task if it is failed in-place."""
 
-    run = _update_run(
+    run_failed = await _transition_run(
         run,
         openai_backend,
+        from_statuses=("queued", "in_progress"),
         status="failed",
         failed_at=int(time.time()),
         last_error=last_error,
     )
-    return run
+    if run_failed is None:  # Cancelled while generating
+        return await _update_run_lost_race(run, openai_backend)
+    return run_failed
+
+
+async def _create_chat_completion(
+    openai_client: "OpenAI", params: Dict[Text, Any]
+) -> "ChatCompletion":
+    """Request the chat completion through the async client of the upstream,
+    so cancelling the run task aborts the request.
 
+    The plugin clients, and the clients with an HTTP client without an async
+    one, are called in a worker thread. A cancelled run stops waiting for
+    them, but the upstream request is not aborted and runs to its end.
+    """
+
+    from openai.types.chat.chat_completion import ChatCompletion
 
-def task_openai_threads_runs_create(
+    async_openai_client = to_async_openai_client(openai_client)
+    if async_openai_client is not None:
+        return await async_openai_client.chat.completions.create(**params)
+    return cast(
+        ChatCompletion,
+        await asyncio.to_thread(openai_client.chat.completions.create, **params),
+    )
+
+
+def _chat_completion_params(
+    run: "Run", messages: List["ThreadsMessage"]
+) -> Dict[Text, Any]:
+    """Return the chat completion parameters of the run, with the function
+    tools of the run.
+    """
+
+    from languru.types.chat.completions import ChatCompletionRequest
+
+    params = ChatCompletionRequest.from_openai_threads_run(
+        run=run, messages=messages, stream=False  # Ensure synchronous completion
+    ).model_dump(exclude_none=True)
+    tools = [
+        {"type": "function", "function": t.function.model_dump(exclude_none=True)}
+        for t in run.tools
+        if t.type == "function"
+    ]
+    if tools:
+        params["tools"] = tools
+        if run.tool_choice is not None:
+            params["tool_choice"] = (
+                run.tool_choice
+                if isinstance(run.tool_choice, Text)
+                else run.tool_choice.model_dump(exclude_none=True)
+            )
+        if run.parallel_tool_calls is False:
+            params["parallel_tool_calls"] = False
+    return params
+
+
+def _sum_usages(usages: List["CompletionUsage"]) -> Optional["CompletionUsage"]:
+    if not usages:
+        return None
+    return usages[-1].model_copy(
+        update={
+            "prompt_tokens": sum(u.prompt_tokens for u in usages),
+            "completion_tokens": sum(u.completion_tokens for u in usages),
+            "total_tokens": sum(u.total_tokens for u in usages),
+        }
+    )
+
+
+class RunTasks:
+    """The registry of the in-flight run tasks on the server event loop.
+
+    Cancelling the task of a run aborts its upstream request and finishes the
+    run as `cancelled` if it is `cancelling`. Runs submitted with a delay are
+    scheduled on the loop and only get a task once the delay has passed, their
+    saved `RunState` lets `resume_scheduled_runs` schedule them again after a
+    restart.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Text, "asyncio.Task[Run]"] = {}
+        self._scheduled: Dict[
+            Text, Tuple[asyncio.TimerHandle, Coroutine[Any, Any, "Run"]]
+        ] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, run_id: Text) -> bool:
+        return run_id in self._tasks or run_id in self._scheduled
+
+    @property
+    def scheduled(self) -> int:
+        """The number of runs waiting for their delay to pass."""
+
+        return len(self._scheduled)
+
+    def get(self, run_id: Text) -> Optional["asyncio.Task[Run]"]:
+        """Return the task of the run, None if it is not started."""
+
+        return self._tasks.get(run_id)
+
+    def submit(
+        self,
+        run_id: Text,
+        coro: Coroutine[Any, Any, "Run"],
+        *,
+        delay: Optional[float] = None,
+    ) -> Optional["asyncio.Task[Run]"]:
+        """Schedule the coroutine executing the run on the running loop.
+
+        Parameters
+        ----------
+        run_id : Text
+            The ID of the run.
+        coro : Coroutine[Any, Any, Run]
+            The coroutine executing the run.
+        delay : Optional[float], optional
+            The seconds before the run is started, by default None.
+
+        Returns
+        -------
+        Optional[asyncio.Task[Run]]
+            The task of the run, None if it is delayed.
+        """
+
+        if not delay:
+            return self._start(run_id, coro)
+        timer = asyncio.get_running_loop().call_later(
+            delay, self._start_scheduled, run_id
+        )
+        self._scheduled[run_id] = (timer, coro)
+        return None
+
+    def cancel(self, run_id: Text) -> bool:
+        """Cancel the task of the run, returns False if it is not in flight.
+
+        A delayed run is started right away, so it can finish its cancellation
+        without waiting for the delay.
+        """
+
+        if run_id in self._scheduled:
+            self._start_scheduled(run_id)
+            return True
+        task = self._tasks.get(run_id)
+        if task is None or task.done():
+            return False
+        return task.cancel()
+
+    async def shutdown(self) -> None:
+        """Drop the delayed runs, cancel the run tasks and wait for them.
+
+        The delayed runs keep their saved states, `resume_scheduled_runs`
+        schedules them again on the next start.
+        """
+
+        for timer, coro in self._scheduled.values():
+            timer.cancel()
+            coro.close()
+        self._scheduled.clear()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start(
+        self, run_id: Text, coro: Coroutine[Any, Any, "Run"]
+    ) -> "asyncio.Task[Run]":
+        task = asyncio.create_task(coro, name=f"languru.run.{run_id}")
+        self._tasks[run_id] = task
+        task.add_done_callback(lambda t: self._discard(run_id, t))
+        return task
+
+    def _start_scheduled(self, run_id: Text) -> None:
+        timer, coro = self._scheduled.pop(run_id)
+        timer.cancel()
+        self._start(run_id, coro)
+
+    def _discard(self, run_id: Text, task: "asyncio.Task[Run]") -> None:
+        if self._tasks.get(run_id) is task:
+            del self._tasks[run_id]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Run task failed: run_id={run_id}", exc_info=task.exception())
+
+
+async def resume_scheduled_runs(
+    run_tasks: "RunTasks",
+    *,
+    openai_backend: "BaseOpenaiBackend",
+    openai_clients: Optional["OpenaiClients"] = None,
+    run_tools: Optional["RunTools"] = None,
+) -> int:
+    """Schedule again the delayed runs saved by the last process, with the
+    rest of their delays.
+
+    Every worker schedules them, only the first one starting a run executes
+    it. The states of the runs which are not queued anymore are deleted.
+
+    Returns
+    -------
+    int
+        The number of scheduled runs.
+    """
+
+    from languru.exceptions import NotFound
+    from languru.server.deps.openai_clients import openai_client_from_model
+    from languru.server.deps.openai_clients import openai_clients as _openai_clients
+
+    states: List["RunState"] = await _call_backend(
+        openai_backend.threads.runs.list_scheduled_states
+    )
+    scheduled = 0
+    for state in states:
+        if state.id in run_tasks:
+            continue
+        try:
+            run: "Run" = await _call_backend(
+                openai_backend.threads.runs.retrieve,
+                run_id=state.id,
+                thread_id=state.thread_id,
+            )
+        except NotFound:
+            run = None  # type: ignore[assignment]
+        if run is None or run.status not in ("queued", "cancelling"):
+            await _call_backend(
+                openai_backend.threads.runs.delete_state,
+                run_id=state.id,
+                thread_id=state.thread_id,
+            )
+            continue
+        try:
+            openai_client, _, _ = openai_client_from_model(
+                run.model,
+                org_type=state.org_type,
+                openai_clients=openai_clients or _openai_clients,
+            )
+        except Exception as e:
+            logger.warning(f"Run not resumed: run_id={run.id} error={e}")
+            continue
+        messages = await _call_backend(
+            openai_backend.threads.messages.list,
+            thread_id=run.thread_id,
+            order="asc",
+            exclude=("incomplete_details", "metadata"),
+        )
+        # A cancelling run finishes its cancellation right away
+        delay = (
+            0
+            if run.status == "cancelling"
+            else max((state.scheduled_at or 0) - time.time(), 0)
+        )
+        run_tasks.submit(
+            run.id,
+            task_openai_threads_runs_create(
+                run=run,
+                messages=messages,
+                openai_client=openai_client,
+                openai_backend=openai_backend,
+                run_tools=run_tools,
+                run_state=state,
+            ),
+            delay=delay or None,
+        )
+        logger.info(f"Run resumed: run_id={run.id} delay={delay:.1f}")
+        scheduled += 1
+    return scheduled
+
+
+async def task_openai_threads_runs_create(
     run: "Run",
     messages: List["ThreadsMessage"],
     *,
     openai_client: "OpenAI",
-    openai_backend: "OpenaiBackend",
+    openai_backend: "BaseOpenaiBackend",
     delay: Optional[int] = None,
     sleep: Optional[int] = None,
-    verbose: bool = True,
+    verbose: bool = False,
+    run_tools: Optional["RunTools"] = None,
+    tool_messages: Optional[List[Dict[Text, Any]]] = None,
+    run_state: Optional["RunState"] = None,
     **kwargs,
 ) -> "Run":
     """Create a new OpenAI Threads run and generate chat completions
 
+    Cancelling the task, e.g. through `RunTasks.cancel`, aborts the upstream
+    request and the run is finished as `cancelled` if it is `cancelling`.
+
     Parameters
     ----------
     run : Run
@@ -163,12 +576,25 @@ def task_openai_threads_runs_create(
         The list of messages in the thread
     openai_client : OpenAI
         The OpenAI client instance
-    openai_backend : OpenaiBackend
+    openai_backend : BaseOpenaiBackend
         The OpenAI backend instance
     delay : Optional[int], optional
-        The delay in milliseconds before starting the run, by default None
+        The delay in milliseconds before starting the run, by default None.
+        The task waits for it, `RunTasks.submit` delays the run without a task.
     sleep : Optional[int], optional
         The sleep in milliseconds after completing the run, by default None
+    verbose : bool, optional
+        Whether to log the input and output messages at DEBUG level,
+        by default False
+    run_tools : Optional[RunTools], optional
+        The functions executed by the server, by default None which hands all
+        the tool calls to the client
+    tool_messages : Optional[List[Dict[Text, Any]]], optional
+        The tool calls and outputs continuing the thread messages, given when
+        the run is resumed with `RunTools.resume`, by default None
+    run_state : Optional[RunState], optional
+        The saved state of the run, whose rounds and usage the run continues,
+        deleted once the run is started, by default None
 
     Returns
     -------
@@ -176,71 +602,156 @@ def task_openai_threads_runs_create(
         The updated run object
     """
 
-    from openai.types.beta.threads.run import LastError
-    from openai.types.chat.chat_completion import ChatCompletion
+    try:
+        return await _execute_run(
+            run,
+            messages,
+            openai_client=openai_client,
+            openai_backend=openai_backend,
+            delay=delay,
+            sleep=sleep,
+            verbose=verbose,
+            run_tools=run_tools,
+            tool_messages=tool_messages,
+            run_state=run_state,
+        )
+    except asyncio.CancelledError:
+        run = await _update_run_lost_race(run, openai_backend)
+        logger.info(f"Run task cancelled: run_id={run.id} status={run.status}")
+        return run
 
-    from languru.types.chat.completions import ChatCompletionRequest
 
-    time_start = datetime.now(pytz.utc)
-    console.print(
-        f"[{time_start.isoformat(timespec='seconds')}] "
-        + "Received `task_openai_threads_runs_create`."
-    )
+async def _execute_run(
+    run: "Run",
+    messages: List["ThreadsMessage"],
+    *,
+    openai_client: "OpenAI",
+    openai_backend: "BaseOpenaiBackend",
+    delay: Optional[int] = None,
+    sleep: Optional[int] = None,
+    verbose: bool = False,
+    run_tools: Optional["RunTools"] = None,
+    tool_messages: Optional[List[Dict[Text, Any]]] = None,
+    run_state: Optional["RunState"] = None,
+) -> "Run":
+    from openai.types.beta.threads.run import LastError
+    from openai.types.completion_usage import CompletionUsage
 
+    time_start = time.perf_counter()
     if delay:
-        console.print(f"Run '{run.id}' delaying for {delay} milliseconds...")
-        time.sleep(delay / 1000)
-
-    # Refresh the run from the backend
-    run = openai_backend.threads.runs.retrieve(run_id=run.id, thread_id=run.thread_id)
-    console.print(f"[{time_start.isoformat(timespec='seconds')}] Executing run: {run}")
-
-    # Cancel the run if it is already cancelled
-    run = _update_run_if_cancelled(run, openai_backend)
-
-    # Return if the run is already in a terminal state
-    if run.status in TERMINAL_RUN_STATUSES:
-        console.print(f"Run '{run.id}' is already in a terminal state: '{run.status}'")
+        await asyncio.sleep(delay / 1000)
+
+    # Initialize the run, only a queued run can be started
+    run_in_progress = await _update_run_in_progress(run, openai_backend)
+    if run_in_progress is None:
+        # Cancel the run if it is being cancelled
+        run = await _update_run_lost_race(run, openai_backend)
+        if run_state is not None and run.status in TERMINAL_RUN_STATUSES:
+            await _call_backend(
+                openai_backend.threads.runs.delete_state,
+                run_id=run.id,
+                thread_id=run.thread_id,
+            )
+        logger.info(f"Run not queued: run_id={run.id} status={run.status}")
         return run  # RETURN: run
-
-    # Initialize the run
-    run = _update_run_in_progress(run, openai_backend)
+    run = run_in_progress
+    if run_state is not None:
+        await _call_backend(
+            openai_backend.threads.runs.delete_state,
+            run_id=run.id,
+            thread_id=run.thread_id,
+        )
+    logger.info(
+        f"Run started: run_id={run.id} thread_id={run.thread_id} "
+        + f"model={run.model} messages={len(messages)}"
+    )
 
     # Prepare the chat completion request
-    chat_completion_request = ChatCompletionRequest.from_openai_threads_run(
-        run=run, messages=messages, stream=False  # Ensure synchronous completion
-    )
-    if verbose:
-        display_messages(
-            chat_completion_request.messages,
-            table_title=f"Run '{run.id}' Input Messages",
+    chat_completion_params = _chat_completion_params(run, messages)
+    conversation = list(tool_messages or [])
+    if verbose and logger.isEnabledFor(logging.DEBUG):
+        input_messages = json.dumps(
+            chat_completion_params["messages"] + conversation,
+            ensure_ascii=False,
+            default=str,
         )
-        console.print(f"Chat completion request: {chat_completion_request}")
+        logger.debug(f"Run input messages: run_id={run.id} messages={input_messages}")
 
-    # Generate chat completions
+    # Generate chat completions, until the model answers without tool calls,
+    # a resumed run continues the rounds and the usage of its state
     try:
-        chat_completion_res = openai_client.chat.completions.create(
-            **chat_completion_request.model_dump(exclude_none=True)
-        )
-        chat_completion_res = cast(ChatCompletion, chat_completion_res)
+        usages: List["CompletionUsage"] = []
+        rounds = 0
+        if run_state is not None:
+            rounds = run_state.rounds
+            if run_state.usage is not None:
+                usages.append(
+                    CompletionUsage.model_validate(run_state.usage.model_dump())
+                )
+        max_rounds = run_tools.max_rounds if run_tools is not None else 10
+        while rounds < max_rounds:
+            rounds += 1
+            chat_completion_res = await _create_chat_completion(
+                openai_client,
+                {
+                    **chat_completion_params,
+                    "messages": chat_completion_params["messages"] + conversation,
+                },
+            )
+            if chat_completion_res.usage is not None:
+                usages.append(chat_completion_res.usage)
+            response_message = chat_completion_res.choices[0].message
+            tool_calls = response_tool_calls(response_message)
+            if not tool_calls:
+                break
+
+            # The local tool calls run concurrently, the others are handed to
+            # the client once they are done
+            conversation.append(
+                assistant_tool_calls_message(response_message.content, tool_calls)
+            )
+            local_calls = [
+                c for c in tool_calls if run_tools is not None and run_tools.is_local(c)
+            ]
+            client_calls = [c for c in tool_calls if c not in local_calls]
+            logger.info(
+                f"Run tool calls: run_id={run.id} local={len(local_calls)} "
+                + f"client={len(client_calls)}"
+            )
+            if run_tools is not None and local_calls:
+                conversation.extend(await run_tools.call_many(local_calls))
+            if client_calls:
+                return await _update_run_requires_action(  # RETURN: run
+                    run,
+                    openai_backend,
+                    tool_calls=client_calls,
+                    conversation=conversation,
+                    rounds=rounds,
+                    usage=_sum_usages(usages),
+                )
+        else:
+            raise RuntimeError(f"The run exceeded {max_rounds} tool call rounds")
 
         # Update the run with the chat completion
-        run = _update_run_completed(
+        run = await _update_run_completed(
             run,
             openai_backend,
-            chat_completion=chat_completion_res,
+            chat_completion=chat_completion_res.model_copy(
+                update={"usage": _sum_usages(usages)}
+            ),
             with_creating_message=True,
             threads_messages=messages,
         )
-        if verbose:
-            display_messages(
-                messages[-1:], table_title=f"Run '{run.id}' Output Messages"
+        # Only the run which won the completion added its answer
+        if verbose and run.status == "completed" and logger.isEnabledFor(logging.DEBUG):
+            output_message = messages[-1].model_dump_json(include={"role", "content"})
+            logger.debug(
+                f"Run output message: run_id={run.id} message={output_message}"
             )
 
     except Exception as e:
-        console.print_exception()
-        console.print(f"Error generating chat completions: {e}")
-        run = _update_run_failed(
+        logger.exception(f"Run failed: run_id={run.id} error={e}")
+        run = await _update_run_failed(
             run,
             openai_backend,
             last_error=LastError.model_validate(
@@ -249,9 +760,12 @@ def task_openai_threads_runs_create(
         )
 
     if sleep:
-        console.print(f"Run '{run.id}' sleeping for {sleep} milliseconds...")
-        time.sleep(sleep / 1000)
+        await asyncio.sleep(sleep / 1000)
 
     # Finish the run
-    console.print(f"Run '{run.id}' completed: {run}")
+    duration_ms = (time.perf_counter() - time_start) * 1000
+    logger.info(
+        f"Run finished: run_id={run.id} status={run.status} "
+        + f"duration_ms={duration_ms:.0f}"
+    )
     return run
@@ -0,0 +1,206 @@
+import asyncio
+import functools
+import inspect
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Text,
+    TypeVar,
+)
+
+from languru.config import logger
+
+if TYPE_CHECKING:
+    from openai.types.beta.threads.required_action_function_tool_call import (
+        RequiredActionFunctionToolCall,
+    )
+    from openai.types.beta.threads.run import RequiredAction, Run
+    from openai.types.chat.chat_completion_message import ChatCompletionMessage
+    from openai.types.chat.chat_completion_message_tool_call import (
+        ChatCompletionMessageToolCall,
+    )
+
+    from languru.types.openai_threads import RunState
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class RunTools:
+    """The tool calls of runs: the functions the server executes itself.
+
+    The run calls a registered function when one of its function tools has the
+    name of the function, the calls of the other functions are handed to the
+    client with the `requires_action` status. The local calls of one completion
+    are executed concurrently, at most `max_concurrency` at a time.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        The number of local tool calls executed at once, by default 8.
+    max_rounds : int, optional
+        The number of completions per run before it fails, by default 10.
+        The completions before and after the tool outputs of the client are
+        counted together.
+    """
+
+    def __init__(self, *, max_concurrency: int = 8, max_rounds: int = 10):
+        self.max_concurrency = max_concurrency
+        self.max_rounds = max_rounds
+        self._functions: Dict[Text, Callable[..., Any]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def __contains__(self, name: Text) -> bool:
+        return name in self._functions
+
+    def register(self, func: F, *, name: Optional[Text] = None) -> F:
+        """Register the function, sync or async, called with the JSON arguments
+        of the tool call as keyword arguments.
+
+        The returned string is the tool output, other values are JSON encoded.
+        """
+
+        self._functions[name or func.__name__] = func
+        return func
+
+    def unregister(self, name: Text) -> None:
+        self._functions.pop(name, None)
+
+    def is_local(self, tool_call: "ChatCompletionMessageToolCall") -> bool:
+        return tool_call.type == "function" and tool_call.function.name in self
+
+    async def call(self, tool_call: "ChatCompletionMessageToolCall") -> Text:
+        """Execute the local tool call, errors are returned as the output so
+        the model can react to them.
+        """
+
+        func = self._functions[tool_call.function.name]
+        try:
+            kwargs = json.loads(tool_call.function.arguments or "{}")
+            async with self._semaphore:
+                if inspect.iscoroutinefunction(func):
+                    output = await func(**kwargs)
+                else:
+                    output = await asyncio.get_running_loop().run_in_executor(
+                        self._get_executor(), functools.partial(func, **kwargs)
+                    )
+        except Exception as e:
+            logger.exception(
+                f"Tool call failed: tool_call_id={tool_call.id} "
+                + f"name={tool_call.function.name}"
+            )
+            return json.dumps({"error": str(e)})
+        if isinstance(output, Text):
+            return output
+        return json.dumps(output, ensure_ascii=False, default=str)
+
+    async def call_many(
+        self, tool_calls: Sequence["ChatCompletionMessageToolCall"]
+    ) -> List[Dict[Text, Any]]:
+        """Execute the local tool calls concurrently, returns the tool
+        messages of their outputs.
+        """
+
+        outputs = await asyncio.gather(*(self.call(c) for c in tool_calls))
+        return [
+            tool_message(tool_call.id, output)
+            for tool_call, output in zip(tool_calls, outputs)
+        ]
+
+    def resume(
+        self,
+        run: "Run",
+        tool_outputs: Sequence[Dict[Text, Any]],
+        *,
+        run_state: Optional["RunState"] = None,
+    ) -> List[Dict[Text, Any]]:
+        """Return the conversation of the run continued with the tool outputs.
+
+        The conversation is the one saved in the state of the run by the
+        worker which suspended it. Without a state, e.g. for runs suspended by
+        older versions, it is rebuilt from the required action of the run.
+        """
+
+        if run_state is not None:
+            messages = list(run_state.conversation)
+        elif run.required_action is not None:
+            messages = [
+                assistant_tool_calls_message(
+                    None, run.required_action.submit_tool_outputs.tool_calls
+                )
+            ]
+        else:
+            messages = []
+        return messages + [
+            tool_message(o["tool_call_id"], o.get("output") or "") for o in tool_outputs
+        ]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency,
+                thread_name_prefix="languru.run_tools",
+            )
+        return self._executor
+
+
+def assistant_tool_calls_message(
+    content: Optional[Text],
+    tool_calls: Sequence[
+        "ChatCompletionMessageToolCall | RequiredActionFunctionToolCall"
+    ],
+) -> Dict[Text, Any]:
+    return {
+        "role": "assistant",
+        "content": content,
+        "tool_calls": [
+            {
+                "id": c.id,
+                "type": "function",
+                "function": {
+                    "name": c.function.name,
+                    "arguments": c.function.arguments,
+                },
+            }
+            for c in tool_calls
+        ],
+    }
+
+
+def tool_message(tool_call_id: Text, output: Text) -> Dict[Text, Any]:
+    return {"role": "tool", "tool_call_id": tool_call_id, "content": output}
+
+
+def to_required_action(
+    tool_calls: Sequence["ChatCompletionMessageToolCall"],
+) -> "RequiredAction":
+    from openai.types.beta.threads.run import RequiredAction
+
+    return RequiredAction.model_validate(
+        {
+            "type": "submit_tool_outputs",
+            "submit_tool_outputs": {
+                "tool_calls": assistant_tool_calls_message(None, tool_calls)[
+                    "tool_calls"
+                ]
+            },
+        }
+    )
+
+
+def response_tool_calls(
+    message: "ChatCompletionMessage",
+) -> List["ChatCompletionMessageToolCall"]:
+    return [c for c in message.tool_calls or [] if c.type == "function"]
@@ -1,10 +1,23 @@
-from typing import List, Literal, Optional, Text, Union
+import json
+from typing import Dict, List, Literal, Optional, Sequence, Text, Union
 
 from pydantic import BaseModel, ConfigDict, Field
 
 from languru.config import logger
 from languru.types.chat.completions import ChatCompletionRequest
 
+# The shortest prefix Anthropic caches, shorter breakpoints are ignored by it
+PROMPT_CACHE_MIN_TOKENS = 1024
+# The models caching only longer prefixes, by model name prefix
+PROMPT_CACHE_MODEL_MIN_TOKENS: Dict[Text, int] = {
+    "claude-3-haiku": 2048,
+    "claude-3-5-haiku": 2048,
+}
+# The most `cache_control` breakpoints allowed in a request
+PROMPT_CACHE_MAX_BREAKPOINTS = 4
+
+CacheBreakpoint = Union[int, Literal["tools", "system"]]
+
 
 class Source(BaseModel):
     type: Literal["base64"]
@@ -12,10 +25,15 @@ class Source(BaseModel):
     data: str
 
 
+class CacheControl(BaseModel):
+    type: Literal["ephemeral"] = "ephemeral"
+
+
 class ContentBlock(BaseModel):
     type: Literal["text", "image"]
     text: Optional[str] = None
     source: Optional[Source] = None
+    cache_control: Optional[CacheControl] = None
 
 
 class MessageParam(BaseModel):
@@ -37,6 +55,7 @@ class Tool(BaseModel):
     name: Text
     description: Optional[Text] = None
     input_schema: ToolInputSchema
+    cache_control: Optional[CacheControl] = None
 
 
 class AnthropicChatCompletionRequest(BaseModel):
@@ -46,15 +65,53 @@ class AnthropicChatCompletionRequest(BaseModel):
     metadata: Optional[Metadata] = None
     stop_sequences: Optional[List[Text]] = None
     stream: bool = False
-    system: Optional[Text] = None
+    system: Optional[Union[Text, List[ContentBlock]]] = None
     temperature: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    tools: Optional[List[Tool]] = None
     top_k: Optional[int] = None
     top_p: Optional[float] = None
 
+    @property
+    def uses_prompt_caching(self) -> bool:
+        """Whether any block of the request has a `cache_control` breakpoint."""
+
+        return any(
+            block.cache_control is not None for block in self._cacheable_blocks()
+        )
+
     @classmethod
     def from_openai_chat_completion_request(
-        cls, request: "ChatCompletionRequest"
+        cls,
+        request: "ChatCompletionRequest",
+        *,
+        prompt_caching: bool = False,
+        cache_breakpoints: Optional[Sequence[CacheBreakpoint]] = None,
+        cache_min_tokens: Optional[int] = None,
     ) -> "AnthropicChatCompletionRequest":
+        """Convert the OpenAI chat completion request.
+
+        Parameters
+        ----------
+        request : ChatCompletionRequest
+            The OpenAI chat completion request.
+        prompt_caching : bool, optional
+            Whether to set `cache_control` breakpoints, by default False.
+        cache_breakpoints : Optional[Sequence[CacheBreakpoint]], optional
+            The hinted breakpoints, the indexes of the OpenAI messages ending a
+            cached prefix, a system message index or "system" for the system
+            prompt and "tools" for the tool definitions. By default None, the
+            breakpoints are placed by `with_cache_control`.
+        cache_min_tokens : Optional[int], optional
+            The estimated tokens of the shortest prefix worth a breakpoint,
+            by default None, the minimum of the model by
+            `prompt_cache_min_tokens`.
+
+        Returns
+        -------
+        AnthropicChatCompletionRequest
+            The Anthropic messages request.
+        """
+
         request = request.model_copy(deep=True)
 
         system: Optional[Text] = None
@@ -62,12 +119,18 @@ class AnthropicChatCompletionRequest(BaseModel):
         messages: List[MessageParam] = []
         temperature: float = 1.0 if request.temperature is None else request.temperature
 
+        # The OpenAI message indexes of the converted messages
+        message_indexes: Dict[int, CacheBreakpoint] = {}
+
         for idx, m in enumerate(request.messages):
             if m.role == "system":
                 sys_message_indexes.append(idx)
+                message_indexes[idx] = "system"
             elif m.role == "user":
+                message_indexes[idx] = len(messages)
                 messages.append(MessageParam(role="user", content=m.content))
             elif m.role == "assistant":
+                message_indexes[idx] = len(messages)
                 messages.append(MessageParam(role="assistant", content=m.content))
             else:
                 logger.warning(f"Unknown role: {m.role}")
@@ -76,7 +139,7 @@ class AnthropicChatCompletionRequest(BaseModel):
             [request.messages[sys_idx].content for sys_idx in sys_message_indexes]
         )
 
-        return cls.model_validate(
+        anthropic_request = cls.model_validate(
             {
                 "model": request.model,
                 "messages": messages,
@@ -90,3 +153,141 @@ class AnthropicChatCompletionRequest(BaseModel):
                 "top_p": request.top_p,
             }
         )
+        if not prompt_caching:
+            return anthropic_request
+        return anthropic_request.with_cache_control(
+            breakpoints=(
+                None
+                if cache_breakpoints is None
+                else [
+                    message_indexes[b] if isinstance(b, int) else b
+                    for b in cache_breakpoints
+                    if not isinstance(b, int) or b in message_indexes
+                ]
+            ),
+            min_tokens=cache_min_tokens,
+        )
+
+    def with_cache_control(
+        self,
+        *,
+        breakpoints: Optional[Sequence[CacheBreakpoint]] = None,
+        min_tokens: Optional[int] = None,
+    ) -> "AnthropicChatCompletionRequest":
+        """Return a copy of the request with `cache_control` breakpoints.
+
+        The cached prefix of a request is its tools, system prompt and
+        messages in this order. Without hinted `breakpoints`, i.e. the indexes
+        of the messages, "tools" and "system", the breakpoints are placed
+        automatically after the tools, the system prompt, the last message of
+        the previous turn, which the previous request cached, and the last
+        message, which the next turn reads. Breakpoints of a prefix shorter
+        than the estimated `min_tokens`, by default the minimum of the model,
+        are dropped, as Anthropic does not cache it.
+        """
+
+        if min_tokens is None:
+            min_tokens = prompt_cache_min_tokens(self.model)
+        request = self.model_copy(deep=True)
+        prefix_tokens: List[int] = []  # The tokens up to tools, system, messages
+        tokens = 0
+        for block in (request.tools, request.system):
+            tokens += _estimate_tokens(block)
+            prefix_tokens.append(tokens)
+        for message in request.messages:
+            tokens += _estimate_tokens(message.content)
+            prefix_tokens.append(tokens)
+
+        if breakpoints is None:
+            breakpoints = ["tools", "system"]
+            if len(request.messages) >= 3:
+                breakpoints.append(len(request.messages) - 3)
+            if request.messages:
+                breakpoints.append(len(request.messages) - 1)
+
+        positions = {"tools": 0, "system": 1}
+        marked = 0
+        for breakpoint in dict.fromkeys(breakpoints):
+            # No message to mark without messages
+            if not isinstance(breakpoint, Text) and not request.messages:
+                continue
+            position = (
+                positions[breakpoint]
+                if isinstance(breakpoint, Text)
+                else breakpoint % len(request.messages) + 2
+            )
+            if prefix_tokens[position] < min_tokens:
+                continue
+            if marked >= PROMPT_CACHE_MAX_BREAKPOINTS:
+                logger.warning(f"Too many cache breakpoints, '{breakpoint}' dropped.")
+                break
+            if request._mark_cache_control(breakpoint):
+                marked += 1
+        return request
+
+    def without_cache_control(self) -> "AnthropicChatCompletionRequest":
+        """Return a copy of the request without `cache_control` breakpoints."""
+
+        request = self.model_copy(deep=True)
+        for block in request._cacheable_blocks():
+            block.cache_control = None
+        return request
+
+    def _mark_cache_control(self, breakpoint: CacheBreakpoint) -> bool:
+        if breakpoint == "tools":
+            if not self.tools:
+                return False
+            self.tools[-1].cache_control = CacheControl()
+            return True
+        if breakpoint == "system":
+            if not self.system:
+                return False
+            if isinstance(self.system, Text):
+                self.system = [ContentBlock(type="text", text=self.system)]
+            self.system[-1].cache_control = CacheControl()
+            return True
+        message = self.messages[breakpoint]
+        if isinstance(message.content, Text):
+            message.content = [ContentBlock(type="text", text=message.content)]
+        if not message.content:
+            return False
+        message.content[-1].cache_control = CacheControl()
+        return True
+
+    def _cacheable_blocks(self) -> List[Union[ContentBlock, Tool]]:
+        blocks: List[Union[ContentBlock, Tool]] = list(self.tools or [])
+        if isinstance(self.system, List):
+            blocks.extend(self.system)
+        for message in self.messages:
+            if isinstance(message.content, List):
+                blocks.extend(message.content)
+        return blocks
+
+
+def prompt_cache_min_tokens(model: Text) -> int:
+    """Returns the tokens of the shortest prefix the model caches."""
+
+    model = model.strip().lower()
+    for prefix in sorted(PROMPT_CACHE_MODEL_MIN_TOKENS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return PROMPT_CACHE_MODEL_MIN_TOKENS[prefix]
+    return PROMPT_CACHE_MIN_TOKENS
+
+
+def _estimate_tokens(
+    content: Optional[Union[Text, List[ContentBlock], List[Tool]]]
+) -> int:
+    """Estimate the tokens of the content, a token is about 4 characters."""
+
+    if not content:
+        return 0
+    if isinstance(content, Text):
+        return len(content) // 4
+    return sum(
+        (
+            len(block.text or "") // 4
+            if isinstance(block, ContentBlock)
+            else len(json.dumps(block.model_dump(exclude_none=True))) // 4
+        )
+        for block in content
+    )
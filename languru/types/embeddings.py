@@ -1,4 +1,4 @@
-from typing import List, Optional, Text, Union
+from typing import List, Literal, Optional, Text, Union
 
 from pydantic import BaseModel, Field
 
@@ -6,8 +6,12 @@ from pydantic import BaseModel, Field
 class EmbeddingRequest(BaseModel):
     input: Union[Text, List[Union[Text, List[Text]]]]
     model: Text
-    encoding_format: Optional[Text] = Field(
-        default="float", description="The format to return the embeddings in."
+    encoding_format: Optional[Literal["float", "base64", "base64_float16"]] = Field(
+        default="float",
+        description=(
+            "The format to return the embeddings in, the base64 of float32, "
+            + "or of float16 for `base64_float16`."
+        ),
     )
     dimensions: Optional[int] = Field(
         default=None,
@@ -0,0 +1,21 @@
+from typing import Dict, Literal, Optional, Text
+
+from pydantic import BaseModel, Field
+
+
+class BatchCreateRequest(BaseModel):
+    input_file_id: Text = Field(
+        ...,
+        description="The ID of an uploaded file with the purpose `batch` that contains requests for the new batch.",  # noqa: E501
+    )
+    endpoint: Literal["/v1/chat/completions", "/v1/completions", "/v1/embeddings"] = (
+        Field(..., description="The endpoint to be used for all requests in the batch.")
+    )
+    completion_window: Literal["24h"] = Field(
+        default="24h",
+        description="The time frame within which the batch should be processed.",
+    )
+    metadata: Optional[Dict[Text, Text]] = Field(
+        default=None,
+        description="Set of 16 key-value pairs that can be attached to an object.",
+    )
@@ -101,7 +101,7 @@ class ThreadsMessageCreate(BaseModel):
         data["thread_id"] = thread_id
         data["status"] = status
         data["object"] = "thread.message"
-        data["created_at"] = int(time.time())
+        data["created_at"] = data.get("created_at") or int(time.time())
         if isinstance(data["content"], Text):
             data["content"] = [
                 TextContentBlock.model_validate({"text": {"value": data["content"]}})
@@ -141,6 +141,52 @@ class ThreadCreateRequest(BaseModel):
         return Thread.model_validate(data)
 
 
+class ThreadsMessageImport(ThreadsMessageCreate):
+    created_at: Optional[int] = Field(
+        default=None,
+        description="The Unix timestamp (in seconds) for when the message was created.",
+    )
+
+
+class ThreadImport(ThreadCreateRequest):
+    messages: Optional[List[ThreadsMessageImport]] = Field(  # type: ignore[assignment]
+        default=None,
+        description="The messages of the thread, in the order they were created.",
+    )
+    created_at: Optional[int] = Field(
+        default=None,
+        description="The Unix timestamp (in seconds) for when the thread was created.",
+    )
+
+    def to_openai_thread(self, thread_id: Optional[Text] = None) -> Thread:
+        data = self.model_dump(exclude={"messages"})
+        data["id"] = thread_id or rand_openai_id("thread")
+        data["object"] = "thread"
+        data["created_at"] = self.created_at or int(time.time())
+        return Thread.model_validate(data)
+
+
+class ThreadsImportRequest(BaseModel):
+    threads: List[ThreadImport] = Field(
+        ...,
+        description="The threads to import with their message histories.",
+    )
+
+    def to_openai_threads_and_messages(
+        self,
+    ) -> Tuple[List[Thread], List[OpenaiMessage]]:
+        threads: List[Thread] = []
+        messages: List[OpenaiMessage] = []
+        for thread_import in self.threads:
+            thread = thread_import.to_openai_thread()
+            threads.append(thread)
+            messages.extend(
+                m.to_openai_message(thread_id=thread.id)
+                for m in thread_import.messages or []
+            )
+        return (threads, messages)
+
+
 class ThreadUpdateRequest(BaseModel):
     metadata: Optional[Dict[Text, Text]] = Field(
         default=None,
@@ -225,6 +271,7 @@ class ThreadsRunCreate(BaseModel):
         status: RunStatus = "queued",
         default_instructions: Optional[Text] = None,
         default_temperature: Optional[float] = None,
+        default_tools: Optional[List[AssistantTool]] = None,
         enable_additional_instructions: bool = True,
         additional_instructions_separator: Text = "\n",
     ) -> OpenaiRun:
@@ -239,8 +286,8 @@ class ThreadsRunCreate(BaseModel):
             data["instructions"] += additional_instructions_separator
             data["instructions"] += self.additional_instructions or ""
         data["temperature"] = self.temperature or default_temperature
-        data["parallel_tool_calls"] = self.parallel_tool_calls or False
-        data["tools"] = self.tools or []
+        data["parallel_tool_calls"] = self.parallel_tool_calls is not False
+        data["tools"] = self.tools or default_tools or []
         return OpenaiRun.model_validate(data)
 
 
@@ -419,6 +466,7 @@ class ThreadCreateAndRunRequest(BaseModel):
         status: RunStatus = "queued",
         default_instructions: Optional[Text] = None,
         default_temperature: Optional[float] = None,
+        default_tools: Optional[List[AssistantTool]] = None,
     ) -> OpenaiRun:
         data = self.model_dump()
         data["id"] = run_id or rand_openai_id("run")
@@ -428,8 +476,8 @@ class ThreadCreateAndRunRequest(BaseModel):
         data["status"] = status
         data["instructions"] = data["instructions"] or default_instructions or ""
         data["temperature"] = data["temperature"] or default_temperature
-        data["parallel_tool_calls"] = data["parallel_tool_calls"] or False
-        data["tools"] = data["tools"] or []
+        data["parallel_tool_calls"] = data["parallel_tool_calls"] is not False
+        data["tools"] = data["tools"] or default_tools or []
         return OpenaiRun.model_validate(data)
 
 
@@ -459,3 +507,32 @@ class RunSubmitToolOutputsRequest(BaseModel):
             + "state with a `data: [DONE]` message."
         ),
     )
+
+
+class RunState(BaseModel):
+    """The server state of a run which outlives its task, kept by the backend
+    until the run is executed: the start time of a delayed run, or the
+    conversation, tool call rounds and usage of a run waiting for tool outputs.
+    """
+
+    id: Text = Field(..., description="The ID of the run.")
+    thread_id: Text = Field(..., description="The ID of the thread of the run.")
+    created_at: int = Field(
+        default_factory=lambda: int(time.time()),
+        description="The Unix timestamp (in seconds) the state was saved.",
+    )
+    org_type: Optional[Text] = Field(
+        default=None, description="The organization of the client of the run."
+    )
+    scheduled_at: Optional[float] = Field(
+        default=None,
+        description="The Unix timestamp (in seconds) a delayed run starts at.",
+    )
+    conversation: List[Dict] = Field(
+        default_factory=list,
+        description="The tool calls and outputs continuing the thread messages.",
+    )
+    rounds: int = Field(default=0, description="The chat completions of the run.")
+    usage: Optional[Usage] = Field(
+        default=None, description="The usage of the chat completions of the run."
+    )
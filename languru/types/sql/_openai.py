@@ -1,6 +1,7 @@
-from typing import Dict, Iterable, List, Optional, Text, Union
+from typing import Any, ClassVar, Dict, Iterable, List, Optional, Text, Tuple, Union
 
 import sqlalchemy as sa
+import sqlalchemy.orm
 from openai.types.beta.assistant import Assistant as OpenaiAssistant
 from openai.types.beta.assistant import ToolResources
 from openai.types.beta.assistant_response_format_option import (
@@ -12,18 +13,51 @@ from openai.types.beta.threads.message import Message as OpenaiMessage
 from openai.types.beta.threads.run import Run as OpenaiRun
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
+from languru.types.openai_threads import RunState as OpenaiRunState
 from languru.utils.common import model_dump
 
 
 class Base(DeclarativeBase):
-    pass
+    # The OpenAI fields stored in JSON columns, which list queries may skip
+    # loading, mapped to their column names and the values used instead
+    deferrable_fields: ClassVar[Dict[Text, Tuple[Text, Any]]] = {}
+
+    @classmethod
+    def defer_options(cls, exclude: Optional[Iterable[Text]] = None) -> List[Any]:
+        """Return the loader options deferring the columns of excluded fields."""
+
+        options: List[Any] = []
+        for field in exclude or ():
+            if field not in cls.deferrable_fields:
+                raise ValueError(
+                    f"Field '{field}' of {cls.__name__} can not be excluded, "
+                    + f"expected one of {list(cls.deferrable_fields)}"
+                )
+            column, _ = cls.deferrable_fields[field]
+            options.append(sa.orm.defer(getattr(cls, column)))
+        return options
+
+    def _deferrable_values(self, exclude: Optional[Iterable[Text]] = None) -> Dict:
+        exclude = set(exclude or ())
+        return {
+            field: (
+                (default() if callable(default) else default)
+                if field in exclude
+                else getattr(self, column)
+            )
+            for field, (column, default) in self.deferrable_fields.items()
+        }
 
 
 class Assistant(Base):
     __tablename__ = "assistants"
+    __table_args__ = (
+        sa.Index("ux_assistants_id", "id", unique=True),
+        sa.Index("ix_assistants_created_at_db_id", "created_at", "db_id"),
+    )
 
     db_id: Mapped[int] = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
-    id: Mapped[Text] = mapped_column(sa.String, index=True)
+    id: Mapped[Text] = mapped_column(sa.String)
     created_at: Mapped[int] = mapped_column(sa.Integer, index=True)
     description: Mapped[Text] = mapped_column(sa.String, nullable=True)
     instructions: Mapped[Text] = mapped_column(sa.String, nullable=True)
@@ -117,9 +151,13 @@ class Assistant(Base):
 
 class Thread(Base):
     __tablename__ = "threads"
+    __table_args__ = (
+        sa.Index("ux_threads_id", "id", unique=True),
+        sa.Index("ix_threads_created_at_db_id", "created_at", "db_id"),
+    )
 
     db_id: Mapped[int] = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
-    id: Mapped[Text] = mapped_column(sa.String, index=True)
+    id: Mapped[Text] = mapped_column(sa.String)
     created_at: Mapped[int] = mapped_column(sa.Integer, index=True)
     thread_metadata: Mapped[Dict] = mapped_column(sa.JSON, nullable=True)
     object: Mapped[Text] = mapped_column(sa.String)
@@ -127,13 +165,19 @@ class Thread(Base):
 
     @classmethod
     def from_openai(cls, thread: "OpenaiThread") -> "Thread":
-        return cls(
-            id=thread.id,
-            created_at=thread.created_at,
-            thread_metadata=model_dump(thread.metadata),
-            object=thread.object,
-            tool_resources=model_dump(thread.tool_resources),
-        )
+        return cls(**cls.values_from_openai(thread))
+
+    @classmethod
+    def values_from_openai(cls, thread: "OpenaiThread") -> Dict:
+        """Return the column values of the thread for bulk inserts."""
+
+        return {
+            "id": thread.id,
+            "created_at": thread.created_at,
+            "thread_metadata": model_dump(thread.metadata),
+            "object": thread.object,
+            "tool_resources": model_dump(thread.tool_resources),
+        }
 
     def to_openai(self):
         return OpenaiThread.model_validate(
@@ -161,9 +205,16 @@ class Thread(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        sa.Index("ux_messages_id", "id", unique=True),
+        sa.Index(
+            "ix_messages_thread_id_created_at_db_id", "thread_id", "created_at", "db_id"
+        ),
+        sa.Index("ix_messages_thread_id_run_id", "thread_id", "run_id"),
+    )
 
     db_id: Mapped[int] = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
-    id: Mapped[Text] = mapped_column(sa.String, index=True)
+    id: Mapped[Text] = mapped_column(sa.String)
     assistant_id: Mapped[Text] = mapped_column(sa.String, nullable=True)
     attachments: Mapped[List[Dict]] = mapped_column(sa.JSON, nullable=True)
     completed_at: Mapped[int] = mapped_column(sa.Integer, nullable=True)
@@ -178,51 +229,69 @@ class Message(Base):
     status: Mapped[Text] = mapped_column(sa.String, nullable=True)
     thread_id: Mapped[Text] = mapped_column(sa.String, index=True)
 
+    deferrable_fields = {
+        "attachments": ("attachments", None),
+        "content": ("content", list),
+        "incomplete_details": ("incomplete_details", None),
+        "metadata": ("message_metadata", None),
+    }
+
     @classmethod
     def from_openai(cls, message: "OpenaiMessage") -> "Message":
-        return cls(
-            id=message.id,
-            assistant_id=message.assistant_id,
-            attachments=model_dump(message.attachments),
-            completed_at=message.completed_at,
-            content=model_dump(message.content),
-            created_at=message.created_at,
-            incomplete_at=message.incomplete_at,
-            incomplete_details=model_dump(message.incomplete_details),
-            message_metadata=model_dump(message.metadata),
-            object=message.object,
-            role=message.role,
-            run_id=message.run_id,
-            status=message.status,
-            thread_id=message.thread_id,
-        )
+        return cls(**cls.values_from_openai(message))
+
+    @classmethod
+    def values_from_openai(cls, message: "OpenaiMessage") -> Dict:
+        """Return the column values of the message for bulk inserts."""
 
-    def to_openai(self) -> "OpenaiMessage":
+        return {
+            "id": message.id,
+            "assistant_id": message.assistant_id,
+            "attachments": model_dump(message.attachments),
+            "completed_at": message.completed_at,
+            "content": model_dump(message.content),
+            "created_at": message.created_at,
+            "incomplete_at": message.incomplete_at,
+            "incomplete_details": model_dump(message.incomplete_details),
+            "message_metadata": model_dump(message.metadata),
+            "object": message.object,
+            "role": message.role,
+            "run_id": message.run_id,
+            "status": message.status,
+            "thread_id": message.thread_id,
+        }
+
+    def to_openai(self, *, exclude: Optional[Iterable[Text]] = None) -> "OpenaiMessage":
+        # The JSON columns are read from our own database and are validated
+        # as they are, without dumping them again
         return OpenaiMessage.model_validate(
             {
                 "id": self.id,
                 "assistant_id": self.assistant_id,
-                "attachments": model_dump(self.attachments),
                 "completed_at": self.completed_at,
-                "content": model_dump(self.content),
                 "created_at": self.created_at,
                 "incomplete_at": self.incomplete_at,
-                "incomplete_details": model_dump(self.incomplete_details),
-                "metadata": model_dump(self.message_metadata),
                 "object": self.object,
                 "role": self.role,
                 "run_id": self.run_id,
                 "status": self.status,
                 "thread_id": self.thread_id,
+                **self._deferrable_values(exclude),
             }
         )
 
 
 class Run(Base):
     __tablename__ = "runs"
+    __table_args__ = (
+        sa.Index("ux_runs_id", "id", unique=True),
+        sa.Index(
+            "ix_runs_thread_id_created_at_db_id", "thread_id", "created_at", "db_id"
+        ),
+    )
 
     db_id: Mapped[int] = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
-    id: Mapped[Text] = mapped_column(sa.String, index=True)
+    id: Mapped[Text] = mapped_column(sa.String)
     assistant_id: Mapped[Text] = mapped_column(sa.String, index=True)
     cancelled_at: Mapped[int] = mapped_column(sa.Integer, nullable=True)
     completed_at: Mapped[int] = mapped_column(sa.Integer, nullable=True)
@@ -250,43 +319,63 @@ class Run(Base):
     temperature: Mapped[float] = mapped_column(sa.Float, nullable=True)
     top_p: Mapped[float] = mapped_column(sa.Float, nullable=True)
 
+    deferrable_fields = {
+        "incomplete_details": ("incomplete_details", None),
+        "last_error": ("last_error", None),
+        "metadata": ("run_metadata", None),
+        "required_action": ("required_action", None),
+        "response_format": ("response_format", None),
+        "tool_choice": ("tool_choice", None),
+        "tools": ("tools", list),
+        "truncation_strategy": ("truncation_strategy", None),
+        "usage": ("usage", None),
+    }
+
     @classmethod
     def from_openai(cls, message: "OpenaiRun") -> "Run":
-        return cls(
-            id=message.id,
-            assistant_id=message.assistant_id,
-            cancelled_at=message.cancelled_at,
-            completed_at=message.completed_at,
-            created_at=message.created_at,
-            expires_at=message.expires_at,
-            failed_at=message.failed_at,
-            incomplete_details=model_dump(message.incomplete_details),
-            instructions=message.instructions,
-            last_error=model_dump(message.last_error),
-            max_completion_tokens=message.max_completion_tokens,
-            max_prompt_tokens=message.max_prompt_tokens,
-            run_metadata=model_dump(message.metadata),
-            model=message.model,
-            object=message.object,
-            parallel_tool_calls=message.parallel_tool_calls,
-            required_action=model_dump(message.required_action),
-            response_format=model_dump(message.response_format),
-            started_at=message.started_at,
-            status=message.status,
-            thread_id=message.thread_id,
-            tool_choice=(
+        return cls(**cls.values_from_openai(message))
+
+    @classmethod
+    def values_from_openai(cls, message: "OpenaiRun") -> Dict:
+        """Return the column values of the run for bulk inserts."""
+
+        return {
+            "id": message.id,
+            "assistant_id": message.assistant_id,
+            "cancelled_at": message.cancelled_at,
+            "completed_at": message.completed_at,
+            "created_at": message.created_at,
+            "expires_at": message.expires_at,
+            "failed_at": message.failed_at,
+            "incomplete_details": model_dump(message.incomplete_details),
+            "instructions": message.instructions,
+            "last_error": model_dump(message.last_error),
+            "max_completion_tokens": message.max_completion_tokens,
+            "max_prompt_tokens": message.max_prompt_tokens,
+            "run_metadata": model_dump(message.metadata),
+            "model": message.model,
+            "object": message.object,
+            "parallel_tool_calls": message.parallel_tool_calls,
+            "required_action": model_dump(message.required_action),
+            "response_format": model_dump(message.response_format),
+            "started_at": message.started_at,
+            "status": message.status,
+            "thread_id": message.thread_id,
+            "tool_choice": (
                 message.tool_choice
                 if isinstance(message.tool_choice, Text)
                 else model_dump(message.tool_choice)
             ),
-            tools=model_dump(message.tools),
-            truncation_strategy=model_dump(message.truncation_strategy),
-            usage=model_dump(message.usage),
-            temperature=message.temperature,
-            top_p=message.top_p,
-        )
+            "tools": model_dump(message.tools),
+            "truncation_strategy": model_dump(message.truncation_strategy),
+            "usage": model_dump(message.usage),
+            "temperature": message.temperature,
+            "top_p": message.top_p,
+        }
 
-    def to_openai(self) -> "OpenaiRun":
+    def to_openai(self, *, exclude: Optional[Iterable[Text]] = None) -> "OpenaiRun":
+        # The JSON columns are read from our own database and are validated
+        # as they are, without dumping them again
         return OpenaiRun.model_validate(
             {
                 "id": self.id,
@@ -296,32 +385,53 @@ class Run(Base):
                 "created_at": self.created_at,
                 "expires_at": self.expires_at,
                 "failed_at": self.failed_at,
-                "incomplete_details": model_dump(self.incomplete_details),
                 "instructions": self.instructions,
-                "last_error": model_dump(self.last_error),
                 "max_completion_tokens": self.max_completion_tokens,
                 "max_prompt_tokens": self.max_prompt_tokens,
-                "metadata": model_dump(self.run_metadata),
                 "model": self.model,
                 "object": self.object,
                 "parallel_tool_calls": self.parallel_tool_calls,
-                "required_action": model_dump(self.required_action),
-                "response_format": model_dump(self.response_format),
                 "started_at": self.started_at,
                 "status": self.status,
                 "thread_id": self.thread_id,
-                "tool_choice": (
-                    self.tool_choice
-                    if isinstance(self.tool_choice, Text)
-                    else model_dump(self.tool_choice)
-                ),
-                "tools": model_dump(self.tools),
-                "truncation_strategy": model_dump(self.truncation_strategy),
-                "usage": model_dump(self.usage),
                 "temperature": self.temperature,
                 "top_p": self.top_p,
+                **self._deferrable_values(exclude),
+            }
+        )
+
+
+class RunState(Base):
+    __tablename__ = "run_states"
+    __table_args__ = (sa.Index("ux_run_states_id", "id", unique=True),)
+
+    db_id: Mapped[int] = mapped_column(sa.Integer, primary_key=True, autoincrement=True)
+    id: Mapped[Text] = mapped_column(sa.String)
+    thread_id: Mapped[Text] = mapped_column(sa.String, index=True)
+    created_at: Mapped[int] = mapped_column(sa.Integer)
+    org_type: Mapped[Text] = mapped_column(sa.String, nullable=True)
+    scheduled_at: Mapped[float] = mapped_column(sa.Float, nullable=True, index=True)
+    conversation: Mapped[List[Dict]] = mapped_column(sa.JSON)
+    rounds: Mapped[int] = mapped_column(sa.Integer)
+    usage: Mapped[Dict] = mapped_column(sa.JSON, nullable=True)
+
+    @classmethod
+    def values_from_state(cls, state: "OpenaiRunState") -> Dict:
+        return state.model_dump(mode="json")
+
+    def to_state(self) -> "OpenaiRunState":
+        return OpenaiRunState.model_validate(
+            {
+                "id": self.id,
+                "thread_id": self.thread_id,
+                "created_at": self.created_at,
+                "org_type": self.org_type,
+                "scheduled_at": self.scheduled_at,
+                "conversation": self.conversation,
+                "rounds": self.rounds,
+                "usage": self.usage,
             }
         )
 
 
-__all__ = ["Assistant", "Thread", "Message", "Run"]
+__all__ = ["Assistant", "Thread", "Message", "Run", "RunState"]
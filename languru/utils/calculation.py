@@ -1,4 +1,15 @@
-from typing import TYPE_CHECKING, Literal, TypeVar, overload
+import base64
+from typing import (
+    TYPE_CHECKING,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Text,
+    TypeVar,
+    Union,
+    overload,
+)
 
 import numpy as np
 from numpy.typing import NDArray
@@ -8,23 +19,90 @@ if TYPE_CHECKING:
 
 FloatType = TypeVar("FloatType", np.float16, np.float32, np.float64)
 
+EMBEDDING_ENCODING_FORMATS = ("float", "base64", "base64_float16")
+
 
 def mean_pooling(
-    last_hidden_states: NDArray[FloatType], attention_mask: NDArray[FloatType]
+    last_hidden_states: NDArray[FloatType], attention_mask: NDArray
+) -> NDArray[FloatType]:
+    """The mean of the hidden states of the unmasked tokens.
+
+    The masked sum is a batched matrix product of the mask and the hidden
+    states, `(batch, 1, seq) @ (batch, seq, hidden)`, so no masked copy of
+    the hidden states is made.
+    """
+
+    mask = attention_mask.astype(last_hidden_states.dtype, copy=False)
+    sum_hidden = np.matmul(mask[:, None, :], last_hidden_states)[:, 0]
+    # Avoid division by zero
+    mask_sum = np.maximum(mask.sum(axis=1, keepdims=True), 1)
+    sum_hidden /= mask_sum
+    return sum_hidden
+
+
+def l2_normalize(
+    embeddings: NDArray[FloatType], *, out: Optional[NDArray[FloatType]] = None
 ) -> NDArray[FloatType]:
-    # Convert attention_mask to boolean
-    # and expand its dimensions to match last_hidden_states
-    attention_mask_expanded = np.expand_dims(attention_mask, axis=-1).astype(bool)
-    # Use the attention mask to zero out positions in last_hidden_states
-    last_hidden = np.where(attention_mask_expanded, last_hidden_states, 0.0)
-    # Sum along the specified axis and compute the average
-    sum_hidden = last_hidden.sum(axis=1)
-    mask_sum = attention_mask.sum(axis=1, keepdims=True)
+    """L2 normalize the rows, in place if `out` is `embeddings`."""
+
+    norms = np.sqrt(np.einsum("ij,ij->i", embeddings, embeddings))[:, None]
     # Avoid division by zero
-    mask_sum = np.where(mask_sum == 0, 1, mask_sum)
+    norms[norms == 0] = 1
+    return np.divide(embeddings, norms, out=out)
+
+
+def truncate_embeddings(
+    embeddings: NDArray[FloatType], dimensions: Optional[int]
+) -> NDArray[FloatType]:
+    """Keep the first `dimensions` of the Matryoshka embeddings and normalize
+    them again, the embeddings are returned as is if they are not longer.
+    """
+
+    if dimensions is None or dimensions >= embeddings.shape[-1]:
+        return embeddings
+    truncated = np.array(embeddings[:, :dimensions], order="C")
+    return l2_normalize(truncated, out=truncated)
+
+
+def embeddings_to_base64(
+    embeddings: NDArray, dtype: Literal["float32", "float16"] = "float32"
+) -> List[Text]:
+    """Pack each row as the base64 of its little-endian floats, the
+    `encoding_format="base64"` of the OpenAI embeddings with float32.
+    """
+
+    packed = np.ascontiguousarray(embeddings, dtype=np.dtype(dtype).newbyteorder("<"))
+    return [base64.b64encode(row.data).decode("ascii") for row in packed]
+
+
+def base64_to_embeddings(
+    encoded: Sequence[Text], dtype: Literal["float32", "float16"] = "float32"
+) -> NDArray[np.float32]:
+    """Unpack the base64 rows of `embeddings_to_base64`."""
+
+    _dtype = np.dtype(dtype).newbyteorder("<")
+    return np.stack(
+        [np.frombuffer(base64.b64decode(e), dtype=_dtype) for e in encoded]
+    ).astype(np.float32, copy=False)
+
+
+def encode_embeddings(
+    embeddings: NDArray, encoding_format: Optional[Text] = "float"
+) -> Union[List[List[float]], List[Text]]:
+    """Encode the embeddings in the `encoding_format`, "float", "base64" of
+    float32, or "base64_float16" of float16 for half the size.
+    """
 
-    average_hidden = sum_hidden / mask_sum
-    return average_hidden
+    if encoding_format in (None, "float"):
+        return embeddings.tolist()
+    if encoding_format == "base64":
+        return embeddings_to_base64(embeddings, "float32")
+    if encoding_format == "base64_float16":
+        return embeddings_to_base64(embeddings, "float16")
+    raise ValueError(
+        f"Unsupported encoding format: '{encoding_format}', "
+        + f"supported formats are {EMBEDDING_ENCODING_FORMATS}"
+    )
 
 
 @overload
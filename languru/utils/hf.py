@@ -1,8 +1,10 @@
-from typing import Literal, Optional, Sequence, Text, Union, cast
+from typing import List, Literal, Optional, Sequence, Set, Text, Union, cast
 
 import torch
 from transformers import PreTrainedTokenizer, PreTrainedTokenizerFast, StoppingCriteria
 
+from languru.utils.stop_sequences import StopSequences
+
 
 def remove_special_tokens(
     text: Text, tokenizer: Union[PreTrainedTokenizer, PreTrainedTokenizerFast]
@@ -39,17 +41,75 @@ class StopAtWordsStoppingCriteria(StoppingCriteria):
         super().__init__()
 
         self.stop_words_ids = [self.to_cpu_long(s) for s in stop_words_ids]
+        self.stop_sequences: StopSequences[int] = StopSequences(
+            s.reshape(-1).tolist() for s in self.stop_words_ids
+        )
         self.stop_reason: Optional[Literal["stop", "length", "content_filter"]] = None
+        # The matching states of the rows, fed with the new tokens of each step
+        self._states: List[int] = []
+        self._stopped: Set[int] = set()
+        self._seen_length = 0
+        # The batch size of the generation, None before its first call
+        self._batch_size: Optional[int] = None
+
+    def __call__(
+        self, input_ids: "torch.LongTensor", scores: "torch.FloatTensor", **kwargs
+    ) -> "torch.BoolTensor":
+        """Return whether each row is done, a row stops at its first stop word
+        and the others keep generating.
+        """
+
+        batch_size, length = input_ids.shape
+        if not self._continues(input_ids):
+            # A new generation, the states start from its prompt tail, and
+            # only a stop word ending at the last token stops it
+            start = max(length - self.stop_sequences.max_length, 0)
+            self._states = [
+                self.stop_sequences.advance(0, row_ids)
+                for row_ids in input_ids[:, start : length - 1].tolist()
+            ]
+            self._stopped = set()
+            self._seen_length = length - 1
+            self._batch_size = batch_size
+
+        # Only the tokens since the last step are copied to the CPU
+        new_ids = input_ids[:, self._seen_length :].tolist()
+        self._seen_length = length
+        for row, row_ids in enumerate(new_ids):
+            if row in self._stopped:
+                continue
+            self._states[row], match = self.stop_sequences.feed(
+                self._states[row], row_ids
+            )
+            if match is not None:
+                self._stopped.add(row)
+        if self._stopped:
+            self.stop_reason = "stop"
+        is_done = torch.tensor(
+            [row in self._stopped for row in range(batch_size)],
+            dtype=torch.bool,
+            device=input_ids.device,
+        )
+        return cast(torch.BoolTensor, is_done)
+
+    def reset(self) -> None:
+        """Start anew at the next call, e.g. before reusing the criteria for
+        a generation of the same batch size and a prompt one token longer.
+        """
+
+        self._states = []
+        self._stopped = set()
+        self._seen_length = 0
+        self._batch_size = None
+        self.stop_reason = None
+
+    def _continues(self, input_ids: "torch.LongTensor") -> bool:
+        """Whether the input IDs extend the rows of the last call by the one
+        token of a generation step, without comparing the prompt tokens.
+        """
 
-    def __call__(self, input_ids: "torch.LongTensor", scores: "torch.FloatTensor"):
-        input_ids_cpu = self.to_cpu_long(input_ids)
-        for stop_words_id in self.stop_words_ids:
-            if torch.all(
-                (stop_words_id == input_ids_cpu[0][-len(stop_words_id) :])
-            ).item():
-                self.stop_reason = "stop"
-                return True
-        return False
+        batch_size, length = input_ids.shape
+        return batch_size == self._batch_size and length == self._seen_length + 1
 
     def get_stop_reason(self) -> Optional[Literal["stop", "length", "content_filter"]]:
         return self.stop_reason
@@ -1,7 +1,20 @@
 import json
 import logging
-from typing import Any, Dict, Generator, Iterable, List, Literal, Optional, Text, Union
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Text,
+    Union,
+)
 
+import anyio
 import httpx
 from pydantic import BaseModel
 
@@ -22,6 +35,16 @@ async def requests_stream_lines(
                 yield chunk + "\n"
 
 
+def _sse_encode_item(item: Union[Text, Dict, List[Any], BaseModel]) -> Optional[Text]:
+    if isinstance(item, BaseModel):
+        return f"data: {item.model_dump_json()}\n\n"
+    elif isinstance(item, (Dict, List)):
+        return f"data: {json.dumps(item)}\n\n"
+    elif isinstance(item, Text):
+        return f"data: {item}\n\n"
+    return None
+
+
 def simple_sse_encode(
     stream: Union[
         Iterable[Union[Text, Dict, List[Any], BaseModel]],
@@ -33,17 +56,44 @@ def simple_sse_encode(
     logger = logging.getLogger(logger) if isinstance(logger, Text) else logger
     has_warned = False
     for item in stream:
-        if isinstance(item, BaseModel):
-            yield f"data: {item.model_dump_json()}\n\n"
-        elif isinstance(item, (Dict, List)):
-            yield f"data: {json.dumps(item)}\n\n"
-        elif isinstance(item, Text):
-            yield f"data: {item}\n\n"
-        else:
+        encoded = _sse_encode_item(item)
+        if encoded is None:
             if has_warned is False:
                 logger.warning(
                     f"Unknown type {type(item)} in stream, using str() to encode."
                 )
                 has_warned = True
-            yield f"data: {str(item)}\n\n"
+            encoded = f"data: {str(item)}\n\n"
+        yield encoded
     yield "data: [DONE]\n\n"
+
+
+async def async_simple_sse_encode(
+    stream: AsyncIterable[Union[Text, Dict, List[Any], BaseModel]],
+    logger: Optional[Union[Text, "logging.Logger"]] = None,
+) -> AsyncGenerator[Text, None]:
+    """The async `simple_sse_encode`, the stream is closed when the encoding
+    generator is closed, e.g. when the client disconnects.
+    """
+
+    logger = logger or languru_logger
+    logger = logging.getLogger(logger) if isinstance(logger, Text) else logger
+    has_warned = False
+    try:
+        async for item in stream:
+            encoded = _sse_encode_item(item)
+            if encoded is None:
+                if has_warned is False:
+                    logger.warning(
+                        f"Unknown type {type(item)} in stream, using str() to encode."
+                    )
+                    has_warned = True
+                encoded = f"data: {str(item)}\n\n"
+            yield encoded
+        yield "data: [DONE]\n\n"
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            # Shielded, the enclosing scope may be cancelled already
+            with anyio.CancelScope(shield=True):
+                await aclose()
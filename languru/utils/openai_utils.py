@@ -20,6 +20,9 @@ def rand_openai_id(
         "message",
         "msg",
         "run",
+        "file",
+        "batch",
+        "batch_req",
     ]
 ) -> Text:
     if type in ("chat_completion", "chatcmpl"):
@@ -32,6 +35,12 @@ def rand_openai_id(
         return rand_message_id()
     elif type == "run":
         return rand_run_id()
+    elif type == "file":
+        return rand_file_id()
+    elif type == "batch":
+        return rand_batch_id()
+    elif type == "batch_req":
+        return rand_batch_request_id()
     else:
         raise ValueError(f"Invalid type: {type}")
 
@@ -56,6 +65,18 @@ def rand_run_id() -> Text:
     return f"run_{rand_str(24)}"
 
 
+def rand_file_id() -> Text:
+    return f"file-{rand_str(24)}"
+
+
+def rand_batch_id() -> Text:
+    return f"batch_{rand_str(24)}"
+
+
+def rand_batch_request_id() -> Text:
+    return f"batch_req_{rand_str(24)}"
+
+
 def ensure_chat_completion_message_params(
     messages: (
         Sequence[ChatCompletionMessageParam]
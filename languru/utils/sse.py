@@ -1,10 +1,14 @@
 import json
-from typing import Dict, List, Text, Union
+from json.encoder import encode_basestring_ascii
+from typing import Dict, List, Optional, Text, Union
 
 from pydantic import BaseModel
 
 from languru.config import logger
 
+# A placeholder without JSON escapes, so it is rendered as is in the template
+_CONTENT_PLACEHOLDER = "__languru_chunk_content__"
+
 
 def simple_encode_sse(
     data: Union[bytes, Text, BaseModel, Dict, List],
@@ -40,3 +44,91 @@ def simple_encode_sse(
         logger.warning(f"Unknown data type to encode SSE: {type(data)}")
         encoded_data = str(data).encode(encoding)
     return b"data: " + encoded_data + b"\n\n"
+
+
+class ChatCompletionChunkEncoder:
+    """Encode the content chunks of one chat completion stream.
+
+    The SSE frame of a chunk with the fixed ID, model and creation time of the
+    stream is rendered once, and each content delta is only JSON escaped into
+    it. The frames are byte-identical to `simple_encode_sse` of the same
+    `ChatCompletionChunk`.
+
+    Parameters
+    ----------
+    id : Text
+        The chat completion ID.
+    model : Text
+        The model name.
+    created : int
+        The timestamp when the chat completion was created.
+    system_fingerprint : Optional[Text], optional
+        The system fingerprint of the chunks, by default None.
+    encoding : Text, optional
+        The encoding format, by default "utf-8".
+    """
+
+    def __init__(
+        self,
+        *,
+        id: Text,
+        model: Text,
+        created: int,
+        system_fingerprint: Optional[Text] = None,
+        encoding: Text = "utf-8",
+    ):
+        from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+        self.id = id
+        self.model = model
+        self.created = created
+        self.system_fingerprint = system_fingerprint
+        self.encoding = encoding
+        frame = simple_encode_sse(
+            ChatCompletionChunk.model_validate(
+                {
+                    "id": id,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "delta": {
+                                "content": _CONTENT_PLACEHOLDER,
+                                "role": "assistant",
+                            },
+                        }
+                    ],
+                    "created": created,
+                    "model": model,
+                    "object": "chat.completion.chunk",
+                    "system_fingerprint": system_fingerprint,
+                }
+            ),
+            encoding=encoding,
+        )
+        self._prefix, self._suffix = frame.split(
+            json.dumps(_CONTENT_PLACEHOLDER).encode(encoding), 1
+        )
+
+    def matches(
+        self,
+        *,
+        id: Text,
+        model: Text,
+        created: int,
+        system_fingerprint: Optional[Text] = None,
+    ) -> bool:
+        return (id, model, created, system_fingerprint) == (
+            self.id,
+            self.model,
+            self.created,
+            self.system_fingerprint,
+        )
+
+    def encode_content(self, content: Text) -> bytes:
+        """Encode the chunk of the assistant content delta."""
+
+        return (
+            self._prefix
+            + encode_basestring_ascii(content).encode(self.encoding)
+            + self._suffix
+        )
@@ -0,0 +1,112 @@
+from collections import deque
+from typing import (
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+Symbol = TypeVar("Symbol", bound=Hashable)
+
+
+class StopSequences(Generic[Symbol]):
+    """The Aho-Corasick automaton of the stop sequences, matching all of them
+    at once on a stream of symbols, e.g. the characters of the generated text
+    or the generated token ids.
+
+    A stream keeps its state, an int, and feeds only its new symbols, so each
+    symbol is visited once however many stop sequences there are.
+
+    Parameters
+    ----------
+    patterns : Iterable[Sequence[Symbol]]
+        The stop sequences, the empty ones are ignored.
+    """
+
+    def __init__(self, patterns: Iterable[Sequence[Symbol]]):
+        self.patterns = tuple(tuple(p) for p in patterns if len(p) > 0)
+        self._goto: List[Dict[Symbol, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        # The length of the longest pattern ending at the state, 0 if none
+        self._output: List[int] = [0]
+
+        for pattern in self.patterns:
+            state = 0
+            for symbol in pattern:
+                next_state = self._goto[state].get(symbol)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][symbol] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._depth.append(self._depth[state] + 1)
+                    self._output.append(0)
+                state = next_state
+            self._output[state] = max(self._output[state], len(pattern))
+
+        # The failure links, breadth first so the shorter suffixes are done
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and symbol not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(symbol, 0)
+                self._fail[next_state] = fail if fail != next_state else 0
+                if self._output[next_state] == 0:
+                    self._output[next_state] = self._output[fail]
+                queue.append(next_state)
+
+    def __bool__(self) -> bool:
+        return len(self.patterns) > 0
+
+    @property
+    def max_length(self) -> int:
+        return max((len(p) for p in self.patterns), default=0)
+
+    def feed(
+        self, state: int, symbols: Iterable[Symbol]
+    ) -> Tuple[int, Optional[Tuple[int, int]]]:
+        """Feed the new symbols of a stream in the state.
+
+        Returns
+        -------
+        Tuple[int, Optional[Tuple[int, int]]]
+            The new state, and the first match as the index of its last symbol
+            in `symbols` and its length, or None if no stop sequence matched.
+        """
+
+        goto, fail, output = self._goto, self._fail, self._output
+        for index, symbol in enumerate(symbols):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            if output[state]:
+                return (state, (index, output[state]))
+        return (state, None)
+
+    def advance(self, state: int, symbols: Iterable[Symbol]) -> int:
+        """Feed the symbols in the state ignoring the matches, e.g. to start
+        a stream from its context, returns the new state.
+        """
+
+        goto, fail = self._goto, self._fail
+        for symbol in symbols:
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+        return state
+
+    def pending(self, state: int) -> int:
+        """The number of the last symbols which may begin a stop sequence, so
+        a stream holds them back until the following symbols tell.
+        """
+
+        return self._depth[state]
@@ -0,0 +1,134 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+from languru.openai_plugins.clients.anthropic import AnthropicOpenAI
+from languru.utils.http import async_simple_sse_encode
+
+
+class _AsyncStream:
+    """An `anthropic.AsyncStream` of the events, records if it was closed."""
+
+    def __init__(self, events, *, hang: bool = False):
+        self.events = events
+        self.hang = hang
+        self.closed = False
+
+    async def __aiter__(self):
+        for event in self.events:
+            yield event
+        if self.hang:
+            await asyncio.sleep(60)
+
+    async def close(self):
+        self.closed = True
+
+
+def _events():
+    return [
+        SimpleNamespace(
+            type="message_start",
+            message=SimpleNamespace(
+                id="msg_1", usage=SimpleNamespace(input_tokens=10, output_tokens=1)
+            ),
+        ),
+        SimpleNamespace(
+            type="content_block_delta",
+            delta=SimpleNamespace(type="text_delta", text="Hel"),
+        ),
+        SimpleNamespace(
+            type="content_block_delta",
+            delta=SimpleNamespace(type="text_delta", text="lo"),
+        ),
+        SimpleNamespace(
+            type="message_delta",
+            delta=SimpleNamespace(stop_reason="max_tokens"),
+            usage=SimpleNamespace(output_tokens=2),
+        ),
+        SimpleNamespace(type="message_stop"),
+    ]
+
+
+@pytest.fixture
+def anthropic_openai(monkeypatch: pytest.MonkeyPatch):
+    client = AnthropicOpenAI(api_key="test")
+    requests = []
+    streams = []
+
+    async def create(**kwargs):
+        requests.append(kwargs)
+        streams.append(_AsyncStream(_events(), hang=kwargs["model"] == "hang"))
+        return streams[-1]
+
+    monkeypatch.setattr(client.async_anthropic_client.messages, "create", create)
+    return (client, requests, streams)
+
+
+@pytest.mark.asyncio
+async def test_anthropic_async_create_stream(anthropic_openai):
+    client, requests, streams = anthropic_openai
+    chunks = [
+        chunk
+        async for chunk in await client.chat.completions.async_create_stream(
+            messages=[{"role": "user", "content": "Hi"}],
+            model="claude-3-haiku-20240307",
+            stream_options={"include_usage": True},
+        )
+    ]
+    assert requests[0]["stream"] is True
+    assert "stream_options" not in requests[0]
+    assert [c.choices[0].delta.content for c in chunks[:-2]] == ["Hel", "lo"]
+    assert chunks[-2].choices[0].finish_reason == "length"
+    assert chunks[-2].usage is None
+    # The usage is in a trailing chunk without choices
+    assert chunks[-1].choices == []
+    assert chunks[-1].usage is not None
+    assert chunks[-1].usage.total_tokens == 12
+    assert streams[0].closed
+
+    # The chunks are the ones the sync stream encodes
+    sync_lines = list(
+        client.chat.completions.generator_generate_content_chunks(
+            _events(),  # type: ignore[arg-type]
+            model="claude-3-haiku-20240307",
+            created=chunks[0].created,
+            include_usage=True,
+        )
+    )
+    assert [
+        ChatCompletionChunk.model_validate_json(line.decode()[len("data: ") :])
+        for line in sync_lines[:-1]
+    ] == chunks
+
+    # Without `stream_options.include_usage` no chunk carries the usage
+    chunks = [
+        chunk
+        async for chunk in await client.chat.completions.async_create_stream(
+            messages=[{"role": "user", "content": "Hi"}],
+            model="claude-3-haiku-20240307",
+        )
+    ]
+    assert chunks[-1].choices[0].finish_reason == "length"
+    assert all(c.usage is None for c in chunks)
+
+
+@pytest.mark.asyncio
+async def test_anthropic_async_stream_cancelled(anthropic_openai):
+    client, _, streams = anthropic_openai
+    received = asyncio.Event()
+
+    async def consume():
+        stream = await client.chat.completions.async_create_stream(
+            messages=[{"role": "user", "content": "Hi"}], model="hang"
+        )
+        async for line in async_simple_sse_encode(stream):
+            received.set()
+
+    task = asyncio.create_task(consume())
+    await asyncio.wait_for(received.wait(), timeout=10)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert streams[0].closed
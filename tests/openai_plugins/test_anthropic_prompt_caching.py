@@ -0,0 +1,238 @@
+from types import SimpleNamespace
+
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+from languru.openai_plugins.clients.anthropic import (
+    AnthropicOpenAI,
+    to_completion_usage,
+)
+from languru.types.chat.anthropic import (
+    AnthropicChatCompletionRequest,
+    prompt_cache_min_tokens,
+)
+from languru.types.chat.completions import ChatCompletionRequest
+
+LONG_TEXT = "lorem ipsum " * 400  # About 1200 tokens
+
+
+def _openai_request(
+    messages, model: str = "claude-3-5-sonnet-20240620"
+) -> ChatCompletionRequest:
+    return ChatCompletionRequest.from_kwargs(messages=messages, model=model)
+
+
+def _cache_marks(request: AnthropicChatCompletionRequest):
+    system_marks = [
+        b.cache_control is not None
+        for b in (request.system if isinstance(request.system, list) else [])
+    ]
+    message_marks = [
+        isinstance(m.content, list) and m.content[-1].cache_control is not None
+        for m in request.messages
+    ]
+    return (system_marks, message_marks)
+
+
+def test_anthropic_prompt_caching_auto_breakpoints():
+    request = AnthropicChatCompletionRequest.from_openai_chat_completion_request(
+        _openai_request(
+            [
+                {"role": "system", "content": LONG_TEXT},
+                {"role": "user", "content": "Hi"},
+                {"role": "assistant", "content": "Hello"},
+                {"role": "user", "content": "How are you?"},
+            ]
+        ),
+        prompt_caching=True,
+    )
+    assert request.uses_prompt_caching
+    assert _cache_marks(request) == ([True], [True, False, True])
+    assert request.model_dump(exclude_none=True)["system"] == [
+        {
+            "type": "text",
+            "text": LONG_TEXT.strip(),
+            "cache_control": {"type": "ephemeral"},
+        }
+    ]
+
+    # Too short prefixes are not cached
+    request = AnthropicChatCompletionRequest.from_openai_chat_completion_request(
+        _openai_request([{"role": "user", "content": "Hi"}]), prompt_caching=True
+    )
+    assert not request.uses_prompt_caching
+    assert request.messages[0].content == "Hi"
+
+
+def test_anthropic_prompt_caching_model_min_tokens():
+    assert prompt_cache_min_tokens("claude-3-5-sonnet-20240620") == 1024
+    assert prompt_cache_min_tokens("claude-3-haiku-20240307") == 2048
+
+    # The prefix is long enough for Sonnet but not for Haiku
+    messages = [
+        {"role": "system", "content": LONG_TEXT},
+        {"role": "user", "content": "Hi"},
+    ]
+    request = AnthropicChatCompletionRequest.from_openai_chat_completion_request(
+        _openai_request(messages, "claude-3-haiku-20240307"), prompt_caching=True
+    )
+    assert not request.uses_prompt_caching
+    messages[0]["content"] = LONG_TEXT * 2
+    request = AnthropicChatCompletionRequest.from_openai_chat_completion_request(
+        _openai_request(messages, "claude-3-haiku-20240307"), prompt_caching=True
+    )
+    assert _cache_marks(request) == ([True], [True])
+
+
+def test_anthropic_prompt_caching_opt_in():
+    completions = AnthropicOpenAI(api_key="test").chat.completions
+    messages = [
+        {"role": "system", "content": LONG_TEXT},
+        {"role": "user", "content": "Hi"},
+    ]
+    request = completions.to_anthropic_request(
+        messages=messages, model="claude-3-5-sonnet-20240620"  # type: ignore
+    )
+    assert not request.uses_prompt_caching
+    request = completions.to_anthropic_request(
+        messages=messages,  # type: ignore[arg-type]
+        model="claude-3-5-sonnet-20240620",
+        extra_body={"prompt_caching": True},
+    )
+    assert request.uses_prompt_caching
+
+
+def test_anthropic_prompt_caching_hinted_breakpoints():
+    request = AnthropicChatCompletionRequest.from_openai_chat_completion_request(
+        _openai_request(
+            [
+                {"role": "system", "content": "Be brief."},
+                {"role": "user", "content": LONG_TEXT},
+                {"role": "assistant", "content": "OK"},
+                {"role": "user", "content": LONG_TEXT},
+            ]
+        ),
+        prompt_caching=True,
+        cache_breakpoints=[1],
+    )
+    # The OpenAI message index 1 is the Anthropic message index 0
+    assert _cache_marks(request) == ([], [True, False, False])
+
+    request = AnthropicChatCompletionRequest.from_openai_chat_completion_request(
+        _openai_request([{"role": "user", "content": LONG_TEXT}]),
+        prompt_caching=False,
+    )
+    assert not request.uses_prompt_caching
+
+
+def test_anthropic_prompt_caching_no_messages():
+    request = AnthropicChatCompletionRequest(
+        model="claude-3-5-sonnet-20240620", messages=[], system=LONG_TEXT
+    )
+    # The message breakpoints are skipped without messages
+    request = request.with_cache_control(breakpoints=["system", 0, -1])
+    assert _cache_marks(request) == ([True], [])
+    request = request.with_cache_control()
+    assert _cache_marks(request) == ([True], [])
+
+
+def test_anthropic_prompt_caching_unsupported():
+    request = AnthropicChatCompletionRequest.from_openai_chat_completion_request(
+        _openai_request(
+            [
+                {"role": "system", "content": LONG_TEXT},
+                {"role": "user", "content": "Hi"},
+            ]
+        ),
+        prompt_caching=True,
+    )
+    assert request.uses_prompt_caching
+    completions = AnthropicOpenAI(api_key="test").chat.completions
+
+    # The prompt caching beta resource when the SDK has it
+    anthropic_client = SimpleNamespace(
+        messages="messages",
+        beta=SimpleNamespace(prompt_caching=SimpleNamespace(messages="beta")),
+    )
+    assert completions.anthropic_messages(
+        request, anthropic_client=anthropic_client  # type: ignore[arg-type]
+    ) == ("beta", request)
+
+    # Otherwise the messages resource without the breakpoints
+    anthropic_client = SimpleNamespace(messages="messages", beta=SimpleNamespace())
+    messages, sent_request = completions.anthropic_messages(
+        request, anthropic_client=anthropic_client  # type: ignore[arg-type]
+    )
+    assert messages == "messages"
+    assert not sent_request.uses_prompt_caching
+    assert "cache_control" not in str(sent_request.model_dump(exclude_none=True))
+    assert request.uses_prompt_caching
+
+
+def test_anthropic_prompt_caching_usage():
+    usage = to_completion_usage(
+        SimpleNamespace(
+            input_tokens=10,
+            output_tokens=5,
+            cache_creation_input_tokens=1500,
+            cache_read_input_tokens=2000,
+        )
+    )
+    assert (usage.prompt_tokens, usage.completion_tokens, usage.total_tokens) == (
+        3510,
+        5,
+        3515,
+    )
+    assert usage.model_dump()["prompt_tokens_details"] == {"cached_tokens": 2000}
+    assert usage.model_dump()["cache_creation_input_tokens"] == 1500
+
+    # Without prompt caching
+    usage = to_completion_usage(SimpleNamespace(input_tokens=10, output_tokens=5))
+    assert (usage.prompt_tokens, usage.total_tokens) == (10, 15)
+
+
+def test_anthropic_stream_cache_usage():
+    events = [
+        SimpleNamespace(
+            type="message_start",
+            message=SimpleNamespace(
+                id="msg_1",
+                usage=SimpleNamespace(
+                    input_tokens=10,
+                    output_tokens=1,
+                    cache_creation_input_tokens=0,
+                    cache_read_input_tokens=2000,
+                ),
+            ),
+        ),
+        SimpleNamespace(
+            type="content_block_delta",
+            delta=SimpleNamespace(type="text_delta", text="Hi"),
+        ),
+        SimpleNamespace(
+            type="message_delta",
+            delta=SimpleNamespace(stop_reason="end_turn"),
+            usage=SimpleNamespace(output_tokens=2),
+        ),
+        SimpleNamespace(type="message_stop"),
+    ]
+    client = AnthropicOpenAI(api_key="test")
+    lines = list(
+        client.chat.completions.generator_generate_content_chunks(
+            events,  # type: ignore[arg-type]
+            model="claude-3-haiku-20240307",
+            include_usage=True,
+        )
+    )
+    chunks = [
+        ChatCompletionChunk.model_validate_json(line.decode().strip()[len("data: ") :])
+        for line in lines[:-1]
+    ]
+    assert chunks[0].choices[0].delta.content == "Hi"
+    assert chunks[-2].choices[0].finish_reason == "stop"
+    assert chunks[-2].usage is None
+    assert chunks[-1].choices == []
+    assert chunks[-1].usage is not None
+    assert (chunks[-1].usage.prompt_tokens, chunks[-1].usage.completion_tokens) == (
+        2010,
+        2,
+    )
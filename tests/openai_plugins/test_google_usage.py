@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
+
+from languru.openai_plugins.clients.google import (
+    GoogleOpenAI,
+    get_generative_model,
+    to_completion_usage,
+    to_generation_config,
+)
+
+
+def test_google_generative_model_cached():
+    config = to_generation_config(temperature=0.0, stop="\n")
+    assert config == (("stop_sequences", ("\n",)), ("temperature", 0.0))
+    model = get_generative_model("models/gemini-1.5-flash", config)
+    assert model is get_generative_model("models/gemini-1.5-flash", config)
+    assert model is not get_generative_model("models/gemini-1.5-flash", None)
+
+
+def test_google_completion_usage():
+    usage_metadata = SimpleNamespace(prompt_token_count=12, candidates_token_count=3)
+    usage = to_completion_usage(usage_metadata, contents=[], output_text="")
+    assert (usage.prompt_tokens, usage.completion_tokens, usage.total_tokens) == (
+        12,
+        3,
+        15,
+    )
+
+    # Estimated without usage metadata
+    usage = to_completion_usage(
+        None, contents=[{"role": "user", "parts": ["12345678"]}], output_text="12345"
+    )
+    assert (usage.prompt_tokens, usage.completion_tokens) == (2, 2)
+
+
+def test_google_stream_usage_chunk():
+    generate_content_chunks = [
+        SimpleNamespace(
+            candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))],
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=7, candidates_token_count=count
+            ),
+        )
+        for parts, count in (([SimpleNamespace(text="Hi")], 1), ([], 2))
+    ]
+    lines = list(
+        GoogleOpenAI(api_key="test").chat.completions.generator_generate_content_chunks(
+            generate_content_chunks,  # type: ignore[arg-type]
+            model="models/gemini-1.5-flash",
+            include_usage=True,
+        )
+    )
+    assert lines[-1] == b"data: [DONE]\n\n"
+    chunks = [
+        ChatCompletionChunk.model_validate_json(line.removeprefix(b"data: "))
+        for line in lines[:-1]
+    ]
+    assert chunks[-2].choices[0].finish_reason == "stop"
+    assert chunks[-2].usage is None
+    assert chunks[-1].choices == []
+    assert chunks[-1].usage is not None
+    assert chunks[-1].usage.total_tokens == 9
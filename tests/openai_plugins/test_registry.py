@@ -0,0 +1,134 @@
+import importlib.metadata
+import threading
+import time
+
+import pytest
+
+import languru.openai_plugins.registry
+from languru.openai_plugins.registry import (
+    PROVIDERS_ENTRY_POINT_GROUP,
+    ProviderCapabilities,
+    ProviderSpec,
+    load_providers,
+)
+from languru.server.deps.openai_clients import OpenaiClients
+from languru.types.organizations import OrganizationType
+
+
+class _Client:
+    pass
+
+
+class _SlowClient:
+    created = 0
+
+    def __init__(self):
+        time.sleep(0.2)
+        _SlowClient.created += 1
+
+
+ACME_PROVIDER = ProviderSpec(
+    organization="acme",
+    aliases=("ac",),
+    client=f"{__name__}:_Client",
+    models=("acme-chat",),
+    env_keys=("LANGURU_TEST_API_KEY",),
+    capabilities=ProviderCapabilities(embeddings=True, max_concurrency=8),
+)
+
+
+def _acme_provider() -> ProviderSpec:
+    return ACME_PROVIDER
+
+
+@pytest.fixture
+def entry_points(monkeypatch: pytest.MonkeyPatch):
+    def _entry_points(*, group):
+        assert group == PROVIDERS_ENTRY_POINT_GROUP
+        return [
+            importlib.metadata.EntryPoint(
+                name="acme", value=f"{__name__}:_acme_provider", group=group
+            ),
+            importlib.metadata.EntryPoint(
+                name="broken", value=f"{__name__}:_missing", group=group
+            ),
+        ]
+
+    monkeypatch.setattr(
+        languru.openai_plugins.registry.importlib.metadata,
+        "entry_points",
+        _entry_points,
+    )
+
+
+def test_load_providers(entry_points):
+    providers = {spec.name: spec for spec in load_providers()}
+    assert providers["acme"] == ACME_PROVIDER
+    assert OrganizationType.OPENAI.value in providers
+    assert "broken" not in providers
+
+
+def test_openai_clients_entry_point_provider(
+    entry_points, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("LANGURU_TEST_API_KEY", "test")
+    openai_clients = OpenaiClients()
+
+    assert openai_clients.org_from_model("acme-chat") == "acme"
+    assert openai_clients.org_from_model("ac/acme-chat") == "acme"
+    assert openai_clients.model_strip_org("AC/acme-chat", "acme") == "acme-chat"
+    assert openai_clients.capabilities("ac").max_concurrency == 8
+    assert isinstance(openai_clients.org_to_openai_client("acme"), _Client)
+    # No async factory
+    assert openai_clients.async_client("acme") is None
+
+    # The built-in providers keep their organization types
+    assert openai_clients.to_org("claude") is OrganizationType.ANTHROPIC
+    assert not openai_clients.capabilities("voyage").supports("chat")
+
+
+def test_openai_clients_provider_credentials(monkeypatch: pytest.MonkeyPatch):
+    for spec in load_providers():
+        for env_key in spec.env_keys:
+            monkeypatch.delenv(env_key, raising=False)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    openai_clients = OpenaiClients()
+
+    # The OpenAI key does not make the other providers available
+    assert {m.owned_by for m in openai_clients.models()} == {"openai"}
+    assert openai_clients.org_from_model("claude-3-5-sonnet-20240620") is None
+
+
+def test_openai_clients_local_models(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("LOCAL_GENERATION_MODEL", "tiny-chat")
+    monkeypatch.delenv("LOCAL_EMBEDDINGS_MODEL", raising=False)
+    openai_clients = OpenaiClients()
+
+    # The local models are named by the environment variables
+    assert openai_clients.models(model="tiny-chat")[0].owned_by == "local"
+    assert openai_clients.org_from_model("tiny-chat") == "local"
+    assert openai_clients.org_from_model("local/tiny-chat") == "local"
+
+
+def test_openai_clients_create_client_once():
+    openai_clients = OpenaiClients(
+        providers=[
+            ProviderSpec(organization="slow", client=f"{__name__}:_SlowClient"),
+            ProviderSpec(organization="fast", client=f"{__name__}:_Client"),
+        ]
+    )
+    clients = []
+    threads = [
+        threading.Thread(target=lambda: clients.append(openai_clients.client("slow")))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    # The other providers are not blocked by the slow client
+    started_at = time.monotonic()
+    assert isinstance(openai_clients.client("fast"), _Client)
+    assert time.monotonic() - started_at < 0.1
+    for t in threads:
+        t.join()
+    assert _SlowClient.created == 1
+    assert len(clients) == 4 and all(c is clients[0] for c in clients)
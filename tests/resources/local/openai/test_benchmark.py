@@ -0,0 +1,54 @@
+import time
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from languru.resources.openai_backend import BaseOpenaiBackend
+from languru.utils.openai_dummies import get_dummy_message, get_dummy_thread
+
+
+def _benchmark(openai_backend: BaseOpenaiBackend, messages_count: int = 300) -> Dict:
+    """Return the operations per second of the message hot paths."""
+
+    openai_backend.touch()
+    thread = openai_backend.threads.create(get_dummy_thread())
+    messages = [get_dummy_message(thread_id=thread.id) for _ in range(messages_count)]
+
+    result = {}
+    start = time.perf_counter()
+    for message in messages:
+        openai_backend.threads.messages.create(message)
+    result["create"] = messages_count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for message in messages:
+        openai_backend.threads.messages.retrieve(message.id, thread_id=thread.id)
+    result["retrieve"] = messages_count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(20):
+        page = openai_backend.threads.messages.list(thread.id, limit=100)
+        assert len(page) == 100
+    result["list"] = 20 / (time.perf_counter() - start)
+
+    openai_backend.close()
+    return result
+
+
+@pytest.mark.benchmark
+def test_openai_backend_engines_benchmark(tmp_path: Path):
+    results = {
+        "sql": _benchmark(
+            BaseOpenaiBackend.from_url(f"sqlite:///{tmp_path}/openai.db")
+        ),
+        "memory": _benchmark(BaseOpenaiBackend.from_url("memory://")),
+        "logstore": _benchmark(
+            BaseOpenaiBackend.from_url(f"logstore://{tmp_path}/log")
+        ),
+    }
+    for engine, result in results.items():
+        print(
+            f"OpenAI backend {engine}: "
+            + ", ".join(f"{op} {ops:.1f}/s" for op, ops in result.items())
+        )
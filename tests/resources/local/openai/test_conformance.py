@@ -0,0 +1,463 @@
+"""The behavior shared by every engine of the OpenAI backend."""
+
+import time
+from pathlib import Path
+from typing import Text
+
+import pytest
+from openai.types.beta.assistant import Assistant
+
+from languru.exceptions import NotFound
+from languru.resources.openai_backend import BaseOpenaiBackend
+from languru.types.openai_threads import RunState
+from languru.utils.openai_dummies import (
+    get_dummy_assistant,
+    get_dummy_message,
+    get_dummy_message_answer,
+    get_dummy_run,
+    get_dummy_thread,
+)
+
+ENGINE_URLS = {
+    "sql": "sqlite:///{path}/openai.db",
+    "memory": "memory://",
+    "logstore": "logstore://{path}/openai",
+}
+
+
+@pytest.fixture(params=list(ENGINE_URLS))
+def openai_backend(request: pytest.FixtureRequest, tmp_path: Path):
+    openai_backend = BaseOpenaiBackend.from_url(
+        ENGINE_URLS[request.param].format(path=tmp_path)
+    )
+    openai_backend.touch()
+    yield openai_backend
+    _close(openai_backend)
+
+
+def _close(openai_backend: BaseOpenaiBackend):
+    openai_backend.close()
+
+
+def test_engines_from_url(tmp_path: Path):
+    for engine, class_name in (
+        ("sql", "OpenaiBackend"),
+        ("memory", "MemoryOpenaiBackend"),
+        ("logstore", "LogOpenaiBackend"),
+    ):
+        openai_backend = BaseOpenaiBackend.from_url(
+            ENGINE_URLS[engine].format(path=tmp_path), pool_size=4
+        )
+        assert isinstance(openai_backend, BaseOpenaiBackend)
+        assert openai_backend.multiprocess is (engine == "sql")
+        assert openai_backend.__class__.__name__ == class_name
+        _close(openai_backend)
+
+
+def test_assistants_conformance(openai_backend: BaseOpenaiBackend):
+    assistants = [
+        openai_backend.assistants.create(
+            Assistant.model_validate(get_dummy_assistant())
+        )
+        for _ in range(3)
+    ]
+
+    assert [a.id for a in openai_backend.assistants.list()] == [
+        a.id for a in assistants
+    ]
+    assert [
+        a.id for a in openai_backend.assistants.list(after=assistants[0].id, limit=1)
+    ] == [assistants[1].id]
+    assert [a.id for a in openai_backend.assistants.list(before=assistants[0].id)] == []
+    with pytest.raises(NotFound):
+        openai_backend.assistants.list(after="asst_missing")
+
+    updated = openai_backend.assistants.update(
+        assistants[0].id, description="Updated", metadata={"key": "value"}
+    )
+    assert updated.description == "Updated"
+    assert updated.name == assistants[0].name
+    retrieved = openai_backend.assistants.retrieve(assistants[0].id)
+    assert retrieved.description == "Updated"
+    assert retrieved.metadata == {"key": "value"}
+
+    assert openai_backend.assistants.delete(assistants[0].id).deleted is True
+    assert (
+        openai_backend.assistants.delete(assistants[0].id, not_exist_ok=True).deleted
+        is False
+    )
+    with pytest.raises(NotFound):
+        openai_backend.assistants.retrieve(assistants[0].id)
+    with pytest.raises(NotFound):
+        openai_backend.assistants.update(assistants[0].id, name="Missing")
+
+
+def test_threads_conformance(openai_backend: BaseOpenaiBackend):
+    thread = openai_backend.threads.create(get_dummy_thread())
+    assert openai_backend.threads.retrieve(thread.id).id == thread.id
+    assert [t.id for t in openai_backend.threads.list()] == [thread.id]
+
+    updated = openai_backend.threads.update(thread.id, metadata={"key": "value"})
+    assert updated.metadata == {"key": "value"}
+    assert openai_backend.threads.retrieve(thread.id).metadata == {"key": "value"}
+
+    # Deleting the thread deletes its messages and runs
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    message = openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=thread.id)
+    )
+    run = openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+    )
+    assert openai_backend.threads.delete(thread.id).deleted is True
+    assert openai_backend.threads.delete(thread.id, not_exist_ok=True).deleted is False
+    with pytest.raises(NotFound):
+        openai_backend.threads.retrieve(thread.id)
+    with pytest.raises(NotFound):
+        openai_backend.threads.messages.retrieve(message.id, thread_id=thread.id)
+    with pytest.raises(NotFound):
+        openai_backend.threads.runs.retrieve(run.id, thread_id=thread.id)
+    with pytest.raises(NotFound):
+        openai_backend.threads.list(before=thread.id)
+
+
+def test_messages_conformance(openai_backend: BaseOpenaiBackend):
+    thread = openai_backend.threads.create(get_dummy_thread())
+
+    # Messages sharing the same `created_at` second keep their insertion order
+    created_at = int(time.time())
+    messages = []
+    for _ in range(5):
+        message = get_dummy_message(thread_id=thread.id)
+        message.created_at = created_at
+        messages.append(message)
+    openai_backend.threads.messages.create(messages[0])
+    openai_backend.threads.messages.create_many(messages[1:])
+    message_ids = [m.id for m in messages]
+
+    for order, expected_ids in (("asc", message_ids), ("desc", message_ids[::-1])):
+        paged_ids = []
+        after = None
+        while True:
+            page = openai_backend.threads.messages.list(
+                thread_id=thread.id, after=after, limit=2, order=order
+            )
+            if not page:
+                break
+            paged_ids.extend(m.id for m in page)
+            after = page[-1].id
+        assert paged_ids == expected_ids
+        assert [
+            m.id
+            for m in openai_backend.threads.messages.list(
+                thread_id=thread.id, before=expected_ids[2], order=order
+            )
+        ] == expected_ids[:2]
+    assert openai_backend.threads.messages.list(thread.id, after="msg_missing") == []
+
+    # Runs filter and excluded fields
+    answer = openai_backend.threads.messages.create(
+        get_dummy_message_answer(
+            assistant_id="asst_dummy", thread_id=thread.id, run_id="run_dummy"
+        )
+    )
+    assert [
+        m.id
+        for m in openai_backend.threads.messages.list(thread.id, run_id="run_dummy")
+    ] == [answer.id]
+    listed = openai_backend.threads.messages.list(
+        thread.id, limit=1, exclude=["metadata", "content"]
+    )
+    assert listed[0].id == answer.id
+    assert listed[0].content == []
+    assert listed[0].metadata is None
+    with pytest.raises(ValueError):
+        openai_backend.threads.messages.list(thread.id, exclude=["role"])
+
+    # Update and delete
+    updated = openai_backend.threads.messages.update(
+        message_ids[0], thread_id=thread.id, metadata={"key": "value"}
+    )
+    assert updated.metadata == {"key": "value"}
+    assert updated.content == messages[0].content
+    assert openai_backend.threads.messages.retrieve(
+        message_ids[0], thread_id=thread.id
+    ).metadata == {"key": "value"}
+    assert (
+        openai_backend.threads.messages.delete(
+            message_ids[0], thread_id=thread.id
+        ).deleted
+        is True
+    )
+    assert (
+        openai_backend.threads.messages.delete(
+            message_ids[0], thread_id=thread.id, not_exist_ok=True
+        ).deleted
+        is False
+    )
+    with pytest.raises(NotFound):
+        openai_backend.threads.messages.retrieve(message_ids[0], thread_id=thread.id)
+    with pytest.raises(NotFound):
+        openai_backend.threads.messages.retrieve(message_ids[1], thread_id="thread_x")
+    assert len(openai_backend.threads.messages.list(thread.id)) == 5
+
+
+def test_runs_conformance(openai_backend: BaseOpenaiBackend):
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = openai_backend.threads.create(get_dummy_thread())
+    runs = []
+    for assistant_id in (assistant.id, assistant.id, "asst_other"):
+        run = get_dummy_run(assistant_id=assistant_id, thread_id=thread.id)
+        run.expires_at = None
+        runs.append(openai_backend.threads.runs.create(run))
+
+    assert [r.id for r in openai_backend.threads.runs.list(thread.id)] == [
+        r.id for r in runs[::-1]
+    ]
+    assert [
+        r.id
+        for r in openai_backend.threads.runs.list(
+            thread.id, assistant_id=assistant.id, order="asc", limit=1
+        )
+    ] == [runs[0].id]
+    listed = openai_backend.threads.runs.list(thread.id, exclude=["tools", "usage"])
+    assert all(r.tools == [] and r.usage is None for r in listed)
+
+    # Updates reset the metadata which is not given
+    updated = openai_backend.threads.runs.update(
+        runs[0].id, thread_id=thread.id, metadata={"step": "1"}, model="gpt-4o"
+    )
+    assert (updated.metadata, updated.model) == ({"step": "1"}, "gpt-4o")
+    updated = openai_backend.threads.runs.update(
+        runs[0].id, thread_id=thread.id, status="in_progress"
+    )
+    assert (updated.metadata, updated.status) == ({}, "in_progress")
+    with pytest.raises(NotFound):
+        openai_backend.threads.runs.update(
+            runs[0].id, thread_id="thread_other", status="failed"
+        )
+
+    # Transitions only apply from the expected statuses
+    completed_at = int(time.time())
+    assert (
+        openai_backend.threads.runs.transition(
+            runs[0].id,
+            thread_id=thread.id,
+            from_statuses=["queued"],
+            status="completed",
+        )
+        is None
+    )
+    completed = openai_backend.threads.runs.transition(
+        runs[0].id,
+        thread_id=thread.id,
+        from_statuses=["in_progress"],
+        status="completed",
+        completed_at=completed_at,
+    )
+    assert completed is not None
+    assert (completed.status, completed.completed_at) == ("completed", completed_at)
+
+    # Expiration and retention
+    assert openai_backend.threads.runs.expire(expires_after=-1) == 2
+    assert {r.status for r in openai_backend.threads.runs.list(thread.id)} == {
+        "completed",
+        "expired",
+    }
+    assert openai_backend.threads.runs.delete_finished(older_than=-1) == 3
+    assert openai_backend.threads.runs.list(thread.id) == []
+
+    run = openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+    )
+    assert openai_backend.threads.runs.delete(run.id, thread_id=thread.id)["deleted"]
+    with pytest.raises(NotFound):
+        openai_backend.threads.runs.delete(run.id, thread_id=thread.id)
+
+
+def test_runs_complete_conformance(openai_backend: BaseOpenaiBackend):
+    thread = openai_backend.threads.create(get_dummy_thread())
+    run = openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id="asst_1", thread_id=thread.id, status="in_progress")
+    )
+    answer = get_dummy_message_answer(thread_id=thread.id, run_id=run.id)
+
+    # A failing insert leaves the run in progress and the thread unanswered
+    with pytest.raises(Exception):
+        openai_backend.threads.runs.complete(
+            run.id, thread_id=thread.id, messages=[answer, answer]
+        )
+    retrieved = openai_backend.threads.runs.retrieve(run.id, thread_id=thread.id)
+    assert retrieved.status == "in_progress"
+    assert openai_backend.threads.messages.list(thread.id) == []
+
+    completed = openai_backend.threads.runs.complete(
+        run.id, thread_id=thread.id, completed_at=1, messages=[answer]
+    )
+    assert completed is not None
+    assert (completed.status, completed.completed_at) == ("completed", 1)
+    assert [m.id for m in openai_backend.threads.messages.list(thread.id)] == [
+        answer.id
+    ]
+
+    # Only an in-progress run completes
+    other_answer = get_dummy_message_answer(thread_id=thread.id, run_id=run.id)
+    assert (
+        openai_backend.threads.runs.complete(
+            run.id, thread_id=thread.id, messages=[other_answer]
+        )
+        is None
+    )
+    assert len(openai_backend.threads.messages.list(thread.id)) == 1
+
+
+def test_run_states_conformance(openai_backend: BaseOpenaiBackend):
+    thread = openai_backend.threads.create(get_dummy_thread())
+    runs = [
+        openai_backend.threads.runs.create(
+            get_dummy_run(assistant_id="asst_state", thread_id=thread.id)
+        )
+        for _ in range(3)
+    ]
+    now = time.time()
+    for run, scheduled_at in zip(runs, (now + 60, now + 30, None)):
+        openai_backend.threads.runs.save_state(
+            RunState(
+                id=run.id,
+                thread_id=thread.id,
+                org_type="openai",
+                scheduled_at=scheduled_at,
+            )
+        )
+
+    # The states are saved once per run, the delayed ones by start time
+    state = openai_backend.threads.runs.retrieve_state(runs[0].id, thread_id=thread.id)
+    assert state is not None
+    assert (state.org_type, state.scheduled_at) == ("openai", now + 60)
+    openai_backend.threads.runs.save_state(state.model_copy(update={"org_type": None}))
+    state = openai_backend.threads.runs.retrieve_state(runs[0].id, thread_id=thread.id)
+    assert state is not None and state.org_type is None
+    assert openai_backend.threads.runs.retrieve_state(runs[0].id, thread_id="x") is None
+    assert [s.id for s in openai_backend.threads.runs.list_scheduled_states()] == [
+        runs[1].id,
+        runs[0].id,
+    ]
+
+    assert openai_backend.threads.runs.delete_state(runs[1].id, thread_id=thread.id)
+    assert not openai_backend.threads.runs.delete_state(runs[1].id, thread_id=thread.id)
+    # Deleting the run or its thread deletes its state
+    openai_backend.threads.runs.delete(runs[0].id, thread_id=thread.id)
+    assert (
+        openai_backend.threads.runs.retrieve_state(runs[0].id, thread_id=thread.id)
+        is None
+    )
+    openai_backend.threads.delete(thread.id)
+    assert (
+        openai_backend.threads.runs.retrieve_state(runs[2].id, thread_id=thread.id)
+        is None
+    )
+
+
+def test_create_and_run_conformance(openai_backend: BaseOpenaiBackend):
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = get_dummy_thread()
+    run = get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+    messages = [get_dummy_message(thread_id=thread.id) for _ in range(2)]
+    openai_backend.threads.create_and_run(thread, run, messages)
+    assert len(openai_backend.threads.messages.list(thread.id)) == 2
+    assert openai_backend.threads.runs.retrieve(run.id, thread_id=thread.id)
+
+    # Nothing is written when the run ID is taken
+    other_thread = get_dummy_thread()
+    with pytest.raises(Exception):
+        openai_backend.threads.create_and_run(
+            other_thread,
+            run.model_copy(update={"thread_id": other_thread.id}),
+            [get_dummy_message(thread_id=other_thread.id)],
+        )
+    with pytest.raises(NotFound):
+        openai_backend.threads.retrieve(other_thread.id)
+    assert openai_backend.threads.messages.list(other_thread.id) == []
+
+    # Imports
+    threads = [get_dummy_thread() for _ in range(3)]
+    openai_backend.threads.create_many(
+        threads, [get_dummy_message(thread_id=t.id) for t in threads]
+    )
+    for t in threads:
+        assert len(openai_backend.threads.messages.list(t.id)) == 1
+
+
+def test_retention_conformance(openai_backend: BaseOpenaiBackend):
+    now = int(time.time())
+    idle_thread = get_dummy_thread()
+    idle_thread.created_at = now - 7200
+    active_thread = get_dummy_thread()
+    active_thread.created_at = now - 7200
+    openai_backend.threads.create_many([idle_thread, active_thread])
+    old_message = get_dummy_message(thread_id=idle_thread.id)
+    old_message.created_at = now - 7200
+    openai_backend.threads.messages.create(old_message)
+    openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=active_thread.id)
+    )
+
+    assert openai_backend.threads.delete_idle(idle_seconds=3600) == 1
+    with pytest.raises(NotFound):
+        openai_backend.threads.retrieve(idle_thread.id)
+    assert openai_backend.threads.retrieve(active_thread.id)
+    assert openai_backend.threads.messages.list(idle_thread.id) == []
+
+    # Messages and runs whose thread is gone
+    openai_backend.threads.messages.create(get_dummy_message(thread_id="thread_gone"))
+    openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id="asst_gone", thread_id="thread_gone")
+    )
+    assert openai_backend.threads.delete_orphans() == 2
+    assert openai_backend.threads.delete_orphans() == 0
+    assert len(openai_backend.threads.messages.list(active_thread.id)) == 1
+
+    openai_backend.compact()
+    assert len(openai_backend.threads.messages.list(active_thread.id)) == 1
+
+
+def test_engines_agree(tmp_path: Path, session_id_fixture: Text):
+    """The same calls return the same objects on every engine."""
+
+    assistant = Assistant.model_validate(get_dummy_assistant())
+    thread = get_dummy_thread()
+    messages = [get_dummy_message(thread_id=thread.id) for _ in range(3)]
+    run = get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+
+    results = []
+    for engine, url in ENGINE_URLS.items():
+        (tmp_path / engine).mkdir()
+        openai_backend = BaseOpenaiBackend.from_url(url.format(path=tmp_path / engine))
+        openai_backend.touch()
+        openai_backend.assistants.create(assistant)
+        openai_backend.threads.create_and_run(thread, run, messages)
+        openai_backend.threads.messages.update(
+            messages[1].id, thread_id=thread.id, metadata={"key": "value"}
+        )
+        openai_backend.threads.runs.update(
+            run.id, thread_id=thread.id, status="in_progress", started_at=1
+        )
+        results.append(
+            [
+                [obj.model_dump() for obj in objs]
+                for objs in (
+                    openai_backend.assistants.list(),
+                    openai_backend.threads.list(),
+                    openai_backend.threads.messages.list(thread.id),
+                    openai_backend.threads.runs.list(thread.id),
+                )
+            ]
+        )
+        _close(openai_backend)
+    assert results[0] == results[1] == results[2]
@@ -0,0 +1,122 @@
+from pathlib import Path
+
+from openai.types.beta.assistant import Assistant
+
+from languru.resources.local.openai.backend import LogOpenaiBackend
+from languru.utils.openai_dummies import (
+    get_dummy_assistant,
+    get_dummy_message,
+    get_dummy_run,
+    get_dummy_thread,
+)
+
+
+def _segments(path: Path):
+    return sorted(p.name for p in path.glob("threads/*/*.log"))
+
+
+def test_log_store_reopen(tmp_path: Path):
+    openai_backend = LogOpenaiBackend(f"logstore://{tmp_path}")
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = openai_backend.threads.create(get_dummy_thread())
+    messages = openai_backend.threads.messages.create_many(
+        [get_dummy_message(thread_id=thread.id) for _ in range(5)]
+    )
+    run = openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+    )
+    openai_backend.threads.runs.update(run.id, thread_id=thread.id, status="completed")
+    openai_backend.threads.messages.update(
+        messages[0].id, thread_id=thread.id, metadata={"key": "value"}
+    )
+    openai_backend.threads.messages.delete(messages[1].id, thread_id=thread.id)
+    openai_backend.close()
+
+    # Everything is replayed from the logs, in the same order
+    openai_backend = LogOpenaiBackend(f"logstore://{tmp_path}")
+    assert openai_backend.assistants.retrieve(assistant.id) == assistant
+    assert openai_backend.threads.retrieve(thread.id) == thread
+    assert (
+        openai_backend.threads.runs.retrieve(run.id, thread_id=thread.id).status
+        == "completed"
+    )
+    assert [
+        m.id for m in openai_backend.threads.messages.list(thread.id, order="asc")
+    ] == [messages[0].id] + [m.id for m in messages[2:]]
+    assert openai_backend.threads.messages.retrieve(
+        messages[0].id, thread_id=thread.id
+    ).metadata == {"key": "value"}
+
+    openai_backend.threads.delete(thread.id)
+    assert not (tmp_path / "threads" / thread.id).exists()
+    openai_backend.close()
+
+
+def test_log_store_segments_and_compaction(tmp_path: Path):
+    openai_backend = LogOpenaiBackend(f"logstore://{tmp_path}?segment_size=4096")
+    thread = openai_backend.threads.create(get_dummy_thread())
+    messages = openai_backend.threads.messages.create_many(
+        [get_dummy_message(thread_id=thread.id) for _ in range(30)]
+    )
+    assert len(_segments(tmp_path)) > 1
+
+    # Superseded records are reclaimed by the compaction
+    for message in messages[:20]:
+        openai_backend.threads.messages.delete(message.id, thread_id=thread.id)
+    for message in messages[20:]:
+        openai_backend.threads.messages.update(
+            message.id, thread_id=thread.id, metadata={"key": "value"}
+        )
+    size_before = sum(p.stat().st_size for p in tmp_path.glob("threads/*/*.log"))
+    openai_backend.compact()
+    size_after = sum(p.stat().st_size for p in tmp_path.glob("threads/*/*.log"))
+    assert size_after < size_before / 2
+
+    listed = openai_backend.threads.messages.list(thread.id, order="asc")
+    assert [m.id for m in listed] == [m.id for m in messages[20:]]
+    assert all(m.metadata == {"key": "value"} for m in listed)
+
+    # Writes after the compaction land next to the rewritten records
+    message = openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=thread.id)
+    )
+    openai_backend.close()
+    openai_backend = LogOpenaiBackend(f"logstore://{tmp_path}?segment_size=4096")
+    assert len(openai_backend.threads.messages.list(thread.id)) == 11
+    assert openai_backend.threads.messages.retrieve(message.id, thread_id=thread.id)
+    openai_backend.close()
+
+
+def test_log_store_torn_write(tmp_path: Path):
+    openai_backend = LogOpenaiBackend(f"logstore://{tmp_path}")
+    thread = openai_backend.threads.create(get_dummy_thread("thread/../unsafe id"))
+    message = openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=thread.id)
+    )
+    openai_backend.close()
+
+    # Thread IDs which are not file names are encoded
+    (segment,) = tmp_path.glob("threads/*/*.log")
+    assert segment.parent.parent == tmp_path / "threads"
+
+    # A record cut short by a crash is dropped, later writes stay readable
+    with open(segment, "ab") as f:
+        f.write(b'{"id": "msg_torn", "crea')
+    with open(tmp_path / "objects.log", "ab") as f:
+        f.write(b'{"kind": "threads", "da')
+    openai_backend = LogOpenaiBackend(f"logstore://{tmp_path}")
+    other_message = openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=thread.id)
+    )
+    openai_backend.threads.create(get_dummy_thread())
+    openai_backend.close()
+
+    openai_backend = LogOpenaiBackend(f"logstore://{tmp_path}")
+    assert [
+        m.id for m in openai_backend.threads.messages.list(thread.id, order="asc")
+    ] == [message.id, other_message.id]
+    assert len(openai_backend.threads.list()) == 2
+    assert openai_backend.threads.delete_orphans() == 0
+    openai_backend.close()
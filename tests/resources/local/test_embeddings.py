@@ -0,0 +1,149 @@
+import json
+import threading
+from pathlib import Path
+from typing import List, Optional, Sequence, Text, Tuple
+
+import numpy as np
+import pytest
+from numpy.typing import NDArray
+
+from languru.openai_plugins.clients.local import LocalOpenAI
+from languru.resources.local.embeddings import EmbeddingEngine, EmbeddingModel
+from languru.utils.calculation import base64_to_embeddings
+
+RANDOM_MODEL = f"{__name__}:RandomEmbeddingModel"
+
+
+class RandomEmbeddingModel(EmbeddingModel):
+    """A tiny randomly initialised model, a token is a word hashed into the
+    embedding table, and the batches are logged to `log_path`.
+    """
+
+    def __init__(
+        self, model: Text, *, log_path: Optional[Text] = None, hidden_size: int = 8
+    ):
+        super().__init__(model)
+        rng = np.random.default_rng(0)
+        self.table = rng.standard_normal((97, hidden_size)).astype(np.float32)
+        self.weight = rng.standard_normal((hidden_size, hidden_size)).astype(np.float32)
+        self.log_path = log_path
+
+    def forward(
+        self, texts: Sequence[Text]
+    ) -> Tuple[NDArray[np.float32], NDArray[np.int64]]:
+        if "fail" in texts:
+            raise ValueError("model failed")
+        tokens = [[sum(map(ord, w)) % 97 for w in t.split()] or [0] for t in texts]
+        length = max(len(t) for t in tokens)
+        input_ids = np.zeros((len(texts), length), dtype=np.int64)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int64)
+        for i, ids in enumerate(tokens):
+            input_ids[i, : len(ids)] = ids
+            attention_mask[i, : len(ids)] = 1
+        if self.log_path is not None:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps([len(t) for t in tokens]) + "\n")
+        return (np.tanh(self.table[input_ids] @ self.weight), attention_mask)
+
+
+def _texts(n: int) -> List[Text]:
+    return [" ".join(f"w{j}" for j in range(i % 7 + 1)) for i in range(n)]
+
+
+def _batches(log_path: Path) -> List[List[int]]:
+    return [json.loads(line) for line in log_path.read_text().splitlines()]
+
+
+def test_embedding_engine():
+    texts = _texts(10)
+    expected, token_counts = RandomEmbeddingModel("random").embed(texts)
+    with EmbeddingEngine("random", backend=RANDOM_MODEL, max_batch_size=4) as engine:
+        result = engine.embed(texts, timeout=60)
+        assert engine.embed([]).prompt_tokens == 0
+        with pytest.raises(ValueError, match="model failed"):
+            engine.embed(["fail"], timeout=60)
+
+    # The batches are sorted by length, the results are in the input order
+    np.testing.assert_allclose(result.embeddings, expected, rtol=1e-5)
+    np.testing.assert_allclose(
+        np.linalg.norm(result.embeddings, axis=1), 1.0, rtol=1e-5
+    )
+    assert result.prompt_tokens == sum(token_counts)
+    with pytest.raises(RuntimeError):
+        engine.submit(["closed"])
+
+
+def test_embedding_engine_dynamic_batching(tmp_path: Path):
+    log_path = tmp_path / "batches.jsonl"
+    texts = _texts(24)
+    expected, _ = RandomEmbeddingModel("random").embed(texts)
+    results = [None] * len(texts)
+    with EmbeddingEngine(
+        "random",
+        backend=RANDOM_MODEL,
+        max_batch_size=8,
+        max_wait=0.2,
+        log_path=str(log_path),
+    ) as engine:
+        engine.embed(["warm up"], timeout=60)
+        log_path.unlink()
+
+        def _embed(i: int):
+            results[i] = engine.embed([texts[i]], timeout=60).embeddings[0]
+
+        threads = [threading.Thread(target=_embed, args=(i,)) for i in range(24)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    np.testing.assert_allclose(np.stack(results), expected, rtol=1e-5)
+    batches = _batches(log_path)
+    # The concurrent requests share the batches, each padded to similar lengths
+    assert sum(len(b) for b in batches) == 24
+    assert len(batches) < 24
+    assert max(len(b) for b in batches) <= 8
+    assert all(b == sorted(b) for b in batches)
+
+
+def test_local_openai_embeddings():
+    client = LocalOpenAI(embeddings_model="random", embeddings_backend=RANDOM_MODEL)
+    try:
+        res = client.embeddings.create(input=["hello world", "hi"], model="random")
+        assert [d.index for d in res.data] == [0, 1]
+        assert len(res.data[0].embedding) == 8
+        assert res.usage.prompt_tokens == 3
+        assert client.models.retrieve("random").owned_by == "local"
+
+        res = client.embeddings.create(
+            input="hello world", model="random", dimensions=4, encoding_format="base64"
+        )
+        embedding = base64_to_embeddings([res.data[0].embedding])  # type: ignore
+        assert embedding.shape == (1, 4)
+        np.testing.assert_allclose(np.linalg.norm(embedding), 1.0, rtol=1e-5)
+    finally:
+        client.close()
+
+
+def test_transformers_embedding_model(tmp_path: Path):
+    pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    from languru.resources.local.embeddings import TransformersEmbeddingModel
+
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "hello", "world"]
+    tmp_path.joinpath("vocab.txt").write_text("\n".join(vocab))
+    transformers.BertTokenizer(str(tmp_path / "vocab.txt")).save_pretrained(tmp_path)
+    config = transformers.BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+    )
+    transformers.BertModel(config).save_pretrained(tmp_path)
+
+    model = TransformersEmbeddingModel(str(tmp_path))
+    embeddings, token_counts = model.embed(["hello world", "hello"])
+    assert embeddings.shape == (2, 16)
+    assert token_counts == [4, 3]
+    np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
@@ -0,0 +1,185 @@
+import threading
+import time
+from typing import Any, List, Sequence, Text, Tuple
+
+import numpy as np
+import pytest
+from numpy.typing import NDArray
+
+from languru.openai_plugins.clients.local import LocalOpenAI
+from languru.resources.local.generation import (
+    GenerationEngine,
+    GenerationModel,
+    sample_tokens,
+)
+
+EOS = 0
+
+
+class ScriptModel(GenerationModel):
+    """A byte-level model which generates its prompt reversed, then a script,
+    so the outputs are known, and records the batch size of every step.
+    """
+
+    eos_token_ids = frozenset([EOS])
+
+    def __init__(
+        self, model: Text = "script", *, script: Text = " STOP tail", delay: float = 0
+    ):
+        super().__init__(model)
+        self.script = script
+        self.delay = delay
+        self.batch_sizes: List[int] = []
+
+    def encode(self, text: Text) -> List[int]:
+        return [b + 1 for b in text.encode()]
+
+    def decode(self, token_ids: Sequence[int]) -> Text:
+        return bytes(i - 1 for i in token_ids).decode(errors="replace")
+
+    def _logits(self, target: List[int], position: int) -> NDArray[np.float32]:
+        logits = np.zeros(257, dtype=np.float32)
+        logits[target[position] if position < len(target) else EOS] = 10.0
+        return logits
+
+    def prefill(self, input_ids: Sequence[int]) -> Tuple[Any, NDArray[np.float32]]:
+        prompt = self.decode(input_ids).rsplit("user: ", 1)[-1].split("\n")[0]
+        target = self.encode(prompt[::-1] + self.script)
+        return ((target, 1), self._logits(target, 0))
+
+    def decode_step(
+        self, token_ids: Sequence[int], caches: Sequence[Any]
+    ) -> Tuple[List[Any], NDArray[np.float32]]:
+        self.batch_sizes.append(len(caches))
+        time.sleep(self.delay)
+        new_caches = [(target, position + 1) for target, position in caches]
+        logits = np.stack([self._logits(t, p) for t, p in caches])
+        return (new_caches, logits)
+
+
+def _prompt(model: ScriptModel, text: Text) -> List[int]:
+    return model.apply_chat_template([{"role": "user", "content": text}])
+
+
+def test_generation_engine():
+    model = ScriptModel()
+    with GenerationEngine(model, max_batch_size=4) as engine:
+        output = engine.generate(_prompt(model, "héllo"), temperature=0)
+        assert output.text == "olléh STOP tail"
+        assert output.finish_reason == "stop"
+        assert output.completion_tokens == len("olléh STOP tail".encode()) + 1
+
+        # The stop sequences are matched across the tokens, the text of a
+        # possible stop sequence is held back until it is told apart
+        deltas = list(
+            engine.stream(_prompt(model, "ab"), temperature=0, stop=["STOX", "P t"])
+        )
+        assert "".join(d.text for d in deltas) == "ba STO"
+        assert deltas[-1].finish_reason == "stop"
+        assert [d.text for d in deltas][-3:] == [" ", "STO", ""]
+
+        output = engine.generate(_prompt(model, "abc"), temperature=0, max_tokens=5)
+        assert (output.text, output.finish_reason) == ("cba S", "length")
+
+
+def test_generation_engine_continuous_batching():
+    model = ScriptModel(script=" " + "x" * 200, delay=0.002)
+    texts = [f"request {i}" for i in range(6)]
+    outputs: List[Any] = [None] * len(texts)
+    with GenerationEngine(model, max_batch_size=4) as engine:
+
+        def _generate(i: int):
+            outputs[i] = engine.generate(
+                _prompt(model, texts[i]), temperature=0, max_tokens=10 + 20 * i
+            )
+
+        threads = [threading.Thread(target=_generate, args=(i,)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    for i, output in enumerate(outputs):
+        expected = (texts[i][::-1] + " " + "x" * 200)[: 10 + 20 * i]
+        assert (output.text, output.finish_reason) == (expected, "length")
+    # The sequences share the decode steps, never more than the batch size,
+    # and the waiting ones join as soon as the short ones finish
+    assert max(model.batch_sizes) == 4
+    assert sum(model.batch_sizes) == sum(10 + 20 * i - 1 for i in range(6))
+
+
+def test_generation_engine_cancel():
+    model = ScriptModel(script=" " + "x" * 10_000)
+    with GenerationEngine(model) as engine:
+        stream = engine.stream(_prompt(model, "a"), temperature=0)
+        next(stream)
+        stream.close()
+        # The cancelled sequence leaves the batch, the next request runs alone
+        output = engine.generate(_prompt(model, "b"), temperature=0, max_tokens=3)
+        assert output.text == "b x"
+    with pytest.raises(RuntimeError):
+        engine.generate([1])
+
+
+def test_sample_tokens():
+    logits = np.log(np.array([[0.1, 0.6, 0.3], [0.5, 0.2, 0.3]], dtype=np.float32))
+    rngs = [np.random.default_rng(0), np.random.default_rng(1)]
+    greedy = sample_tokens(
+        logits, np.zeros(2, np.float32), np.ones(2, np.float32), rngs
+    )
+    assert greedy.tolist() == [1, 0]
+    # A `top_p` below the most probable token samples it only
+    for _ in range(20):
+        tokens = sample_tokens(
+            logits, np.ones(2, np.float32), np.full(2, 0.4, np.float32), rngs
+        )
+        assert tokens.tolist() == [1, 0]
+    counts = np.bincount(
+        [
+            sample_tokens(
+                logits[:1], np.ones(1, np.float32), np.ones(1, np.float32), rngs
+            )[0]
+            for _ in range(2000)
+        ],
+        minlength=3,
+    )
+    np.testing.assert_allclose(counts / 2000, [0.1, 0.6, 0.3], atol=0.05)
+
+
+@pytest.mark.asyncio
+async def test_local_openai_chat_completions(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(
+        "languru.resources.local.generation.GENERATION_BACKENDS",
+        {"script": f"{__name__}:ScriptModel"},
+    )
+    client = LocalOpenAI(generation_model="script", generation_backend="script")
+    try:
+        messages = [{"role": "user", "content": "hi"}]
+        res = client.chat.completions.create(
+            messages=messages, model="script", temperature=0, stop="STOP"
+        )
+        assert res.choices[0].message.content == "ih "
+        assert res.choices[0].finish_reason == "stop"
+        assert res.usage is not None and res.usage.completion_tokens == 7
+
+        chunks = list(
+            client.chat.completions.create(
+                messages=messages, model="script", temperature=0, stream=True
+            )
+        )
+        assert (
+            "".join(c.choices[0].delta.content or "" for c in chunks) == "ih STOP tail"
+        )
+        assert chunks[-1].usage is not None
+
+        stream = await client.chat.completions.async_create_stream(
+            messages=messages, model="script", temperature=0, max_tokens=3
+        )
+        chunks = [c async for c in stream]
+        assert "".join(c.choices[0].delta.content or "" for c in chunks) == "ih "
+        assert chunks[-1].choices[0].finish_reason == "length"
+
+        with pytest.raises(ValueError):
+            client.embeddings.create(input="hi", model="script")
+    finally:
+        client.close()
@@ -0,0 +1,68 @@
+import time
+from typing import Text
+
+import pytest
+
+from languru.exceptions import NotFound
+from languru.resources.sql.openai.backend import AsyncOpenaiBackend, OpenaiBackend
+from languru.utils.openai_dummies import (
+    get_dummy_assistant,
+    get_dummy_message,
+    get_dummy_run,
+    get_dummy_thread,
+)
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.mark.parametrize(
+    "url, backend_type",
+    [
+        ("sqlite:///:memory:", OpenaiBackend),
+        ("sqlite+pysqlite:///:memory:", OpenaiBackend),
+        ("sqlite+aiosqlite:///:memory:", AsyncOpenaiBackend),
+    ],
+)
+def test_openai_backend_from_url(url: Text, backend_type: type):
+    assert type(OpenaiBackend.from_url(url)) is backend_type
+
+
+@pytest.mark.asyncio
+async def test_async_openai_backend_apis(session_id_fixture: Text):
+    openai_backend = OpenaiBackend.from_url("sqlite+aiosqlite:///:memory:")
+    assert isinstance(openai_backend, AsyncOpenaiBackend)
+    await openai_backend.touch()
+
+    # Assistants
+    assistant = await openai_backend.assistants.create(get_dummy_assistant())
+    assistant = await openai_backend.assistants.update(
+        assistant.id, description="Math Tutor for kids"
+    )
+    assert (
+        await openai_backend.assistants.retrieve(assistant.id)
+    ).description == "Math Tutor for kids"
+
+    # Threads and messages
+    thread = await openai_backend.threads.create(get_dummy_thread())
+    message = await openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=thread.id)
+    )
+    messages = await openai_backend.threads.messages.list(thread_id=thread.id)
+    assert [m.id for m in messages] == [message.id]
+
+    # Runs
+    run = await openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+    )
+    await openai_backend.threads.runs.update(
+        run.id, thread_id=thread.id, status="completed", completed_at=int(time.time())
+    )
+    run = await openai_backend.threads.runs.retrieve(run.id, thread_id=thread.id)
+    assert run.status == "completed"
+
+    # Delete
+    await openai_backend.threads.delete(thread.id)
+    with pytest.raises(NotFound):
+        await openai_backend.threads.retrieve(thread.id)
+
+    await openai_backend.dispose()
@@ -0,0 +1,98 @@
+import time
+from pathlib import Path
+from typing import Text
+
+import pytest
+import sqlalchemy as sa
+from openai.types.beta.assistant import Assistant
+
+from languru.exceptions import NotFound
+from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.resources.sql.openai.backend._cache import CacheInvalidation, TTLCache
+from languru.utils.openai_dummies import get_dummy_assistant, get_dummy_thread
+
+
+def test_ttl_cache():
+    cache: TTLCache[Assistant] = TTLCache(maxsize=2, ttl=0.2)
+    assistants = [Assistant.model_validate(get_dummy_assistant()) for _ in range(3)]
+    for assistant in assistants:
+        cache.set(assistant.id, assistant, cache.token(assistant.id))
+
+    # The least recently used entry is evicted
+    assert len(cache) == 2
+    assert cache.get(assistants[0].id) is None
+    assert cache.get(assistants[2].id) == assistants[2]
+
+    # Entries expire after the TTL
+    time.sleep(0.3)
+    assert cache.get(assistants[2].id) is None
+
+    # Values loaded before an invalidation are not cached
+    token = cache.token(assistants[0].id)
+    cache.delete(assistants[1].id)
+    cache.set(assistants[0].id, assistants[0], token)
+    assert cache.get(assistants[0].id) is None
+
+
+def test_ttl_cache_invalidation_channel(tmp_path: Path):
+    invalidation_url = f"diskcache://{tmp_path / 'cache'}"
+    cache_a: TTLCache[Assistant] = TTLCache(
+        invalidation=CacheInvalidation.from_url(invalidation_url)
+    )
+    cache_b: TTLCache[Assistant] = TTLCache(
+        invalidation=CacheInvalidation.from_url(invalidation_url)
+    )
+    assistant = Assistant.model_validate(get_dummy_assistant())
+    cache_a.set(assistant.id, assistant, cache_a.token(assistant.id))
+    assert cache_a.get(assistant.id) == assistant
+
+    # Invalidations of other workers are honored
+    cache_b.delete(assistant.id)
+    assert cache_a.get(assistant.id) is None
+
+
+def test_openai_backend_read_through_cache(session_id_fixture: Text, tmp_path: Path):
+    url = f"sqlite:///{tmp_path / 'openai.db'}"
+    invalidation_url = f"diskcache://{tmp_path / 'cache'}"
+    openai_backend = OpenaiBackend(
+        url=url, cache_ttl=60, cache_invalidation_url=invalidation_url
+    )
+    openai_backend.touch()
+    other_worker_backend = OpenaiBackend(
+        url=url, cache_ttl=60, cache_invalidation_url=invalidation_url
+    )
+
+    statements = []
+    sa.event.listen(
+        openai_backend.sql_engine,
+        "before_cursor_execute",
+        lambda *args, **kwargs: statements.append(args[2]),
+    )
+
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = openai_backend.threads.create(get_dummy_thread())
+
+    # Hot objects are served without a database round trip
+    openai_backend.assistants.retrieve(assistant.id)
+    openai_backend.threads.retrieve(thread.id)
+    statements.clear()
+    for _ in range(3):
+        assert openai_backend.assistants.retrieve(assistant.id).id == assistant.id
+        assert openai_backend.threads.retrieve(thread.id).id == thread.id
+    assert statements == []
+
+    # Updates through the backend invalidate the cache
+    openai_backend.assistants.update(assistant.id, description="Updated")
+    assert openai_backend.assistants.retrieve(assistant.id).description == "Updated"
+    openai_backend.threads.update(thread.id, metadata={"key": "value"})
+    assert openai_backend.threads.retrieve(thread.id).metadata == {"key": "value"}
+
+    # Deletes of another worker invalidate the cache through the channel
+    other_worker_backend.assistants.delete(assistant.id)
+    other_worker_backend.threads.delete(thread.id)
+    with pytest.raises(NotFound):
+        openai_backend.assistants.retrieve(assistant.id)
+    with pytest.raises(NotFound):
+        openai_backend.threads.retrieve(thread.id)
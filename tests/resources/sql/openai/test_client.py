@@ -3,10 +3,12 @@ from pprint import pformat
 from typing import Text
 
 import pytest
+import sqlalchemy.exc
 from openai.types.beta.assistant import Assistant
 
 from languru.exceptions import NotFound
 from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.types.sql._openai import Base as SQL_Base
 from languru.utils.openai_dummies import (
     get_dummy_assistant,
     get_dummy_message,
@@ -147,7 +149,6 @@ def test_openai_backend_threads_runs_apis(session_id_fixture: Text):
     )
     openai_backend.threads.messages.create(
         get_dummy_message_answer(
-            message_id=message.id,
             assistant_id=assistant.id,
             thread_id=thread.id,
             run_id=run.id,
@@ -166,3 +167,311 @@ def test_openai_backend_threads_runs_apis(session_id_fixture: Text):
         len(openai_backend.threads.messages.list(thread_id=thread.id, run_id=run.id))
         == 1
     )
+
+
+def test_openai_backend_threads_messages_keyset_pagination(session_id_fixture: Text):
+    openai_backend = OpenaiBackend(url="sqlite:///:memory:")
+    openai_backend.touch()
+
+    thread = openai_backend.threads.create(get_dummy_thread())
+
+    # Messages sharing the same `created_at` second must not be skipped
+    created_at = int(time.time())
+    message_ids = []
+    for _ in range(7):
+        message = get_dummy_message(thread_id=thread.id)
+        message.created_at = created_at
+        message_ids.append(openai_backend.threads.messages.create(message).id)
+
+    for order, expected_ids in (("asc", message_ids), ("desc", message_ids[::-1])):
+        paged_ids = []
+        after = None
+        while True:
+            page = openai_backend.threads.messages.list(
+                thread_id=thread.id, after=after, limit=3, order=order
+            )
+            if not page:
+                break
+            paged_ids.extend(m.id for m in page)
+            after = page[-1].id
+        assert paged_ids == expected_ids
+
+        before_page = openai_backend.threads.messages.list(
+            thread_id=thread.id, before=expected_ids[3], order=order
+        )
+        assert [m.id for m in before_page] == expected_ids[:3]
+
+    # Unknown cursors of top-level objects are reported
+    with pytest.raises(NotFound):
+        openai_backend.threads.list(after=rand_openai_id("thread"))
+
+
+def test_openai_backend_threads_runs_transition(session_id_fixture: Text):
+    openai_backend = OpenaiBackend(url="sqlite:///:memory:")
+    openai_backend.touch()
+
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = openai_backend.threads.create(get_dummy_thread())
+    run = openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+    )
+    assert run.status == "queued"
+
+    # Start the queued run
+    started_at = int(time.time())
+    run_in_progress = openai_backend.threads.runs.transition(
+        run.id,
+        thread_id=thread.id,
+        from_statuses=("queued",),
+        status="in_progress",
+        started_at=started_at,
+    )
+    assert run_in_progress is not None
+    assert run_in_progress.status == "in_progress"
+    assert run_in_progress.started_at == started_at
+
+    # Cancellation wins, the completion is rejected
+    assert openai_backend.threads.runs.transition(
+        run.id, thread_id=thread.id, from_statuses=("in_progress",), status="cancelling"
+    )
+    assert (
+        openai_backend.threads.runs.transition(
+            run.id,
+            thread_id=thread.id,
+            from_statuses=("in_progress",),
+            status="completed",
+            completed_at=int(time.time()),
+        )
+        is None
+    )
+    run_retrieved = openai_backend.threads.runs.retrieve(run.id, thread_id=thread.id)
+    assert run_retrieved.status == "cancelling"
+    assert run_retrieved.completed_at is None
+
+    # Unknown runs are not transitioned
+    assert (
+        openai_backend.threads.runs.transition(
+            rand_openai_id("run"),
+            thread_id=thread.id,
+            from_statuses=("queued",),
+            status="in_progress",
+        )
+        is None
+    )
+
+
+def test_openai_backend_threads_create_many(session_id_fixture: Text):
+    openai_backend = OpenaiBackend(url="sqlite:///:memory:")
+    openai_backend.touch()
+
+    threads = [get_dummy_thread() for _ in range(3)]
+    messages = [
+        get_dummy_message(thread_id=thread.id) for thread in threads for _ in range(5)
+    ]
+    assert len(openai_backend.threads.create_many(threads, messages)) == 3
+    assert len(openai_backend.threads.list()) == 3
+    for thread in threads:
+        retrieved_messages = openai_backend.threads.messages.list(
+            thread_id=thread.id, order="asc"
+        )
+        assert [m.id for m in retrieved_messages] == [
+            m.id for m in messages if m.thread_id == thread.id
+        ]
+
+    # Bulk insert messages across several batches
+    thread = threads[0]
+    more_messages = [get_dummy_message(thread_id=thread.id) for _ in range(25)]
+    openai_backend.threads.messages.create_many(more_messages, batch_size=10)
+    retrieved_messages = openai_backend.threads.messages.list(
+        thread_id=thread.id, order="asc"
+    )
+    assert [m.id for m in retrieved_messages[-25:]] == [m.id for m in more_messages]
+
+
+def test_openai_backend_threads_create_and_run(session_id_fixture: Text):
+    openai_backend = OpenaiBackend(url="sqlite:///:memory:")
+    openai_backend.touch()
+
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = get_dummy_thread()
+    messages = [get_dummy_message(thread_id=thread.id) for _ in range(2)]
+    run = get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+
+    # The thread, messages and run are written together
+    thread, messages, run = openai_backend.threads.create_and_run(
+        thread, run, messages=messages
+    )
+    assert openai_backend.threads.retrieve(thread.id).id == thread.id
+    assert len(openai_backend.threads.messages.list(thread_id=thread.id)) == 2
+    assert openai_backend.threads.runs.retrieve(run.id, thread_id=thread.id)
+
+    # Nothing is written if any of them fails
+    thread_failed = get_dummy_thread()
+    with pytest.raises(sqlalchemy.exc.IntegrityError):
+        openai_backend.threads.create_and_run(
+            thread_failed,
+            run,  # Duplicated run ID
+            messages=[get_dummy_message(thread_id=thread_failed.id)],
+        )
+    with pytest.raises(NotFound):
+        openai_backend.threads.retrieve(thread_failed.id)
+    assert openai_backend.threads.messages.list(thread_id=thread_failed.id) == []
+
+
+def test_openai_backend_threads_retention(session_id_fixture: Text, tmp_path):
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    openai_backend.touch()
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    now = int(time.time())
+
+    def _create_thread(created_at: int):
+        thread = get_dummy_thread().model_copy(update={"created_at": created_at})
+        run = get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+        run = run.model_copy(update={"created_at": created_at, "expires_at": None})
+        messages = [
+            get_dummy_message(thread_id=thread.id).model_copy(
+                update={"created_at": created_at}
+            )
+            for _ in range(3)
+        ]
+        return openai_backend.threads.create_and_run(thread, run, messages=messages)
+
+    # Deleting a thread deletes its messages and runs
+    thread, _, run = _create_thread(now)
+    openai_backend.threads.delete(thread.id)
+    assert openai_backend.threads.messages.list(thread_id=thread.id) == []
+    assert openai_backend.threads.runs.list(thread_id=thread.id) == []
+
+    # Unfinished runs expire, finished runs are kept
+    idle_thread, _, idle_run = _create_thread(now - 86400 * 10)
+    active_thread, _, active_run = _create_thread(now - 86400 * 10)
+    openai_backend.threads.runs.update(
+        active_run.id, thread_id=active_thread.id, status="completed"
+    )
+    assert openai_backend.threads.runs.expire(expires_after=600) == 1
+    idle_run = openai_backend.threads.runs.retrieve(
+        idle_run.id, thread_id=idle_thread.id
+    )
+    assert idle_run.status == "expired"
+    assert idle_run.expires_at == idle_run.created_at + 600
+    assert openai_backend.threads.runs.expire(expires_after=600) == 0
+
+    # Old finished runs are trimmed
+    assert openai_backend.threads.runs.delete_finished(86400, batch_size=1) == 2
+    assert openai_backend.threads.runs.list(thread_id=active_thread.id) == []
+
+    # Idle threads are deleted, threads with new messages are kept
+    openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=active_thread.id)
+    )
+    assert openai_backend.threads.delete_idle(86400 * 7, batch_size=1) == 1
+    with pytest.raises(NotFound):
+        openai_backend.threads.retrieve(idle_thread.id)
+    assert openai_backend.threads.messages.list(thread_id=idle_thread.id) == []
+    assert openai_backend.threads.retrieve(active_thread.id)
+
+    # Compaction keeps the data
+    openai_backend.compact()
+    openai_backend.compact(full=True)
+    assert len(openai_backend.threads.messages.list(thread_id=active_thread.id)) == 4
+
+
+def test_openai_backend_threads_delete_orphans(session_id_fixture: Text):
+    openai_backend = OpenaiBackend(url="sqlite:///:memory:")
+    openai_backend.touch()
+
+    thread = openai_backend.threads.create(get_dummy_thread())
+    openai_backend.threads.messages.create_many(
+        [get_dummy_message(thread_id=thread.id) for _ in range(2)]
+    )
+    orphan_messages = [get_dummy_message(thread_id=rand_openai_id("thread"))]
+    openai_backend.threads.messages.create_many(orphan_messages)
+
+    assert openai_backend.threads.delete_orphans() == 1
+    assert len(openai_backend.threads.messages.list(thread_id=thread.id)) == 2
+
+
+def test_openai_backend_threads_list_exclude(session_id_fixture: Text):
+    openai_backend = OpenaiBackend(url="sqlite:///:memory:")
+    openai_backend.touch()
+
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = openai_backend.threads.create(get_dummy_thread())
+    message = get_dummy_message(thread_id=thread.id).model_copy(
+        update={"metadata": {"source": "test"}}
+    )
+    openai_backend.threads.messages.create(message)
+    run = openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+    )
+
+    # The round trip through the database keeps the objects
+    assert openai_backend.threads.messages.list(thread_id=thread.id) == [message]
+    assert openai_backend.threads.runs.list(thread_id=thread.id) == [run]
+
+    # Excluded JSON fields are returned empty
+    messages = openai_backend.threads.messages.list(
+        thread_id=thread.id, exclude=["metadata", "attachments"]
+    )
+    assert messages[0].metadata is None
+    assert messages[0].content == message.content
+    runs = openai_backend.threads.runs.list(thread_id=thread.id, exclude=["tools"])
+    assert runs[0].tools == []
+    assert runs[0].status == run.status
+    with pytest.raises(ValueError):
+        openai_backend.threads.messages.list(thread_id=thread.id, exclude=["role"])
+
+
+def test_openai_backend_touch_upgrade(session_id_fixture: Text, tmp_path):
+    url = f"sqlite:///{tmp_path / 'upgrade.db'}"
+    # The schema of the older versions, a non-unique index on the ids and no
+    # composite indexes
+    engine = sqlalchemy.create_engine(url)
+    with engine.begin() as conn:
+        for table in SQL_Base.metadata.sorted_tables:
+            table.create(conn)
+            for index in table.indexes:
+                index.drop(conn)
+            sqlalchemy.Index(f"ix_{table.name}_id", table.c.id).create(conn)
+    engine.dispose()
+
+    # The older versions inserted the threads and messages twice
+    legacy_backend = OpenaiBackend(url=url)
+    duplicated_thread = get_dummy_thread()
+    duplicated_message = get_dummy_message(thread_id=duplicated_thread.id)
+    for _ in range(2):
+        with legacy_backend.sql_session() as session:
+            for orm_model, obj in (
+                (legacy_backend.threads.orm_model, duplicated_thread),
+                (legacy_backend.threads.messages.orm_model, duplicated_message),
+            ):
+                session.execute(
+                    sqlalchemy.insert(orm_model), [orm_model.values_from_openai(obj)]
+                )
+    legacy_backend.sql_engine.dispose()
+
+    openai_backend = OpenaiBackend(url=url)
+    openai_backend.touch()
+    openai_backend.touch()  # Idempotent
+    inspector = sqlalchemy.inspect(openai_backend.sql_engine)
+    for table_name in ("assistants", "threads", "messages", "runs"):
+        indexes = {i["name"]: i for i in inspector.get_indexes(table_name)}
+        assert f"ix_{table_name}_id" not in indexes
+        assert indexes[f"ux_{table_name}_id"]["unique"]
+
+    # The first inserted row of the duplicated ones is kept
+    assert openai_backend.threads.retrieve(duplicated_thread.id)
+    messages = openai_backend.threads.messages.list(thread_id=duplicated_thread.id)
+    assert [m.id for m in messages] == [duplicated_message.id]
+
+    thread = openai_backend.threads.create(get_dummy_thread())
+    with pytest.raises(sqlalchemy.exc.IntegrityError):
+        openai_backend.threads.create(thread)
@@ -0,0 +1,95 @@
+import time
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+
+from languru.exceptions import NotFound
+from languru.resources.sql.openai.backend import OpenaiBackend, _replicas
+from languru.utils.openai_dummies import get_dummy_message, get_dummy_thread
+
+
+def _backends(tmp_path: Path, **kwargs):
+    primary_url = f"sqlite:///{tmp_path / 'primary.db'}"
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    # The replica is a separate database, so it is easy to tell which one
+    # served a read
+    replica_backend = OpenaiBackend(url=replica_url)
+    replica_backend.touch()
+    openai_backend = OpenaiBackend(
+        url=primary_url, replica_urls=[replica_url], replica_max_lag=0.2, **kwargs
+    )
+    openai_backend.touch()
+    return (openai_backend, replica_backend)
+
+
+def test_openai_backend_replica_read_your_writes(tmp_path: Path):
+    openai_backend, replica_backend = _backends(tmp_path)
+    thread = get_dummy_thread()
+    replica_backend.threads.create(thread.model_copy(update={"metadata": {"db": "r"}}))
+    openai_backend.threads.create(thread.model_copy(update={"metadata": {"db": "p"}}))
+    message = openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=thread.id)
+    )
+
+    # Recently written threads are read from the primary
+    assert openai_backend.threads.retrieve(thread.id).metadata == {"db": "p"}
+    assert [m.id for m in openai_backend.threads.messages.list(thread.id)] == [
+        message.id
+    ]
+
+    # Once the writes have replicated the reads go to the replica
+    time.sleep(0.3)
+    assert openai_backend.threads.retrieve(thread.id).metadata == {"db": "r"}
+    assert openai_backend.threads.messages.list(thread.id) == []
+
+    # Objects missing on the replica are looked up on the primary
+    assert openai_backend.threads.messages.retrieve(message.id, thread_id=thread.id)
+    with pytest.raises(NotFound):
+        openai_backend.threads.retrieve("thread_not_exist")
+
+
+def test_openai_backend_replica_fallback(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    openai_backend, replica_backend = _backends(tmp_path)
+    thread = get_dummy_thread()
+    replica_backend.threads.create(thread.model_copy(update={"metadata": {"db": "r"}}))
+    openai_backend.threads.create(thread.model_copy(update={"metadata": {"db": "p"}}))
+    time.sleep(0.3)
+    assert openai_backend.threads.retrieve(thread.id).metadata == {"db": "r"}
+
+    # Lagging replicas are skipped
+    assert openai_backend.replica_router is not None
+    openai_backend.replica_router.lag_check_interval = 0.0
+    monkeypatch.setattr(_replicas, "measure_replica_lag", lambda engine: 60.0)
+    assert openai_backend.threads.retrieve(thread.id).metadata == {"db": "p"}
+
+
+def test_openai_backend_replica_unavailable(tmp_path: Path):
+    primary_url = f"sqlite:///{tmp_path / 'primary.db'}"
+    openai_backend = OpenaiBackend(
+        url=primary_url, replica_urls=[f"sqlite:///{tmp_path / 'missing/db'}"]
+    )
+    openai_backend.touch()
+    thread = openai_backend.threads.create(get_dummy_thread())
+    openai_backend.replica_router.max_lag = 0.0
+    assert openai_backend.threads.retrieve(thread.id) == thread
+    assert not openai_backend.replica_router.replicas[0].healthy
+
+
+def test_openai_backend_replica_engine_options(tmp_path: Path):
+    # The in-memory primary has no pool sizing or WAL, the file replica has both
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    openai_backend = OpenaiBackend(
+        url="sqlite:///:memory:", replica_urls=[replica_url], pool_size=3
+    )
+    assert openai_backend.replica_router is not None
+    replica_engine = openai_backend.replica_router.replicas[0].engine
+    assert isinstance(replica_engine.pool, sa.pool.QueuePool)
+    assert replica_engine.pool.size() == 3
+    assert not isinstance(openai_backend.sql_engine.pool, sa.pool.QueuePool)
+    with replica_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+    with openai_backend.sql_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "memory"
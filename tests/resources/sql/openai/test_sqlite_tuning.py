@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Text
+
+import pytest
+from openai.types.beta.assistant import Assistant
+from sqlalchemy.pool import QueuePool
+
+from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.utils.openai_dummies import (
+    get_dummy_assistant,
+    get_dummy_message,
+    get_dummy_run,
+    get_dummy_thread,
+)
+
+
+def _pragma(openai_backend: OpenaiBackend, name: Text):
+    with openai_backend.sql_engine.connect() as conn:
+        return conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+
+def _concurrent_writes(
+    db_path: Path,
+    *,
+    sqlite_pragmas: Optional[Dict[Text, Any]],
+    workers: int = 8,
+    writes_per_worker: int = 25,
+) -> float:
+    """Return the write throughput of concurrent `runs.update` and
+    `messages.create` calls, in writes per second.
+    """
+
+    openai_backend = OpenaiBackend(
+        url=f"sqlite:///{db_path}", sqlite_pragmas=sqlite_pragmas
+    )
+    openai_backend.touch()
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = openai_backend.threads.create(get_dummy_thread())
+    runs = [
+        openai_backend.threads.runs.create(
+            get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+        )
+        for _ in range(workers)
+    ]
+
+    def _worker(run_id: Text):
+        for i in range(writes_per_worker):
+            openai_backend.threads.messages.create(
+                get_dummy_message(thread_id=thread.id)
+            )
+            openai_backend.threads.runs.update(
+                run_id, thread_id=thread.id, metadata={"step": str(i)}
+            )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(_worker, run.id) for run in runs]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    messages = openai_backend.threads.messages.list(thread_id=thread.id)
+    assert len(messages) == workers * writes_per_worker
+    openai_backend.sql_engine.dispose()
+    return (workers * writes_per_worker * 2) / elapsed
+
+
+def test_openai_backend_sqlite_pragmas(tmp_path: Path):
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    openai_backend.touch()
+    assert _pragma(openai_backend, "journal_mode") == "wal"
+    assert _pragma(openai_backend, "synchronous") == 1  # NORMAL
+    assert _pragma(openai_backend, "busy_timeout") == 5000
+
+    openai_backend = OpenaiBackend(
+        url=f"sqlite:///{tmp_path / 'openai-default.db'}", sqlite_pragmas={}
+    )
+    openai_backend.touch()
+    assert _pragma(openai_backend, "journal_mode") == "delete"
+
+    # WAL is skipped for in-memory databases, the other pragmas still apply
+    openai_backend = OpenaiBackend(url="sqlite:///:memory:")
+    openai_backend.touch()
+    assert _pragma(openai_backend, "journal_mode") == "memory"
+    assert _pragma(openai_backend, "busy_timeout") == 5000
+
+
+def test_openai_backend_pool_settings(tmp_path: Path):
+    openai_backend = OpenaiBackend(
+        url=f"sqlite:///{tmp_path / 'openai.db'}",
+        pool_size=12,
+        max_overflow=4,
+        pool_timeout=3.0,
+        pool_recycle=600,
+    )
+    pool = openai_backend.sql_engine.pool
+    assert isinstance(pool, QueuePool)
+    assert pool.size() == 12
+    assert pool._max_overflow == 4
+    assert pool._timeout == 3.0
+    assert pool._recycle == 600
+    assert pool._pre_ping is True
+
+    # Pool sizing does not apply to the single connection of in-memory SQLite
+    openai_backend = OpenaiBackend(
+        url="sqlite:///:memory:", pool_size=12, max_overflow=4
+    )
+    assert not isinstance(openai_backend.sql_engine.pool, QueuePool)
+
+
+def test_openai_backend_sqlite_concurrent_writes(tmp_path: Path):
+    _concurrent_writes(tmp_path / "openai.db", sqlite_pragmas=None, workers=4)
+
+    # The pragmas apply to every connection of the pool, not only the first
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    with openai_backend.sql_engine.connect() as conn_1:
+        with openai_backend.sql_engine.connect() as conn_2:
+            for conn in (conn_1, conn_2):
+                assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+                assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+                assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+    assert openai_backend.sql_engine.pool.checkedout() == 0
+
+
+@pytest.mark.benchmark
+def test_openai_backend_sqlite_concurrent_writes_benchmark(tmp_path: Path):
+    default_throughput = _concurrent_writes(tmp_path / "default.db", sqlite_pragmas={})
+    tuned_throughput = _concurrent_writes(tmp_path / "tuned.db", sqlite_pragmas=None)
+    print(
+        "SQLite concurrent writes: "
+        + f"default {default_throughput:.1f} writes/s, "
+        + f"tuned {tuned_throughput:.1f} writes/s"
+    )
@@ -0,0 +1,83 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from languru.exceptions import OrganizationNotFound
+from languru.openai_plugins.registry import ProviderSpec
+from languru.server.deps.openai_clients import OpenaiClients
+from languru.types.organizations import OrganizationType
+
+# The provider SDKs, only imported when their clients are first routed to
+PROVIDER_MODULES = ("anthropic", "google.generativeai", "groq", "voyageai")
+
+
+def _import_in_subprocess(module: str, modules=PROVIDER_MODULES) -> dict:
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [m for m in {tuple(modules)!r} if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'loaded': loaded}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_time_openai_clients():
+    # Neither the provider SDKs nor FastAPI, the heaviest imports of the server
+    result = _import_in_subprocess(
+        "languru.server.deps.openai_clients", PROVIDER_MODULES + ("fastapi",)
+    )
+    print(f"Import languru.server.deps.openai_clients: {result['elapsed']:.3f}s")
+    assert result["loaded"] == []
+
+
+def test_import_time_cli():
+    # The CLI does not even import the OpenAI SDK
+    result = _import_in_subprocess("languru.cli.main", PROVIDER_MODULES + ("openai",))
+    print(f"Import languru.cli.main: {result['elapsed']:.3f}s")
+    assert result["loaded"] == []
+
+
+class _Client:
+    instances = 0
+
+    def __init__(self):
+        _Client.instances += 1
+
+
+def test_openai_clients_lazy_client(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("LANGURU_TEST_API_KEY", "test")
+    openai_clients = OpenaiClients(
+        providers=[
+            ProviderSpec(
+                organization=OrganizationType.ANTHROPIC,
+                client=f"{__name__}:_Client",
+                models=("claude-test",),
+                env_keys=("LANGURU_TEST_API_KEY",),
+            ),
+            ProviderSpec(
+                organization=OrganizationType.GROQ,
+                client=f"{__name__}:_Client",
+                models=("groq-test",),
+                env_keys=("LANGURU_TEST_NOT_SET",),
+            ),
+        ]
+    )
+    assert [m.id for m in openai_clients.models()] == ["claude-test"]
+    assert openai_clients.initialized_clients() == []
+    assert _Client.instances == 0
+
+    # Created on the first route only
+    assert openai_clients.org_from_model("claude-test") == OrganizationType.ANTHROPIC
+    assert openai_clients.org_from_model("groq-test") is None
+    _client = openai_clients.org_to_openai_client(OrganizationType.ANTHROPIC)
+    assert openai_clients.org_to_openai_client("anthropic") is _client
+    assert _Client.instances == 1
+    with pytest.raises(OrganizationNotFound):
+        openai_clients.org_to_openai_client(OrganizationType.OPENAI)
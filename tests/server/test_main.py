@@ -14,3 +14,34 @@ def test_app_health(test_client):
     response = test_client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.parametrize(
+    "workers, invalidation, cached",
+    [(1, False, True), (2, False, False), (2, True, True)],
+)
+def test_app_openai_backend_cache(workers, invalidation, cached, tmp_path):
+    from languru.server.build import create_app
+    from languru.server.config import ServerBaseSettings
+
+    assert ServerBaseSettings().OPENAI_BACKEND_CACHE_TTL is None
+    settings = ServerBaseSettings(
+        OPENAI_BACKEND_URL="sqlite:///:memory:",
+        OPENAI_BACKEND_CACHE_TTL=60,
+        OPENAI_BACKEND_CACHE_INVALIDATION_URL=(
+            f"diskcache://{tmp_path / 'cache'}" if invalidation else None
+        ),
+        WORKERS=workers,
+    )
+    app = create_app(settings)
+    openai_backend = app.state.openai_backend
+    assert (openai_backend._threads_cache is not None) is cached
+
+
+def test_app_openai_backend_single_process():
+    from languru.server.build import create_app
+    from languru.server.config import ServerBaseSettings
+
+    with pytest.raises(ValueError, match="single process"):
+        create_app(ServerBaseSettings(OPENAI_BACKEND_URL="memory://", WORKERS=2))
+    create_app(ServerBaseSettings(OPENAI_BACKEND_URL="memory://", WORKERS=1))
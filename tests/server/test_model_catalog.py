@@ -0,0 +1,111 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+from openai.types import Model
+
+from languru.server.deps.openai_clients import OpenaiClients
+from languru.tasks.openai_models import loop_openai_clients_models_refresh
+from languru.types.organizations import OrganizationType
+
+
+def _openai_clients(listed_models):
+    openai_clients = OpenaiClients()
+    calls = []
+
+    def _list():
+        calls.append(1)
+        if isinstance(listed_models, Exception):
+            raise listed_models
+        return [
+            Model(id=m, created=1, object="model", owned_by="google")
+            for m in listed_models
+        ]
+
+    google_client = SimpleNamespace(models=SimpleNamespace(list=_list))
+    openai_clients._clients["google"] = google_client  # type: ignore
+
+    openai_clients.model_add(
+        Model(
+            id="models/gemini-1.5-flash", created=0, object="model", owned_by="google"
+        )
+    )
+    return (openai_clients, calls)
+
+
+def test_openai_clients_refresh_models():
+    openai_clients, calls = _openai_clients(
+        ["models/gemini-1.5-flash", "models/gemini-new"]
+    )
+    known_models = {m.id: m.created for m in openai_clients.models()}
+    assert "models/gemini-new" not in known_models
+
+    new_models = openai_clients.refresh_models()
+    assert [m.id for m in new_models] == ["models/gemini-new"]
+    assert openai_clients.org_from_model("models/gemini-new") == (
+        OrganizationType.GOOGLE
+    )
+    assert openai_clients.refresh_models() == []
+    assert len(calls) == 2
+
+    # The catalog is served from memory with stable timestamps
+    models = {m.id: m.created for m in openai_clients.models()}
+    assert models["models/gemini-new"] == 1
+    assert {k: models[k] for k in known_models} == known_models
+    assert len(calls) == 2
+
+
+def test_openai_clients_refresh_models_evicted():
+    listed_models = ["models/gemini-1.5-flash", "models/gemini-new"]
+    openai_clients, _ = _openai_clients(listed_models)
+    openai_clients.refresh_models()
+    assert openai_clients.models(model="models/gemini-new")
+
+    # The models removed upstream are evicted from the catalog and the routes
+    listed_models.remove("models/gemini-new")
+    assert openai_clients.refresh_models() == []
+    model_ids = {m.id for m in openai_clients.models()}
+    assert "models/gemini-new" not in model_ids
+    assert "models/gemini-1.5-flash" in model_ids
+    assert openai_clients.org_from_model("models/gemini-new") is None
+
+
+def test_openai_clients_refresh_models_failure():
+    openai_clients, _ = _openai_clients(RuntimeError("unavailable"))
+    num_models = len(openai_clients.models())
+    assert openai_clients.refresh_models() == []
+    assert len(openai_clients.models()) == num_models
+    assert openai_clients.models_refreshed_at is not None
+
+
+@pytest.mark.asyncio
+async def test_loop_openai_clients_models_refresh():
+    openai_clients, calls = _openai_clients(["models/gemini-new"])
+    task = asyncio.create_task(
+        loop_openai_clients_models_refresh(openai_clients, interval=0.05)
+    )
+    await asyncio.sleep(0.3)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert len(calls) >= 2
+    assert openai_clients.models(model="models/gemini-new")
+
+
+def test_openai_clients_refresh_models_uninitialized(monkeypatch: pytest.MonkeyPatch):
+    for env_key in (
+        "ANTHROPIC_API_KEY",
+        "GOOGLE_API_KEY",
+        "GROQ_API_KEY",
+        "VOYAGE_API_KEY",
+    ):
+        monkeypatch.setenv(env_key, "test")
+    sdk_modules = {"anthropic", "google.generativeai", "groq", "voyageai"}
+    imported = set(sys.modules)
+    openai_clients = OpenaiClients()
+
+    # The providers with credentials but without a client are not listed
+    assert openai_clients.refresh_models() == []
+    assert openai_clients.initialized_clients() == []
+    assert not sdk_modules & (set(sys.modules) - imported)
@@ -0,0 +1,38 @@
+from typing import Text
+
+import pytest
+from openai.types.beta.assistant import Assistant
+
+from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.tasks.openai_backend import task_openai_backend_maintenance
+from languru.utils.openai_dummies import (
+    get_dummy_assistant,
+    get_dummy_run,
+    get_dummy_thread,
+)
+
+
+@pytest.mark.asyncio
+async def test_task_openai_backend_maintenance(session_id_fixture: Text, tmp_path):
+    # The jobs run in worker threads, which do not share in-memory databases
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    openai_backend.touch()
+
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = openai_backend.threads.create(get_dummy_thread())
+    run = openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id=assistant.id, thread_id=thread.id).model_copy(
+            update={"status": "in_progress", "expires_at": 1}
+        )
+    )
+
+    result = await task_openai_backend_maintenance(
+        openai_backend, run_retention=86400, thread_retention=86400
+    )
+    assert result["expired_runs"] == 1
+    assert result["deleted_runs"] == 0
+    assert result["deleted_threads"] == 0
+    run = openai_backend.threads.runs.retrieve(run.id, thread_id=thread.id)
+    assert run.status == "expired"
@@ -0,0 +1,298 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, List, Text
+
+import pytest
+from openai.types import CreateEmbeddingResponse
+
+from languru.exceptions import InvalidRequest, NotFound
+from languru.openai_plugins.registry import ProviderCapabilities, ProviderSpec
+from languru.resources.local.openai.batches import LocalBatches
+from languru.resources.local.openai.files import LocalFiles
+from languru.server.deps.openai_clients import OpenaiClients
+from languru.tasks.openai_batches import BatchWorker
+from languru.types.organizations import OrganizationType
+
+
+def _embedding_response(model: Text) -> CreateEmbeddingResponse:
+    return CreateEmbeddingResponse.model_validate(
+        {
+            "object": "list",
+            "model": model,
+            "data": [{"object": "embedding", "index": 0, "embedding": [0.1, 0.2]}],
+            "usage": {"prompt_tokens": 1, "total_tokens": 1},
+        }
+    )
+
+
+@pytest.fixture
+def upstream(monkeypatch: pytest.MonkeyPatch):
+    """An upstream which records the requests, `model=fail` raises and
+    `model=hang` never answers.
+    """
+
+    requests: List[Dict] = []
+    hanging = asyncio.Event()
+
+    class _Embeddings:
+        async def create(self, **kwargs):
+            requests.append(kwargs)
+            if kwargs["model"] == "fail":
+                raise ValueError("upstream failed")
+            if kwargs["model"] == "hang":
+                hanging.set()
+                await asyncio.sleep(60)
+            return _embedding_response(kwargs["model"])
+
+    class _AsyncClient:
+        embeddings = _Embeddings()
+
+    monkeypatch.setenv("LANGURU_TEST_API_KEY", "test")
+    openai_clients = OpenaiClients(
+        providers=[
+            ProviderSpec(
+                organization=OrganizationType.OPENAI,
+                client="openai:OpenAI",
+                models=("text-embedding-3-small", "fail", "hang"),
+                env_keys=("LANGURU_TEST_API_KEY",),
+                capabilities=ProviderCapabilities(
+                    chat=False, embeddings=True, max_batch_size=2, max_concurrency=2
+                ),
+            )
+        ]
+    )
+    openai_clients._clients["openai"] = object()  # type: ignore[assignment]
+    openai_clients._async_clients["openai"] = _AsyncClient()  # type: ignore
+    return (requests, hanging, openai_clients)
+
+
+def _batch_worker(
+    tmp_path: Path,
+    lines: List[Dict],
+    openai_clients: OpenaiClients,
+    endpoint: str = "/v1/embeddings",
+) -> BatchWorker:
+    batch_worker = BatchWorker(
+        LocalFiles(tmp_path / "files"),
+        LocalBatches(tmp_path / "batches"),
+        openai_clients=openai_clients,
+        concurrency=4,
+    )
+    input_file = batch_worker.files.create(
+        "".join(json.dumps(line) + "\n" for line in lines).encode(),
+        filename="requests.jsonl",
+        purpose="batch",
+    )
+    batch_worker.batches.create(input_file_id=input_file.id, endpoint=endpoint)
+    return batch_worker
+
+
+def _request(custom_id: Text, model: Text = "openai/text-embedding-3-small") -> Dict:
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/embeddings",
+        "body": {"model": model, "input": custom_id},
+    }
+
+
+def _read_results(batch_worker: BatchWorker, file_id) -> List[Dict]:
+    content = batch_worker.files.path(file_id).read_text()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_batch_worker_process(tmp_path: Path, upstream):
+    requests, _, openai_clients = upstream
+    batch_worker = _batch_worker(
+        tmp_path,
+        [_request(f"req-{i}") for i in range(10)] + [_request("x", "fail")],
+        openai_clients,
+    )
+    batch = batch_worker.batches.list()[0]
+    batch = await batch_worker.submit(batch.id)
+
+    assert batch.status == "completed"
+    assert batch.request_counts is not None
+    assert (batch.request_counts.completed, batch.request_counts.failed) == (10, 1)
+    assert len(requests) == 11
+    assert requests[0]["model"] == "text-embedding-3-small"
+    outputs = _read_results(batch_worker, batch.output_file_id)
+    assert sorted(o["custom_id"] for o in outputs) == sorted(
+        f"req-{i}" for i in range(10)
+    )
+    assert outputs[0]["response"]["status_code"] == 200
+    errors = _read_results(batch_worker, batch.error_file_id)
+    assert errors[0]["custom_id"] == "x"
+    assert errors[0]["error"]["code"] == "ValueError"
+    assert batch_worker.files.retrieve(batch.output_file_id).status == "processed"
+    assert len(batch_worker) == 0
+
+
+@pytest.mark.asyncio
+async def test_batch_worker_validation(tmp_path: Path, upstream):
+    requests, _, openai_clients = upstream
+    batch_worker = _batch_worker(
+        tmp_path,
+        [_request("req-0"), _request("req-0"), {"custom_id": "req-1"}],
+        openai_clients,
+    )
+    batch = batch_worker.batches.list()[0]
+    batch = await batch_worker.submit(batch.id)
+
+    assert batch.status == "failed"
+    assert batch.errors is not None and batch.errors.data is not None
+    assert [(e.code, e.line) for e in batch.errors.data] == [
+        ("duplicate_custom_id", 2),
+        ("invalid_method", 3),
+    ]
+    assert requests == []
+
+
+@pytest.mark.asyncio
+async def test_batch_worker_resume(tmp_path: Path, upstream):
+    requests, _, openai_clients = upstream
+    batch_worker = _batch_worker(
+        tmp_path, [_request(f"req-{i}") for i in range(5)], openai_clients
+    )
+    batch = batch_worker.batches.list()[0]
+
+    # A crash left the batch in progress with two results and a partial line
+    output_file = batch_worker.files.create(
+        b"", filename="output.jsonl", purpose="batch_output"
+    )
+    error_file = batch_worker.files.create(
+        b"", filename="error.jsonl", purpose="batch_output"
+    )
+    batch_worker.files.path(output_file.id).write_text(
+        json.dumps({"custom_id": "req-0", "response": {"status_code": 200}})
+        + "\n"
+        + json.dumps({"custom_id": "req-3", "response": {"status_code": 200}})
+        + '\n{"custom_id": "req-'
+    )
+    batch_worker.batches.update(
+        batch.id,
+        status="in_progress",
+        output_file_id=output_file.id,
+        error_file_id=error_file.id,
+        request_counts={"total": 5, "completed": 1, "failed": 0},
+    )
+
+    await batch_worker.start()
+    batch = await batch_worker.submit(batch.id)
+    assert batch.status == "completed"
+    assert sorted(r["input"] for r in requests) == ["req-1", "req-2", "req-4"]
+    assert batch.request_counts is not None
+    assert batch.request_counts.completed == 5
+    outputs = _read_results(batch_worker, batch.output_file_id)
+    assert sorted(o["custom_id"] for o in outputs) == [f"req-{i}" for i in range(5)]
+    # No request failed, so the batch has no error file
+    assert batch.error_file_id is None
+    await batch_worker.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_batch_worker_claim(tmp_path: Path, upstream):
+    requests, hanging, openai_clients = upstream
+    batch_worker = _batch_worker(
+        tmp_path, [_request("req-0"), _request("req-1", "hang")], openai_clients
+    )
+    batch_worker.checkpoint_interval = 0.1
+    batch = batch_worker.batches.list()[0]
+    task = batch_worker.submit(batch.id)
+    await asyncio.wait_for(hanging.wait(), timeout=10)
+
+    # The worker of another process leaves the claimed batch alone
+    other_worker = BatchWorker(
+        LocalFiles(tmp_path / "files"),
+        LocalBatches(tmp_path / "batches"),
+        openai_clients=openai_clients,
+    )
+    assert await other_worker.resume() == 0
+    other_batch = await other_worker.submit(batch.id)
+    assert other_batch.status == "in_progress"
+    assert len(requests) == 2
+
+    # It cancels the batch through the store, the owner stops at a checkpoint
+    other_worker.batches.transition(
+        batch.id, from_statuses=("in_progress",), status="cancelling"
+    )
+    batch = await asyncio.wait_for(task, timeout=10)
+    assert batch.status == "cancelled"
+    assert not list((tmp_path / "batches").glob(f".{batch.id}.lock"))
+
+
+@pytest.mark.asyncio
+async def test_batch_worker_cancel(tmp_path: Path, upstream):
+    _, hanging, openai_clients = upstream
+    batch_worker = _batch_worker(
+        tmp_path, [_request("req-0"), _request("req-1", "hang")], openai_clients
+    )
+    batch = batch_worker.batches.list()[0]
+    task = batch_worker.submit(batch.id)
+    await asyncio.wait_for(hanging.wait(), timeout=10)
+
+    batch_worker.batches.transition(
+        batch.id, from_statuses=("in_progress",), status="cancelling"
+    )
+    assert batch_worker.cancel(batch.id)
+    batch = await asyncio.wait_for(task, timeout=10)
+    assert batch.status == "cancelled"
+    assert batch.cancelled_at is not None
+    assert batch.request_counts is not None
+    assert batch.request_counts.completed == 1
+    outputs = _read_results(batch_worker, batch.output_file_id)
+    assert [o["custom_id"] for o in outputs] == ["req-0"]
+
+
+@pytest.mark.asyncio
+async def test_batch_worker_capabilities(tmp_path: Path, upstream):
+    requests, _, openai_clients = upstream
+    batch_worker = _batch_worker(
+        tmp_path,
+        [
+            _request("req-0"),
+            {**_request("req-1"), "body": {"model": "fail", "input": ["a"] * 3}},
+        ],
+        openai_clients,
+    )
+    batch = await batch_worker.submit(batch_worker.batches.list()[0].id)
+    assert batch.status == "completed"
+    errors = _read_results(batch_worker, batch.error_file_id)
+    # The inputs over the `max_batch_size` never reach the provider
+    assert errors[0]["custom_id"] == "req-1"
+    assert errors[0]["response"]["status_code"] == 400
+    assert [r["input"] for r in requests] == ["req-0"]
+
+    # The provider has no chat capability
+    chat_request = {
+        "custom_id": "req-2",
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {"model": "text-embedding-3-small", "messages": []},
+    }
+    batch_worker = _batch_worker(
+        tmp_path / "chat", [chat_request], openai_clients, "/v1/chat/completions"
+    )
+    batch = await batch_worker.submit(batch_worker.batches.list()[0].id)
+    errors = _read_results(batch_worker, batch.error_file_id)
+    assert "does not support chat" in errors[0]["response"]["body"]["error"]["message"]
+
+
+@pytest.mark.asyncio
+async def test_batch_worker_delete_file(tmp_path: Path, upstream):
+    _, _, openai_clients = upstream
+    batch_worker = _batch_worker(tmp_path, [_request("req-0")], openai_clients)
+    batch = batch_worker.batches.list()[0]
+
+    # The input of an unfinished batch is kept
+    with pytest.raises(InvalidRequest):
+        batch_worker.delete_file(batch.input_file_id)
+    assert batch_worker.files.path(batch.input_file_id).exists()
+
+    batch = await batch_worker.submit(batch.id)
+    assert batch.status == "completed"
+    assert batch_worker.delete_file(batch.input_file_id).deleted
+    with pytest.raises(NotFound):
+        batch_worker.delete_file(batch.input_file_id)
@@ -0,0 +1,408 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Dict, List, Text
+
+import pytest
+from openai.types.beta.assistant import Assistant
+from openai.types.beta.function_tool import FunctionTool
+from openai.types.chat.chat_completion import ChatCompletion
+
+import languru.tasks.openai_threads
+from languru.resources.sql.openai.backend import OpenaiBackend
+from languru.tasks.openai_threads import (
+    RunTasks,
+    resume_scheduled_runs,
+    task_openai_threads_runs_create,
+)
+from languru.tasks.run_tools import RunTools
+from languru.types.openai_threads import RunState
+from languru.utils.openai_dummies import (
+    get_dummy_assistant,
+    get_dummy_message,
+    get_dummy_run,
+    get_dummy_thread,
+)
+
+
+def _create_run(openai_backend: OpenaiBackend):
+    openai_backend.touch()
+    assistant = openai_backend.assistants.create(
+        Assistant.model_validate(get_dummy_assistant())
+    )
+    thread = openai_backend.threads.create(get_dummy_thread())
+    message = openai_backend.threads.messages.create(
+        get_dummy_message(thread_id=thread.id)
+    )
+    run = openai_backend.threads.runs.create(
+        get_dummy_run(assistant_id=assistant.id, thread_id=thread.id)
+    )
+    return (run, message)
+
+
+@pytest.mark.asyncio
+async def test_task_openai_threads_runs_create_cancelled_before_start(
+    session_id_fixture: Text, tmp_path: Path
+):
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    run, message = _create_run(openai_backend)
+    openai_backend.threads.runs.update(
+        run.id, thread_id=run.thread_id, status="cancelling"
+    )
+
+    # The run is not started, so the chat completion is never requested
+    run = await task_openai_threads_runs_create(
+        run,
+        [message],
+        openai_client=None,  # type: ignore[arg-type]
+        openai_backend=openai_backend,
+        verbose=False,
+    )
+    assert run.status == "cancelled"
+    assert run.cancelled_at is not None
+
+
+@pytest.mark.asyncio
+async def test_task_openai_threads_runs_create_cancelled_mid_generation(
+    session_id_fixture: Text, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    run, message = _create_run(openai_backend)
+
+    # An upstream which never answers
+    generating = asyncio.Event()
+
+    class _Completions:
+        async def create(self, **kwargs):
+            generating.set()
+            await asyncio.sleep(60)
+
+    class _AsyncClient:
+        class chat:
+            completions = _Completions()
+
+    monkeypatch.setattr(
+        languru.tasks.openai_threads,
+        "to_async_openai_client",
+        lambda openai_client: _AsyncClient(),
+    )
+
+    run_tasks = RunTasks()
+    task = run_tasks.submit(
+        run.id,
+        task_openai_threads_runs_create(
+            run,
+            [message],
+            openai_client=None,  # type: ignore[arg-type]
+            openai_backend=openai_backend,
+            verbose=False,
+        ),
+    )
+    assert run.id in run_tasks
+    await asyncio.wait_for(generating.wait(), timeout=10)
+
+    # Cancelling the task aborts the upstream request right away
+    openai_backend.threads.runs.transition(
+        run.id,
+        thread_id=run.thread_id,
+        from_statuses=("in_progress",),
+        status="cancelling",
+    )
+    assert run_tasks.cancel(run.id)
+    run = await asyncio.wait_for(task, timeout=10)
+    assert run.status == "cancelled"
+    assert len(run_tasks) == 0
+    assert not run_tasks.cancel(run.id)
+
+
+@pytest.mark.asyncio
+async def test_run_tasks_delayed_run(session_id_fixture: Text, tmp_path: Path):
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    run, message = _create_run(openai_backend)
+    openai_backend.threads.runs.update(
+        run.id, thread_id=run.thread_id, status="cancelling"
+    )
+
+    # The delayed run holds no task until it is started
+    run_tasks = RunTasks()
+    task = run_tasks.submit(
+        run.id,
+        task_openai_threads_runs_create(
+            run,
+            [message],
+            openai_client=None,  # type: ignore[arg-type]
+            openai_backend=openai_backend,
+        ),
+        delay=60,
+    )
+    assert task is None
+    assert run.id in run_tasks
+    assert (len(run_tasks), run_tasks.scheduled) == (0, 1)
+
+    # Cancelling starts it right away to finish the cancellation
+    assert run_tasks.cancel(run.id)
+    task = run_tasks.get(run.id)
+    assert task is not None
+    assert run_tasks.scheduled == 0
+    run = await asyncio.wait_for(task, timeout=10)
+    assert run.status == "cancelled"
+    assert run.id not in run_tasks
+
+
+@pytest.mark.asyncio
+async def test_resume_scheduled_runs(
+    session_id_fixture: Text, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    runs = [_create_run(openai_backend)[0] for _ in range(3)]
+    openai_backend.threads.runs.update(
+        runs[2].id, thread_id=runs[2].thread_id, status="cancelled"
+    )
+    now = time.time()
+    for run, scheduled_at in zip(runs, (now - 1, now + 60, now - 1)):
+        openai_backend.threads.runs.save_state(
+            RunState(
+                id=run.id,
+                thread_id=run.thread_id,
+                org_type="openai",
+                scheduled_at=scheduled_at,
+            )
+        )
+
+    # The resumed run waits, so it is still in flight when it is checked
+    release = asyncio.Event()
+
+    class _Completions:
+        async def create(self, **kwargs):
+            await release.wait()
+            return _chat_completion(content="Resumed.")
+
+    class _AsyncClient:
+        class chat:
+            completions = _Completions()
+
+    class _OpenaiClients:
+        def model_strip_org(self, model, org=None):
+            return model
+
+        def org_to_openai_client(self, org):
+            return None
+
+    monkeypatch.setattr(
+        languru.tasks.openai_threads,
+        "to_async_openai_client",
+        lambda openai_client: _AsyncClient(),
+    )
+
+    # The runs of the last process start when their delays pass
+    run_tasks = RunTasks()
+    scheduled = await resume_scheduled_runs(
+        run_tasks,
+        openai_backend=openai_backend,
+        openai_clients=_OpenaiClients(),  # type: ignore[arg-type]
+    )
+    assert scheduled == 2
+    assert (len(run_tasks), run_tasks.scheduled) == (1, 1)
+    task = run_tasks.get(runs[0].id)
+    assert task is not None
+    release.set()
+    run = await asyncio.wait_for(task, timeout=10)
+    assert run.status == "completed"
+    assert [s.id for s in openai_backend.threads.runs.list_scheduled_states()] == [
+        runs[1].id
+    ]
+    await run_tasks.shutdown()
+
+
+def _chat_completion(content=None, tool_calls=None) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                    "message": {
+                        "role": "assistant",
+                        "content": content,
+                        "tool_calls": [
+                            {
+                                "id": f"call_{name}",
+                                "type": "function",
+                                "function": {"name": name, "arguments": "{}"},
+                            }
+                            for name in tool_calls or []
+                        ]
+                        or None,
+                    },
+                }
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_task_openai_threads_runs_create_cancelled_on_completion(
+    session_id_fixture: Text, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    run, message = _create_run(openai_backend)
+
+    # The run is cancelled while the upstream answers
+    class _Completions:
+        async def create(self, **kwargs):
+            openai_backend.threads.runs.transition(
+                run.id,
+                thread_id=run.thread_id,
+                from_statuses=("in_progress",),
+                status="cancelling",
+            )
+            return _chat_completion(content="Too late.")
+
+    class _AsyncClient:
+        class chat:
+            completions = _Completions()
+
+    monkeypatch.setattr(
+        languru.tasks.openai_threads,
+        "to_async_openai_client",
+        lambda openai_client: _AsyncClient(),
+    )
+
+    messages = [message]
+    run = await task_openai_threads_runs_create(
+        run,
+        messages,
+        openai_client=None,  # type: ignore[arg-type]
+        openai_backend=openai_backend,
+        verbose=False,
+    )
+    assert run.status == "cancelled"
+    # The answer of the cancelled run is not added to the thread
+    assert messages == [message]
+    thread_messages = openai_backend.threads.messages.list(thread_id=run.thread_id)
+    assert [m.id for m in thread_messages] == [message.id]
+
+
+@pytest.mark.asyncio
+async def test_task_openai_threads_runs_create_tool_calls(
+    session_id_fixture: Text, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    openai_backend = OpenaiBackend(url=f"sqlite:///{tmp_path / 'openai.db'}")
+    run, message = _create_run(openai_backend)
+    run = openai_backend.threads.runs.update(
+        run.id,
+        thread_id=run.thread_id,
+        tools=[
+            FunctionTool.model_validate(
+                {"type": "function", "function": {"name": name}}
+            )
+            for name in ("local_a", "local_b", "client_c")
+        ],
+    )
+
+    # The upstream calls the tools, then answers with their outputs
+    requests: List[Dict] = []
+    responses = [
+        _chat_completion(tool_calls=["local_a", "local_b"]),
+        _chat_completion(tool_calls=["client_c"]),
+        _chat_completion(content="Done."),
+    ]
+
+    class _Completions:
+        async def create(self, **kwargs):
+            requests.append(kwargs)
+            return responses.pop(0)
+
+    class _AsyncClient:
+        class chat:
+            completions = _Completions()
+
+    monkeypatch.setattr(
+        languru.tasks.openai_threads,
+        "to_async_openai_client",
+        lambda openai_client: _AsyncClient(),
+    )
+
+    # The local tools run concurrently
+    run_tools = RunTools(max_concurrency=2)
+
+    async def local_a():
+        await asyncio.sleep(0.3)
+        return "a"
+
+    def local_b():
+        time.sleep(0.3)
+        return {"b": 1}
+
+    run_tools.register(local_a)
+    run_tools.register(local_b)
+
+    time_start = time.perf_counter()
+    run = await task_openai_threads_runs_create(
+        run,
+        [message],
+        openai_client=None,  # type: ignore[arg-type]
+        openai_backend=openai_backend,
+        run_tools=run_tools,
+    )
+    assert time.perf_counter() - time_start < 0.55
+    assert [t["function"]["name"] for t in requests[0]["tools"]] == [
+        "local_a",
+        "local_b",
+        "client_c",
+    ]
+    assert [m["content"] for m in requests[1]["messages"][-2:]] == ["a", '{"b": 1}']
+
+    # The other tools are handed to the client
+    assert run.status == "requires_action"
+    assert run.required_action is not None
+    tool_calls = run.required_action.submit_tool_outputs.tool_calls
+    assert [c.function.name for c in tool_calls] == ["client_c"]
+
+    run_queued = openai_backend.threads.runs.transition(
+        run.id,
+        thread_id=run.thread_id,
+        from_statuses=("requires_action",),
+        status="queued",
+    )
+    assert run_queued is not None
+    assert run_queued.required_action is None
+    run_state = openai_backend.threads.runs.retrieve_state(
+        run.id, thread_id=run.thread_id
+    )
+    assert run_state is not None
+    assert (run_state.rounds, len(run_state.conversation)) == (2, 4)
+    messages = [message]
+    run = await task_openai_threads_runs_create(
+        run_queued,
+        messages,
+        openai_client=None,  # type: ignore[arg-type]
+        openai_backend=openai_backend,
+        run_tools=run_tools,
+        tool_messages=run_tools.resume(
+            run,
+            [{"tool_call_id": tool_calls[0].id, "output": "c"}],
+            run_state=run_state,
+        ),
+        run_state=run_state,
+    )
+    assert run.status == "completed"
+    # The usage of the three completions, before and after the tool outputs
+    assert run.usage is not None and run.usage.total_tokens == 45
+    assert (
+        openai_backend.threads.runs.retrieve_state(run.id, thread_id=run.thread_id)
+        is None
+    )
+    assert requests[2]["messages"][-1] == {
+        "role": "tool",
+        "tool_call_id": "call_client_c",
+        "content": "c",
+    }
+    assert len(requests[2]["messages"]) == len(requests[1]["messages"]) + 2
+    assert messages[-1].content[0].text.value == "Done."  # type: ignore
+    run_tools.close()
@@ -0,0 +1,64 @@
+import base64
+
+import numpy as np
+import pytest
+
+from languru.utils.calculation import (
+    base64_to_embeddings,
+    embeddings_to_base64,
+    encode_embeddings,
+    l2_normalize,
+    mean_pooling,
+    truncate_embeddings,
+)
+
+
+def test_mean_pooling():
+    rng = np.random.default_rng(0)
+    last_hidden_states = rng.standard_normal((3, 5, 4)).astype(np.float32)
+    attention_mask = np.array([[1, 1, 0, 0, 0], [1, 1, 1, 1, 1], [0, 0, 0, 0, 0]])
+
+    pooled = mean_pooling(last_hidden_states, attention_mask)
+    assert pooled.dtype == np.float32
+    np.testing.assert_allclose(
+        pooled[0], last_hidden_states[0, :2].mean(axis=0), rtol=1e-5
+    )
+    np.testing.assert_allclose(pooled[1], last_hidden_states[1].mean(axis=0), rtol=1e-5)
+    # The fully masked rows are zeros
+    np.testing.assert_array_equal(pooled[2], 0)
+
+
+def test_l2_normalize_truncate():
+    embeddings = np.array([[3.0, 4.0, 12.0], [0.0, 0.0, 0.0]], dtype=np.float32)
+    normalized = l2_normalize(embeddings)
+    assert normalized is not embeddings
+    np.testing.assert_allclose(normalized[0], [3 / 13, 4 / 13, 12 / 13])
+    assert l2_normalize(embeddings, out=embeddings) is embeddings
+    np.testing.assert_allclose(embeddings, normalized)
+
+    truncated = truncate_embeddings(embeddings, 2)
+    assert truncated.flags.c_contiguous
+    np.testing.assert_allclose(truncated, [[0.6, 0.8], [0.0, 0.0]], rtol=1e-6)
+    assert truncate_embeddings(embeddings, 3) is embeddings
+    assert truncate_embeddings(embeddings, None) is embeddings
+
+
+def test_encode_embeddings():
+    embeddings = np.array([[0.5, -0.25], [1.0, 2.0]], dtype=np.float32)
+    assert encode_embeddings(embeddings) == [[0.5, -0.25], [1.0, 2.0]]
+
+    # The base64 of the OpenAI embeddings, little-endian float32
+    encoded = encode_embeddings(embeddings, "base64")
+    assert np.frombuffer(base64.b64decode(encoded[0]), dtype="<f4").tolist() == [
+        0.5,
+        -0.25,
+    ]
+    np.testing.assert_array_equal(base64_to_embeddings(encoded), embeddings)
+
+    encoded_half = embeddings_to_base64(embeddings, "float16")
+    assert len(base64.b64decode(encoded_half[0])) == 4
+    np.testing.assert_array_equal(
+        base64_to_embeddings(encoded_half, "float16"), embeddings
+    )
+    with pytest.raises(ValueError):
+        encode_embeddings(embeddings, "int8")
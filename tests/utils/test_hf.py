@@ -0,0 +1,53 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from languru.utils.hf import StopAtWordsStoppingCriteria  # noqa: E402
+
+
+def _step(criteria, input_ids, new_ids):
+    input_ids = torch.cat([input_ids, torch.tensor(new_ids).reshape(-1, 1)], dim=1)
+    return (input_ids, criteria(input_ids, None).tolist())
+
+
+def test_stop_at_words_per_row():
+    criteria = StopAtWordsStoppingCriteria([torch.tensor([5, 6])])
+    input_ids = torch.tensor([[5, 6], [1, 2]])
+
+    # A stop word in the prompt does not stop the generation
+    input_ids, is_done = _step(criteria, input_ids, [5, 7])
+    assert is_done == [False, False]
+    input_ids, is_done = _step(criteria, input_ids, [6, 5])
+    assert is_done == [True, False]
+    assert criteria.get_stop_reason() == "stop"
+    # The stopped row stays done, the other one keeps generating
+    input_ids, is_done = _step(criteria, input_ids, [0, 6])
+    assert is_done == [True, True]
+
+
+def test_stop_at_words_new_generation():
+    criteria = StopAtWordsStoppingCriteria([torch.tensor([5, 6])])
+    input_ids, is_done = _step(criteria, torch.tensor([[5], [5]]), [6, 6])
+    assert is_done == [True, True]
+
+    # Not one token longer than the last call, so a new generation
+    input_ids, is_done = _step(
+        criteria, torch.tensor([[1, 2, 3, 4], [1, 2, 3, 5]]), [7, 7]
+    )
+    assert is_done == [False, False]
+    input_ids, is_done = _step(criteria, input_ids, [5, 5])
+    input_ids, is_done = _step(criteria, input_ids, [6, 0])
+    assert is_done == [True, False]
+
+
+def test_stop_at_words_reset():
+    criteria = StopAtWordsStoppingCriteria([torch.tensor([5, 6])])
+    input_ids, is_done = _step(criteria, torch.tensor([[5], [5]]), [6, 6])
+    assert is_done == [True, True]
+
+    # A prompt one token longer looks like the next step without a reset
+    criteria.reset()
+    assert criteria.get_stop_reason() is None
+    input_ids, is_done = _step(criteria, torch.tensor([[1, 5], [1, 2]]), [6, 0])
+    assert is_done == [True, False]
@@ -1,9 +1,10 @@
 from typing import Any, Text
 
 import pytest
+from openai.types.chat.chat_completion_chunk import ChatCompletionChunk
 from pydantic import BaseModel
 
-from languru.utils.sse import simple_encode_sse
+from languru.utils.sse import ChatCompletionChunkEncoder, simple_encode_sse
 
 
 class MyBaseModel(BaseModel):
@@ -22,3 +23,73 @@ class MyBaseModel(BaseModel):
 )
 def test_simple_encode_sse(data: Any, expected: bytes):
     assert simple_encode_sse(data) == expected
+
+
+@pytest.mark.parametrize(
+    "content",
+    ["Hello", "", 'Quote " and \\ backslash', "Line\nbreak\t\x00", "天空 🌤️ é"],
+)
+def test_chat_completion_chunk_encoder(content: Text):
+    chunk = ChatCompletionChunk.model_validate(
+        {
+            "id": "chatcmpl-1",
+            "choices": [
+                {"index": 0, "delta": {"content": content, "role": "assistant"}}
+            ],
+            "created": 1700000000,
+            "model": "gpt-4o-mini",
+            "object": "chat.completion.chunk",
+            "system_fingerprint": "fp_1",
+        }
+    )
+    chunk_encoder = ChatCompletionChunkEncoder(
+        id="chatcmpl-1",
+        model="gpt-4o-mini",
+        created=1700000000,
+        system_fingerprint="fp_1",
+    )
+    assert chunk_encoder.encode_content(content) == simple_encode_sse(chunk)
+
+
+def test_groq_content_chunks_encoded_as_before():
+    from groq.types.chat.chat_completion_chunk import (
+        ChatCompletionChunk as GroqChatCompletionChunk,
+    )
+
+    from languru.openai_plugins.clients.groq import GroqChatCompletions
+
+    groq_chunks = [
+        GroqChatCompletionChunk.model_validate(
+            {
+                "id": "chatcmpl-1",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                "created": 1700000000,
+                "model": "llama3-8b-8192",
+                "object": "chat.completion.chunk",
+                "system_fingerprint": "fp_1",
+                "x_groq": x_groq,
+            }
+        )
+        for delta, finish, x_groq in (
+            (
+                {"role": "assistant", "content": ""},
+                None,
+                {"id": "req_1", "usage": None, "error": None},
+            ),
+            ({"role": "assistant", "content": "Hi é"}, None, None),
+            ({"content": " there"}, None, None),
+            ({}, "stop", {"id": "req_1", "usage": None, "error": None}),
+        )
+    ]
+    expected = [
+        simple_encode_sse(
+            ChatCompletionChunk.model_validate(c.model_dump(exclude_none=True))
+        )
+        for c in groq_chunks
+    ] + [simple_encode_sse("[DONE]")]
+    lines = list(
+        GroqChatCompletions.generator_generate_content_chunks(
+            None, groq_chunks  # type: ignore[arg-type]
+        )
+    )
+    assert lines == expected
@@ -0,0 +1,33 @@
+from languru.utils.stop_sequences import StopSequences
+
+
+def test_stop_sequences():
+    stop_sequences = StopSequences(["he", "she", "hers", "abcd", "bc", ""])
+    assert stop_sequences.patterns == (
+        ("h", "e"),
+        ("s", "h", "e"),
+        ("h", "e", "r", "s"),
+        ("a", "b", "c", "d"),
+        ("b", "c"),
+    )
+    # The first match ends earliest, the longest of the ones ending there
+    assert stop_sequences.feed(0, "ushers")[1] == (3, 3)
+    assert stop_sequences.feed(0, "nothing")[1] is None
+
+    # The matches across the fed chunks, holding back the possible prefixes
+    state, match = stop_sequences.feed(0, "xxab")
+    assert match is None
+    assert stop_sequences.pending(state) == 2
+    state, match = stop_sequences.feed(state, "c")
+    assert match == (0, 2)
+    state, match = stop_sequences.feed(stop_sequences.advance(0, "xab"), "x")
+    assert match is None and stop_sequences.pending(state) == 0
+
+
+def test_stop_sequences_token_ids():
+    stop_sequences = StopSequences([[7, 8, 9], [9, 1]])
+    assert stop_sequences.max_length == 3
+    state = stop_sequences.advance(0, [1, 7, 8])
+    assert stop_sequences.feed(state, [9])[1] == (0, 3)
+    assert stop_sequences.feed(0, [9, 9, 1])[1] == (2, 2)
+    assert not StopSequences([])